@@ -14,6 +14,11 @@
 # initial and final velocities will also be given
 # added time at closest approach
 # added function to select traj according to settings from ion imaging experiment
+# traj/mxt_fin files can be read in parallel by a pool of worker processes (mxt_fin.py)
+# incremental mode: only new or changed traj/mxt_fin files are read, see MXT2Summary.manifest
+# HBEAM selection with vectorized detector masks (detector.py)
+# binary scatter records traj/scatter*.bin (md_tian2 output scatter_bin) are read instead of traj/mxt_fin files (scatter_bin.py),
+# merged by traj_id with the traj/mxt_fin files of trajectories without a binary record
 
 # intention: analyze all traj/mxt_fin files and create the MXt2Summary file
 
@@ -25,12 +30,16 @@
 
 
 
-import os, sys, glob 
+import os, sys, glob, time, types, numpy
+import mxt_fin  # parallel reader for traj/mxt_fin files, lives next to this script
+import detector # detector acceptance masks, lives next to this script
+import scatter_bin # reader for traj/scatter*.bin files, lives next to this script
 
 # set names for output and log file
 outname     = "MXT2Summary"
 logfilename = "CreateMXTSummary.log"
 settingname = "plot_settings.dat"
+manifestname = "MXT2Summary.manifest" # file name, size and mtime of all harvested traj/mxt_fin files
 
 METAL_TYPE = "C"
 SHOT_THRU_LIMIT = 0.0
@@ -42,6 +51,14 @@ AZIMUTHAL_ANGLE = -42.0  # should match experimental settings (HBEAM surface shi
 ANGLE_MAX = 90  # maximum angle in degrees
 ANGLE_MIN = -90 # minimum angle in degrees
 
+NPROCS    = 0    # worker processes reading traj/mxt_fin files (0: all cores, 1: serial, -1: old keyword reader)
+CHUNKSIZE = 1000 # number of files handed to a worker at once
+
+INCREMENTAL = False # True: update an existing MXT2Summary.txt with new or changed traj/mxt_fin files only
+
+SCATTER_BIN = True # True: read traj/scatter*.bin files if there are any (fast, always reads all of them), traj/mxt_fin
+                   # files of trajectories without a binary record (runs without scatter_bin) are read as well
+
 # add range of scattered angle to look at
 
 ############# NO CHANGES BELOW THIS LINE ######################################
@@ -239,6 +256,136 @@ def read_in_mxt_fins(logfile):
         return traj_list
 
 
+def read_in_mxt_fins_parallel(logfile, folder_list=None):
+        os.chdir("traj/")
+        if folder_list is None:
+                folder_list = sorted(glob.glob('mxt_*'))
+        num_folders = len(folder_list)
+        print("Reading {} trajs with {} processes...".format(num_folders, NPROCS if NPROCS > 0 else os.cpu_count()))
+        logfile.write("Reading {} trajs with {} processes...\n".format(num_folders, NPROCS if NPROCS > 0 else os.cpu_count()))
+
+        def progress(ndone, ntotal):
+                print("{}%".format(100*ndone//ntotal))
+                logfile.write("{}%\n".format(100*ndone//ntotal))
+
+        start = time.time()
+        results = mxt_fin.harvest(folder_list, NPROCS, CHUNKSIZE, progress)
+        elapsed = time.time() - start
+
+        traj_list = []
+        for folder, (traj_id, fields) in zip(folder_list, results):
+                if fields is None:
+                        print("Skipping unfinished traj {}".format(folder))
+                        logfile.write("Skipping unfinished traj {}\n".format(folder))
+                        continue
+                traj_list.append(Traj(folder, *fields, traj_id))
+
+        print("Read {} files in {:.2f} s ({:.0f} files/s)".format(num_folders, elapsed, mxt_fin.throughput(num_folders, elapsed)))
+        logfile.write("Read {} files in {:.2f} s ({:.0f} files/s)\n".format(num_folders, elapsed, mxt_fin.throughput(num_folders, elapsed)))
+
+        os.chdir("../")
+        return traj_list
+
+
+def read_scatter_bins(logfile, fnames):
+        start = time.time()
+        recs  = scatter_bin.load(fnames)
+        traj_list = [Traj("mxt_fin%08d.dat" % rec["traj_id"], *scatter_bin.summary_fields(rec), "%08d" % rec["traj_id"]) for rec in recs]
+        elapsed = time.time() - start
+
+        print("Read {} trajs from {} scatter_bin files in {:.2f} s".format(len(traj_list), len(fnames), elapsed))
+        logfile.write("Read {} trajs from {} scatter_bin files in {:.2f} s\n".format(len(traj_list), len(fnames), elapsed))
+
+        # runs without scatter_bin (or before it was switched on) only wrote traj/mxt_fin files,
+        # a trajectory with both is taken from its binary record
+        have = set(traj.traj_id for traj in traj_list)
+        missing = [name for name, _, _ in mxt_fin.scan("traj") if mxt_fin.traj_id_from_name(name) not in have]
+        if missing:
+                print("{} traj/mxt_fin files without a scatter_bin record, reading them".format(len(missing)))
+                logfile.write("{} traj/mxt_fin files without a scatter_bin record, reading them\n".format(len(missing)))
+                traj_list = sorted(traj_list + read_in_mxt_fins_parallel(logfile, missing), key=lambda traj: traj.traj_id)
+        return traj_list
+
+
+def traj_from_summary_line(line):
+        sl = line.split()
+        return Traj("mxt_fin" + sl[0] + ".dat", sl[1], sl[2], sl[3], sl[4], sl[5:8], sl[8:11], sl[11], sl[12], \
+                    sl[13], sl[14], sl[15], sl[16], sl[17:20], sl[20:23], sl[23], sl[24], sl[25], sl[26], \
+                    sl[27], sl[28], sl[29:32], sl[0])
+
+
+def write_manifest(entries, traj_list):
+        # entries must be the stat of traj/ taken *before* the files were read, so that files
+        # changing in the meantime are read again next time
+        finished = set(traj.fname for traj in traj_list)
+        mxt_fin.write_manifest(manifestname, dict((name, (size, mtime, name in finished)) for name, size, mtime in entries))
+
+
+def update_summary_incremental(logfile):
+        # read only new or changed traj/mxt_fin files and merge them into the existing summary
+        summary_name = outname + ".txt"
+        manifest = mxt_fin.read_manifest(manifestname)
+        entries  = mxt_fin.scan("traj")
+
+        todo    = [name for name, size, mtime in entries if manifest.get(name, (None, None, False))[:2] != (size, mtime)]
+        current = set(name for name, _, _ in entries)
+        # trajectories already in the summary that have to be replaced or dropped
+        stale   = set(name for name in manifest if manifest[name][2] and (name not in current or name in todo))
+
+        print("Incremental update: {} of {} files new or changed, {} summary rows replaced".format(len(todo), len(entries), len(stale)))
+        logfile.write("Incremental update: {} of {} files new or changed, {} summary rows replaced\n".format(len(todo), len(entries), len(stale)))
+
+        new_trajs = read_in_mxt_fins_parallel(logfile, todo) if todo else []
+        new_names = set(traj.fname for traj in new_trajs)
+
+        last_id = max([name for name in manifest if manifest[name][2]] or [""])
+        if not stale and all(traj.fname > last_id for traj in new_trajs):
+                # common case during a running campaign: append at the end
+                outfile = open(summary_name, "a")
+                for traj in new_trajs:
+                        write_traj_to_file(traj, outfile)
+                outfile.close()
+                traj_in_hbeam(new_trajs, "a")
+        else:
+                # merge the kept rows of the old summary with the new rows, ordered by traj_id
+                stale_ids = set(mxt_fin.traj_id_from_name(name) for name in stale)
+                tmp_name  = summary_name + ".tmp"
+                outfile   = open(tmp_name, "w")
+                infile    = open(summary_name, "r")
+                merged    = []
+                new_iter  = iter(new_trajs)
+                next_new  = next(new_iter, None)
+                for line in infile:
+                        if line.startswith("#"):
+                                outfile.write(line)
+                                continue
+                        this_id = line.split(None, 1)[0]
+                        if this_id in stale_ids:
+                                continue
+                        while next_new is not None and next_new.traj_id < this_id:
+                                write_traj_to_file(next_new, outfile)
+                                merged.append(next_new)
+                                next_new = next(new_iter, None)
+                        outfile.write(line)
+                        merged.append(traj_from_summary_line(line))
+                while next_new is not None:
+                        write_traj_to_file(next_new, outfile)
+                        merged.append(next_new)
+                        next_new = next(new_iter, None)
+                infile.close()
+                outfile.close()
+                os.replace(tmp_name, summary_name)
+                traj_in_hbeam(merged)
+
+        for name, size, mtime in entries:
+                if name in manifest and name not in todo:
+                        continue
+                manifest[name] = (size, mtime, name in new_names)
+        for name in set(manifest) - current:
+                del manifest[name]
+        mxt_fin.write_manifest(manifestname, manifest)
+
+
 def write_summary(logfile, outfile_name_tmp, traj_list):
         outfile_name = outfile_name_tmp + ".txt" 
         outfile = open(outfile_name, "w")
@@ -328,7 +475,7 @@ def write_angle_files(traj_list):
         outfile_60.close()
 
 
-def traj_in_hbeam(traj_list):
+def traj_in_hbeam(traj_list, mode='w'):
 
         foldername = "hbeam"
 
@@ -338,10 +485,12 @@ def traj_in_hbeam(traj_list):
         hbeam_filename  =  foldername + "/" + outname + ".txt"
         #hbeam_filenamet =  foldername + "/" + outname + "_test.txt"
         
-        hbeam_file     = open(hbeam_filename, 'w')
+        write_header   = mode == 'w' or not os.path.exists(hbeam_filename)
+        hbeam_file     = open(hbeam_filename, mode)
         #hbeam_filet      = open(hbeam_filenamet, 'w')
         
-        hbeam_file.write("# traj_id E_kin_p   E_kin_l        E_pot      E_total r_p(    x,        y,         z) v_p(    x,        y,         z)      polar       azi   E_kin_p  E_kin_l       E_pot       E_total     r_p(    x,       y,         z) v_p(    x,       y,         z)        polar       azi     simtime turn_pnts   cl_appr   cl_appr_t   r_p_min\n")
+        if write_header:
+            hbeam_file.write("# traj_id E_kin_p   E_kin_l        E_pot      E_total r_p(    x,        y,         z) v_p(    x,        y,         z)      polar       azi   E_kin_p  E_kin_l       E_pot       E_total     r_p(    x,       y,         z) v_p(    x,       y,         z)        polar       azi     simtime turn_pnts   cl_appr   cl_appr_t   r_p_min\n")
         #hbeam_filet.write("# traj_id E_kin_p   E_kin_l        E_pot      E_total r_p(    x,        y,         z) v_p(    x,        y,         z)      polar       azi   E_kin_p  E_kin_l       E_pot       E_total     r_p(    x,       y,         z) v_p(    x,       y,         z)        polar       azi     simtime turn_pnts   cl_appr   cl_appr_t   r_p_min\n")
 
         #for traj in traj_list:
@@ -360,20 +509,12 @@ def traj_in_hbeam(traj_list):
                         #write_traj_to_file(traj,hbeam_filet)
 
         
-        for traj in traj_list:
-            if float(traj.polar_f) <= 31:
-                if float(traj.azi_f) < 0:
-                    inv_azi = AZIMUTHAL_ANGLE - 180
-                    if abs(inv_azi - float(traj.azi_f)) <= ION_IMAGING_AZI:
-                        write_traj_to_file(traj,hbeam_file)
-                    elif abs(AZIMUTHAL_ANGLE - float(traj.azi_f)) <= ION_IMAGING_AZI:
-                        write_traj_to_file(traj,hbeam_file)
-                if float(traj.azi_f) > 0:
-                    inv_azi = AZIMUTHAL_ANGLE + 180
-                    if abs(inv_azi - float(traj.azi_f)) <= ION_IMAGING_AZI:
-                        write_traj_to_file(traj,hbeam_file)
-                    elif abs(AZIMUTHAL_ANGLE - float(traj.azi_f)) <= ION_IMAGING_AZI:
-                        write_traj_to_file(traj,hbeam_file)
+        # detector window edges included, all trajectories with polar_f <= 31 degrees
+        hbeam_detector = detector.Detector(AZIMUTHAL_ANGLE, ION_IMAGING_AZI, inclusive=True, max_polar=31, scattered_only=False)
+        angles = types.SimpleNamespace(azi_f   = numpy.array([float(traj.azi_f) for traj in traj_list]),
+                                       polar_f = numpy.array([float(traj.polar_f) for traj in traj_list]))
+        for i in numpy.flatnonzero(hbeam_detector.selection(angles)):
+            write_traj_to_file(traj_list[i],hbeam_file)
 
 
 
@@ -400,11 +541,28 @@ logfile.write("Created by version %4.2f\n" % VERSION_ID)
 # check if unfinished trajectories are there and remove them
 #remove_unfinished_traj(logfile)
 
-traj_list = read_in_mxt_fins(logfile)
-write_summary(logfile, outname, traj_list)
+bin_files = scatter_bin.find("traj") if SCATTER_BIN else []
+
+if bin_files:
+        traj_list = read_scatter_bins(logfile, bin_files)
+        write_summary(logfile, outname, traj_list)
+
+        # Ion Imaging Experiment
+        traj_in_hbeam(traj_list)
+
+elif INCREMENTAL and os.path.exists(outname + ".txt") and os.path.exists(manifestname):
+        update_summary_incremental(logfile)
+else:
+        entries = mxt_fin.scan("traj")
+        if NPROCS < 0:
+                traj_list = read_in_mxt_fins(logfile)
+        else:
+                traj_list = read_in_mxt_fins_parallel(logfile, [name for name, _, _ in entries])
+        write_summary(logfile, outname, traj_list)
+        write_manifest(entries, traj_list)
 
-# Ion Imaging Experiment
-traj_in_hbeam(traj_list)
+        # Ion Imaging Experiment
+        traj_in_hbeam(traj_list)
 
 
 # H@Gr related functions
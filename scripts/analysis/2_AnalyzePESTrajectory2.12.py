@@ -18,12 +18,26 @@
 
 # Modifications v2.12:
 # angle correction added in polar plots
+# MXT2Summary.txt is read through a binary column cache (mxt_summary.py)
+# trajectories are held in a struct-of-arrays table (TrajTable), outcome classes are boolean masks
+# histogram files are written in bulk through hist_output.py (same text format)
+# all histograms of analyze() are declared once and filled in one pass (hist_engine.py)
+# streaming mode for large campaigns: the summary is read in chunks, histogram states can be saved and merged
+# bootstrap/jackknife per-bin standard errors of the written histogram files in <file>_err.txt (hist_errors.py)
+# detector acceptance (ion imaging, RAT, cMD) is described by detector.Detector objects
+# parameter scan over detector and angle range settings (SCAN_*), the summary is read only once
 
 # intention: analyze compressed traj file to generate data files needed for plotting
 
 # use like: python3 <scriptname> or ./<scriptname> # check first command line
 
-import os, sys, math, copy, numpy, time
+import os, sys, copy, numpy, io, itertools, contextlib, multiprocessing
+import mxt_summary # binary column cache of MXT2Summary.txt, lives next to this script
+import hist_output # bulk histogram text output, lives next to this script
+import hist_engine # single pass filling of all histograms, lives next to this script
+import hist_errors # bootstrap/jackknife error bars, lives next to this script
+import detector    # detector acceptance masks, lives next to this script
+from hist_output import centres
 
 ### edit here ###
 
@@ -46,6 +60,7 @@ import os, sys, math, copy, numpy, time
 #BINS = int((ANGLE_MAX-ANGLE_MIN)/5.0) # Denominator defining bin width, default is 2.5
 
 inpname     = "MXT2Summary.txt" # output file
+OUTDIR      = "analysis" # folder of all analysis files
 logfilename = "AnalyzePESTrajectory.log" # logfile
 mdtinpname  = "md_tian.inp" # md_tian.inp file
 settingname = "plot_settings.dat" # settings file
@@ -53,6 +68,32 @@ settingname = "plot_settings.dat" # settings file
 # H@Gr related
 defnrgname = "deformation_energy_trajids.txt"
 
+# large campaigns
+STREAM        = False   # True: read the summary in chunks of CHUNK_ROWS trajectories, memory stays bounded
+CHUNK_ROWS    = 1000000 # trajectories per chunk
+SAVE_STATE    = ""      # e.g. "part1.state.npz": save the histogram state instead of writing analysis/
+BINNING_STATE = ""      # e.g. "stats.state.npz": bin edges from the merged state of all parts, makes the saved states mergeable
+LOAD_STATE    = ""      # e.g. "merged.state.npz": write analysis/ from a merged state, see hist_engine.py for merging
+
+# error bars
+ERRORS        = ""      # "bootstrap" or "jackknife": standard errors of the histogram files of analysis/ (and Summary.txt) in <file>_err.txt,
+                        # not of the per-trajectory files (spatial_v.txt, H@Gr)
+REPLICAS      = 100     # bootstrap replicas or jackknife groups
+ERROR_SEED    = 12345   # same seed, same errors
+ERROR_NPROCS  = 0       # worker processes for the replicas (0: all cores, 1: serial)
+
+# detectors of the experiments, need the in-memory table (STREAM = False, no LOAD_STATE), their errors are written as well
+RAT           = False   # 2d-ang-dist_rat*.txt
+CMD           = False   # 2d-ang-dist_cmd*.txt
+
+# parameter scan: every combination of the listed settings is analyzed into OUTDIR/scan/<index>/,
+# see OUTDIR/scan/index.txt, an empty list keeps the value of plot_settings.dat
+SCAN_SPECULAR_RADIUS = []   # e.g. [1.0, 1.5, 2.0]
+SCAN_ION_IMAGING_AZI = []   # e.g. [4.5, 5.0]
+SCAN_AZIMUTHAL_ANGLE = []   # e.g. [0, 42]
+SCAN_ANGLE_RANGE     = []   # (ANGLE_MIN, ANGLE_MAX), e.g. [(-90, 90), (-60, 60)]
+SCAN_NPROCS          = 0    # worker processes (0: all cores, 1: serial)
+
 
 ### CHANGES BELOW THIS LINE DEVELOPERS ONLY###
 
@@ -80,272 +121,105 @@ for line in settingfile:
 
 BINS = int((ANGLE_MAX-ANGLE_MIN)/5.0) # Denominator defining bin width, default is 2.5
 
-class Point3D:
-	def __init__(self,x,y,z):
-		self.x = x
-		self.y = y
-		self.z = z
-
-	def add(self,other):
-		self.x += other.x
-		self.y += other.y
-		self.z += other.z
-	
-	def minus(self,other):
-                self.x -= other.x
-                self.y -= other.y
-                self.z -= other.z
-	
-	def multiply(self, factor):
-		self.x *= factor
-		self.y *= factor
-		self.z *= factor
-
-	def distance(self, other):
-		return math.sqrt( (self.x-other.x)**2 + \
-			(self.y-other.y)**2 +(self.z-other.z)**2 )
-
-	def normalize(self):
-                l = self.length()
-                self.x = self.x / l
-                self.y = self.y / l
-                self.z = self.z / l
-	
-	def project_onto_plane(self, plane):
-                d = self.dot_product(plane) / plane.length()
-                plane.normalize()
-                plane.multiply(d)
-                self.minus(plane)
-
-
-	def rotate_about_z(self, angle):
-		rangle = math.radians(float(angle))
-		self.x, self.y = math.cos(rangle)*self.x - math.sin(rangle)*self.y, math.sin(rangle)*self.x + math.cos(rangle)*self.y
-
-	def rotate_about_y(self, angle):
-                rangle = math.radians(float(angle))
-                self.x, self.z = math.cos(rangle)*self.x + math.sin(rangle)*self.z, -math.sin(rangle)*self.x + math.cos(rangle)*self.z
+### DETECTORS ###
+
+def make_detectors():
+        # detectors of the current settings
+        global ANG_DETECTOR, ION_DETECTOR, RAT_DETECTOR, CMD_DETECTOR
+        ANG_DETECTOR = detector.Detector(AZIMUTHAL_ANGLE, SPECULAR_RADIUS) # 1D and 2D angular distributions
+        ION_DETECTOR = detector.Detector(AZIMUTHAL_ANGLE, ION_IMAGING_AZI) # ion imaging experiment
+        RAT_DETECTOR = detector.Detector(width=SPECULAR_RADIUS, domains=[(13.5, 13.5), (-13.5, -13.5)]) # RAT, domain 1 with azi_i = +13.5 degree, domain 2 with azi_i = -13.5 degree
+        CMD_DETECTOR = detector.Detector(0, 90) # constrained MD simulations
+
+make_detectors()
+
+class TrajTable:
+        # struct of arrays: one numpy array per column of the summary file (vectors are (ntrajs,3)
+        # arrays), the derived quantities and outcome classes are computed for all trajectories at once
+        def __init__(self, cols):
+                for name in cols:
+                        setattr(self, name, numpy.asarray(cols[name]))
+                self.ntrajs    = len(self.traj_id)
+                self.v_i       = numpy.sqrt(self.v_p_i[:,0]**2 + self.v_p_i[:,1]**2 + self.v_p_i[:,2]**2)
+                self.v_f       = numpy.sqrt(self.v_p_f[:,0]**2 + self.v_p_f[:,1]**2 + self.v_p_f[:,2]**2)
+                self.eloss     = self.ekin_p_i - self.ekin_p_f
+                self.efrac     = self.ekin_p_f / self.ekin_p_i
+                self.vloss     = self.v_i - self.v_f
+                self.has_scattered   = self.r_p_f[:,2] > self.r_p_i[:,2]
+                self.has_transmitted = self.r_p_f[:,2] < SHOT_THRU_LIMIT
+                self.has_adsorbed    = ~(self.has_scattered | self.has_transmitted)
+                self.delta_azi = numpy.minimum(360-numpy.abs(self.azi_f-self.azi_i), numpy.abs(self.azi_f-self.azi_i))
+                self.angular_masks()
+
+        def angular_masks(self):
+                # depend on SPECULAR_RADIUS
+                self.in_spec   = numpy.sqrt( (self.polar_f-self.polar_i)**2 + (self.azi_f-self.azi_i)**2 ) < SPECULAR_RADIUS
+                self.in_plane  = self.delta_azi < SPECULAR_RADIUS
+
+        def subset(self, key, ntrajs):
+                # table with all arrays indexed by key
+                sub = copy.copy(self)
+                for name, value in vars(self).items():
+                        if isinstance(value, numpy.ndarray):
+                                setattr(sub, name, value[key])
+                sub.ntrajs = ntrajs
+                return sub
+
+        def rows(self, start, stop):
+                # table of the trajectories start..stop-1, the arrays are views
+                return self.subset(slice(start, stop), stop - start)
+
+        def take(self, idx):
+                # table of the trajectories in the index array idx (copies, repetitions allowed)
+                return self.subset(idx, len(idx))
+
+        def traj_id_str(self, i):
+                return mxt_summary.traj_id_str(self.traj_id[i])
+
+class SummaryTable:
+        # memory-mapped summary columns, the TrajTable of a chunk is built on demand (STREAM = True)
+        def __init__(self, cols):
+                self.cols   = cols
+                self.ntrajs = len(cols["traj_id"])
+
+        def rows(self, start, stop):
+                return TrajTable({name: self.cols[name][start:stop] for name in self.cols})
 
-	def dot_product(self, other):
-                return self.x*other.x + self.y*other.y + self.z*other.z
-
-	def cross_product(self, other):
-		return [self.y*other.z - self.z*other.y, self.z*other.x - self.x*other.z, self.x*other.y - self.y*other.x]
-
-	def cross_product2(self, other):
-		cp = self.cross_product(other)
-		return Point3D(cp[0], cp[1], cp[2])
-
-	def length(self):
-		return math.sqrt( self.x**2 + self.y**2 + self.z**2)
-	
-	def __str__(self):
-		return str(self.x) + '  ' + str(self.y) + '  ' + str(self.z)
-
-class Traj:
-
-
-	def __init__(self, ekin_p_i, ekin_l_i, epot_i, etotal_i,\
-			r_p_i, v_p_i, polar_i, azi_i, ekin_p_f, ekin_l_f, epot_f,   \
-                        etotal_f, r_p_f, v_p_f, polar_f, azi_f, time, turn_pnts,    \
-			cl_appr, cl_appr_t, r_p_min, traj_id):
-                self.ekin_p_i   = ekin_p_i
-                self.ekin_l_i   = ekin_l_i
-                self.epot_i     = epot_i
-                self.etotal_i   = etotal_i
-                self.r_p_i      = r_p_i
-                self.v_p_i      = v_p_i
-                self.polar_i    = polar_i
-                self.azi_i      = azi_i
-                self.ekin_p_f   = ekin_p_f
-                self.ekin_l_f   = ekin_l_f
-                self.epot_f     = epot_f
-                self.etotal_f   = etotal_f
-                self.r_p_f      = r_p_f
-                self.v_p_f      = v_p_f
-                self.polar_f    = polar_f
-                self.azi_f      = azi_f
-                self.time       = time
-                self.turn_pnts  = turn_pnts
-                self.cl_appr    = cl_appr
-                self.cl_appr_t  = cl_appr_t
-                self.r_p_min    = r_p_min
-                self.traj_id    = traj_id
-                self.eloss      = ekin_p_i - ekin_p_f
-                self.efrac      = ekin_p_f / ekin_p_i
-                self.vloss      = length(v_p_i) - length(v_p_f)
-                self.has_scattered = r_p_f.z > r_p_i.z
-                self.has_transmitted = r_p_f.z < SHOT_THRU_LIMIT
-                self.has_adsorbed = not (self.has_scattered or self.has_transmitted)
-                self.delta_azi = min(360-abs(azi_f-azi_i), abs(azi_f-azi_i))
-                self.in_spec = math.sqrt( (polar_f-polar_i)**2 + (azi_f-azi_i)**2 ) < SPECULAR_RADIUS
-                self.in_plane = self.delta_azi < SPECULAR_RADIUS
-
-	def spec_scattering_vector(self):
-                inc = copy.deepcopy(self.v_p_i)
-                inc.z *= -1.
-                inc.normalize()
-                return inc
-
-	def angle_with_spec_scattering_vector(self):
-		inc = self.spec_scattering_vector()
-		out = copy.deepcopy(self.v_p_f)
-		out.normalize()
-		dp = inc.dot_product(out)
-		angle_in_rad = math.acos(dp)
-		return math.degrees( angle_in_rad )
-
-	def angle_with_vector(self, vec):
-                out = copy.deepcopy(self.v_p_f)
-                out.normalize()
-                vec = Point3D(vec[0], vec[1], vec[2])
-                vec.normalize()
-                dp = out.dot_product(vec)
-                angle_in_rad = math.acos(dp)
-                return math.degrees( angle_in_rad )
-
-
-def angle_between(fv, sv):
-        fv1 = Point3D(fv[0], fv[1], fv[2])
-        sv1 = Point3D(sv[0], sv[1], sv[2])
-        fv1.normalize()
-        sv1.normalize()
-        dp = fv1.dot_product(sv1)
-        angle_in_rad = math.acos(dp)
-        return math.degrees( angle_in_rad )
 
 def convert_index_to_float(line, idx):
 	l = line.strip(' \n\t\r').split()
 	return float(l[idx])
 
-def convert_line_to_point3d(line):
-	l = line.strip(' \n\t\r').split()
-	return Point3D(float(l[0]), float(l[1]), float(l[2]))
-
-def obtain_rot_mat(vec, angle):
-	# vec describes line thru origin around which the rotation is performed
-	# rotation angle needs to be given in degrees
-        # normalize rotation vector
-        vec.normalize()
-
-        rangle = math.radians(float(angle))
-
-        rot = [[None,None,None], [None,None,None], [None,None,None]]
-        rot[0][0] = vec.x*vec.x*(1.-math.cos(rangle)) +        math.cos(rangle)
-        rot[1][0] = vec.x*vec.y*(1.-math.cos(rangle)) - vec.z*math.sin(rangle)
-        rot[2][0] = vec.x*vec.z*(1.-math.cos(rangle)) + vec.y*math.sin(rangle)
-
-        rot[0][1] = vec.y*vec.x*(1.-math.cos(rangle)) + vec.z*math.sin(rangle)
-        rot[1][1] = vec.y*vec.y*(1.-math.cos(rangle)) +        math.cos(rangle)
-        rot[2][1] = vec.y*vec.z*(1.-math.cos(rangle)) - vec.x*math.sin(rangle)
-
-        rot[0][2] = vec.z*vec.x*(1.-math.cos(rangle)) - vec.y*math.sin(rangle)
-        rot[1][2] = vec.z*vec.y*(1.-math.cos(rangle)) + vec.x*math.sin(rangle)
-        rot[2][2] = vec.z*vec.z*(1.-math.cos(rangle)) +        math.cos(rangle)
-        return rot
-
 def matmul(mat, vec):
 	v1 = mat[0][0]*vec[0] + mat[0][1]*vec[1] + mat[0][2]*vec[2]
 	v2 = mat[1][0]*vec[0] + mat[1][1]*vec[1] + mat[1][2]*vec[2]
 	v3 = mat[2][0]*vec[0] + mat[2][1]*vec[1] + mat[2][2]*vec[2]
 	return [v1, v2, v3]
 
-def length(self):
-	return math.sqrt( (self.x)**2 + (self.y)**2 +(self.z)**2 )
-
 def initialize(inpname,logfile):
-        ntrajs = sum(1 for line in open(inpname, "r")) -1 	# first line is commment
+        cols = mxt_summary.load_summary(inpname, logfile)	# binary column cache, rebuilt if the text summary changed
+        if STREAM:
+                trajs = SummaryTable(cols)
+        else:
+                trajs = TrajTable(cols)
+        ntrajs = trajs.ntrajs
         print("Reading {} trajectories".format(ntrajs))
         logfile.write("Reading {} trajectories\n".format(ntrajs))
-        traj_list = []					# init list
-        inp_file = open(inpname, "r")
-        counter = 0
-        scattered = 0
-        #sc_count = 0
-        absorbed = 0
-        transmitted = 0
-        for line in inp_file:
-                if line.startswith("#"):				# is comment line
-                	continue
-                if (counter % (ntrajs/10) == 0):
-                        print("{}%".format(100*counter/ntrajs+1))
-                        logfile.write("{}%\n".format(100*counter/ntrajs+1))
-                sl = line.strip("\n\t\r ").split()
-                traj_id  = str(sl[0])                                           #       traj_id   = 00000001
-                ekin_p_i = float(sl[1])						#	e_kin_p_i = 3.33000
-                ekin_l_i = float(sl[2])						#	e_kin_l_i = 4.07264
-                epot_i   = float(sl[3])						#	epot_i    = 30.09554
-                etotal_i = float(sl[4])						#       e_total_i = 37.49818
-                r_p_i    = Point3D(float(sl[5]), float(sl[6]), float(sl[7]))	#	r_i       = 14.88455  -2.57611  6.00000
-                v_p_i    = Point3D(float(sl[8]), float(sl[9]), float(sl[10]))	#	r_i       = 14.88455  -2.57611  6.00000
-                polar_i  = float(sl[11])                                         #       polar_i   = 50.00000
-                azi_i    = float(sl[12])                                         #       azi_i     = 0.000000
-
-                ekin_p_f = float(sl[13])					#	ekin_p_f  = 0.05978
-                ekin_l_f = float(sl[14])					#	ekin_l_f  = 5.26957
-                epot_f   = float(sl[15])					#	epot_f    = 28.73945
-                etotal_f = float(sl[16])					#	etotal_f  = 34.06880
-                r_p_f    = Point3D(float(sl[17]), float(sl[18]), float(sl[19]))	#	r_f       = 13.70619  1.33464  -1.07431
-                v_p_f    = Point3D(float(sl[20]), float(sl[21]), float(sl[22]))	#	r_f       = 13.70619  1.33464  -1.07431
-                polar_f  = float(sl[23])                                        #       polar_f   = 27.23457
-                azi_f    = float(sl[24])                                        # 	azi_f     = 4.23478	
-                
-                time     = float(sl[25])					#	time      = 978.70000
-                turn_pnts = int(sl[26])						#       turn_pnts = 14
-                cl_appr  = float(sl[27])					#	cl_appr  =      0.9846501
-                cl_appr_t  = float(sl[28])					#	cl_appr_t = 128
-                r_p_min  = Point3D(float(sl[29]), float(sl[30]), float(sl[31])) #	r_min_p  = 33.4630699  31.9529501  0.9322836
-        
-                this_traj = Traj(ekin_p_i, ekin_l_i, epot_i, etotal_i, r_p_i, v_p_i, polar_i, azi_i, ekin_p_f, \
-                			ekin_l_f, epot_f, etotal_f, r_p_f, v_p_f, polar_f, azi_f, time, turn_pnts, \
-                			cl_appr, cl_appr_t, r_p_min, traj_id)
-
-                traj_list.append(this_traj)
-                #if counter == 0:
-                #        einc = ekin_p_i
-                #        print("Einc_set = {}".format(einc))
-                counter += 1
-
-                if this_traj.ekin_p_f > 1.4*this_traj.ekin_p_i:
-                	print("Warning in traj {}: a projectile with final kinetic energy of {} gained more \
-                            than 40% of its initial kinetic energy!".format(this_traj.traj_id,this_traj.ekin_p_f))
-                	logfile.write("Warning in traj {}: a projectile with final kinetic energy of {} gained \
-                            more than 40% of its initial kinetic energy!\n".format(this_traj.traj_id,this_traj.ekin_p_f))
-
-                #if this_traj.has_transmitted is True:
-                #        print("Particle was transmitted in traj {}".format(this_traj.traj_id))
-                #        logfile.write("Particle was transmitted in traj {}".format(this_traj.traj_id))
-
-
-
-
-
-        inp_file.close()
-
-        if not os.path.exists("analysis"):
-        	os.makedirs("analysis")
-
-        for traj in traj_list:
-                if traj.has_scattered:
-                        scattered += 1
-                        #if traj.cl_appr < 1.4:
-                                #if traj.turn_pnts == 1:
-                                        #def_nrg_file.write(traj.traj_id)
-                                        #def_nrg_file.write(' ')
-                                #print("Analyze slow component in traj {}".format(traj.traj_id))
-                                #logfile.write("Analyze slow component in traj {}\n".format(traj.traj_id))
-                                #sc_count += 1
-                elif traj.has_transmitted:
-                        transmitted += 1
-                        print("Particle was transmitted in traj {}".format(traj.traj_id))
-                        logfile.write("Particle was transmitted in traj {}\n".format(traj.traj_id))
-                else:
-                	absorbed += 1
 
-        #print("total traj: {}".format(ntrajs))
-        #logfile.write("total traj: {}\n".format(ntrajs))
-        #print("# traj with scattering after barrier: {} out of {} scattered traj ({}%)".format(sc_count,scattered,float(sc_count)*100/float(scattered)))
-        #logfile.write("# traj with scattering after barrier: {} out of {} scattered traj ({}%)\n".format(sc_count,scattered,float(sc_count)*100/float(scattered)))
+        for chunk in hist_engine.chunks(trajs, CHUNK_ROWS):
+                for i in numpy.flatnonzero(chunk.ekin_p_f > 1.4*chunk.ekin_p_i):
+                        print("Warning in traj {}: a projectile with final kinetic energy of {} gained more \
+                            than 40% of its initial kinetic energy!".format(chunk.traj_id_str(i),float(chunk.ekin_p_f[i])))
+                        logfile.write("Warning in traj {}: a projectile with final kinetic energy of {} gained \
+                            more than 40% of its initial kinetic energy!\n".format(chunk.traj_id_str(i),float(chunk.ekin_p_f[i])))
+
+                for i in numpy.flatnonzero(chunk.has_transmitted & ~chunk.has_scattered):
+                        print("Particle was transmitted in traj {}".format(chunk.traj_id_str(i)))
+                        logfile.write("Particle was transmitted in traj {}\n".format(chunk.traj_id_str(i)))
+
+        return trajs
+
+def report_outcomes(ntrajs, scattered, absorbed, transmitted, logfile):
         print("trajs with scattering: {} out of total {} traj ({:4.2f}%)".format(scattered,ntrajs,float(scattered)*float(100)/float(ntrajs)))
         print("trajs with adsorption: {} out of total {} traj ({:4.2f}%)".format(absorbed,ntrajs,float(absorbed)*float(100)/float(ntrajs)))
         print("trajs transmitted: {} out of total {} traj ({:4.2f}%)".format(transmitted,ntrajs,float(transmitted)*float(100)/float(ntrajs)))
@@ -353,10 +227,8 @@ def initialize(inpname,logfile):
         logfile.write("trajs with adsorption: {} out of total {} traj ({:4.2f}%)\n".format(absorbed,ntrajs,float(absorbed)*float(100)/float(ntrajs)))
         logfile.write("trajs transmitted: {} out of total {} traj ({:4.2f}%)\n".format(transmitted,ntrajs,float(transmitted)*float(100)/float(ntrajs)))
 
-        return traj_list, scattered, absorbed, transmitted
-
 def numbins(inp):
-	if isinstance(inp, list):
+	if isinstance(inp, (list, numpy.ndarray)):
 		return int(3*(len(inp)**(1./3)))
 	elif isinstance(inp, int):
 		return int(3*((inp)**(1./3)))
@@ -365,105 +237,285 @@ def numbins(inp):
 	else:
 		sys.exit("Unknown type from which to compute number of bins in histogram")
 
-def analyze(trajs,logfile):
+def relative_azimuth(trajs, mask, logfile):
+        # final minus initial azimuth folded into [-180,180]
+        delta_azi = trajs.azi_f[mask]-trajs.azi_i[mask]
+        if numpy.isnan(delta_azi).any():
+                print("Weird angle in spherical symmetry.")
+                logfile.write("Weird angle in spherical symmetry.\n")
+                sys.exit()
+        return numpy.where(delta_azi < -180, delta_azi+360, numpy.where(delta_azi > 180, delta_azi-360, delta_azi))
+
+def declare_observables(engine, logfile):
+        # every histogram of analyze() and ion_imaging_analysis() is declared once here and filled in one pass,
+        # the binning only depends on the statistics of the observables (mergeable over parts of a campaign)
+
+        # MASKS
+        engine.mask("all",         lambda t, m: numpy.ones(t.ntrajs, dtype=bool))
+        engine.mask("scattered",   lambda t, m: t.has_scattered)
+        engine.mask("adsorbed",    lambda t, m: t.has_adsorbed)
+        engine.mask("transmitted", lambda t, m: t.has_transmitted)
+        engine.mask("shot_thru",   lambda t, m: t.has_transmitted & ~t.has_scattered)
+        engine.mask("energy_won",  lambda t, m: m["scattered"] & (t.eloss < 0))
+        engine.mask("spec",        lambda t, m: t.in_spec & m["scattered"])
+        engine.mask("in_plane",    lambda t, m: t.in_plane & m["scattered"])
+        engine.mask("detected",    lambda t, m: ANG_DETECTOR.selection(t))
+        engine.mask("ion_imaging", lambda t, m: ION_DETECTOR.selection(t))
+        for sel in ("scattered", "spec", "in_plane"):
+                engine.mask(sel+"_one_b", lambda t, m, sel=sel: m[sel] & (t.turn_pnts == 1))
+                engine.mask(sel+"_two_b", lambda t, m, sel=sel: m[sel] & (t.turn_pnts == 3))
+        engine.mask("scattered_mul_b", lambda t, m: m["scattered"] & (t.turn_pnts >= 5))
+        engine.mask("spec_mul_b",      lambda t, m: m["spec"] & (t.turn_pnts != 1) & (t.turn_pnts != 3))
+        engine.mask("in_plane_mul_b",  lambda t, m: m["in_plane"] & (t.turn_pnts != 1) & (t.turn_pnts != 3))
+
+        # BINNING HELPERS
+        own_numbins = lambda name: (lambda s: numbins(s[name].count))
+        scat_numbins = own_numbins("all_eloss") # numbins(SCATTERED)
+        same_range  = lambda name: (lambda s: s[name].range())
+        column      = hist_engine.column
+        pair        = lambda x, y: (lambda t, sel: (getattr(t, x)[sel], getattr(t, y)[sel]))
+
+        # OUTCOMES AND INCIDENCE CONDITIONS (first trajectory)
+        engine.add("incidence", "all",       lambda t, sel: (t.ekin_p_i[sel], t.v_i[sel], t.polar_i[sel]))
+        engine.add("shot_thru", "shot_thru", column("turn_pnts"))
+
+        # BOUNCES
+        max_bounces = lambda s: s["all_bounces"].max()
+        for name, sel in (("all_bounces", "all"), ("scat_bounces", "scattered"), ("abso_bounces", "adsorbed"), ("transm_bounces", "transmitted")):
+                engine.add(name, sel, column("turn_pnts"), bins=max_bounces, range=lambda s: (0, s["all_bounces"].max()), density=True)
+
+        # ENERGY LOSS
+        engine.add("all_eloss",      "scattered",       column("eloss"), bins=scat_numbins, density=True)
+        engine.add("one_b",          "scattered_one_b", column("eloss"), bins=scat_numbins, range=same_range("all_eloss"), density=True)
+        engine.add("two_b",          "scattered_two_b", column("eloss"), bins=scat_numbins, range=same_range("all_eloss"), density=True)
+        engine.add("mul_b",          "scattered_mul_b", column("eloss"), bins=scat_numbins, range=same_range("all_eloss"), density=True)
+        engine.add("absorbed_eloss", "adsorbed",        column("eloss"))
+        engine.add("energy_won",     "energy_won",      column("eloss"))
+        for sel in ("spec", "in_plane"):
+                engine.add(sel+"_all_eloss", sel,          column("eloss"), bins=own_numbins(sel+"_all_eloss"), density=True)
+                engine.add(sel+"_one_b",     sel+"_one_b", column("eloss"), bins=own_numbins(sel+"_all_eloss"), range=same_range(sel+"_all_eloss"), density=True)
+                engine.add(sel+"_two_b",     sel+"_two_b", column("eloss"), bins=own_numbins(sel+"_all_eloss"), range=same_range(sel+"_all_eloss"), density=True)
+                engine.add(sel+"_mul_b",     sel+"_mul_b", column("eloss"), bins=own_numbins(sel+"_all_eloss"), range=same_range(sel+"_all_eloss"), density=True)
+
+        # Z-POSITION
+        engine.add("final_z", "adsorbed", lambda t, sel: t.r_p_f[sel, 2], bins=own_numbins("final_z"), density=True)
+
+        # BOUNCES VS ELOSS
+        engine.add("bounce_vs_eloss", "scattered", pair("turn_pnts", "eloss"),
+                   bins=lambda s: (s["scat_bounces"].max(), numbins(s["all_eloss"].count)),
+                   range=lambda s: [[0, s["scat_bounces"].max()], [s["all_eloss"].min(), s["all_eloss"].max()]])
+
+        # ANGULAR DISTRIBUTIONS
+        engine.add("angle_eloss",           "in_plane",  pair("eloss", "polar_f"), bins=own_numbins("angle_eloss"))
+        engine.add("angle_efrac",           "in_plane",  pair("efrac", "polar_f"), bins=BINS, range=[[0, 1.1],[0, 90]]) # bins=90
+        engine.add("occurence",             "in_plane",  column("polar_f"),        bins=numpy.arange(91))
+        engine.add("polar_scatt_azi_int",   "scattered", pair("eloss", "polar_f"), bins=own_numbins("polar_scatt_azi_int"))
+        engine.add("polar_scatt_azi_int_f", "scattered", pair("efrac", "polar_f"), bins=BINS, range=[[0, 1.1],[0, 90]])
+        engine.add("angle_vloss",           "in_plane",  pair("vloss", "polar_f"), bins=own_numbins("angle_vloss"))
+        engine.add("polar_scatt_azi_int_v", "scattered", pair("vloss", "polar_f"), bins=own_numbins("polar_scatt_azi_int_v"))
+
+        # LOSS TO EHP AND PHONONS
+        loss_to_ehps = lambda t, sel: t.etotal_i[sel] - t.etotal_f[sel]
+        engine.add("loss_to_ehps",      "scattered", loss_to_ehps, bins=own_numbins("loss_to_ehps"), density=True)
+        engine.add("loss_to_ehps_spec", "spec",      loss_to_ehps, bins=own_numbins("loss_to_ehps_spec"), density=True)
+
+        # SPHERICAL SYMMETRY
+        engine.add("rel_spherical", "scattered", lambda t, sel: (relative_azimuth(t, sel, logfile), t.polar_f[sel]), bins=own_numbins("rel_spherical"))
+        engine.add("abs_spherical", "scattered", pair("azi_f", "polar_f"), bins=own_numbins("abs_spherical"))
+
+        # 1D AND 2D ANGULAR DISTRIBUTION AT THE DETECTOR
+        signed_polar = lambda t, sel: ANG_DETECTOR.polar(t)[sel]
+        engine.add("ang_dist",    "detected", signed_polar, bins=BINS, range=(-90, 90))
+        engine.add("2d_ang_dist", "detected", lambda t, sel: (t.efrac[sel], signed_polar(t, sel)), bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]]) # fixed bin size of 2 deg; try 36,72,180
+        ion_polar = lambda t, sel: ION_DETECTOR.polar(t)[sel]
+        engine.add("ion_imaging", "ion_imaging", lambda t, sel: (t.efrac[sel], ion_polar(t, sel)), bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]]) # fixed bin size of 2 deg; try 36,72,180
+
+        # PROJECTILE-SURFACE DISTANCE
+        engine.add("ps_dist",            "scattered", column("cl_appr"),        bins=own_numbins("ps_dist"), density=True)
+        engine.add("eloss_psd",          "scattered", pair("eloss", "cl_appr"), bins=own_numbins("eloss_psd"))
+        engine.add("polar_psd",          "in_plane",  pair("cl_appr", "polar_f"), bins=own_numbins("polar_psd"))
+        engine.add("eloss_psd_in_plane", "in_plane",  pair("eloss", "cl_appr"), bins=own_numbins("eloss_psd_in_plane"))
+
+        # VELOCITY LOSS AND FINAL VELOCITY
+        for name, col in (("vb", "vloss"), ("vfb", "v_f")):
+                first = "all_"+col if col == "vloss" else "all_vf"
+                engine.add(first,       "scattered",       column(col), bins=scat_numbins, density=True)
+                engine.add("one_"+name, "scattered_one_b", column(col), bins=scat_numbins, range=same_range(first), density=True)
+                engine.add("two_"+name, "scattered_two_b", column(col), bins=scat_numbins, range=same_range(first), density=True)
+                engine.add("mul_"+name, "scattered_mul_b", column(col), bins=scat_numbins, range=same_range(first), density=True)
+
+def outcomes(res):
+        # numbers of all, scattered, absorbed and transmitted trajectories of res
+        ntrajs      = res["incidence"].count
+        scattered   = res["all_eloss"].count
+        transmitted = res["shot_thru"].count
+        return ntrajs, scattered, ntrajs - scattered - transmitted, transmitted
+
+def by_bounces(res, first, bounce_names):
+        # histogram of first followed by the bounce resolved histograms, each weighted by its share of the count of first
+        return [res[first].hist] + [float(res[name].count)/res[first].count*res[name].hist for name in bounce_names]
+
+def summary_values(res):
+        # quantities of Summary.txt and its last row, the specular peak is nan without trajectories in the specular angle
+        ntrajs, scattered, absorbed, transmitted = outcomes(res)
+        e_i = res["incidence"].stats.firsts[0]
+        spec_all_eloss, all_eloss = res["spec_all_eloss"], res["all_eloss"]
+        s = {"spec_peak":      spec_all_eloss.edges[numpy.argmax(spec_all_eloss.hist)] if spec_all_eloss.hist is not None else numpy.nan,
+             "all_peak":       all_eloss.edges[numpy.argmax(all_eloss.hist)],
+             "spec_mean":      spec_all_eloss.stats.mean(),
+             "all_mean":       all_eloss.stats.mean(),
+             "absorbed_mean":  res["absorbed_eloss"].stats.mean(),
+             "ehps_mean":      res["loss_to_ehps"].stats.mean(),
+             "ehps_spec_mean": res["loss_to_ehps_spec"].stats.mean()}
+        s["row"] = numpy.array([100.*(float(scattered)/ntrajs), 100.*(float(absorbed)/ntrajs), 100.*(float(transmitted)/ntrajs),
+                                100.*res["energy_won"].count/scattered, 100.*spec_all_eloss.count/scattered, e_i-s["spec_mean"], e_i-s["spec_peak"],
+                                e_i-s["absorbed_mean"], e_i-s["all_mean"], e_i-s["all_peak"], s["ehps_mean"], s["ehps_spec_mean"]])
+        return s
+
+def summary_columns(row, values):
+        # columns of the last row of Summary.txt for values (the row or its errors): without a specular peak in row its column is left out
+        return numpy.delete(values, 6) if numpy.isnan(row[6]) else values
+
+def analysis_outputs(res, summary=None):
+        # values of the histogram files of analyze(), computed from res alone: they are written by analyze()
+        # and recomputed on every replica for the error bars; files of empty selections are left out
+        # summary: summary_values(res) if already computed
+        Output = hist_output.Output
+        out = {}
+        ntrajs, scattered, absorbed, transmitted = outcomes(res)
+
+        # BOUNCES
+        out["bounces.txt"] = Output(centres(res["all_bounces"].edges), None, [res["all_bounces"].hist, float(scattered)/ntrajs*res["scat_bounces"].hist,
+                                    float(absorbed)/ntrajs*res["abso_bounces"].hist, float(transmitted)/ntrajs*res["transm_bounces"].hist])
+
+        # TOTAL, SPECULAR AND IN PLANE ENERGY LOSS, Z-POSITION
+        out["eloss.txt"] = Output(centres(res["all_eloss"].edges), None, by_bounces(res, "all_eloss", ("one_b", "two_b", "mul_b")))
+        for sel in ("spec", "in_plane"):
+                if res[sel+"_all_eloss"].count > 0:
+                        out[sel+"_eloss.txt"] = Output(centres(res[sel+"_all_eloss"].edges), None, by_bounces(res, sel+"_all_eloss", (sel+"_one_b", sel+"_two_b", sel+"_mul_b")))
+        if res["final_z"].count > 0:
+                out["final_z.txt"] = Output(centres(res["final_z"].edges), None, [res["final_z"].hist])
+
+        # BOUNCES VS ELOSS
+        xedges, yedges = res["bounce_vs_eloss"].edges
+        out["bounces_vs_eloss.txt"] = Output(centres(xedges), centres(yedges), [res["bounce_vs_eloss"].hist])
+
+        # ANGULAR DISTRIBUTIONS (energy and velocity loss)
+        for loss, suffix in (("eloss", ""), ("vloss", "_v")):
+                if res["angle_"+loss].count != 0:
+                        hist, (xedges, yedges) = res["angle_"+loss].hist, res["angle_"+loss].edges
+                        xc, yc = centres(xedges), centres(yedges)
+                        out["ang_res_%s.txt" % loss]        = Output(xc, yc, [hist_output.corrected(hist, yc)])
+                        out["ang_res_%s_matrix.txt" % loss] = Output(xc, yc, [hist])
+                        occ = res["occurence"]
+                        out["ang_res_occurrence%s.txt" % suffix] = Output(centres(occ.edges), None, [1.0*occ.hist/occ.hist.sum()])
+        if res["angle_eloss"].count != 0:
+                hist, (xedges, yedges) = res["angle_eloss"].hist, res["angle_eloss"].edges
+                out["ang_res_eloss_matrix_norm.txt"] = Output(centres(xedges), centres(yedges), [hist/hist.sum()])
+                efrac_hist, (xefedges, yefedges) = res["angle_efrac"].hist, res["angle_efrac"].edges
+                yefc = centres(yefedges)
+                abs_val = hist_output.corrected_int(efrac_hist, yefc) # correct for angle in experiment
+                out["ang_res_eloss_norm.txt"] = Output(centres(xefedges), yefc, [hist_output.normalized(abs_val, efrac_hist)["sum"]]) # get flux (integrated over all angles)
+
+        # INTERGRATED OVER ALL AZIMUTH ANGLES
+        for name, suffix in (("polar_scatt_azi_int", ""), ("polar_scatt_azi_int_v", "_v")):
+                if res[name].count != 0:
+                        xedges, yedges = res[name].edges
+                        yc = centres(yedges)
+                        out["polar_scatt_azi_int%s.txt" % suffix] = Output(centres(xedges), yc, [hist_output.corrected(res[name].hist, yc)])
+        if res["polar_scatt_azi_int_f"].count != 0:
+                hist, (xefedges, yefedges) = res["polar_scatt_azi_int_f"].hist, res["polar_scatt_azi_int_f"].edges
+                yefc = centres(yefedges)
+                abs_val = hist_output.corrected_int(hist, yefc)
+                out["polar_scatt_azi_int_norm.txt"] = Output(centres(xefedges), yefc, [hist_output.normalized(abs_val, hist)["sum"]])
+
+        # LOSS TO EHP AND PHONONS
+        out["eloss_to_ehps.txt"] = Output(centres(res["loss_to_ehps"].edges), None, [res["loss_to_ehps"].hist])
+        if res["loss_to_ehps_spec"].count > 0:
+                out["eloss_to_ehps_spec.txt"] = Output(centres(res["loss_to_ehps_spec"].edges), None, [res["loss_to_ehps_spec"].hist])
+
+        # SPHERICAL SYMMETRY (also written to the velocity files), the polar bins are those of abs_spherical
+        yc = centres(res["abs_spherical"].edges[1])
+        for name in ("rel_spherical", "abs_spherical"):
+                out[name+"_symmetry.txt"] = out[name+"_symmetry_v.txt"] = Output(centres(res[name].edges[0]), -yc, [hist_output.corrected(res[name].hist, yc)])
+
+        # 1D AND 2D ANGULAR DISTRIBUTION
+        if res["ang_dist"].count > 0:
+                ac = centres(res["ang_dist"].edges)
+                angle_hist = hist_output.corrected(res["ang_dist"].hist, ac).astype(res["ang_dist"].hist.dtype) # needs to be divided by sin(x) to correct geometry of experiment.
+                out["ang_dist.txt"] = Output(ac, None, [angle_hist, angle_hist/float(angle_hist.max())])
+        if res["2d_ang_dist"].count != 0:
+                angle_efrac_hist, (xedges, yedges) = res["2d_ang_dist"].hist, res["2d_ang_dist"].edges
+                xc, yc = centres(xedges), centres(yedges)
+                abs_val = hist_output.corrected_int(angle_efrac_hist, yc) # needs to be divided by sin(x) to correct geometry of experiment.
+                out["2d-ang-dist.txt"]      = Output(xc, yc, [abs_val])
+                out["2d-ang-dist_norm.txt"] = Output(xc, yc, [hist_output.normalized(abs_val, angle_efrac_hist)["sum"]]) # current bin devided by sum of all bins to get "flux"
+
+        # PROJECTILE-SURFACE DISTANCE
+        out["ps_dist.txt"] = Output(centres(res["ps_dist"].edges), None, [res["ps_dist"].hist])
+        xedges, yedges = res["eloss_psd"].edges
+        out["eloss_psd.txt"] = Output(centres(xedges), centres(yedges), [res["eloss_psd"].hist])
+        for name in ("polar_psd", "eloss_psd_in_plane"):
+                if res[name].count > 0:
+                        xedges, yedges = res[name].edges
+                        yc = centres(yedges)
+                        out[name+".txt"] = Output(centres(xedges), yc, [hist_output.corrected(res[name].hist, yc)])
+
+        # VELOCITY LOSS AND FINAL VELOCITY
+        out["vloss.txt"]       = Output(centres(res["all_vloss"].edges), None, by_bounces(res, "all_vloss", ("one_vb", "two_vb", "mul_vb")))
+        out["all_final_v.txt"] = Output(centres(res["all_vf"].edges), None, by_bounces(res, "all_vf", ("one_vfb", "two_vfb", "mul_vfb")))
+
+        # SUMMARY (last row, all columns)
+        out["Summary.txt"] = Output(None, None, [(summary or summary_values(res))["row"]])
+        return out
+
+def write_placeholder(outfile):
+        # dummy grid of empty selections, keeps the gnuplot scripts working
+        outfile.write("%f %f %d\n"   % (0.1, 0.5, 0))
+        outfile.write("%f %f %d\n\n" % (0.1, 1.0, 1))
+        outfile.write("%f %f %d\n"   % (0.2, 1.0, 1))
+        outfile.write("%f %f %d\n"   % (0.2, 0.5, 2))
+
+def analyze(res,trajs,logfile):
+        # res: results of the observables of declare_observables(), trajs: None if read from a saved state
+        e_i, v_i, polar_i = res["incidence"].stats.firsts
+        summary = summary_values(res)
+        out = analysis_outputs(res, summary)
 
         ### BOUNCES ###
         print("Calculating bounces.")
         logfile.write("Calculating bounces.\n")
 
-        # LOOP 
-        all_bounces    = [traj.turn_pnts for traj in trajs]
-        scat_bounces   = [traj.turn_pnts for traj in trajs if traj.has_scattered]
-        abso_bounces   = [traj.turn_pnts for traj in trajs if traj.has_adsorbed]
-        transm_bounces = [traj.turn_pnts for traj in trajs if traj.has_transmitted]
-        
-        # ANALYSIS
-        all_bounce_hist,    all_bounce_edges    = numpy.histogram(all_bounces,    bins=max(all_bounces), range=(0,max(all_bounces)), density=True)
-        scat_bounce_hist,   scat_bounce_edges   = numpy.histogram(scat_bounces,   bins=max(all_bounces), range=(0,max(all_bounces)), density=True)
-        abso_bounce_hist,   abso_bounce_edges   = numpy.histogram(abso_bounces,   bins=max(all_bounces), range=(0,max(all_bounces)), density=True)
-        transm_bounce_hist, transm_bounce_edges = numpy.histogram(transm_bounces, bins=max(all_bounces), range=(0,max(all_bounces)), density=True)
-
         # OUTPUT
-        bounce_file = open("analysis/bounces.txt", "w")
+        bounce_file = open(os.path.join(OUTDIR, "bounces.txt"), "w")
         bounce_file.write("# bounces  all  scattered  absorbed  transmitted\n")
-        for i in range(len(all_bounce_hist)):
-        	bounce_file.write("%d %f %f %f %f\n" % ( 0.5*(all_bounce_edges[i]+all_bounce_edges[i+1]), all_bounce_hist[i], FRAC_SCATTERED*scat_bounce_hist[i], FRAC_ABSORBED*abso_bounce_hist[i], FRAC_TRANSMITTED*transm_bounce_hist[i]))
+        hist_output.write_columns(bounce_file, "%d %f %f %f %f", [out["bounces.txt"].x] + out["bounces.txt"].values)
         bounce_file.close()
 
 
         ### TOTAL ENERGY LOSS ###
         print("Calculating total energy loss.")
         logfile.write("Calculating total energy loss.\n")
-        # LOOP 
-        all_eloss = [traj.eloss for traj in trajs if traj.has_scattered] 
-        #all_efrac = [traj.efrac for traj in trajs if traj.has_scattered] 
-        one_b     = [traj.eloss for traj in trajs if traj.has_scattered and traj.turn_pnts == 1]
-        two_b     = [traj.eloss for traj in trajs if traj.has_scattered and traj.turn_pnts == 3]
-        mul_b     = [traj.eloss for traj in trajs if traj.has_scattered and traj.turn_pnts >= 5]
-        
-        absorbed_eloss = [traj.eloss for traj in trajs if traj.has_adsorbed]
 
-        # ANALYSIS
-        all_eloss_hist, all_eloss_edges = numpy.histogram(all_eloss, bins=numbins(SCATTERED), range=(min(all_eloss), max(all_eloss)), density=True)
-        #all_efrac_hist, all_efrac_edges = numpy.histogram(all_efrac, bins=numbins(SCATTERED), range=(min(all_efrac), max(all_efrac)), density=True)
-        one_b_hist,     one_b_edges     = numpy.histogram(one_b,     bins=numbins(SCATTERED), range=(min(all_eloss), max(all_eloss)), density=True)
-        two_b_hist,     two_b_edges     = numpy.histogram(two_b,     bins=numbins(SCATTERED), range=(min(all_eloss), max(all_eloss)), density=True)
-        mul_b_hist,     mul_b_edges     = numpy.histogram(mul_b,     bins=numbins(SCATTERED), range=(min(all_eloss), max(all_eloss)), density=True)
-        frac_one_b = float(len(one_b))/SCATTERED
-        frac_two_b = float(len(two_b))/SCATTERED
-        frac_mul_b = float(len(mul_b))/SCATTERED
-
-        # OUTPUT 
-        eloss_file = open("analysis/eloss.txt", "w")
+        # OUTPUT
+        eloss_file = open(os.path.join(OUTDIR, "eloss.txt"), "w")
         eloss_file.write("# eloss/eV  all  single bounce  double bounce  multi bounce\n")
-        for i in range(len(all_eloss_hist)):
-        	eloss_file.write("%f %f %f %f %f\n" % (0.5*(all_eloss_edges[i]+all_eloss_edges[i+1]), all_eloss_hist[i], frac_one_b*one_b_hist[i], frac_two_b*two_b_hist[i], frac_mul_b*mul_b_hist[i]))
+        hist_output.write_columns(eloss_file, "%f %f %f %f %f", [out["eloss.txt"].x] + out["eloss.txt"].values)
         eloss_file.close()
 
 
         ### SPECULAR ENERGY LOSS ###
         print("Calculating specular energy loss.")
         logfile.write("Calculating specular energy loss.\n")
+        spec_all_eloss = res["spec_all_eloss"]
 
-        # INIT
-        spec_all_eloss = []
-        #spec_all_efrac = []
-        spec_one_b     = []
-        spec_two_b     = []
-        spec_mul_b     = []
-
-        # LOOP
-        for traj in trajs:	# List comprehension simply need too much time. This is ugly, but fast.
-                if traj.in_spec and traj.has_scattered:
-                        spec_all_eloss.append(traj.eloss)
-                        #spec_all_efrac.append(traj.efrac)
-                        if traj.turn_pnts == 1:
-                        	spec_one_b.append(traj.eloss)
-                        elif traj.turn_pnts == 3:
-                        	spec_two_b.append(traj.eloss)
-                        else:
-                        	spec_mul_b.append(traj.eloss)
-
-        spec_eloss_file = open("analysis/spec_eloss.txt", "w")
+        spec_eloss_file = open(os.path.join(OUTDIR, "spec_eloss.txt"), "w")
         spec_eloss_file.write("# eloss/eV  all  single bounce  double bounce  multi bounce\n")
-        if len(spec_all_eloss) > 0:	
-                # ANALYSIS 
-                spec_all_eloss_hist, spec_all_eloss_edges = numpy.histogram(spec_all_eloss, bins=numbins(spec_all_eloss), range=(min(spec_all_eloss), max(spec_all_eloss)), density=True)
-                #spec_all_efrac_hist, spec_all_efrac_edges = numpy.histogram(spec_all_efrac, bins=numbins(spec_all_efrac), range=(min(spec_all_efrac), max(spec_all_efrac)), density=True)
-                spec_one_b_hist,     spec_one_b_edges     = numpy.histogram(spec_one_b,     bins=numbins(spec_all_eloss), range=(min(spec_all_eloss), max(spec_all_eloss)), density=True)
-                spec_two_b_hist,     spec_two_b_edges     = numpy.histogram(spec_two_b,     bins=numbins(spec_all_eloss), range=(min(spec_all_eloss), max(spec_all_eloss)), density=True)
-                spec_mul_b_hist,     spec_mul_b_edges     = numpy.histogram(spec_mul_b,     bins=numbins(spec_all_eloss), range=(min(spec_all_eloss), max(spec_all_eloss)), density=True)
-                spec_frac_one_b = float(len(spec_one_b))/len(spec_all_eloss)
-                spec_frac_two_b = float(len(spec_two_b))/len(spec_all_eloss)
-                spec_frac_mul_b = float(len(spec_mul_b))/len(spec_all_eloss)
-
-                # OUTPUT 
-                spec_eloss_file = open("analysis/spec_eloss.txt", "w")
-                spec_eloss_file.write("# eloss/eV  all  single bounce  double bounce  multi bounce\n")
-                for i in range(len(spec_all_eloss_hist)):
-	                spec_eloss_file.write("%f %f %f %f %f\n" % (0.5*(spec_all_eloss_edges[i]+spec_all_eloss_edges[i+1]), spec_all_eloss_hist[i], spec_frac_one_b*spec_one_b_hist[i], spec_frac_two_b*spec_two_b_hist[i], spec_frac_mul_b*spec_mul_b_hist[i]))
+        if "spec_eloss.txt" in out:
+                # OUTPUT
+                hist_output.write_columns(spec_eloss_file, "%f %f %f %f %f", [out["spec_eloss.txt"].x] + out["spec_eloss.txt"].values)
         else:
-        	spec_eloss_file.write("%f %f %f %f %f\n" % ( 0.0, 0.0, 0.0, 0.0, 0.0))
+                spec_eloss_file.write("%f %f %f %f %f\n" % ( 0.0, 0.0, 0.0, 0.0, 0.0))
         spec_eloss_file.close()
 
 
@@ -471,55 +523,24 @@ def analyze(trajs,logfile):
         print("Calculating in-plane energy loss.")
         logfile.write("Calculating in-plane energy loss.\n")
 
-        pp_file = open("analysis/plot_parameter.txt", "w") # here the parameters needed for plotting are stored
+        pp_file = open(os.path.join(OUTDIR, "plot_parameter.txt"), "w") # here the parameters needed for plotting are stored
         mdtinpfile = open(mdtinpname, "r")
         for line in mdtinpfile:
             if not line.startswith("!"): # skip comment lines
                 if "Tsurf" in line:
                     temp = float(line.split()[-1]) # "Tsurf 300"
-        pp_file.write("Einc Vinc Ainc Temp Detector_radius Bins\n{} {} {} {:f} {} {}".format(trajs[0].ekin_p_i,length(trajs[0].v_p_i),trajs[0].polar_i,temp,SPECULAR_RADIUS,BINS))
+        pp_file.write("Einc Vinc Ainc Temp Detector_radius Bins\n{} {} {} {:f} {} {}".format(float(e_i),float(v_i),float(polar_i),temp,SPECULAR_RADIUS,BINS))
         pp_file.close()
 
+        in_plane_all_eloss = res["in_plane_all_eloss"]
 
-        # INIT
-        in_plane_all_eloss = []
-        in_plane_one_b     = []
-        in_plane_two_b     = []
-        in_plane_mul_b     = []
-
-        # LOOP
-        for traj in trajs:	# List comprehension simply need too much time. This is ugly, but fast.
-                if traj.in_plane and traj.has_scattered:
-
-                        in_plane_all_eloss.append(traj.eloss)
-
-                        if traj.turn_pnts == 1:
-                        	in_plane_one_b.append(traj.eloss)
-                        elif traj.turn_pnts == 3:
-                        	in_plane_two_b.append(traj.eloss)
-                        else:
-                        	in_plane_mul_b.append(traj.eloss)
-
-
-        in_plane_eloss_file = open("analysis/in_plane_eloss.txt", "w")
+        in_plane_eloss_file = open(os.path.join(OUTDIR, "in_plane_eloss.txt"), "w")
         in_plane_eloss_file.write("# eloss/eV  all  single bounce  double bounce  multi bounce\n")
-        if len(in_plane_all_eloss) > 0:	
-                # ANALYSIS 
-                in_plane_all_eloss_hist, in_plane_all_eloss_edges = numpy.histogram(in_plane_all_eloss, bins=numbins(in_plane_all_eloss), range=(min(in_plane_all_eloss), max(in_plane_all_eloss)), density=True)
-                in_plane_one_b_hist,     in_plane_one_b_edges     = numpy.histogram(in_plane_one_b,     bins=numbins(in_plane_all_eloss), range=(min(in_plane_all_eloss), max(in_plane_all_eloss)), density=True)
-                in_plane_two_b_hist,     in_plane_two_b_edges     = numpy.histogram(in_plane_two_b,     bins=numbins(in_plane_all_eloss), range=(min(in_plane_all_eloss), max(in_plane_all_eloss)), density=True)
-                in_plane_mul_b_hist,     in_plane_mul_b_edges     = numpy.histogram(in_plane_mul_b,     bins=numbins(in_plane_all_eloss), range=(min(in_plane_all_eloss), max(in_plane_all_eloss)), density=True)
-                in_plane_frac_one_b = float(len(in_plane_one_b))/len(in_plane_all_eloss)
-                in_plane_frac_two_b = float(len(in_plane_two_b))/len(in_plane_all_eloss)
-                in_plane_frac_mul_b = float(len(in_plane_mul_b))/len(in_plane_all_eloss)
-
-                # OUTPUT 
-                in_plane_eloss_file = open("analysis/in_plane_eloss.txt", "w")
-                in_plane_eloss_file.write("# eloss/eV  all  single bounce  double bounce  multi bounce\n")
-                for i in range(len(in_plane_all_eloss_hist)):
-                        in_plane_eloss_file.write("%f %f %f %f %f\n" % (0.5*(in_plane_all_eloss_edges[i]+in_plane_all_eloss_edges[i+1]), in_plane_all_eloss_hist[i], in_plane_frac_one_b*in_plane_one_b_hist[i], in_plane_frac_two_b*in_plane_two_b_hist[i], in_plane_frac_mul_b*in_plane_mul_b_hist[i]))
+        if "in_plane_eloss.txt" in out:
+                # OUTPUT
+                hist_output.write_columns(in_plane_eloss_file, "%f %f %f %f %f", [out["in_plane_eloss.txt"].x] + out["in_plane_eloss.txt"].values)
         else:
-        	in_plane_eloss_file.write("%f %f %f %f %f\n" % ( 0.0, 0.0, 0.0, 0.0, 0.0))
+                in_plane_eloss_file.write("%f %f %f %f %f\n" % ( 0.0, 0.0, 0.0, 0.0, 0.0))
         in_plane_eloss_file.close()
 
 
@@ -527,344 +548,148 @@ def analyze(trajs,logfile):
         ### Z-POSITION ###
         print("Calculating final z positions.")
         logfile.write("Calculating final z positions.\n")
-        # LOOP
-        final_z = [traj.r_p_f.z for traj in trajs if traj.has_adsorbed]
 
-        if (len(final_z) > 0):
-        	# ANALYSIS
-        	final_z_hist, final_z_edges = numpy.histogram(final_z, bins=numbins(final_z), range=(min(final_z), max(final_z)), density=True)
+        if "final_z.txt" in out:
+                # OUTPUT
+                final_z_file = open(os.path.join(OUTDIR, "final_z.txt"), "w")
+                final_z_file.write("# z/A  probability density\n")
+                hist_output.write_columns(final_z_file, "%f %f", [out["final_z.txt"].x] + out["final_z.txt"].values)
+                final_z_file.close()
 
-        	# OUTPUT
-        	final_z_file = open("analysis/final_z.txt", "w")
-        	final_z_file.write("# z/A  probability density\n")
-        	for i in range(len(final_z_hist)):
-        		final_z_file.write("%f %f\n" % (0.5*(final_z_edges[i]+final_z_edges[i+1]), final_z_hist[i]))
-        	final_z_file.close()
-        	
 
         ### BOUNCES VS ELOSS ###
         print("Calculating bounces/energy loss correlation.")
         logfile.write("Calculating bounces/energy loss correlation.\n")
-        # ANALYSIS
-        bounce_vs_eloss_hist, xedges, yedges = numpy.histogram2d(scat_bounces, all_eloss, bins=(max(scat_bounces),numbins(all_eloss)), range=[[0,max(scat_bounces)],[min(all_eloss),max(all_eloss)]], normed=False)
 
         # OUTPUT
-        out = open("analysis/bounces_vs_eloss.txt", "w")
-        out.write("# bounces  eloss/eV  counts\n")
-        for i in range(len(bounce_vs_eloss_hist)):
-        	for j in range(len(bounce_vs_eloss_hist[i])):
-        		out.write("%d %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), bounce_vs_eloss_hist[i][j]))
-        	out.write("\n")
-        out.close()
+        o = out["bounces_vs_eloss.txt"]
+        bounces_vs_eloss_file = open(os.path.join(OUTDIR, "bounces_vs_eloss.txt"), "w")
+        bounces_vs_eloss_file.write("# bounces  eloss/eV  counts\n")
+        hist_output.write_grid(bounces_vs_eloss_file, "%d %f %d", o.x, o.y, o.values)
+        bounces_vs_eloss_file.close()
 
 
         ### ANGULAR DISTRIBUTION ###
         print("Calculating angular energy loss.")
         logfile.write("Calculating angular energy loss.\n")
-        # get trajectories that are within specular radius in azimuth direction
-        energy_collect  = []
-        efrac_collect   = []
-        angle_collect   = []
-        ps_dist_collect = []
-        polar_scatt_azi_int_energy = []
-        polar_scatt_azi_int_efrac  = []
-        polar_scatt_azi_int_angle  = []
-        #total_counts = 0
-        for traj in trajs:
-        	if traj.has_scattered:
-        		polar_scatt_azi_int_energy.append(traj.eloss)
-        		polar_scatt_azi_int_efrac.append(traj.efrac)
-        		polar_scatt_azi_int_angle.append(traj.polar_f)
-
-        		if traj.in_plane:
-        			energy_collect.append(traj.eloss)
-        			efrac_collect.append(traj.efrac)
-        			angle_collect.append(traj.polar_f)
-        			ps_dist_collect.append(traj.cl_appr)
-
-        ang_dist_file          = open("analysis/ang_res_eloss.txt", "w")
-        ang_dist_file_norm     = open("analysis/ang_res_eloss_norm.txt", "w")
-        ang_dist_mat_file      = open("analysis/ang_res_eloss_matrix.txt", "w")
-        ang_dist_mat_file_norm = open("analysis/ang_res_eloss_matrix_norm.txt", "w")
-        occurence_file         = open("analysis/ang_res_occurrence.txt", "w")
-        if len(energy_collect) != 0:
-                angle_eloss_hist, xedges, yedges = numpy.histogram2d(energy_collect, angle_collect, bins=(numbins(energy_collect)), density=False)
-                angle_efrac_hist, xefedges, yefedges = numpy.histogram2d(efrac_collect, angle_collect, bins=BINS, range=[[0, 1.1],[0, 90]], density=False) # bins=90
-                #occurence_hist, occ_edges = numpy.histogram(angle_collect, bins=numpy.arange(91), normed=False)
-                occurence_hist, occ_edges = numpy.histogram(angle_collect, bins=numpy.arange(91), density=False)
+        # trajectories that are within specular radius in azimuth direction
+
+        ang_dist_file          = open(os.path.join(OUTDIR, "ang_res_eloss.txt"), "w")
+        ang_dist_file_norm     = open(os.path.join(OUTDIR, "ang_res_eloss_norm.txt"), "w")
+        ang_dist_mat_file      = open(os.path.join(OUTDIR, "ang_res_eloss_matrix.txt"), "w")
+        ang_dist_mat_file_norm = open(os.path.join(OUTDIR, "ang_res_eloss_matrix_norm.txt"), "w")
+        occurence_file         = open(os.path.join(OUTDIR, "ang_res_occurrence.txt"), "w")
+        if "ang_res_eloss.txt" in out:
+                xedges, yedges = res["angle_eloss"].edges
+                angle_eloss_hist = out["ang_res_eloss_matrix.txt"].values[0]
 
                 # OUTPUT
-                for i in range(len(angle_eloss_hist)):
-                    for j in range(len(angle_eloss_hist[i])):
-                        ang_dist_file.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), int(angle_eloss_hist[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                	#ang_dist_file.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), angle_eloss_hist[i][j]))
-                        ang_dist_file.write("\n")
+                o = out["ang_res_eloss.txt"]
+                xc, yc = o.x, o.y
+                hist_output.write_grid(ang_dist_file, "%f %f %d\n", xc, yc, o.values, blocks=False) # empty line after every bin
 
                 ang_dist_mat_file.write("# x-range describing energy loss in eV (left to right) from %f to %f in steps of %f\n" % (0.5*(xedges[0]+xedges[1]), 0.5*(xedges[-2]+xedges[-1]), abs(xedges[0]-xedges[1])))
                 ang_dist_mat_file.write("# y-range describing scattering angle in degrees (top to bottom) from %f to %f in steps of %f\n" % (0.5*(yedges[0]+yedges[1]), 0.5*(yedges[-2]+yedges[-1]), abs(yedges[0]-yedges[1])))
-                ang_dist_mat_file.write("# specular scattering angle is %f degrees and detector radius is %f degrees\n" % (trajs[0].polar_i, SPECULAR_RADIUS))
-                ang_dist_mat_file.write("{:8.4f}".format(0)); [ang_dist_mat_file.write("{:8.4f}".format((0.5*(xedges[i]+xedges[i+1])))) for i in range(len(xedges)-1)]; ang_dist_mat_file.write("\n")
-                ang_dist_mat_file.write("{:8.4f}".format(0)); [ang_dist_mat_file.write("{:8.4f}".format((trajs[0].ekin_p_i - (0.5*(xedges[i]+xedges[i+1]))))) for i in range(len(xedges)-1)]; ang_dist_mat_file.write("\n")
-                for i in range(len(angle_eloss_hist[0])):
-                        ang_dist_mat_file.write("{:8.4f}".format(0.5*(yedges[i]+yedges[i+1])))
-                        for j in range(len(angle_eloss_hist)):
-                            ang_dist_mat_file.write("{:4d}".format(int(angle_eloss_hist[j][i])))
-                            #total_counts += int(angle_eloss_hist[j][i])
-                        ang_dist_mat_file.write("\n")
-                
-                # OUTPUT without and with norm
-                for i in range(len(angle_efrac_hist)):
-                    for j in range(len(angle_efrac_hist[i])):
-                        abs_val = int(angle_efrac_hist[i][j]/abs(numpy.sin(0.5*(yefedges[j]+yefedges[j+1])/360*2*numpy.pi))) # correct for angle in experiment
-                        #abs_val = int(angle_eloss_hist[i][j]/numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))
-                        rel_val = float(abs_val)/float(angle_efrac_hist.sum()) # get flux (integrated over all angles)
-                        ang_dist_file_norm.write("%f %f %f\n" % (0.5*(xefedges[i]+xefedges[i+1]), 0.5*(yefedges[j]+yefedges[j+1]), rel_val))
+                ang_dist_mat_file.write("# specular scattering angle is %f degrees and detector radius is %f degrees\n" % (float(polar_i), SPECULAR_RADIUS))
+                hist_output.write_matrix(ang_dist_mat_file, "%8.4f", "%8.4f", [0], [xc])
+                hist_output.write_matrix(ang_dist_mat_file, "%8.4f", "%8.4f", [0], [e_i - xc])
+                hist_output.write_matrix(ang_dist_mat_file, "%8.4f", "%4d", yc, angle_eloss_hist.T)
 
-                #print("Total counts in-plane {}".format(total_counts))
-                #logfile.write("Total counts in-plane {}\n".format(total_counts))
+                # OUTPUT without and with norm
+                o = out["ang_res_eloss_norm.txt"]
+                hist_output.write_grid(ang_dist_file_norm, "%f %f %f", o.x, o.y, o.values, blocks=False)
 
                 ang_dist_mat_file_norm.write("# x-range describing energy in eV (left to right) from %f to %f in steps of %f\n" % (0.5*(xedges[0]+xedges[1]), 0.5*(xedges[-2]+xedges[-1]), abs(xedges[0]-xedges[1])))
                 ang_dist_mat_file_norm.write("# y-range describing scattering angle in degrees (top to bottom) from %f to %f in steps of %f\n" % (0.5*(yedges[0]+yedges[1]), 0.5*(yedges[-2]+yedges[-1]), abs(yedges[0]-yedges[1])))
-                ang_dist_mat_file_norm.write("# specular scattering angle is {} degrees, incidence kinetic energy is {} eV and temperature is {} K\n".format(trajs[0].polar_i, trajs[0].ekin_p_i, temp))
+                ang_dist_mat_file_norm.write("# specular scattering angle is {} degrees, incidence kinetic energy is {} eV and temperature is {} K\n".format(float(polar_i), float(e_i), temp))
                 ang_dist_mat_file_norm.write("# detector radius is %f degrees and total number of counts is %d \n" % (SPECULAR_RADIUS, angle_eloss_hist.sum()))
-                #ang_dist_mat_file_norm.write("{:8.4f}".format(0)); [ang_dist_mat_file_norm.write("{:8.4f}".format((0.5*(xedges[i]+xedges[i+1])))) for i in range(len(xedges)-1)]; ang_dist_mat_file_norm.write("\n")
-                ang_dist_mat_file_norm.write("{:8.4f}".format(0)); [ang_dist_mat_file_norm.write("{:8.4f}".format((trajs[0].ekin_p_i - (0.5*(xedges[i]+xedges[i+1]))))) for i in range(len(xedges)-1)]; ang_dist_mat_file_norm.write("\n")
-                for i in range(len(angle_eloss_hist[0])):
-                         ang_dist_mat_file_norm.write("{:8.4f}".format(0.5*(yedges[i]+yedges[i+1])))
-                         for j in range(len(angle_eloss_hist)):
-                             ang_dist_mat_file_norm.write("{:8.4f}".format(float(angle_eloss_hist[j][i]/angle_eloss_hist.sum())))
-                         ang_dist_mat_file_norm.write("\n")
+                hist_output.write_matrix(ang_dist_mat_file_norm, "%8.4f", "%8.4f", [0], [e_i - xc])
+                hist_output.write_matrix(ang_dist_mat_file_norm, "%8.4f", "%8.4f", yc, out["ang_res_eloss_matrix_norm.txt"].values[0].T)
                 ang_dist_mat_file.write("Total count: {}".format(angle_eloss_hist.sum()))
-                		
+
 
                 occurence_file.write("# number of trajs in plane in unit polar angle, unit azimuthal angle\n")
-                for i in range(len(occurence_hist)):
-                	this_angle = 0.5*(occ_edges[i]+occ_edges[i+1])
-                	occurence_file.write("%f %f\n" % (this_angle, 1.0*occurence_hist[i]/sum(occurence_hist)))
+                hist_output.write_columns(occurence_file, "%f %f", [out["ang_res_occurrence.txt"].x] + out["ang_res_occurrence.txt"].values)
         else:
-                ang_dist_file.write("%f %f %d\n"   % (0.1, 0.5, 0))
-                ang_dist_file.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-                ang_dist_file.write("%f %f %d\n"   % (0.2, 1.0, 1))
-                ang_dist_file.write("%f %f %d\n"   % (0.2, 0.5, 2))
-                
-                #ang_dist_file_norm.write("%f %f %d\n"   % (0.1, 0.5, 0)) # don't know if this is needed and what the numbers should be
-                #ang_dist_file_norm.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-                #ang_dist_file_morm.write("%f %f %d\n"   % (0.2, 1.0, 1))
-                #ang_dist_file_norm.write("%f %f %d\n"   % (0.2, 0.5, 2))
-
+                write_placeholder(ang_dist_file)
                 occurence_file.write("%f %f\n" % (0.1, 0.1))
 
         ang_dist_mat_file.write("\n")
         occurence_file.close()
         ang_dist_file.close()
+        ang_dist_file_norm.close()
         ang_dist_mat_file.close()
         ang_dist_mat_file_norm.close()
 
 
-        # Graphene bounce events #
-        #print("Calculating graphene bounce events.")
-        #logfile.write("Calculating graphene bounce events.\n")
-        #fast_c = open("analysis/component_fast.txt", "w")
-        #slow_c_sb = open("analysis/component_slow_single.txt", "w")
-        #slow_c_mb = open("analysis/component_slow_multi.txt", "w")
-        #for traj in trajs:
-        	#if traj.has_scattered and traj.in_plane:
-        		#if traj.turn_pnts == 1:
-        			#if traj.cl_appr > 1.4:
-        				#fast_c.write("%f %f\n" % (traj.ekin_p_f/traj.ekin_p_i, traj.polar_f))
-        			#if traj.cl_appr < 1.4:
-        				#slow_c_sb.write("%f %f\n" % (traj.ekin_p_f/traj.ekin_p_i, traj.polar_f))
-        		#elif traj.turn_pnts > 1 and traj.cl_appr < 1.4:
-        				#slow_c_mb.write("%f %f\n" % (traj.ekin_p_f/traj.ekin_p_i, traj.polar_f))
-        #slow_c_mb.close(); slow_c_sb.close(); fast_c.close()
-        			
-        			
-        			
-
-
-
         # INTERGRATED OVER ALL AZIMUTH ANGLES #
-        polar_scatt_azi_file = open("analysis/polar_scatt_azi_int.txt", "w")
-        #total_counts_all = 0
-        if len(polar_scatt_azi_int_energy) != 0:
-        	polar_scatt_azi_int_hist, xedges, yedges = numpy.histogram2d(polar_scatt_azi_int_energy, polar_scatt_azi_int_angle, bins=(numbins(polar_scatt_azi_int_energy)), density=False)
-        	
-        	for i in range(len(polar_scatt_azi_int_hist)):
-        		for j in range(len(polar_scatt_azi_int_hist[i])):
-                                polar_scatt_azi_file.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), int(polar_scatt_azi_int_hist[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                                #total_counts_all += int(polar_scatt_azi_int_hist[i][j])
-
-        		polar_scatt_azi_file.write("\n")
+        polar_scatt_azi_file = open(os.path.join(OUTDIR, "polar_scatt_azi_int.txt"), "w")
+        if "polar_scatt_azi_int.txt" in out:
+                o = out["polar_scatt_azi_int.txt"]
+                hist_output.write_grid(polar_scatt_azi_file, "%f %f %d", o.x, o.y, o.values)
         else:
-        	polar_scatt_azi_file.write("%f %f %d\n"   % (0.1, 0.5, 0))
-        	polar_scatt_azi_file.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-        	polar_scatt_azi_file.write("%f %f %d\n"   % (0.2, 1.0, 1))
-        	polar_scatt_azi_file.write("%f %f %d\n"   % (0.2, 0.5, 2))
-
+                write_placeholder(polar_scatt_azi_file)
         polar_scatt_azi_file.close()
-        #print("Total counts all angles: {}".format(int(total_counts_all)))
-        #logfile.write("Total counts all angles: {}\n".format(int(total_counts_all)))
-
-        polar_scatt_azi_file_norm = open("analysis/polar_scatt_azi_int_norm.txt", "w")
-        if len(polar_scatt_azi_int_efrac) != 0:
-                #polar_scatt_azi_int_hist, xedges, yedges = numpy.histogram2d(polar_scatt_azi_int_energy, polar_scatt_azi_int_angle, bins=(numbins(polar_scatt_azi_int_energy)), normed=False)
-                polar_scatt_azi_int_hist_f, xefedges, yefedges = numpy.histogram2d(polar_scatt_azi_int_efrac, polar_scatt_azi_int_angle, bins=BINS, range=[[0, 1.1],[0, 90]], density=False)
 
-                for i in range(len(polar_scatt_azi_int_hist_f)):
-                        for j in range(len(polar_scatt_azi_int_hist_f[i])):
-                                abs_val = int(polar_scatt_azi_int_hist_f[i][j]/abs(numpy.sin(0.5*(yefedges[j]+yefedges[j+1])/360*2*numpy.pi)))
-                                rel_val = float(abs_val)/float(polar_scatt_azi_int_hist_f.sum())
-                                polar_scatt_azi_file_norm.write("%f %f %f\n" % (0.5*(xefedges[i]+xefedges[i+1]), 0.5*(yefedges[j]+yefedges[j+1]), rel_val))
-
-                        #polar_scatt_azi_file_norm.write("\n")
+        polar_scatt_azi_file_norm = open(os.path.join(OUTDIR, "polar_scatt_azi_int_norm.txt"), "w")
+        if "polar_scatt_azi_int_norm.txt" in out:
+                o = out["polar_scatt_azi_int_norm.txt"]
+                hist_output.write_grid(polar_scatt_azi_file_norm, "%f %f %f", o.x, o.y, o.values, blocks=False)
         else:
-                polar_scatt_azi_file_norm.write("%f %f %d\n"   % (0.1, 0.5, 0))
-                polar_scatt_azi_file_norm.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-                polar_scatt_azi_file_norm.write("%f %f %d\n"   % (0.2, 1.0, 1))
-                polar_scatt_azi_file_norm.write("%f %f %d\n"   % (0.2, 0.5, 2))
+                write_placeholder(polar_scatt_azi_file_norm)
+        polar_scatt_azi_file_norm.close()
 
 
 
         ### LOSS TO EHP AND PHONONS ###
         print("Calculating loss to ehps and phonons.")
         logfile.write("Calculating loss to ehps and phonons.\n")
-        # LOOP
-        loss_to_ehps = [ traj.etotal_i - traj.etotal_f for traj in trajs if traj.has_scattered ]
-        loss_to_ehps_spec = [ traj.etotal_i - traj.etotal_f for traj in trajs if traj.has_scattered and traj.in_spec ]
-        
-        # ANALYSIS
-        loss_to_ehps_hist, loss_to_ehps_edges = numpy.histogram(loss_to_ehps, bins=numbins(loss_to_ehps), range=(min(loss_to_ehps), max(loss_to_ehps)), density=True)
-        if len(loss_to_ehps_spec) > 0:
-        	loss_to_ehps_spec_hist, loss_to_ehps_spec_edges = numpy.histogram(loss_to_ehps_spec, bins=numbins(loss_to_ehps_spec), range=(min(loss_to_ehps_spec), max(loss_to_ehps_spec)), density=True)
 
         # OUTPUT
-        loss_to_ehps_file = open("analysis/eloss_to_ehps.txt", "w")
-        for i in range(len(loss_to_ehps_hist)):
-        	loss_to_ehps_file.write("%f %f\n" % (0.5*(loss_to_ehps_edges[i]+loss_to_ehps_edges[i+1]), loss_to_ehps_hist[i]))
+        loss_to_ehps_file = open(os.path.join(OUTDIR, "eloss_to_ehps.txt"), "w")
+        hist_output.write_columns(loss_to_ehps_file, "%f %f", [out["eloss_to_ehps.txt"].x] + out["eloss_to_ehps.txt"].values)
         loss_to_ehps_file.close()
 
-        
-        loss_to_ehps_spec_file = open("analysis/eloss_to_ehps_spec.txt", "w")
-        if len(loss_to_ehps_spec) > 0:
-                for i in range(len(loss_to_ehps_spec_hist)):
-                        loss_to_ehps_spec_file.write("%f %f\n" % (0.5*(loss_to_ehps_spec_edges[i]+loss_to_ehps_spec_edges[i+1]), loss_to_ehps_spec_hist[i]))
+
+        loss_to_ehps_spec_file = open(os.path.join(OUTDIR, "eloss_to_ehps_spec.txt"), "w")
+        if "eloss_to_ehps_spec.txt" in out:
+                hist_output.write_columns(loss_to_ehps_spec_file, "%f %f", [out["eloss_to_ehps_spec.txt"].x] + out["eloss_to_ehps_spec.txt"].values)
         else:
-        	loss_to_ehps_spec_file.write("%f %f\n" % (0.0, 0.0))
+                loss_to_ehps_spec_file.write("%f %f\n" % (0.0, 0.0))
         loss_to_ehps_spec_file.close()
 
 
         ### SPHERICAL SYMMETRY ###
-        # LOOP
         print("Calculating spherical symmetry.")
         logfile.write("Calculating spherical symmetry.\n")
-        abs_azi = []
-        rel_azi = []
-        yvals = []
-        this_azi = None
-        for traj in trajs:
-        	if traj.has_scattered:
-        		delta_azi = traj.azi_f-traj.azi_i
-        		if -180 <= delta_azi <= 180:
-        			rel_azi.append(delta_azi)
-        		elif delta_azi < -180:
-        			rel_azi.append(delta_azi+360)
-        		elif delta_azi > 180:
-        			rel_azi.append(delta_azi-360)
-        		else:
-                                print("Weird angle in spherical symmetry.")
-                                logfile.write("Weird angle in spherical symmetry.\n")
-                                sys.exit()
-
-        		abs_azi.append(traj.azi_f)
-        		yvals.append(traj.polar_f)
-
-        # ANALYSIS
-        rel_spherical_hist, rel_xedges, yedges = numpy.histogram2d(rel_azi, yvals, bins=numbins(rel_azi), normed=False)
-        abs_spherical_hist, abs_xedges, yedges = numpy.histogram2d(abs_azi, yvals, bins=numbins(abs_azi), normed=False)
 
         # OUTPUT
-        spherical_file = open("analysis/rel_spherical_symmetry.txt", "w")
-        for i in range(len(rel_spherical_hist)):
-        	for j in range(len(rel_spherical_hist[i])):
-        		spherical_file.write("%f %f %d\n" % (0.5*(rel_xedges[i]+rel_xedges[i+1]), -0.5*(yedges[j]+yedges[j+1]), int(rel_spherical_hist[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-        	spherical_file.write("\n")
-        spherical_file.close()
-
-        spherical_file = open("analysis/abs_spherical_symmetry.txt", "w")
-        for i in range(len(abs_spherical_hist)):
-        	for j in range(len(abs_spherical_hist[i])):
-        		spherical_file.write("%f %f %d\n" % (0.5*(abs_xedges[i]+abs_xedges[i+1]), -0.5*(yedges[j]+yedges[j+1]), int(abs_spherical_hist[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-        	spherical_file.write("\n")
-        spherical_file.close()
+        for name in ("rel_spherical_symmetry.txt", "abs_spherical_symmetry.txt"):
+                o = out[name]
+                spherical_file = open(os.path.join(OUTDIR, name), "w")
+                hist_output.write_grid(spherical_file, "%f %f %d", o.x, o.y, o.values)
+                spherical_file.close()
 
         ### 1D ANGULAR DISTRIBUTION
         print("Calculate 1D angular distribution")
-        angplane_collect = []
-        for traj in trajs:
-            if traj.azi_f < 0:
-                inv_azi = AZIMUTHAL_ANGLE - 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                    angplane_collect.append(-traj.polar_f)
-                elif traj.has_scattered and abs(AZIMUTHAL_ANGLE - traj.azi_f) < SPECULAR_RADIUS:
-                    angplane_collect.append(traj.polar_f)
-            if traj.azi_f > 0:
-                inv_azi = AZIMUTHAL_ANGLE + 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                    angplane_collect.append(-traj.polar_f)
-                elif traj.has_scattered and abs(AZIMUTHAL_ANGLE - traj.azi_f) < SPECULAR_RADIUS:
-                    angplane_collect.append(traj.polar_f)
-
-        ang_dist_file = open("analysis/ang_dist.txt", "w")
-        if len(angplane_collect) > 0:
-            angle_hist, angplane_collect_edges = numpy.histogram(angplane_collect, bins=BINS, range=(-90, 90), density=False)
-            for i in range(len(angle_hist)):
-                angle_hist[i] = angle_hist[i]/abs(numpy.sin(0.5*(angplane_collect_edges[i]+angplane_collect_edges[i+1])/360*2*numpy.pi)) # needs to be divided by sin(x) to correct geometry of experiment.
-
-            #OUTPUT
-            for i in range(len(angle_hist)):
-                ang_dist_file.write("%f %f %f\n" % (0.5*(angplane_collect_edges[i]+angplane_collect_edges[i+1]), angle_hist[i], angle_hist[i]/float(max(angle_hist))))
-            ang_dist_file.close()
+
+        ang_dist_file = open(os.path.join(OUTDIR, "ang_dist.txt"), "w")
+        if "ang_dist.txt" in out:
+                #OUTPUT
+                hist_output.write_columns(ang_dist_file, "%f %f %f", [out["ang_dist.txt"].x] + out["ang_dist.txt"].values)
+        ang_dist_file.close()
 
 
         ### 2D ANGULAR DISTRIBUTION
         print("Calculate 2D angular distribution")
-        angle_all_collect = [] # all polar angle from -90 to 90 in deg
-        #angle_inp_collect = [] # in-plane polar angle from -90 to 90 in deg
-        efrac_all_collect = [] # all E_s / E_i in eV
-        #efrac_inp_collect = [] # in-plane E_s / E_i in eV
-
-        for traj in trajs:
-            if traj.azi_f < 0:
-                inv_azi = AZIMUTHAL_ANGLE - 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                    angle_all_collect.append(-traj.polar_f)
-                    efrac_all_collect.append(traj.efrac)
-                elif traj.has_scattered and abs(AZIMUTHAL_ANGLE - traj.azi_f) < SPECULAR_RADIUS:
-                    angle_all_collect.append(traj.polar_f)
-                    efrac_all_collect.append(traj.efrac)
-            if traj.azi_f > 0:
-                inv_azi = AZIMUTHAL_ANGLE + 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                    angle_all_collect.append(-traj.polar_f)
-                    efrac_all_collect.append(traj.efrac)
-                elif traj.has_scattered and abs(AZIMUTHAL_ANGLE - traj.azi_f) < SPECULAR_RADIUS:
-                    angle_all_collect.append(traj.polar_f)
-                    efrac_all_collect.append(traj.efrac)
-
-        ang_dist_nrg_ang      = open("analysis/2d-ang-dist.txt", "w")
-        ang_dist_nrg_ang_norm = open("analysis/2d-ang-dist_norm.txt", "w")
-
-        if len(efrac_all_collect) != 0 and len(angle_all_collect) != 0:
-            #angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_all_collect, angle_all_collect,  bins=(numbins(efrac_all_collect)), density=False)
-            #angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_all_collect, angle_all_collect, bins=BINS, range=[[0, 1.1],[-90, 90]], density=False) # fixed bin size of 2 deg; try 36,72,180
-            angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_all_collect, angle_all_collect, bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]], density=False) # fixed bin size of 2 deg; try 36,72,180
-
-            for i in range(len(angle_efrac_hist)):
-                for j in range(len(angle_efrac_hist[i])):
-                    abs_val = int(angle_efrac_hist[i][j]/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))) # needs to be divided by sin(x) to correct geometry of experiment.
-                    rel_val = float(abs_val)/float(angle_efrac_hist.sum()) # current bin devided by sum of all bins to get "flux"
-                    ang_dist_nrg_ang.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), abs_val)) # write data with bins
-                    ang_dist_nrg_ang_norm.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), rel_val)) # write data with "flux""
+
+        ang_dist_nrg_ang      = open(os.path.join(OUTDIR, "2d-ang-dist.txt"), "w")
+        ang_dist_nrg_ang_norm = open(os.path.join(OUTDIR, "2d-ang-dist_norm.txt"), "w")
+
+        if "2d-ang-dist.txt" in out:
+                o, o_norm = out["2d-ang-dist.txt"], out["2d-ang-dist_norm.txt"]
+                hist_output.write_grid(ang_dist_nrg_ang, "%f %f %d", o.x, o.y, o.values, blocks=False) # write data with bins
+                hist_output.write_grid(ang_dist_nrg_ang_norm, "%f %f %f", o_norm.x, o_norm.y, o_norm.values, blocks=False) # write data with "flux"
 
         ang_dist_nrg_ang.close()
         ang_dist_nrg_ang_norm.close()
@@ -873,16 +698,10 @@ def analyze(trajs,logfile):
         ### Projectile-Surface distance ###
         print("Calculating projectile-surface distance.")
         logfile.write("Calculating projectile-surface distance.\n")
-        # LOOP
-        ps_dist = [traj.cl_appr for traj in trajs if traj.has_scattered]
 
-        # ANALYSIS
-        ps_hist, xedges = numpy.histogram(ps_dist, bins=numbins(ps_dist), range=(min(ps_dist), max(ps_dist)), density=True)
-        
         # OUTPUT
-        ps_file = open("analysis/ps_dist.txt", "w")
-        for i in range(len(ps_hist)):
-                ps_file.write("%f %f\n" % (0.5*(xedges[i]+xedges[i+1]), ps_hist[i]))
+        ps_file = open(os.path.join(OUTDIR, "ps_dist.txt"), "w")
+        hist_output.write_columns(ps_file, "%f %f", [out["ps_dist.txt"].x] + out["ps_dist.txt"].values)
         ps_file.close()
 
 
@@ -890,15 +709,11 @@ def analyze(trajs,logfile):
         ### Eloss vs Projectile-Surface distance ###
         print("Calculating energy loss projectile-surface distance relationship.")
         logfile.write("Calculating energy loss projectile-surface distance relationship.\n")
-        # ANALYSIS
-        eloss_psd_hist, xedges, yedges = numpy.histogram2d(all_eloss, ps_dist, bins=numbins(all_eloss), normed=False)
-        
+
         # OUTPUT
-        eloss_psd_file = open("analysis/eloss_psd.txt", "w")
-        for i in range(len(eloss_psd_hist)):
-                for j in range(len(eloss_psd_hist[i])):
-                        eloss_psd_file.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), eloss_psd_hist[i][j]))
-                eloss_psd_file.write("\n")
+        o = out["eloss_psd.txt"]
+        eloss_psd_file = open(os.path.join(OUTDIR, "eloss_psd.txt"), "w")
+        hist_output.write_grid(eloss_psd_file, "%f %f %d", o.x, o.y, o.values)
         eloss_psd_file.close()
 
 
@@ -906,262 +721,133 @@ def analyze(trajs,logfile):
         ### Scattering polar angle vs Projectile-Surface distance in-plane ###
         print("Calculating scattering angle projectile-surface distance relationship.")
         logfile.write("Calculating scattering angle projectile-surface distance relationship.\n")
-        # ANALYSIS
-        polar_psd_file = open("analysis/polar_psd.txt", "w")
-        if len(ps_dist_collect) > 0:
-        	polar_psd_hist, xedges, yedges = numpy.histogram2d(ps_dist_collect, angle_collect, bins=numbins(ps_dist_collect), normed=False)
-
-        	# OUTPUT
-        	for i in range(len(polar_psd_hist)):
-                        for j in range(len(polar_psd_hist[i])):
-                                polar_psd_file.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), int(polar_psd_hist[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                        polar_psd_file.write("\n")
-        else:
-                polar_psd_file.write("%f %f %d\n"   % (0.1, 0.5, 0))
-                polar_psd_file.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-                polar_psd_file.write("%f %f %d\n"   % (0.2, 1.0, 1))
-                polar_psd_file.write("%f %f %d\n"   % (0.2, 0.5, 2))
-        polar_psd_file.close()
-
 
         ### Eloss vs Projectile-Surface distance in plane ###
         print("Calculating in-plane energy loss projectile-surface distance relationship.")
         logfile.write("Calculating in-plane energy loss projectile-surface distance relationship.\n")
-        # ANALYSIS
-        eloss_psd_in_plane_file = open("analysis/eloss_psd_in_plane.txt", "w")
-        if len(ps_dist_collect) > 0:
-        	eloss_psd_in_plane_hist, xedges, yedges = numpy.histogram2d(energy_collect, ps_dist_collect, bins=numbins(ps_dist_collect), normed=False)
-
-        	# OUTPUT
-        	for i in range(len(eloss_psd_in_plane_hist)):
-                        for j in range(len(eloss_psd_in_plane_hist[i])):
-                                eloss_psd_in_plane_file.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), int(eloss_psd_in_plane_hist[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                        eloss_psd_in_plane_file.write("\n")
-        else:
-                eloss_psd_in_plane_file.write("%f %f %d\n"   % (0.1, 0.5, 0))
-                eloss_psd_in_plane_file.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-                eloss_psd_in_plane_file.write("%f %f %d\n"   % (0.2, 1.0, 1))
-                eloss_psd_in_plane_file.write("%f %f %d\n"   % (0.2, 0.5, 2))
-        eloss_psd_in_plane_file.close()
-        
+
+        # OUTPUT
+        for name in ("polar_psd.txt", "eloss_psd_in_plane.txt"):
+                psd_file = open(os.path.join(OUTDIR, name), "w")
+                if name in out:
+                        hist_output.write_grid(psd_file, "%f %f %d", out[name].x, out[name].y, out[name].values)
+                else:
+                        write_placeholder(psd_file)
+                psd_file.close()
+
 
         ### TOTAL VELOCITY LOSS ###
         print("Calculating total velocity loss.")
         logfile.write("Calculating total velocity loss.\n")
-        # LOOP 
-        all_vloss  = [traj.vloss for traj in trajs if traj.has_scattered] 
-        one_vb     = [traj.vloss for traj in trajs if traj.has_scattered and traj.turn_pnts == 1]
-        two_vb     = [traj.vloss for traj in trajs if traj.has_scattered and traj.turn_pnts == 3]
-        mul_vb     = [traj.vloss for traj in trajs if traj.has_scattered and traj.turn_pnts >= 5]
-
-        all_vf     = [length(traj.v_p_f) for traj in trajs if traj.has_scattered]
-        one_vfb    = [length(traj.v_p_f) for traj in trajs if traj.has_scattered and traj.turn_pnts == 1]
-        two_vfb    = [length(traj.v_p_f) for traj in trajs if traj.has_scattered and traj.turn_pnts == 3]
-        mul_vfb    = [length(traj.v_p_f) for traj in trajs if traj.has_scattered and traj.turn_pnts >= 5]
-        
-        absorbed_vloss = [traj.vloss for traj in trajs if traj.has_adsorbed]
 
-        # ANALYSIS
-        all_vloss_hist, all_vloss_edges  = numpy.histogram(all_vloss,   bins=numbins(SCATTERED), range=(min(all_vloss), max(all_vloss)), density=True)
-        one_vb_hist,     one_vb_edges     = numpy.histogram(one_vb,     bins=numbins(SCATTERED), range=(min(all_vloss), max(all_vloss)), density=True)
-        two_vb_hist,     two_vb_edges     = numpy.histogram(two_vb,     bins=numbins(SCATTERED), range=(min(all_vloss), max(all_vloss)), density=True)
-        mul_vb_hist,     mul_vb_edges     = numpy.histogram(mul_vb,     bins=numbins(SCATTERED), range=(min(all_vloss), max(all_vloss)), density=True)
-
-        all_vf_hist,      all_vf_edges      = numpy.histogram(all_vf,     bins=numbins(SCATTERED), range=(min(all_vf), max(all_vf)), density=True)
-        one_vfb_hist,     one_vfb_edges     = numpy.histogram(one_vfb,     bins=numbins(SCATTERED), range=(min(all_vf), max(all_vf)), density=True)
-        two_vfb_hist,     two_vfb_edges     = numpy.histogram(two_vfb,     bins=numbins(SCATTERED), range=(min(all_vf), max(all_vf)), density=True)
-        mul_vfb_hist,     mul_vfb_edges     = numpy.histogram(mul_vfb,     bins=numbins(SCATTERED), range=(min(all_vf), max(all_vf)), density=True)
-
-        frac_one_vb = float(len(one_vb))/SCATTERED
-        frac_two_vb = float(len(two_vb))/SCATTERED
-        frac_mul_vb = float(len(mul_vb))/SCATTERED
-
-        frac_one_vfb = float(len(one_vfb))/SCATTERED
-        frac_two_vfb = float(len(two_vfb))/SCATTERED
-        frac_mul_vfb = float(len(mul_vfb))/SCATTERED
-
-        # OUTPUT 
-        vloss_file = open("analysis/vloss.txt", "w")
+        # OUTPUT
+        vloss_file = open(os.path.join(OUTDIR, "vloss.txt"), "w")
         vloss_file.write("# vloss/Ang*fs^-1  all  single bounce  double bounce  multi bounce\n")
-        for i in range(len(all_vloss_hist)):
-        	vloss_file.write("%f %f %f %f %f\n" % (0.5*(all_vloss_edges[i]+all_vloss_edges[i+1]), all_vloss_hist[i], frac_one_vb*one_vb_hist[i], frac_two_vb*two_vb_hist[i], frac_mul_vb*mul_vb_hist[i]))
+        hist_output.write_columns(vloss_file, "%f %f %f %f %f", [out["vloss.txt"].x] + out["vloss.txt"].values)
         vloss_file.close()
 
         # write final velocities
-        v_final_file = open("analysis/all_final_v.txt", "w")
+        v_final_file = open(os.path.join(OUTDIR, "all_final_v.txt"), "w")
         v_final_file.write("# final v/Ang*fs^-1  all  single bounce  double bounce  multi bounce\n")
-        for i in range(len(all_vf_hist)):
-                v_final_file.write("%f %f %f %f %f\n" % (0.5*(all_vf_edges[i]+all_vf_edges[i+1]), all_vf_hist[i], frac_one_vfb*one_vfb_hist[i], frac_two_vfb*two_vfb_hist[i], frac_mul_vfb*mul_vfb_hist[i]))
+        hist_output.write_columns(v_final_file, "%f %f %f %f %f", [out["all_final_v.txt"].x] + out["all_final_v.txt"].values)
         v_final_file.close()
 
 
-        spatial_file = open("analysis/spatial_v.txt", "w")
-        spatial_file.write("# x-pos y-pos v_scat\n")
-        for traj in trajs:
-            if traj.has_scattered:
-                spatial_file.write("{:10.4f} {:10.4f} {:10.5f}\n".format(traj.r_p_f.x,traj.r_p_f.y,length(traj.v_p_f)))
-        spatial_file.close()
+        if trajs is not None: # per trajectory, not part of a saved state
+                spatial_file = open(os.path.join(OUTDIR, "spatial_v.txt"), "w")
+                spatial_file.write("# x-pos y-pos v_scat\n")
+                for chunk in hist_engine.chunks(trajs, CHUNK_ROWS):
+                        for x, y, v in zip(chunk.r_p_f[chunk.has_scattered, 0].tolist(), chunk.r_p_f[chunk.has_scattered, 1].tolist(), chunk.v_f[chunk.has_scattered].tolist()):
+                                spatial_file.write("{:10.4f} {:10.4f} {:10.5f}\n".format(x,y,v))
+                spatial_file.close()
 
 
 
         ### ANGULAR DISTRIBUTION ###
         print("Calculating angular velocity loss.")
         logfile.write("Calculating angular velocity loss.\n")
-        # get trajectories that are within specular radius in azimuth direction
-        velocity_collect  = []
-        angle_collect   = []
-        ps_dist_collect = []
-        polar_scatt_azi_int_velocity = []
-        polar_scatt_azi_int_angle  = []
-        for traj in trajs:
-        	if traj.has_scattered:
-        		polar_scatt_azi_int_velocity.append(traj.vloss)
-        		polar_scatt_azi_int_angle.append(traj.polar_f)
-
-        		if traj.in_plane:
-        			velocity_collect.append(traj.vloss)
-        			angle_collect.append(traj.polar_f)
-        			ps_dist_collect.append(traj.cl_appr)
-
-        ang_dist_file_v = open("analysis/ang_res_vloss.txt", "w")
-        ang_dist_mat_file_v = open("analysis/ang_res_vloss_matrix.txt", "w")
-        occurence_file_v    = open("analysis/ang_res_occurrence_v.txt", "w")
-        if len(velocity_collect) != 0:
-                angle_vloss_hist, xedges, yedges = numpy.histogram2d(velocity_collect, angle_collect,  bins=(numbins(velocity_collect)), normed=False)
-                #occurence_hist_v, occ_edges = numpy.histogram(angle_collect, bins=numpy.arange(91), normed=False)
-                occurence_hist_v, occ_edges = numpy.histogram(angle_collect, bins=numpy.arange(91), density=False)
-                	
+
+        ang_dist_file_v = open(os.path.join(OUTDIR, "ang_res_vloss.txt"), "w")
+        ang_dist_mat_file_v = open(os.path.join(OUTDIR, "ang_res_vloss_matrix.txt"), "w")
+        occurence_file_v    = open(os.path.join(OUTDIR, "ang_res_occurrence_v.txt"), "w")
+        if "ang_res_vloss.txt" in out:
+                xedges, yedges = res["angle_vloss"].edges
+
                 # OUTPUT
-                for i in range(len(angle_vloss_hist)):
-                	for j in range(len(angle_vloss_hist[i])):
-                		ang_dist_file_v.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), int(angle_vloss_hist[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                	ang_dist_file_v.write("\n")
+                o = out["ang_res_vloss.txt"]
+                xc, yc = o.x, o.y
+                hist_output.write_grid(ang_dist_file_v, "%f %f %d", xc, yc, o.values)
 
                 ang_dist_mat_file_v.write("# x-range describing velocity loss in Ang/fs (left to right) from %f to %f in steps of %f\n" % (0.5*(xedges[0]+xedges[1]), 0.5*(xedges[-2]+xedges[-1]), abs(xedges[0]-xedges[1])))
                 ang_dist_mat_file_v.write("# y-range describing scattering angle in degrees (top to bottom) from %f to %f in steps of %f\n" % (0.5*(yedges[0]+yedges[1]), 0.5*(yedges[-2]+yedges[-1]), abs(yedges[0]-yedges[1])))
-                ang_dist_mat_file_v.write("# specular scattering angle is %f degrees and detector radius is %f degrees\n" % (trajs[0].polar_i, SPECULAR_RADIUS))
-                ang_dist_mat_file_v.write("0.0 "); [ang_dist_mat_file_v.write("%f " % (0.5*(xedges[i]+xedges[i+1]))) for i in range(len(xedges)-1)]; ang_dist_mat_file_v.write("\n")
-                for i in range(len(angle_vloss_hist[0])):
-                        ang_dist_mat_file_v.write("%f " % (0.5*(yedges[i]+yedges[i+1])))
-                        for j in range(len(angle_vloss_hist)):
-                                ang_dist_mat_file_v.write("%d " % angle_vloss_hist[j][i])
-                        ang_dist_mat_file_v.write("\n")
+                ang_dist_mat_file_v.write("# specular scattering angle is %f degrees and detector radius is %f degrees\n" % (float(polar_i), SPECULAR_RADIUS))
+                hist_output.write_matrix(ang_dist_mat_file_v, "%.1f ", "%f ", [0], [xc])
+                hist_output.write_matrix(ang_dist_mat_file_v, "%f ", "%d ", yc, out["ang_res_vloss_matrix.txt"].values[0].T)
 
                 occurence_file_v.write("# number of trajs in plane in unit polar angle, unit azimuthal angle\n")
-                for i in range(len(occurence_hist_v)):
-                        this_angle = 0.5*(occ_edges[i]+occ_edges[i+1])
-                        occurence_file_v.write("%f %f\n" % (this_angle, 1.0*occurence_hist_v[i]/sum(occurence_hist_v)))
+                hist_output.write_columns(occurence_file_v, "%f %f", [out["ang_res_occurrence_v.txt"].x] + out["ang_res_occurrence_v.txt"].values)
         else:
-                ang_dist_file_v.write("%f %f %d\n"   % (0.1, 0.5, 0))
-                ang_dist_file_v.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-                ang_dist_file_v.write("%f %f %d\n"   % (0.2, 1.0, 1))
-                ang_dist_file_v.write("%f %f %d\n"   % (0.2, 0.5, 2))
-
+                write_placeholder(ang_dist_file_v)
                 occurence_file_v.write("%f %f\n" % (0.1, 0.1))
-        	
+
         occurence_file_v.close()
         ang_dist_file_v.close()
         ang_dist_mat_file_v.close()
 
         # INTERGRATED OVER ALL AZIMUTH ANGLES #
-        polar_scatt_azi_file_v = open("analysis/polar_scatt_azi_int_v.txt", "w")
-        if len(polar_scatt_azi_int_velocity) != 0:
-                polar_scatt_azi_int_hist_v, xedges, yedges = numpy.histogram2d(polar_scatt_azi_int_velocity, polar_scatt_azi_int_angle, bins=(numbins(polar_scatt_azi_int_velocity)), normed=False)
-        	
-                for i in range(len(polar_scatt_azi_int_hist_v)):
-                        for j in range(len(polar_scatt_azi_int_hist_v[i])):
-                                polar_scatt_azi_file_v.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), int(polar_scatt_azi_int_hist_v[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                        polar_scatt_azi_file_v.write("\n")
+        polar_scatt_azi_file_v = open(os.path.join(OUTDIR, "polar_scatt_azi_int_v.txt"), "w")
+        if "polar_scatt_azi_int_v.txt" in out:
+                o = out["polar_scatt_azi_int_v.txt"]
+                hist_output.write_grid(polar_scatt_azi_file_v, "%f %f %d", o.x, o.y, o.values)
         else:
-                polar_scatt_azi_file_v.write("%f %f %d\n"   % (0.1, 0.5, 0))
-                polar_scatt_azi_file_v.write("%f %f %d\n\n" % (0.1, 1.0, 1))
-                polar_scatt_azi_file_v.write("%f %f %d\n"   % (0.2, 1.0, 1))
-                polar_scatt_azi_file_v.write("%f %f %d\n"   % (0.2, 0.5, 2))
-
+                write_placeholder(polar_scatt_azi_file_v)
         polar_scatt_azi_file_v.close()
 
         ### SPHERICAL SYMMETRY ###
-        # LOOP
+        # same histograms as above, written to the velocity files
         print("Calculating spherical symmetry.")
         logfile.write("Calculating spherical symmetry.\n")
-        abs_azi = []
-        rel_azi = []
-        yvals = []
-        this_azi = None
-        for traj in trajs:
-                if traj.has_scattered:
-                        delta_azi = traj.azi_f-traj.azi_i
-                        if -180 <= delta_azi <= 180:
-                                rel_azi.append(delta_azi)
-                        elif delta_azi < -180:
-                                rel_azi.append(delta_azi+360)
-                        elif delta_azi > 180:
-                                rel_azi.append(delta_azi-360)
-                        else:
-                                sys.exit("Weird angle in spherical symmetry.")
-
-                        abs_azi.append(traj.azi_f)
-                        yvals.append(traj.polar_f)
-
-        # ANALYSIS
-        rel_spherical_hist_v, rel_xedges, yedges = numpy.histogram2d(rel_azi, yvals, bins=numbins(rel_azi), normed=False)
-        abs_spherical_hist_v, abs_xedges, yedges = numpy.histogram2d(abs_azi, yvals, bins=numbins(abs_azi), normed=False)
 
         # OUTPUT
-        spherical_file_rel_v = open("analysis/rel_spherical_symmetry_v.txt", "w")
-        for i in range(len(rel_spherical_hist_v)):
-                for j in range(len(rel_spherical_hist_v[i])):
-                        spherical_file_rel_v.write("%f %f %d\n" % (0.5*(rel_xedges[i]+rel_xedges[i+1]), -0.5*(yedges[j]+yedges[j+1]), int(rel_spherical_hist_v[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                spherical_file_rel_v.write("\n")
-        spherical_file_rel_v.close()
-
-        spherical_file_abs_v = open("analysis/abs_spherical_symmetry_v.txt", "w")
-        for i in range(len(abs_spherical_hist_v)):
-                for j in range(len(abs_spherical_hist_v[i])):
-                        spherical_file_abs_v.write("%f %f %d\n" % (0.5*(abs_xedges[i]+abs_xedges[i+1]), -0.5*(yedges[j]+yedges[j+1]), int(abs_spherical_hist_v[i][j])/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))))
-                spherical_file_abs_v.write("\n")
-        spherical_file_abs_v.close()
-
-
-
-
-
-
+        for name in ("rel_spherical_symmetry_v.txt", "abs_spherical_symmetry_v.txt"):
+                o = out[name]
+                spherical_file = open(os.path.join(OUTDIR, name), "w")
+                hist_output.write_grid(spherical_file, "%f %f %d", o.x, o.y, o.values)
+                spherical_file.close()
 
 
 
         ### SUMMARY ###
         # ANALYSIS
-        energy_won = sum( [1 for e_final in all_eloss if e_final < 0] )
-
-        # OUTPUT 
-        out = open("analysis/Summary.txt", "w")
-        out.write("Created by version %4.2f\n" % VERSION_ID)
-        out.write("Scattered:   %d (%f%%)\n" % (SCATTERED,   100.*FRAC_SCATTERED))
-        out.write("Absorbed:    %d (%f%%)\n" % (ABSORBED,    100.*FRAC_ABSORBED))
-        out.write("Transmitted: %d (%f%%)\n\n" % (TRANSMITTED, 100.*FRAC_TRANSMITTED))
-
-        out.write("%d (%f%%) of the scattered projectiles won kinetic energy.\n" % (energy_won, 100.*energy_won/SCATTERED))
-        out.write("%f%% of scattered trajectories were within +-%f degrees in plane.\n" % (100.*len(in_plane_all_eloss)/SCATTERED, SPECULAR_RADIUS))
-        out.write("%f%% of scattered trajectories were within +-%f degrees to specular scattering angle.\n\n" % (100.*len(spec_all_eloss)/SCATTERED, SPECULAR_RADIUS))
-
-        out.write("Average energy loss of H-atoms in specular scattering angle %f eV.\n"   % numpy.mean(spec_all_eloss))
-        try:
-                out.write("Peak energy loss of H-atoms in specular scattering angle    %f eV.\n\n" % spec_all_eloss_edges[numpy.argmax(spec_all_eloss_hist)])
-        except(UnboundLocalError):
-                out.write("Peak energy loss of H-atoms in specular scattering angle    %s eV.\n\n" % "No atoms in specular scattering angle")
-        out.write("Average energy loss of H-atoms reflected %f eV.\n"     % numpy.mean(all_eloss))
-        out.write("Peak energy loss of H-atoms reflected    %f eV.\n\n"   % all_eloss_edges[numpy.argmax(all_eloss_hist)])
-        out.write("Average energy loss of H-atoms in bulk   %f eV.\n" % numpy.mean(absorbed_eloss))
-        out.write("Average energy loss of reflected H-atoms to ehps %f eV.\n" % numpy.mean(loss_to_ehps))
-        out.write("Average energy loss of specularly reflected H-atoms to ehps %f eV.\n\n" % numpy.mean(loss_to_ehps_spec))
-        
-        out.write("%refl  %in bulk  %shot_thru  %E_won  %in_spec  avg_E_in_spec  peak_E_in_spec  avg_E_in_bulk  avg_E_refl  peak_E_refl  avg_ehp_loss  avg_ehp_loss_spec Trajs\n")
-        try:
-                out.write("%f %f %f %f %f %f %f %f %f %f %f %f %d\n" % (100.*FRAC_SCATTERED, 100.*FRAC_ABSORBED, 100.*FRAC_TRANSMITTED, 100.*energy_won/SCATTERED, 100.*len(spec_all_eloss)/SCATTERED, trajs[0].ekin_p_i-numpy.mean(spec_all_eloss), trajs[0].ekin_p_i-spec_all_eloss_edges[numpy.argmax(spec_all_eloss_hist)], trajs[0].ekin_p_i-numpy.mean(absorbed_eloss), trajs[0].ekin_p_i-numpy.mean(all_eloss), trajs[0].ekin_p_i-all_eloss_edges[numpy.argmax(all_eloss_hist)], numpy.mean(loss_to_ehps), numpy.mean(loss_to_ehps_spec), len(trajs)))
-        except(UnboundLocalError):
-	        out.write("%f %f %f %f %f %f %f %f %f %f %f %d\n" % (100.*FRAC_SCATTERED, 100.*FRAC_ABSORBED, 100.*FRAC_TRANSMITTED, 100.*energy_won/SCATTERED, 100.*len(spec_all_eloss)/SCATTERED, trajs[0].ekin_p_i-numpy.mean(spec_all_eloss), trajs[0].ekin_p_i-numpy.mean(absorbed_eloss), trajs[0].ekin_p_i-numpy.mean(all_eloss), trajs[0].ekin_p_i-all_eloss_edges[numpy.argmax(all_eloss_hist)], numpy.mean(loss_to_ehps), numpy.mean(loss_to_ehps_spec), len(trajs)))
-        out.close()
+        energy_won = res["energy_won"].count
+        row = out["Summary.txt"].values[0]
+
+        # OUTPUT
+        summary_file = open(os.path.join(OUTDIR, "Summary.txt"), "w")
+        summary_file.write("Created by version %4.2f\n" % VERSION_ID)
+        summary_file.write("Scattered:   %d (%f%%)\n" % (SCATTERED,   100.*FRAC_SCATTERED))
+        summary_file.write("Absorbed:    %d (%f%%)\n" % (ABSORBED,    100.*FRAC_ABSORBED))
+        summary_file.write("Transmitted: %d (%f%%)\n\n" % (TRANSMITTED, 100.*FRAC_TRANSMITTED))
+
+        summary_file.write("%d (%f%%) of the scattered projectiles won kinetic energy.\n" % (energy_won, 100.*energy_won/SCATTERED))
+        summary_file.write("%f%% of scattered trajectories were within +-%f degrees in plane.\n" % (100.*in_plane_all_eloss.count/SCATTERED, SPECULAR_RADIUS))
+        summary_file.write("%f%% of scattered trajectories were within +-%f degrees to specular scattering angle.\n\n" % (100.*spec_all_eloss.count/SCATTERED, SPECULAR_RADIUS))
+
+        summary_file.write("Average energy loss of H-atoms in specular scattering angle %f eV.\n"   % summary["spec_mean"])
+        if not numpy.isnan(summary["spec_peak"]):
+                summary_file.write("Peak energy loss of H-atoms in specular scattering angle    %f eV.\n\n" % summary["spec_peak"])
+        else:
+                summary_file.write("Peak energy loss of H-atoms in specular scattering angle    %s eV.\n\n" % "No atoms in specular scattering angle")
+        summary_file.write("Average energy loss of H-atoms reflected %f eV.\n"     % summary["all_mean"])
+        summary_file.write("Peak energy loss of H-atoms reflected    %f eV.\n\n"   % summary["all_peak"])
+        summary_file.write("Average energy loss of H-atoms in bulk   %f eV.\n" % summary["absorbed_mean"])
+        summary_file.write("Average energy loss of reflected H-atoms to ehps %f eV.\n" % summary["ehps_mean"])
+        summary_file.write("Average energy loss of specularly reflected H-atoms to ehps %f eV.\n\n" % summary["ehps_spec_mean"])
+
+        summary_file.write("%refl  %in bulk  %shot_thru  %E_won  %in_spec  avg_E_in_spec  peak_E_in_spec  avg_E_in_bulk  avg_E_refl  peak_E_refl  avg_ehp_loss  avg_ehp_loss_spec Trajs\n")
+        columns = summary_columns(row, row)
+        summary_file.write(("%f "*len(columns) + "%d\n") % (tuple(columns) + (NTRAJS,)))
+        summary_file.close()
 
 	
 # Average energy of H-atoms in bulk 0.03969474585 eV.
@@ -1175,115 +861,86 @@ def graphene_bounce_events(trajs,logfile):
     print("Calculating graphene bounce events.")
     logfile.write("Calculating graphene bounce events.\n")
 
-    fast_c    = open("analysis/component_fast.txt", "w")
-    slow_c_sb = open("analysis/component_slow_single.txt", "w")
-    slow_c_mb = open("analysis/component_slow_multi.txt", "w")
-
-    for traj in trajs:
-        if traj.has_scattered and traj.in_plane:
-            if traj.turn_pnts == 1:
-                if traj.cl_appr > 1.4:
-                    fast_c.write("%f %f\n" % (traj.ekin_p_f/traj.ekin_p_i, traj.polar_f))
+    fast_c    = open(os.path.join(OUTDIR, "component_fast.txt"), "w")
+    slow_c_sb = open(os.path.join(OUTDIR, "component_slow_single.txt"), "w")
+    slow_c_mb = open(os.path.join(OUTDIR, "component_slow_multi.txt"), "w")
 
-                if traj.cl_appr < 1.4:
-                    slow_c_sb.write("%f %f\n" % (traj.ekin_p_f/traj.ekin_p_i, traj.polar_f))
+    in_plane = trajs.has_scattered & trajs.in_plane
+    fast     = in_plane & (trajs.turn_pnts == 1) & (trajs.cl_appr > 1.4)
+    slow_sb  = in_plane & (trajs.turn_pnts == 1) & (trajs.cl_appr < 1.4)
+    slow_mb  = in_plane & (trajs.turn_pnts > 1)  & (trajs.cl_appr < 1.4)
 
-            elif traj.turn_pnts > 1 and traj.cl_appr < 1.4:
-                slow_c_mb.write("%f %f\n" % (traj.ekin_p_f/traj.ekin_p_i, traj.polar_f))
+    for outfile, mask in ((fast_c, fast), (slow_c_sb, slow_sb), (slow_c_mb, slow_mb)):
+        for efrac, polar_f in zip(trajs.efrac[mask].tolist(), trajs.polar_f[mask].tolist()):
+            outfile.write("%f %f\n" % (efrac, polar_f))
 
     slow_c_mb.close()
     slow_c_sb.close()
     fast_c.close()
 
 def analyze_angles(trajs,logfile):
-        for traj in trajs:	# List comprehension simply need too much time. This is ugly, but fast.
-                if traj.in_plane and traj.has_scattered:
-
-                        if traj.cl_appr < 1.4: # our structural parameter for the barrie # our structural parameter for the barrierr
-                            outfile_string = "slow_component.log"
-                        else:
-                            outfile_string = "fast_component.log"
-
-                        outfile = open(outfile_string,'a+')
-                        if 14 <= traj.polar_f <= 16:
-                            if 1.44 <= traj.ekin_p_f:
-                                outfile.write("15+-1, 1.44 <= E_s: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if 0.960 <= traj.ekin_p_f < 1.44:
-                                outfile.write("15+-1, 0.96 <= E_s < 1.44: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if traj.ekin_p_f < 0.960:
-                                outfile.write("15+-1, E_s < 0.96: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                        if 29 <= traj.polar_f <= 31:
-                            if 1.44 <= traj.ekin_p_f:
-                                outfile.write("30+-1, 1.44 <= E_s: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if 0.960 <= traj.ekin_p_f < 1.44:
-                                outfile.write("30+-1, 0.96 <= E_s < 1.44: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if traj.ekin_p_f < 0.960:
-                                outfile.write("30+-1, E_s < 0.96: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                        if 44 <= traj.polar_f <= 46:
-                            if 1.44 <= traj.ekin_p_f:
-                                outfile.write("45+-1, 1.44 <= E_s: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if 0.960 <= traj.ekin_p_f < 1.44:
-                                outfile.write("45+-1, 0.96 <= E_s < 1.44: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if traj.ekin_p_f < 0.960:
-                                outfile.write("45+-1, E_s < 0.96: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                        if 59 <= traj.polar_f <= 61:
-                            if 1.44 <= traj.ekin_p_f:
-                                outfile.write("60+-1, 1.44 <= E_s: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if 0.960 <= traj.ekin_p_f < 1.44:
-                                outfile.write("60+-1, 0.96 <= E_s < 1.44: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-                            if traj.ekin_p_f < 0.960:
-                                outfile.write("60+-1, E_s < 0.96: trajid {} and closest approach {}\n".format(traj.traj_id,traj.cl_appr))
-
-                        outfile.close()
+        in_plane = trajs.in_plane & trajs.has_scattered
+        slow     = trajs.cl_appr < 1.4 # our structural parameter for the barrier
+        for outfile_string, mask in (("slow_component.log", in_plane & slow), ("fast_component.log", in_plane & ~slow)):
+                if not mask.any():
+                        continue
+                outfile = open(outfile_string,'a+')
+                for i in numpy.flatnonzero(mask):
+                        polar_f, ekin_p_f, cl_appr = float(trajs.polar_f[i]), float(trajs.ekin_p_f[i]), float(trajs.cl_appr[i])
+                        for angle in (15, 30, 45, 60):
+                                if angle-1 <= polar_f <= angle+1:
+                                        if 1.44 <= ekin_p_f:
+                                                outfile.write("{}+-1, 1.44 <= E_s: trajid {} and closest approach {}\n".format(angle,trajs.traj_id_str(i),cl_appr))
+                                        if 0.960 <= ekin_p_f < 1.44:
+                                                outfile.write("{}+-1, 0.96 <= E_s < 1.44: trajid {} and closest approach {}\n".format(angle,trajs.traj_id_str(i),cl_appr))
+                                        if ekin_p_f < 0.960:
+                                                outfile.write("{}+-1, E_s < 0.96: trajid {} and closest approach {}\n".format(angle,trajs.traj_id_str(i),cl_appr))
+                outfile.close()
 
 
 def get_traj(trajs,logfile):
 
     def_nrg_file  = open(defnrgname, "w")
 
-    ntrajs        = len(trajs)
-    scattered_ctr = 0
-    absorbed_ctr  = 0
-    slow_comp_ctr = 0
-    fast_comp_ctr = 0
-    back_scat_ctr = 0
-    traj_after    = 0
-    traj_before   = 0
+    ntrajs        = trajs.ntrajs
     cl_appr_dist  = 1.4
 
-    for traj in trajs:
-        if traj.has_scattered:
-            scattered_ctr += 1
-
-            if traj.cl_appr <= cl_appr_dist: # to get slow component
-                traj_after += 1
-                if traj.turn_pnts == 1:
-                    slow_comp_ctr += 1
-
-                    def_nrg_file.write(traj.traj_id)
-                    def_nrg_file.write(' ')
-
-                    print("Analyze slow component in traj {}".format(traj.traj_id))
-                    logfile.write("Analyze slow component in traj {}\n".format(traj.traj_id))
-
-            else: # traj.cl_appr > 1.4
-                traj_before += 1
-                if traj.turn_pnts == 1:
-                    fast_comp_ctr += 1
-
-                    print("Analyze fast component in traj {}".format(traj.traj_id))
-                    logfile.write("Analyze fast component in traj {}\n".format(traj.traj_id))
-
-            if traj.azi_f < -100: # for backscattering
-                back_scat_ctr += 1
-
-                print("potential backscattering in traj {}".format(traj.traj_id))
-                logfile.write("potential backscattering in traj {}\n".format(traj.traj_id))
+    slow          = trajs.has_scattered & (trajs.cl_appr <= cl_appr_dist) # to get slow component
+    fast          = trajs.has_scattered & ~(trajs.cl_appr <= cl_appr_dist)
+    back_scat     = trajs.has_scattered & (trajs.azi_f < -100) # for backscattering
+    single        = trajs.turn_pnts == 1
+
+    scattered_ctr = int(numpy.count_nonzero(trajs.has_scattered))
+    absorbed_ctr  = ntrajs - scattered_ctr
+    slow_comp_ctr = int(numpy.count_nonzero(slow & single))
+    fast_comp_ctr = int(numpy.count_nonzero(fast & single))
+    back_scat_ctr = int(numpy.count_nonzero(back_scat))
+    traj_after    = int(numpy.count_nonzero(slow))
+    traj_before   = int(numpy.count_nonzero(fast))
+
+    # the messages are printed in trajectory order
+    for i in numpy.flatnonzero((slow & single) | (fast & single) | back_scat | ~trajs.has_scattered):
+        traj_id = trajs.traj_id_str(i)
+        if trajs.has_scattered[i]:
+            if slow[i] and single[i]:
+                def_nrg_file.write(traj_id)
+                def_nrg_file.write(' ')
+
+                print("Analyze slow component in traj {}".format(traj_id))
+                logfile.write("Analyze slow component in traj {}\n".format(traj_id))
+
+            elif fast[i] and single[i]:
+                print("Analyze fast component in traj {}".format(traj_id))
+                logfile.write("Analyze fast component in traj {}\n".format(traj_id))
+
+            if back_scat[i]:
+                print("potential backscattering in traj {}".format(traj_id))
+                logfile.write("potential backscattering in traj {}\n".format(traj_id))
 
         else:
-            absorbed_ctr += 1
-            print("particle adsorbed in traj {}".format(traj.traj_id))
-            logfile.write("particle adsorbed in traj {}\n".format(traj.traj_id))
+            print("particle adsorbed in traj {}".format(traj_id))
+            logfile.write("particle adsorbed in traj {}\n".format(traj_id))
+    def_nrg_file.close()
 
     print("trajs with scattering after barrier (single bounce): {} out of {} scattered traj ({}%)".format(slow_comp_ctr,scattered_ctr,float(slow_comp_ctr)*100/float(scattered_ctr)))
     logfile.write("trajs with scattering after barrier (single bounce): {} out of {} scattered traj ({}%)\n".format(slow_comp_ctr,scattered_ctr,float(slow_comp_ctr)*100/float(scattered_ctr)))
@@ -1299,86 +956,46 @@ def get_traj(trajs,logfile):
 
 
 
+def rat_outputs(trajs):
+        # values of the RAT files, computed from the trajectory table (or a replica of it)
+        # both domains in one selection
+        detected, angle_rat_collect = RAT_DETECTOR.detect(trajs)
+        efrac_rat_collect = trajs.efrac[detected]
+        if len(efrac_rat_collect) == 0 or len(angle_rat_collect) == 0:
+                return {}
+
+        #angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_all_collect, angle_all_collect,  bins=(numbins(efrac_all_collect)), density=False)
+        #angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_all_collect, angle_all_collect, bins=BINS, range=[[0, 1.1],[-90, 90]], density=False) # fixed bin size of 2 deg; try 36,72,180
+        angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_rat_collect, angle_rat_collect, bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]], density=False) # fixed bin size of 2 deg; try 36,72,180
+
+        xc, yc = centres(xedges), centres(yedges)
+        val_abs = hist_output.corrected_int(angle_efrac_hist, yc) # needs to be divided by sin(x) to correct geometry of experiment.
+        val = hist_output.normalized(val_abs, angle_efrac_hist)   # "flux" normalized to sum/max of all values and of all corrected bins
+        out = {"2d-ang-dist_rat.txt": hist_output.Output(xc, yc, [val_abs])}
+        for norm in ("sum", "max", "bin_sum", "bin_max"):
+                out["2d-ang-dist_rat_norm_%s.txt" % norm] = hist_output.Output(xc, yc, [val[norm]])
+        return out
+
 def rat_analysis(trajs,logfile):
 
         # 2D ANGULAR DISTRIBUTION RAT
         print("Calculate 2D angular distribution for RAT experiment")
-        angle_rat_collect = []
-        efrac_rat_collect = []
-        AZIMUTHAL_ANGLE_RAT_D1 = 13.5
-        AZIMUTHAL_ANGLE_RAT_D2 = -13.5
-
-       # DOMAIN 1 with azi_i = +13.5 degree
-        for traj in trajs:
-            if traj.azi_i == AZIMUTHAL_ANGLE_RAT_D1:
-                if traj.azi_f < 0:
-                    inv_azi = AZIMUTHAL_ANGLE_RAT_D1 - 180
-                    if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(-traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-                    elif traj.has_scattered and abs(AZIMUTHAL_ANGLE_RAT_D1 - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-                if traj.azi_f > 0:
-                    inv_azi = AZIMUTHAL_ANGLE_RAT_D1 + 180
-                    if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(-traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-                    elif traj.has_scattered and abs(AZIMUTHAL_ANGLE_RAT_D1 - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-
-       # DOMAIN 2 with azi_i = -13.5 degree
-        for traj in trajs:
-            if traj.azi_i == AZIMUTHAL_ANGLE_RAT_D2:
-                if traj.azi_f < 0:
-                    inv_azi = AZIMUTHAL_ANGLE_RAT_D2 - 180
-                    if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(-traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-                    elif traj.has_scattered and abs(AZIMUTHAL_ANGLE_RAT_D2 - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-                if traj.azi_f > 0:
-                    inv_azi = AZIMUTHAL_ANGLE_RAT_D2 + 180
-                    if traj.has_scattered and abs(inv_azi - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(-traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-                    elif traj.has_scattered and abs(AZIMUTHAL_ANGLE_RAT_D2 - traj.azi_f) < SPECULAR_RADIUS:
-                        angle_rat_collect.append(traj.polar_f)
-                        efrac_rat_collect.append(traj.efrac)
-
-        ang_dist_nrg_rat_ang          = open("analysis/2d-ang-dist_rat.txt", "w")
-        ang_dist_nrg_rat_ang_norm_sum = open("analysis/2d-ang-dist_rat_norm_sum.txt", "w")
-        ang_dist_nrg_rat_ang_norm_max = open("analysis/2d-ang-dist_rat_norm_max.txt", "w")
-        
-        ang_dist_nrg_rat_ang_norm_bin_sum = open("analysis/2d-ang-dist_rat_norm_bin_sum.txt", "w")
-        ang_dist_nrg_rat_ang_norm_bin_max = open("analysis/2d-ang-dist_rat_norm_bin_max.txt", "w")
-
-        bin_arr = []
-
-        if len(efrac_rat_collect) != 0 and len(angle_rat_collect) != 0:
-            #angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_all_collect, angle_all_collect,  bins=(numbins(efrac_all_collect)), density=False)
-            #angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_all_collect, angle_all_collect, bins=BINS, range=[[0, 1.1],[-90, 90]], density=False) # fixed bin size of 2 deg; try 36,72,180
-            angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_rat_collect, angle_rat_collect, bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]], density=False) # fixed bin size of 2 deg; try 36,72,180
-
-            for i in range(len(angle_efrac_hist)):
-                for j in range(len(angle_efrac_hist[i])):
-                    val_abs = int(angle_efrac_hist[i][j]/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))) # needs to be divided by sin(x) to correct geometry of experiment.
-                    bin_arr.append(float(val_abs))
-                    val_sum = float(val_abs)/float(angle_efrac_hist.sum()) # current bin divided by sum of all values to get "flux"
-                    val_max = float(val_abs)/float(angle_efrac_hist.max()) # current bin divided by max value to get "flux"
-                    ang_dist_nrg_rat_ang.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_abs)) # write data with bins
-                    ang_dist_nrg_rat_ang_norm_sum.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_sum)) # write data with area integrtated "flux""
-                    ang_dist_nrg_rat_ang_norm_max.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_max)) # write data with normalized "flux""
-
-            for i in range(len(angle_efrac_hist)):
-                for j in range(len(angle_efrac_hist[i])):
-                    val_abs = int(angle_efrac_hist[i][j]/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi)))
-                    val_sum = float(val_abs)/float(sum(bin_arr))
-                    val_max = float(val_abs)/float(max(bin_arr))
-                    ang_dist_nrg_rat_ang_norm_bin_sum.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_sum))
-                    ang_dist_nrg_rat_ang_norm_bin_max.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_max))
+        out = rat_outputs(trajs)
+
+        ang_dist_nrg_rat_ang          = open(os.path.join(OUTDIR, "2d-ang-dist_rat.txt"), "w")
+        ang_dist_nrg_rat_ang_norm_sum = open(os.path.join(OUTDIR, "2d-ang-dist_rat_norm_sum.txt"), "w")
+        ang_dist_nrg_rat_ang_norm_max = open(os.path.join(OUTDIR, "2d-ang-dist_rat_norm_max.txt"), "w")
+
+        ang_dist_nrg_rat_ang_norm_bin_sum = open(os.path.join(OUTDIR, "2d-ang-dist_rat_norm_bin_sum.txt"), "w")
+        ang_dist_nrg_rat_ang_norm_bin_max = open(os.path.join(OUTDIR, "2d-ang-dist_rat_norm_bin_max.txt"), "w")
+
+        if out:
+            xc, yc = out["2d-ang-dist_rat.txt"].x, out["2d-ang-dist_rat.txt"].y
+            hist_output.write_grid(ang_dist_nrg_rat_ang,              "%f %f %d", xc, yc, out["2d-ang-dist_rat.txt"].values,              blocks=False) # write data with bins
+            hist_output.write_grid(ang_dist_nrg_rat_ang_norm_sum,     "%f %f %f", xc, yc, out["2d-ang-dist_rat_norm_sum.txt"].values,     blocks=False) # write data with area integrtated "flux"
+            hist_output.write_grid(ang_dist_nrg_rat_ang_norm_max,     "%f %f %f", xc, yc, out["2d-ang-dist_rat_norm_max.txt"].values,     blocks=False) # write data with normalized "flux"
+            hist_output.write_grid(ang_dist_nrg_rat_ang_norm_bin_sum, "%f %f %f", xc, yc, out["2d-ang-dist_rat_norm_bin_sum.txt"].values, blocks=False)
+            hist_output.write_grid(ang_dist_nrg_rat_ang_norm_bin_max, "%f %f %f", xc, yc, out["2d-ang-dist_rat_norm_bin_max.txt"].values, blocks=False)
 
         ang_dist_nrg_rat_ang.close()
         ang_dist_nrg_rat_ang_norm_sum.close()
@@ -1388,123 +1005,177 @@ def rat_analysis(trajs,logfile):
         ang_dist_nrg_rat_ang_norm_bin_max.close()
 
 
-def ion_imaging_analysis(trajs,logfile):
+def ion_imaging_outputs(res):
+        # values of the ion imaging files, computed from res alone
+        if res["ion_imaging"].count == 0:
+                return {}
+        angle_efrac_hist, (xedges, yedges) = res["ion_imaging"].hist, res["ion_imaging"].edges
+
+        xc, yc = centres(xedges), centres(yedges)
+        val_abs = hist_output.corrected_int(angle_efrac_hist, yc) # needs to be divided by sin(x) to correct geometry of experiment.
+        val = hist_output.normalized(val_abs, angle_efrac_hist)
+        out = {"2d-ang-dist_ion_imaging.txt": hist_output.Output(xc, yc, [val_abs])}
+        for norm in ("sum", "max", "bin_sum", "bin_max"):
+                out["2d-ang-dist_ion_imaging_norm_%s.txt" % norm] = hist_output.Output(xc, yc, [val[norm]])
+        return out
+
+def ion_imaging_analysis(res,logfile):
 
         print("Calculate 2D angular distribution for ion imaging experiment")
         logfile.write("Calculate 2D angular distribution for ion imaging experiment\n")
-        angle_ion_collect = [] # all polar angle from -90 to 90 in deg
-        efrac_ion_collect = [] # all E_s / E_i in eV
- 
-        for traj in trajs:
-            if traj.azi_f < 0:
-                inv_azi = AZIMUTHAL_ANGLE - 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < ION_IMAGING_AZI:
-                    angle_ion_collect.append(-traj.polar_f)
-                    efrac_ion_collect.append(traj.efrac)
-                elif traj.has_scattered and abs(AZIMUTHAL_ANGLE - traj.azi_f) < ION_IMAGING_AZI:
-                    angle_ion_collect.append(traj.polar_f)
-                    efrac_ion_collect.append(traj.efrac)
-            if traj.azi_f > 0:
-                inv_azi = AZIMUTHAL_ANGLE + 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < ION_IMAGING_AZI:
-                    angle_ion_collect.append(-traj.polar_f)
-                    efrac_ion_collect.append(traj.efrac)
-                elif traj.has_scattered and abs(AZIMUTHAL_ANGLE - traj.azi_f) < ION_IMAGING_AZI:
-                    angle_ion_collect.append(traj.polar_f)
-                    efrac_ion_collect.append(traj.efrac)
- 
-        ang_dist_nrg_ang_ion          = open("analysis/2d-ang-dist_ion_imaging.txt", "w")
-        ang_dist_nrg_ang_ion_norm_sum = open("analysis/2d-ang-dist_ion_imaging_norm_sum.txt", "w")
-        ang_dist_nrg_ang_ion_norm_max = open("analysis/2d-ang-dist_ion_imaging_norm_max.txt", "w")
-        
-        ang_dist_nrg_ang_ion_norm_bin_sum = open("analysis/2d-ang-dist_ion_imaging_norm_bin_sum.txt", "w")
-        ang_dist_nrg_ang_ion_norm_bin_max = open("analysis/2d-ang-dist_ion_imaging_norm_bin_max.txt", "w")
-
-        bin_arr = []
-
-        if len(efrac_ion_collect) != 0 and len(angle_ion_collect) != 0:
-            angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_ion_collect, angle_ion_collect, bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]], density=False) # fixed bin size of 2 deg; try 36,72,180
-
-            for i in range(len(angle_efrac_hist)):
-                for j in range(len(angle_efrac_hist[i])):
-                    val_abs = int(angle_efrac_hist[i][j]/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))) # needs to be divided by sin(x) to correct geometry of experiment.
-                    bin_arr.append(float(val_abs))
-                    val_sum = float(val_abs)/float(angle_efrac_hist.sum()) # current bin divided by sum of all values to get "flux"; area normed
-                    val_max = float(val_abs)/float(angle_efrac_hist.max()) # current bin divided by maximum value of all values to get "flux", max value normed
-                    ang_dist_nrg_ang_ion.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_abs)) # write data with bins
-                    ang_dist_nrg_ang_ion_norm_sum.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_sum)) # write data with area normed "flux"
-                    ang_dist_nrg_ang_ion_norm_max.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_max)) # write data with maximum value normed "flux"
-
-            for i in range(len(angle_efrac_hist)):
-                for j in range(len(angle_efrac_hist[i])):
-                    val_abs = int(angle_efrac_hist[i][j]/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi)))
-                    val_sum = float(val_abs)/float(sum(bin_arr)) # current bin divided by sum of all bins
-                    val_max = float(val_abs)/float(max(bin_arr)) # current bin divided by maximum value of all bins
-                    ang_dist_nrg_ang_ion_norm_bin_sum.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_sum))
-                    ang_dist_nrg_ang_ion_norm_bin_max.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), val_max))
+        # E_s / E_i vs polar angle from -90 to 90 deg seen by the ion imaging detector
+        out = ion_imaging_outputs(res)
+
+        ang_dist_nrg_ang_ion          = open(os.path.join(OUTDIR, "2d-ang-dist_ion_imaging.txt"), "w")
+        ang_dist_nrg_ang_ion_norm_sum = open(os.path.join(OUTDIR, "2d-ang-dist_ion_imaging_norm_sum.txt"), "w")
+        ang_dist_nrg_ang_ion_norm_max = open(os.path.join(OUTDIR, "2d-ang-dist_ion_imaging_norm_max.txt"), "w")
+
+        ang_dist_nrg_ang_ion_norm_bin_sum = open(os.path.join(OUTDIR, "2d-ang-dist_ion_imaging_norm_bin_sum.txt"), "w")
+        ang_dist_nrg_ang_ion_norm_bin_max = open(os.path.join(OUTDIR, "2d-ang-dist_ion_imaging_norm_bin_max.txt"), "w")
+
+        if out:
+            xc, yc = out["2d-ang-dist_ion_imaging.txt"].x, out["2d-ang-dist_ion_imaging.txt"].y
+            hist_output.write_grid(ang_dist_nrg_ang_ion,              "%f %f %d", xc, yc, out["2d-ang-dist_ion_imaging.txt"].values,              blocks=False) # write data with bins
+            hist_output.write_grid(ang_dist_nrg_ang_ion_norm_sum,     "%f %f %f", xc, yc, out["2d-ang-dist_ion_imaging_norm_sum.txt"].values,     blocks=False) # write data with area normed "flux"
+            hist_output.write_grid(ang_dist_nrg_ang_ion_norm_max,     "%f %f %f", xc, yc, out["2d-ang-dist_ion_imaging_norm_max.txt"].values,     blocks=False) # write data with maximum value normed "flux"
+            hist_output.write_grid(ang_dist_nrg_ang_ion_norm_bin_sum, "%f %f %f", xc, yc, out["2d-ang-dist_ion_imaging_norm_bin_sum.txt"].values, blocks=False) # current bin divided by sum of all bins
+            hist_output.write_grid(ang_dist_nrg_ang_ion_norm_bin_max, "%f %f %f", xc, yc, out["2d-ang-dist_ion_imaging_norm_bin_max.txt"].values, blocks=False) # current bin divided by maximum value of all bins
+
+            print(res["ion_imaging"].hist.max())
+            print(res["ion_imaging"].hist.sum())
 
         ang_dist_nrg_ang_ion.close()
         ang_dist_nrg_ang_ion_norm_sum.close()
         ang_dist_nrg_ang_ion_norm_max.close()
 
-        print(angle_efrac_hist.max())
-        print(angle_efrac_hist.sum())
-
         ang_dist_nrg_ang_ion_norm_bin_sum.close()
         ang_dist_nrg_ang_ion_norm_bin_max.close()
 
 
+def cmd_outputs(trajs):
+        # values of the cMD files, computed from the trajectory table (or a replica of it)
+        detected, angle_cmd_collect = CMD_DETECTOR.detect(trajs) # all polar angle from -90 to 90 in deg
+        efrac_cmd_collect = trajs.efrac[detected] # all E_s / E_i in eV
+        if len(efrac_cmd_collect) == 0 or len(angle_cmd_collect) == 0:
+                return {}
+
+        angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_cmd_collect, angle_cmd_collect, bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]], density=False)
+
+        xc, yc = centres(xedges), centres(yedges)
+        abs_val = hist_output.corrected_int(angle_efrac_hist, yc) # needs to be divided by sin(x) to correct geometry of experiment.
+        rel_val = hist_output.normalized(abs_val, angle_efrac_hist)["sum"] # current bin devided by sum of all bins to get "flux"
+        return {"2d-ang-dist_cmd.txt":      hist_output.Output(xc, yc, [abs_val]),
+                "2d-ang-dist_cmd_norm.txt": hist_output.Output(xc, yc, [rel_val])}
+
 def cmd_analysis(trajs,logfile):
         print("Calculate 2D angular distribution for cMD simulations\n")
         logfile.write("Calculate 2D angular distribution for cMD simulations\n")
-        angle_cmd_collect = [] # all polar angle from -90 to 90 in deg
-        efrac_cmd_collect = [] # all E_s / E_i in eV
- 
-        cmd_azi = 0
-        cmd_azi_det = 90
- 
-        for traj in trajs:
-            if traj.azi_f < 0:
-                inv_azi = cmd_azi - 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < cmd_azi_det:
-                    angle_cmd_collect.append(-traj.polar_f)
-                    efrac_cmd_collect.append(traj.efrac)
-                elif traj.has_scattered and abs(cmd_azi - traj.azi_f) < cmd_azi_det:
-                    angle_cmd_collect.append(traj.polar_f)
-                    efrac_cmd_collect.append(traj.efrac)
-            if traj.azi_f > 0:
-                inv_azi = cmd_azi + 180
-                if traj.has_scattered and abs(inv_azi - traj.azi_f) < cmd_azi_det:
-                    angle_cmd_collect.append(-traj.polar_f)
-                    efrac_cmd_collect.append(traj.efrac)
-                elif traj.has_scattered and abs(cmd_azi - traj.azi_f) < cmd_azi_det:
-                    angle_cmd_collect.append(traj.polar_f)
-                    efrac_cmd_collect.append(traj.efrac)
-
-        ang_dist_nrg_ang_cmd      = open("analysis/2d-ang-dist_cmd.txt", "w")
-        ang_dist_nrg_ang_cmd_norm = open("analysis/2d-ang-dist_cmd_norm.txt", "w")
-
-        if len(efrac_cmd_collect) != 0 and len(angle_cmd_collect) != 0:
-            angle_efrac_hist, xedges, yedges = numpy.histogram2d(efrac_cmd_collect, angle_cmd_collect, bins=BINS, range=[[0, 1.1],[ANGLE_MIN, ANGLE_MAX]], density=False)
-
-            for i in range(len(angle_efrac_hist)):
-                for j in range(len(angle_efrac_hist[i])):
-                    abs_val = int(angle_efrac_hist[i][j]/abs(numpy.sin(0.5*(yedges[j]+yedges[j+1])/360*2*numpy.pi))) # needs to be divided by sin(x) to correct geometry of experiment.
-                    rel_val = float(abs_val)/float(angle_efrac_hist.sum()) # current bin devided by sum of all bins to get "flux"
-                    ang_dist_nrg_ang_cmd.write("%f %f %d\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), abs_val)) # write data with bins
-                    ang_dist_nrg_ang_cmd_norm.write("%f %f %f\n" % (0.5*(xedges[i]+xedges[i+1]), 0.5*(yedges[j]+yedges[j+1]), rel_val)) # write data with "flux"
+        out = cmd_outputs(trajs)
+
+        ang_dist_nrg_ang_cmd      = open(os.path.join(OUTDIR, "2d-ang-dist_cmd.txt"), "w")
+        ang_dist_nrg_ang_cmd_norm = open(os.path.join(OUTDIR, "2d-ang-dist_cmd_norm.txt"), "w")
+
+        if out:
+            o, o_norm = out["2d-ang-dist_cmd.txt"], out["2d-ang-dist_cmd_norm.txt"]
+            hist_output.write_grid(ang_dist_nrg_ang_cmd,      "%f %f %d", o.x, o.y, o.values, blocks=False) # write data with bins
+            hist_output.write_grid(ang_dist_nrg_ang_cmd_norm, "%f %f %f", o_norm.x, o_norm.y, o_norm.values, blocks=False) # write data with "flux"
 
         ang_dist_nrg_ang_cmd.close()
         ang_dist_nrg_ang_cmd_norm.close()
 
 
+def error_outputs(res, trajs):
+        # values of all files that get error bars, computed from the results and the table of one replica
+        out = analysis_outputs(res)
+        out.update(ion_imaging_outputs(res))
+        if RAT:
+                out.update(rat_outputs(trajs))
+        if CMD:
+                out.update(cmd_outputs(trajs))
+        return out
+
+
 def get_movies(trajs,logfile):
 
-    for traj in trajs:
-        if traj.has_scattered:
-            #if 1.80 <= traj.
-            if 0.09 <= traj.eloss <= 0.11:
-                print(traj.traj_id)
+    for i in numpy.flatnonzero(trajs.has_scattered & (0.09 <= trajs.eloss) & (trajs.eloss <= 0.11)):
+        print(trajs.traj_id_str(i))
+
+
+
+def set_constants(results, logfile):
+        global NTRAJS, SCATTERED, TRANSMITTED, ABSORBED, FRAC_SCATTERED, FRAC_ABSORBED, FRAC_TRANSMITTED
+        NTRAJS, SCATTERED, ABSORBED, TRANSMITTED = outcomes(results)
+        report_outcomes(NTRAJS, SCATTERED, ABSORBED, TRANSMITTED, logfile)
+        FRAC_SCATTERED = float(SCATTERED)/NTRAJS
+        FRAC_ABSORBED = float(ABSORBED)/NTRAJS
+        FRAC_TRANSMITTED = float(TRANSMITTED)/NTRAJS
+
+
+### PARAMETER SCAN ###
+
+SCAN_TABLE = None # trajectory table of the scan, inherited by the forked workers
+
+def scan_settings(scandir):
+        # all combinations (index, folder, SPECULAR_RADIUS, ION_IMAGING_AZI, AZIMUTHAL_ANGLE, ANGLE_MIN, ANGLE_MAX)
+        combinations = itertools.product(SCAN_SPECULAR_RADIUS or [SPECULAR_RADIUS], SCAN_ION_IMAGING_AZI or [ION_IMAGING_AZI],
+                                         SCAN_AZIMUTHAL_ANGLE or [AZIMUTHAL_ANGLE], SCAN_ANGLE_RANGE or [(ANGLE_MIN, ANGLE_MAX)])
+        return [(i, os.path.join(scandir, "%04d" % i), radius, ion_azi, azimuth, angle_min, angle_max)
+                for i, (radius, ion_azi, azimuth, (angle_min, angle_max)) in enumerate(combinations)]
+
+def analyze_setting(setting):
+        # ion imaging and full analysis of one scan setting, screen output only goes to the logfile of the setting
+        global SPECULAR_RADIUS, ION_IMAGING_AZI, AZIMUTHAL_ANGLE, ANGLE_MIN, ANGLE_MAX, BINS, OUTDIR
+        index, OUTDIR, SPECULAR_RADIUS, ION_IMAGING_AZI, AZIMUTHAL_ANGLE, ANGLE_MIN, ANGLE_MAX = setting
+        BINS = int((ANGLE_MAX-ANGLE_MIN)/5.0)
+        make_detectors()
+        if isinstance(SCAN_TABLE, TrajTable):
+                SCAN_TABLE.angular_masks() # SummaryTable chunks are built with the current SPECULAR_RADIUS
+
+        if not os.path.exists(OUTDIR):
+                os.makedirs(OUTDIR)
+        setting_log = open(os.path.join(OUTDIR, logfilename), "w")
+        with contextlib.redirect_stdout(io.StringIO()):
+                engine = hist_engine.HistogramEngine(CHUNK_ROWS)
+                declare_observables(engine, setting_log)
+                results = engine.run(SCAN_TABLE)
+                set_constants(results, setting_log)
+                ion_imaging_analysis(results, setting_log)
+                analyze(results, SCAN_TABLE, setting_log)
+        setting_log.close()
+        return index
+
+def scan(trajs, logfile):
+        global SCAN_TABLE
+        scandir  = os.path.join(OUTDIR, "scan")
+        settings = scan_settings(scandir)
+        if not os.path.exists(scandir):
+                os.makedirs(scandir)
+        index_file = open(os.path.join(scandir, "index.txt"), "w")
+        index_file.write("# index SPECULAR_RADIUS ION_IMAGING_AZI AZIMUTHAL_ANGLE ANGLE_MIN ANGLE_MAX\n")
+        for index, folder, radius, ion_azi, azimuth, angle_min, angle_max in settings:
+                index_file.write("%04d {} {} {} {} {}\n".format(radius, ion_azi, azimuth, angle_min, angle_max) % index)
+        index_file.close()
+
+        print("Scanning {} settings, see {}".format(len(settings), os.path.join(scandir, "index.txt")))
+        logfile.write("Scanning {} settings, see {}\n".format(len(settings), os.path.join(scandir, "index.txt")))
+        SCAN_TABLE = trajs
+        nprocs = SCAN_NPROCS if SCAN_NPROCS > 0 else (os.cpu_count() or 1)
+        if nprocs == 1 or len(settings) == 1:
+                done = map(analyze_setting, settings)
+        else:
+                # fork avoids re-executing this script in the workers
+                if "fork" in multiprocessing.get_all_start_methods():
+                        ctx = multiprocessing.get_context("fork")
+                else:
+                        ctx = multiprocessing.get_context()
+                pool = ctx.Pool(min(nprocs, len(settings)))
+                done = pool.imap(analyze_setting, settings)
+        for n, index in enumerate(done):
+                print("Setting %04d done ({} of {})".format(n+1, len(settings)) % index)
+                logfile.write("Setting %04d done ({} of {})\n".format(n+1, len(settings)) % index)
+        if nprocs > 1 and len(settings) > 1:
+                pool.close()
+                pool.join()
 
 
 
@@ -1519,30 +1190,72 @@ print("Created by version %4.2f" % VERSION_ID)
 logfile.write("Created by version %4.2f\n" % VERSION_ID)
 
 
+if not os.path.exists(OUTDIR):
+	os.makedirs(OUTDIR)
+
+if SCAN_SPECULAR_RADIUS or SCAN_ION_IMAGING_AZI or SCAN_AZIMUTHAL_ANGLE or SCAN_ANGLE_RANGE:
+        scan(initialize(inpname,logfile), logfile) # summary is read once for all settings
+        logfile.close()
+        sys.exit()
+
+engine = hist_engine.HistogramEngine(CHUNK_ROWS)
+declare_observables(engine, logfile)
+
 ### READ IN TRAJS ###
-traj_collection, SCATTERED, ABSORBED, TRANSMITTED = initialize(inpname,logfile)
+traj_collection = None
+if LOAD_STATE:
+        print("Reading histogram state {}".format(LOAD_STATE))
+        logfile.write("Reading histogram state {}\n".format(LOAD_STATE))
+        state = hist_engine.load_state(LOAD_STATE)
+else:
+        traj_collection = initialize(inpname,logfile)
+        binning_from = hist_engine.load_state(BINNING_STATE).stats if BINNING_STATE else None
+        print("Filling histograms.")
+        logfile.write("Filling histograms.\n")
+        state = engine.accumulate(traj_collection, binning_from)
+
+if SAVE_STATE:
+        state.save(SAVE_STATE)
+        print("Wrote histogram state {}".format(SAVE_STATE))
+        logfile.write("Wrote histogram state {}\n".format(SAVE_STATE))
+        logfile.close()
+        sys.exit()
+
+results = engine.results(state)
 
 ### CALCULATE USEFUL CONSTANTS ###
-NTRAJS = len(traj_collection)
-FRAC_SCATTERED = float(SCATTERED)/NTRAJS
-FRAC_ABSORBED = float(ABSORBED)/NTRAJS
-FRAC_TRANSMITTED = float(TRANSMITTED)/NTRAJS
+set_constants(results, logfile)
+
+### ERROR BARS ###
+if ERRORS:
+        if traj_collection is None or STREAM:
+                print("Error bars need the in-memory table (STREAM = False, no LOAD_STATE), skipped.")
+                logfile.write("Error bars need the in-memory table (STREAM = False, no LOAD_STATE), skipped.\n")
+        else:
+                print("Calculating {} error bars from {} replicas.".format(ERRORS, REPLICAS))
+                logfile.write("Calculating {} error bars from {} replicas.\n".format(ERRORS, REPLICAS))
+                errors  = hist_errors.standard_errors(engine, traj_collection, state.stats, error_outputs, ERRORS, REPLICAS, ERROR_SEED, ERROR_NPROCS)
+                outputs = error_outputs(results, traj_collection)
+                errors["Summary.txt"] = [summary_columns(outputs["Summary.txt"].values[0], errors["Summary.txt"][0])] # same columns as Summary.txt
+                hist_errors.write_errors(OUTDIR, outputs, errors, ERRORS, REPLICAS)
 
 ### RAT ###
-#rat_analysis(traj_collection,logfile)
+if RAT:
+        rat_analysis(traj_collection,logfile)
 
 ### ION IMAGING ###
-ion_imaging_analysis(traj_collection,logfile)
+ion_imaging_analysis(results,logfile)
 
 ### constrained MD ###
-#cmd_analysis(traj_collection,logfile)
+if CMD:
+        cmd_analysis(traj_collection,logfile)
 
 ### OUTPUT ###
-analyze(traj_collection,logfile)
+analyze(results,traj_collection,logfile)
 
 
 
-### H@Gr related functions
+### H@Gr related functions (these need STREAM = False)
 #graphene_bounce_events(traj_collection,logfile)
 #analyze_angles(traj_collection,logfile)
 #get_traj(traj_collection,logfile) # get number of trajs for backscattering
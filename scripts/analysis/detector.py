@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# intention: detector acceptance of scattered trajectories as vectorized masks
+#
+# A detector sits at an azimuth and accepts final azimuths within +-width of it (direct)
+# or of the inverse azimuth, i.e. azimuth-180 for negative and azimuth+180 for positive
+# final azimuths (inverse). Polar angles seen in the inverse window are counted negative.
+# Trajectories with a final azimuth of exactly 0 are never detected. With domains, the
+# detector azimuth depends on the initial azimuth of the trajectory (RAT: one surface
+# domain per initial azimuth), trajectories of other initial azimuths are not detected.
+
+# use like:
+#   import detector
+#   ion = detector.Detector(AZIMUTHAL_ANGLE, ION_IMAGING_AZI)
+#   sel = ion.selection(trajs); polar = ion.polar(trajs)[sel]
+#
+# trajs is anything with the arrays azi_f, polar_f and, if needed, azi_i and has_scattered
+
+import numpy
+
+
+class Detector:
+    def __init__(self, azimuth=0.0, width=0.0, domains=None, inclusive=False, max_polar=None,
+                 scattered_only=True, signed=True):
+        # azimuth:        detector azimuth in deg
+        # width:          half width of the azimuth windows in deg
+        # domains:        list of (initial azimuth, detector azimuth), replaces azimuth
+        # inclusive:      accept azimuths on the window edges (<= instead of <)
+        # max_polar:      only accept final polar angles <= max_polar
+        # scattered_only: only accept scattered trajectories (has_scattered)
+        # signed:         polar angles in the inverse window are negative
+        self.azimuth        = azimuth
+        self.width          = width
+        self.domains        = domains
+        self.inclusive      = inclusive
+        self.max_polar      = max_polar
+        self.scattered_only = scattered_only
+        self.signed         = signed
+
+    def azimuths(self, trajs):
+        # detector azimuth per trajectory, nan outside of all domains
+        if self.domains is None:
+            return self.azimuth
+        azi = numpy.full(len(trajs.azi_f), numpy.nan)
+        for azi_i, azimuth in self.domains:
+            azi[trajs.azi_i == azi_i] = azimuth
+        return azi
+
+    def within(self, delta):
+        if self.inclusive:
+            return numpy.abs(delta) <= self.width
+        return numpy.abs(delta) < self.width
+
+    def masks(self, trajs):
+        # returns (inverse, direct), disjoint boolean masks
+        azi_f   = trajs.azi_f
+        azimuth = self.azimuths(trajs)
+        inv_azi = numpy.where(azi_f < 0, azimuth - 180, azimuth + 180)
+        cand = azi_f != 0
+        if self.scattered_only:
+            cand = cand & trajs.has_scattered
+        if self.max_polar is not None:
+            cand = cand & (trajs.polar_f <= self.max_polar)
+        inverse = cand & self.within(inv_azi - azi_f)
+        direct  = cand & ~inverse & self.within(azimuth - azi_f)
+        return inverse, direct
+
+    def selection(self, trajs):
+        inverse, direct = self.masks(trajs)
+        return inverse | direct
+
+    def polar(self, trajs):
+        # final polar angles as seen by the detector (for all trajectories)
+        if not self.signed:
+            return trajs.polar_f
+        inverse, direct = self.masks(trajs)
+        return numpy.where(inverse, -trajs.polar_f, trajs.polar_f)
+
+    def detect(self, trajs):
+        # returns the selection and the polar angles of the selected trajectories
+        inverse, direct = self.masks(trajs)
+        sel = inverse | direct
+        if not self.signed:
+            return sel, trajs.polar_f[sel]
+        return sel, numpy.where(inverse, -trajs.polar_f, trajs.polar_f)[sel]
+
+
+def detect_all(detectors, trajs):
+    # many detector configurations against one table: dict name -> (selection, polar angles)
+    return {name: det.detect(trajs) for name, det in detectors.items()}
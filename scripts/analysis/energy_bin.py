@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# intention: reader for the energy/traj_%08d.bin files written by output_nrg_bin (src/output_mod.f90)
+#
+# md_tian2 with "output energy_bin <n>" writes the 21 columns of the text energy output
+# (energy/traj_%08d.dat) every n steps as one fixed-size record of real64 values, one file per
+# trajectory. A file starts with a 16 byte header (magic, version, record size) and is
+# memory-mapped as a structured array. A record that is still being written (partial record at
+# the end of the file) is ignored. Native byte order, as written.
+# read_text() returns the same structured array for the text files, so scripts work with both.
+
+# use like:
+#   import energy_bin
+#   recs = energy_bin.read(energy_bin.find("energy")[0])
+#   recs["time"], recs["e_total"], recs["r"][:,2], ...
+#   for fname, d in energy_bin.drift(energy_bin.find("energy")): ...
+
+import os, glob
+import numpy
+
+MAGIC   = b"MDTENRG "
+VERSION = 1
+
+HEADER = numpy.dtype([("magic", "S8"), ("version", numpy.int32), ("record_bytes", numpy.int32)])
+
+# record layout, the columns of output_nrg (time in fs, temperatures in K, energies in eV,
+# radii of gyration in A^2, force sum in eV/A, centroid of the first atom in A and A/fs)
+RECORD = numpy.dtype([
+    ("time",        numpy.float64),
+    ("atom_T",      numpy.float64),
+    ("bead_T",      numpy.float64),
+    ("r_gyr_sq_p",  numpy.float64),
+    ("r_gyr_sq_l",  numpy.float64),
+    ("atom_ekin_p", numpy.float64),
+    ("atom_ekin_l", numpy.float64),
+    ("bead_ekin_p", numpy.float64),
+    ("bead_ekin_l", numpy.float64),
+    ("qntm_ekin_p", numpy.float64),
+    ("qntm_ekin_l", numpy.float64),
+    ("atom_epot",   numpy.float64),
+    ("bead_epot",   numpy.float64),
+    ("e_total",     numpy.float64),
+    ("f_total",     numpy.float64),
+    ("r",           numpy.float64, (3,)),
+    ("v",           numpy.float64, (3,)),
+])
+
+
+def find(energy_dir, ext=".bin"):
+    return sorted(glob.glob(os.path.join(energy_dir, "traj_*" + ext)))
+
+
+def read(fname):
+    # memory-mapped records of one file (empty array for files without a complete record)
+    size = os.path.getsize(fname)
+    if size < HEADER.itemsize:
+        return numpy.empty(0, dtype=RECORD)
+    header = numpy.fromfile(fname, dtype=HEADER, count=1)[0]
+    if header["magic"] != MAGIC:
+        raise ValueError("{} is not an energy_bin file".format(fname))
+    if header["version"] != VERSION or header["record_bytes"] != RECORD.itemsize:
+        raise ValueError("{}: unsupported version {} with {} byte records".format(fname, header["version"], header["record_bytes"]))
+    nrecs = (size - HEADER.itemsize) // RECORD.itemsize
+    if nrecs == 0:
+        return numpy.empty(0, dtype=RECORD)
+    return numpy.memmap(fname, dtype=RECORD, mode="r", offset=HEADER.itemsize, shape=(nrecs,))
+
+
+def read_text(fname):
+    # energy/traj_%08d.dat as the same structured array (a copy, not memory-mapped)
+    cols = numpy.loadtxt(fname, comments="#", ndmin=2)
+    if cols.shape[1] != 21:
+        raise ValueError("{}: {} columns instead of 21".format(fname, cols.shape[1]))
+    return numpy.ascontiguousarray(cols).view(RECORD).reshape(len(cols))
+
+
+def load(fname):
+    return read_text(fname) if fname.endswith(".dat") else read(fname)
+
+
+def drift(fnames, field="e_total"):
+    # (fname, largest deviation of field from its first value) per file with records
+    for fname in fnames:
+        recs = load(fname)
+        if len(recs) > 0:
+            yield fname, float(numpy.abs(recs[field] - recs[field][0]).max())
+
+
+if __name__ == "__main__":
+    # total energy drift of all trajectories: python3 energy_bin.py [energy_dir]
+    import sys, time
+    energy_dir = sys.argv[1] if len(sys.argv) > 1 else "energy"
+    fnames = find(energy_dir)
+    t0 = time.time()
+    drifts = list(drift(fnames))
+    dt = time.time() - t0
+    for fname, d in sorted(drifts, key=lambda x: -x[1])[:10]:
+        print("{:<40s} {:12.6f} meV".format(fname, 1000*d))
+    print("Read {} files in {:.3f} s".format(len(fnames), dt))
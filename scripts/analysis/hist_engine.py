@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+
+# intention: fill many histograms of the trajectory table of 2_AnalyzePESTrajectory in one go
+#
+# Every observable is declared once: the name of its selection mask, a function giving
+# the selected values and its binning. Masks are evaluated once per chunk of trajectories
+# and shared by all observables. A statistics pass (count, min, max, sum) resolves bin
+# numbers and ranges that depend on the data, then all histograms are filled with fixed
+# edges. Tables that fit into one chunk are scanned only once.
+#
+# The accumulated state (statistics, counts and edges) can be saved and merged with the
+# states of other parts of a campaign. Counts only merge if both parts used the same
+# edges: fill every part with the binning of the merged statistics of all parts
+# (accumulate(..., binning_from=merged.stats)), or use fixed edges.
+
+# use like:
+#   engine = hist_engine.HistogramEngine()
+#   engine.mask("scattered", lambda trajs, masks: trajs.has_scattered)
+#   engine.add("all_eloss", "scattered", hist_engine.column("eloss"), bins=50, density=True)
+#   res = engine.run(trajs)
+#   res["all_eloss"].hist, res["all_eloss"].edges, res["all_eloss"].stats.mean()
+#
+#   state = engine.accumulate(trajs); state.save("part1.state.npz")
+#   python3 hist_engine.py merged.state.npz part1.state.npz part2.state.npz
+
+import sys
+import numpy
+
+CHUNK_ROWS = 1000000 # trajectories processed at once
+
+
+def column(name):
+    # value function for a plain column of the table
+    return lambda trajs, sel: getattr(trajs, name)[sel]
+
+
+def chunks(trajs, chunk_rows=CHUNK_ROWS):
+    # tables of consecutive trajectories, trajs needs ntrajs and rows(start, stop)
+    for start in range(0, trajs.ntrajs, chunk_rows):
+        yield trajs.rows(start, min(start + chunk_rows, trajs.ntrajs))
+
+
+def has_edges(bins):
+    # True if bins gives bin edges instead of numbers of bins
+    if isinstance(bins, numpy.ndarray):
+        return True
+    return isinstance(bins, (list, tuple)) and any(numpy.ndim(b) > 0 for b in bins)
+
+
+class Stats:
+    # count, first value, min, max and sum of the selected values, per axis
+    def __init__(self, ndim):
+        self.ndim   = ndim
+        self.count  = 0
+        self.firsts = [None]*ndim
+        self.mins   = [None]*ndim
+        self.maxs   = [None]*ndim
+        self.sums   = [0.0]*ndim
+
+    def add(self, values):
+        if len(values[0]) == 0:
+            return
+        if self.count == 0:
+            self.firsts = [value[0] for value in values]
+        self.count += len(values[0])
+        for axis, value in enumerate(values):
+            lo, hi = value.min(), value.max()
+            self.mins[axis] = lo if self.mins[axis] is None else min(self.mins[axis], lo)
+            self.maxs[axis] = hi if self.maxs[axis] is None else max(self.maxs[axis], hi)
+            self.sums[axis] = self.sums[axis] + value.sum()
+
+    def merge(self, other):
+        # other follows self in the order of the trajectories
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.firsts = list(other.firsts)
+        self.count += other.count
+        for axis in range(self.ndim):
+            lo, hi = other.mins[axis], other.maxs[axis]
+            self.mins[axis] = lo if self.mins[axis] is None else min(self.mins[axis], lo)
+            self.maxs[axis] = hi if self.maxs[axis] is None else max(self.maxs[axis], hi)
+            self.sums[axis] = self.sums[axis] + other.sums[axis]
+
+    def first(self, axis=0):
+        return self.firsts[axis]
+
+    def min(self, axis=0):
+        return self.mins[axis]
+
+    def max(self, axis=0):
+        return self.maxs[axis]
+
+    def range(self, axis=0):
+        if self.count == 0:
+            return None
+        return (self.mins[axis], self.maxs[axis])
+
+    def mean(self, axis=0):
+        if self.count == 0:
+            return numpy.nan
+        return numpy.float64(self.sums[axis]) / self.count
+
+
+class Observable:
+    def __init__(self, name, mask, values, bins=None, range=None, density=False):
+        # values(trajs, sel) returns the selected values, or a tuple (x, y) for 2D histograms
+        # bins: number of bins, array of edges, [bx, by] for 2D, or function(stats) returning one of them
+        #       None only collects statistics
+        # range: (lo, hi), [[xlo, xhi], [ylo, yhi]] or function(stats); None uses min/max of the selected values
+        self.name    = name
+        self.mask    = mask
+        self.values  = values
+        self.bins    = bins
+        self.range   = range
+        self.density = density
+
+
+class Result:
+    def __init__(self, stats):
+        self.stats = stats
+        self.hist  = None # None if nothing was selected to derive the binning from
+        self.edges = None # edges for 1D, (xedges, yedges) for 2D
+
+    @property
+    def count(self):
+        return self.stats.count
+
+
+class State:
+    # mergeable accumulation state: Stats, counts and edges per observable
+    # (no counts for observables whose binning could not be derived)
+    def __init__(self, stats, counts=None, edges=None):
+        self.stats   = stats
+        self.counts  = counts if counts is not None else {}
+        self.edges   = edges if edges is not None else {}
+        self.dropped = set() # observables whose counts were dropped by merge()
+
+    def merge(self, other):
+        # counts are summed if both parts used the same edges, a part without counts for an
+        # observable contributes nothing if it selected no values, otherwise the counts are
+        # dropped and have to be refilled with the binning of the merged statistics
+        for name, stats in other.stats.items():
+            mine = self.stats.setdefault(name, Stats(stats.ndim))
+            had_values = mine.count > 0
+            mine.merge(stats)
+            if name in self.counts and name in other.counts and same_edges(self.edges[name], other.edges[name]):
+                self.counts[name] = self.counts[name] + other.counts[name]
+            elif name in other.counts and not had_values:
+                self.counts[name] = other.counts[name].copy()
+                self.edges[name]  = other.edges[name]
+            elif name in self.counts and stats.count == 0:
+                pass
+            elif name in self.counts or name in other.counts:
+                self.dropped.add(name)
+                self.counts.pop(name, None)
+                self.edges.pop(name, None)
+
+    def save(self, fname):
+        arrays = {}
+        for name, stats in self.stats.items():
+            arrays["stats.%s.count" % name] = numpy.array(stats.count)
+            arrays["stats.%s.ndim" % name]  = numpy.array(stats.ndim)
+            if stats.count == 0:
+                continue
+            for axis in range(stats.ndim):
+                # one array per value keeps the dtype (integer bin numbers from int columns)
+                for key, values in (("first", stats.firsts), ("min", stats.mins), ("max", stats.maxs), ("sum", stats.sums)):
+                    arrays["stats.%s.%s%d" % (name, key, axis)] = numpy.array(values[axis])
+        for name, hist in self.counts.items():
+            arrays["hist.%s" % name] = hist
+            edges = self.edges[name]
+            if isinstance(edges, tuple):
+                arrays["xedges.%s" % name], arrays["yedges.%s" % name] = edges
+            else:
+                arrays["edges.%s" % name] = edges
+        with open(fname, "wb") as outfile:
+            numpy.savez(outfile, **arrays)
+
+
+def same_edges(a, b):
+    if isinstance(a, tuple) != isinstance(b, tuple):
+        return False
+    if isinstance(a, tuple):
+        return all(numpy.array_equal(x, y) for x, y in zip(a, b))
+    return numpy.array_equal(a, b)
+
+
+def load_state(fname):
+    arrays = numpy.load(fname)
+    stats, counts, edges = {}, {}, {}
+    for key in arrays.files:
+        kind, name = key.split(".")[:2]
+        if kind == "stats" and key.endswith(".ndim"):
+            st = Stats(int(arrays[key]))
+            st.count = int(arrays["stats.%s.count" % name])
+            if st.count > 0:
+                for axis in range(st.ndim):
+                    st.firsts[axis] = arrays["stats.%s.first%d" % (name, axis)][()]
+                    st.mins[axis]   = arrays["stats.%s.min%d" % (name, axis)][()]
+                    st.maxs[axis]   = arrays["stats.%s.max%d" % (name, axis)][()]
+                    st.sums[axis]   = arrays["stats.%s.sum%d" % (name, axis)][()]
+            stats[name] = st
+        elif kind == "hist":
+            counts[name] = arrays[key]
+            if "edges.%s" % name in arrays.files:
+                edges[name] = arrays["edges.%s" % name]
+            else:
+                edges[name] = (arrays["xedges.%s" % name], arrays["yedges.%s" % name])
+    return State(stats, counts, edges)
+
+
+def merge_states(fnames):
+    # fnames in the order of the trajectories
+    state = load_state(fnames[0])
+    for fname in fnames[1:]:
+        state.merge(load_state(fname))
+    return state
+
+
+class HistogramEngine:
+    def __init__(self, chunk_rows=CHUNK_ROWS):
+        self.chunk_rows  = chunk_rows
+        self.masks       = [] # (name, function(trajs, masks)), evaluated in order
+        self.observables = []
+
+    def mask(self, name, func):
+        self.masks.append((name, func))
+
+    def add(self, name, mask, values, bins=None, range=None, density=False):
+        self.observables.append(Observable(name, mask, values, bins, range, density))
+
+    def chunks(self, trajs):
+        return chunks(trajs, self.chunk_rows)
+
+    def evaluate(self, chunk):
+        masks = {}
+        for name, func in self.masks:
+            masks[name] = func(chunk, masks)
+        values = {}
+        for obs in self.observables:
+            value = obs.values(chunk, masks[obs.mask])
+            values[obs.name] = value if isinstance(value, tuple) else (value,)
+        return values
+
+    def binning(self, obs, stats):
+        # returns (bins, range) or None if the binning cannot be derived from empty selections
+        bins = obs.bins(stats) if callable(obs.bins) else obs.bins
+        if bins is None:
+            return None
+        if callable(obs.range):
+            rng = obs.range(stats)
+            if rng is None:
+                return None
+        elif obs.range is None and not has_edges(bins):
+            own = stats[obs.name]
+            if own.count == 0:
+                return None
+            rng = own.range(0) if own.ndim == 1 else [own.range(axis) for axis in range(own.ndim)]
+        else:
+            rng = obs.range
+        return bins, rng
+
+    def accumulate(self, trajs, binning_from=None):
+        # returns the State of all chunks of trajs
+        # binning_from: Stats of the whole campaign (e.g. merged from the states of all its parts)
+        #               to derive the binning from, trajs is then read in a single pass
+        single = 0 < trajs.ntrajs <= self.chunk_rows and binning_from is None
+        cached = None
+
+        # statistics pass, also fills the histograms if the binning is given
+        stats, counts, edges = {}, {}, {}
+        if binning_from is not None:
+            binning = self.resolve(binning_from)
+        for chunk in self.chunks(trajs):
+            values = self.evaluate(chunk)
+            if single:
+                cached = values
+            for name, value in values.items():
+                if name not in stats:
+                    stats[name] = Stats(len(value))
+                stats[name].add(value)
+            if binning_from is not None:
+                self.fill(values, binning, counts, edges)
+        for obs in self.observables:
+            if obs.name not in stats: # empty table
+                stats[obs.name] = Stats(1)
+        if binning_from is not None:
+            return State(stats, counts, edges)
+
+        # fill pass
+        binning = self.resolve(stats)
+        if binning:
+            for chunk_values in ([cached] if single else (self.evaluate(chunk) for chunk in self.chunks(trajs))):
+                self.fill(chunk_values, binning, counts, edges)
+        return State(stats, counts, edges)
+
+    def resolve(self, stats):
+        binning = {}
+        for obs in self.observables:
+            b = self.binning(obs, stats)
+            if b is not None:
+                binning[obs.name] = b
+        return binning
+
+    def fill(self, chunk_values, binning, counts, edges):
+        for name, (bins, rng) in binning.items():
+            value = chunk_values[name]
+            if len(value) == 1:
+                hist, e = numpy.histogram(value[0], bins=bins, range=rng)
+            else:
+                hist, xedges, yedges = numpy.histogram2d(value[0], value[1], bins=bins, range=rng)
+                e = (xedges, yedges)
+            if name in counts:
+                counts[name] += hist
+            else:
+                counts[name] = hist
+                edges[name]  = e
+
+    def results(self, state):
+        # returns dict name -> Result
+        results = {}
+        for obs in self.observables:
+            result = results[obs.name] = Result(state.stats.get(obs.name, Stats(1)))
+            if obs.name not in state.counts:
+                continue
+            hist = state.counts[obs.name]
+            result.edges = state.edges[obs.name]
+            if obs.density:
+                # same normalization as numpy.histogram(density=True)
+                db = numpy.array(numpy.diff(result.edges), float)
+                hist = hist/db/hist.sum()
+            result.hist = hist
+        return results
+
+    def run(self, trajs):
+        # returns dict name -> Result
+        return self.results(self.accumulate(trajs))
+
+
+if __name__ == "__main__":
+    # merge saved states: python3 hist_engine.py merged.state.npz part1.state.npz part2.state.npz ...
+    if len(sys.argv) < 3:
+        sys.exit("use like: python3 hist_engine.py <merged state> <state> [<state> ...]")
+    state = merge_states(sys.argv[2:])
+    state.save(sys.argv[1])
+    print("Merged {} states into {}".format(len(sys.argv)-2, sys.argv[1]))
+    if state.dropped:
+        print("Different bin edges for {} histograms: fill all parts again with the binning of {}".format(len(state.dropped), sys.argv[1]))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+# intention: per-bin standard errors of the histogram files written by 2_AnalyzePESTrajectory
+#
+# Replicas of the trajectory table are drawn with index arrays (bootstrap: ntrajs indices
+# drawn with replacement, jackknife: all trajectories except one of REPLICAS random groups)
+# and all histograms of the engine are refilled with the bin edges of the full table.
+# The values of the files are then computed from every replica by the same function that
+# computes them for the written files (bounce fractions, sin correction, normalizations),
+# so the errors belong to the written values. A file missing in a replica (empty selection)
+# counts as nan there. Every replica has its own seed derived from (seed, replica), so the
+# errors do not depend on the number of worker processes. Replicas run in a pool of forked
+# worker processes.
+
+# use like:
+#   # outputs(results, trajs) -> {file name: hist_output.Output}
+#   errors = hist_errors.standard_errors(engine, trajs, state.stats, outputs, "bootstrap", 100, 12345)
+#   hist_errors.write_errors("analysis", outputs(results, trajs), errors, "bootstrap", 100)
+
+import os, sys, warnings, multiprocessing
+import numpy
+import hist_output
+
+METHODS = ("bootstrap", "jackknife")
+
+JOB = None # (engine, trajs, stats, outputs, method, replicas, seed, groups), inherited by the forked workers
+
+
+def jackknife_groups(ntrajs, replicas, seed):
+    # random partition of the trajectories into replicas groups of (almost) equal size
+    groups = numpy.empty(ntrajs, dtype=numpy.int64)
+    groups[numpy.random.default_rng(seed).permutation(ntrajs)] = numpy.arange(ntrajs) % replicas
+    return groups
+
+
+def replica_indices(method, ntrajs, seed, i, groups=None):
+    if method == "bootstrap":
+        return numpy.random.default_rng([seed, i]).integers(0, ntrajs, ntrajs)
+    return numpy.flatnonzero(groups != i)
+
+
+def replica(i):
+    engine, trajs, stats, outputs, method, replicas, seed, groups = JOB
+    sample = trajs.take(replica_indices(method, trajs.ntrajs, seed, i, groups))
+    with numpy.errstate(divide="ignore", invalid="ignore"): # empty selections give nan densities
+        out = outputs(engine.results(engine.accumulate(sample, binning_from=stats)), sample)
+        return {name: [numpy.asarray(value, dtype=numpy.float64) for value in o.values] for name, o in out.items()}
+
+
+def standard_error(reps, method):
+    # nan-aware standard error over the first axis of the replica values
+    # (nan where fewer than 2 replicas have a finite value)
+    n = numpy.count_nonzero(numpy.isfinite(reps), axis=0)
+    with numpy.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # nanmean of bins without finite values
+        dev = numpy.nansum((reps - numpy.nanmean(reps, axis=0))**2, axis=0)
+        if method == "bootstrap":
+            err = numpy.sqrt(dev/(n-1))
+        else:
+            err = numpy.sqrt(dev*(n-1)/n)
+    return numpy.where(n > 1, err, numpy.nan)
+
+
+def standard_errors(engine, trajs, stats, outputs, method, replicas, seed, nprocs=0):
+    # returns dict file name -> standard errors of the value arrays of the file
+    # outputs(results, trajs): dict file name -> hist_output.Output of the values written for results
+    # stats: statistics of the full table, they fix the bin edges of all replicas
+    global JOB
+    if method not in METHODS:
+        sys.exit("Unknown error method {}, use one of {}".format(method, ", ".join(METHODS)))
+    if replicas < 2:
+        sys.exit("At least 2 replicas are needed for error bars")
+    groups = jackknife_groups(trajs.ntrajs, replicas, seed) if method == "jackknife" else None
+    JOB = (engine, trajs, stats, outputs, method, replicas, seed, groups)
+
+    if nprocs <= 0:
+        nprocs = os.cpu_count() or 1
+    values = []
+    if nprocs == 1:
+        values = [replica(i) for i in range(replicas)]
+    else:
+        # fork avoids re-executing the calling script in the workers
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("fork")
+        else:
+            ctx = multiprocessing.get_context()
+        with ctx.Pool(min(nprocs, replicas)) as pool:
+            values = list(pool.imap(replica, range(replicas))) # imap keeps the replica order
+    JOB = None
+
+    errors = {}
+    for name in sorted(set().union(*values)):
+        shapes = [value.shape for value in next(v[name] for v in values if name in v)]
+        errors[name] = [standard_error(numpy.array([v[name][k] if name in v else numpy.full(shape, numpy.nan) for v in values]), method)
+                        for k, shape in enumerate(shapes)]
+    return errors
+
+
+def err_name(name):
+    root, ext = os.path.splitext(name)
+    return root + "_err" + ext
+
+
+def write_errors(dirname, outputs, errors, method, replicas):
+    # one file <file>_err.txt next to every written file: its bin centre(s) and the standard errors of its values
+    # outputs: dict file name -> hist_output.Output of the full table, files without values there are skipped
+    for name in sorted(errors):
+        if name not in outputs:
+            continue
+        o, err = outputs[name], errors[name]
+        outfile = open(os.path.join(dirname, err_name(name)), "w")
+        if o.x is None:
+            outfile.write("# standard errors of the values of the last row of %s (%s, %d replicas)\n" % (name, method, replicas))
+            outfile.write(" ".join(["%g"]*len(err[0])) % tuple(err[0]) + "\n")
+        elif o.y is None:
+            outfile.write("# x  standard errors of the value columns of %s (%s, %d replicas)\n" % (name, method, replicas))
+            hist_output.write_columns(outfile, "%f" + " %g"*len(err), [o.x] + err)
+        else:
+            outfile.write("# x  y  standard errors of the values of %s (%s, %d replicas)\n" % (name, method, replicas))
+            hist_output.write_grid(outfile, "%f %f" + " %g"*len(err), o.x, o.y, err)
+        outfile.close()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# intention: bulk text output of the histograms written by 2_AnalyzePESTrajectory
+#
+# Bin centres, the sin(polar angle) correction of the detector geometry and all
+# normalizations are computed as array operations. Every file is written with a single
+# write call of one format string applied to all values. The text formats are those of
+# the original per-bin writes, which the gnuplot scripts (3_plotAnalysis) rely on.
+
+# use like:
+#   import hist_output
+#   hist, xedges, yedges = numpy.histogram2d(...)
+#   hist_output.write_grid(outfile, "%f %f %d", centres(xedges), centres(yedges), [hist])
+
+import collections
+import numpy
+
+# values written to one output file: bin centres x (None for a single row of values), y (None for
+# 1D) and the value arrays (columns, or (nx,ny) grids)
+Output = collections.namedtuple("Output", ["x", "y", "values"])
+
+
+def centres(edges):
+    return 0.5*(edges[:-1]+edges[1:])
+
+
+def sin_correction(angles):
+    # a detector at polar angle theta sees a ring proportional to sin(theta)
+    return numpy.abs(numpy.sin(angles/360*2*numpy.pi))
+
+
+def corrected(hist, ycentres):
+    # counts divided by the sin correction of the polar angle on the second axis
+    return hist / sin_correction(ycentres)
+
+
+def corrected_int(hist, ycentres):
+    # same as corrected(), truncated to integer counts
+    return corrected(hist, ycentres).astype(numpy.int64)
+
+
+def normalized(abs_val, hist):
+    # abs_val: corrected integer counts of hist
+    # sum/max: divided by sum/maximum of the raw counts
+    # bin_sum/bin_max: divided by sum/maximum of the corrected counts
+    abs_val = abs_val.astype(numpy.float64)
+    return {"sum":     abs_val/float(hist.sum()),
+            "max":     abs_val/float(hist.max()),
+            "bin_sum": abs_val/float(abs_val.sum()),
+            "bin_max": abs_val/float(abs_val.max())}
+
+
+def grid_text(fmt, xcentres, ycentres, values, blocks=True):
+    # one line per (x,y) bin with x as the slow index, values are (nx,ny) arrays
+    # blocks=True adds an empty line after every x block (gnuplot splot format)
+    nx, ny = len(xcentres), len(ycentres)
+    columns = [numpy.repeat(xcentres, ny), numpy.tile(ycentres, nx)]
+    columns += [numpy.asarray(value).reshape(nx*ny) for value in values]
+    flat = numpy.column_stack(columns).ravel().tolist()
+    block = (fmt + "\n")*ny + ("\n" if blocks else "")
+    return (block*nx) % tuple(flat)
+
+
+def write_grid(outfile, fmt, xcentres, ycentres, values, blocks=True):
+    outfile.write(grid_text(fmt, xcentres, ycentres, values, blocks))
+
+
+def write_columns(outfile, fmt, columns):
+    # one line per row of the 1D arrays in columns
+    flat = numpy.column_stack(columns).ravel().tolist()
+    outfile.write(((fmt + "\n")*len(columns[0])) % tuple(flat))
+
+
+def write_matrix(outfile, label_fmt, cell_fmt, labels, matrix):
+    # one line per label: label followed by the row of matrix
+    matrix = numpy.asarray(matrix)
+    flat = numpy.column_stack((labels, matrix)).ravel().tolist()
+    outfile.write(((label_fmt + cell_fmt*matrix.shape[1] + "\n")*len(matrix)) % tuple(flat))
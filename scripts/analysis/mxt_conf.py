@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+# intention: reader for the Fortran unformatted mxt configuration files (conf/*/mxt_*.dat, mxt/mxt_*.dat)
+#
+# output_mxt (src/output_mod.f90) and read_mxt (src/md_init.f90) use two sequential records:
+#   natoms, nbeads, ntypes
+#   r, v, is_cart, is_fixed, idx, name, is_proj, simbox, isimbox
+# Every record is enclosed by record markers holding its length in bytes (4 byte markers,
+# native byte order, as written by gfortran and ifort). The second record is memory-mapped
+# as one structured element, so r, v, ... are views into the file, nothing is copied.
+# Fortran arrays are column-major, the views have the reversed shape:
+#   r(3,nbeads,natoms) -> r[atom, bead, xyz], simbox(3,3) -> simbox[j, i] (rows are the cell vectors)
+# Logicals are 4 byte integers (ifort writes -1 for true), they are returned as bool arrays.
+
+# use like:
+#   import mxt_conf
+#   conf = mxt_conf.read_mxt("conf/latt_300K/mxt_00000001.dat")
+#   conf.r[:,0,2], conf.names(), conf.cartesian()
+#   r, v = mxt_conf.stack(mxt_conf.find("conf/latt_300K"))   # (nconfs, natoms, nbeads, 3)
+
+import os, glob, functools
+import numpy
+
+MARKER = numpy.dtype(numpy.int32) # record marker
+HEAD   = numpy.dtype([("marker", numpy.int32), ("natoms", numpy.int32), ("nbeads", numpy.int32), ("ntypes", numpy.int32), ("end", numpy.int32)])
+
+
+@functools.lru_cache(maxsize=None)
+def record_dtype(natoms, nbeads, ntypes):
+    # second record including its markers, one dtype per system size
+    return numpy.dtype([
+        ("marker",   numpy.int32),
+        ("r",        numpy.float64, (natoms, nbeads, 3)),
+        ("v",        numpy.float64, (natoms, nbeads, 3)),
+        ("is_cart",  numpy.int32),
+        ("is_fixed", numpy.int32, (natoms, nbeads, 3)),
+        ("idx",      numpy.int32, (natoms,)),
+        ("name",     "S3", (ntypes,)),
+        ("is_proj",  numpy.int32, (ntypes,)),
+        ("simbox",   numpy.float64, (3, 3)),
+        ("isimbox",  numpy.float64, (3, 3)),
+        ("end",      numpy.int32),
+    ])
+
+
+class MxtConf:
+    def __init__(self, fname, natoms, nbeads, ntypes, rec):
+        self.fname  = fname
+        self.natoms = natoms
+        self.nbeads = nbeads
+        self.ntypes = ntypes
+        self.rec    = rec # memory-mapped record, the fields below are views
+
+    @property
+    def r(self):
+        return self.rec["r"]
+
+    @property
+    def v(self):
+        return self.rec["v"]
+
+    @property
+    def simbox(self):
+        return self.rec["simbox"]
+
+    @property
+    def isimbox(self):
+        return self.rec["isimbox"]
+
+    @property
+    def idx(self):
+        # atom type index (1-based, as in Fortran)
+        return self.rec["idx"]
+
+    @property
+    def is_cart(self):
+        return bool(self.rec["is_cart"] != 0)
+
+    @property
+    def is_fixed(self):
+        return self.rec["is_fixed"] != 0
+
+    @property
+    def is_proj(self):
+        return self.rec["is_proj"] != 0
+
+    def names(self):
+        # element name per atom
+        types = numpy.char.strip(numpy.char.decode(self.rec["name"]))
+        return types[self.idx - 1]
+
+    def cartesian(self):
+        # positions in cartesian coordinates (a copy if stored as direct coordinates), see to_cartesian()
+        if self.is_cart:
+            return self.r
+        return self.r @ self.simbox
+
+    def centroid(self):
+        # bead average of the cartesian positions, (natoms, 3)
+        return self.cartesian().mean(axis=1)
+
+
+def read_head(fname):
+    head = numpy.fromfile(fname, dtype=HEAD, count=1)
+    if len(head) != 1 or head["marker"][0] != 12 or head["end"][0] != 12:
+        raise ValueError("{} is not an mxt file (4 byte record markers, native byte order)".format(fname))
+    return int(head["natoms"][0]), int(head["nbeads"][0]), int(head["ntypes"][0])
+
+
+def read_mxt(fname):
+    natoms, nbeads, ntypes = read_head(fname)
+    dtype = record_dtype(natoms, nbeads, ntypes)
+    if os.path.getsize(fname) < HEAD.itemsize + dtype.itemsize:
+        raise ValueError("{}: file too short for {} atoms, {} beads and {} types".format(fname, natoms, nbeads, ntypes))
+    rec = numpy.memmap(fname, dtype=dtype, mode="r", offset=HEAD.itemsize, shape=(1,))[0]
+    nbytes = dtype.itemsize - 2*MARKER.itemsize
+    if rec["marker"] != nbytes or rec["end"] != nbytes:
+        raise ValueError("{}: unexpected record length {} instead of {}".format(fname, rec["marker"], nbytes))
+    return MxtConf(fname, natoms, nbeads, ntypes, rec)
+
+
+def find(conf_dir):
+    return sorted(glob.glob(os.path.join(conf_dir, "mxt_*.dat")))
+
+
+def iter_mxt(fnames):
+    for fname in fnames:
+        yield read_mxt(fname)
+
+
+def stack(fnames, cartesian=False):
+    # positions and velocities of many configurations of the same system size as two
+    # (nconfs, natoms, nbeads, 3) arrays
+    r = v = None
+    for i, conf in enumerate(iter_mxt(fnames)):
+        if r is None:
+            shape = (len(fnames),) + conf.r.shape
+            r, v  = numpy.empty(shape), numpy.empty(shape)
+        if conf.r.shape != r.shape[1:]:
+            raise ValueError("{}: {} atoms and {} beads, expected {} and {}".format(conf.fname, conf.natoms, conf.nbeads, r.shape[1], r.shape[2]))
+        r[i] = conf.cartesian() if cartesian else conf.r
+        v[i] = conf.v
+    return r, v
+
+
+def write_xyz(outfile, conf, comment=""):
+    # bead centroids of one configuration as an xyz frame
+    names = conf.names()
+    pos   = conf.centroid()
+    outfile.write("%d\n%s\n" % (conf.natoms, comment))
+    outfile.write("".join("%-3s %16.8f %16.8f %16.8f\n" % (name, x, y, z) for name, (x, y, z) in zip(names, pos)))
+
+
+if __name__ == "__main__":
+    # convert a configuration library: python3 mxt_conf.py conf/latt_300K [out.xyz]
+    import sys, time
+    conf_dir = sys.argv[1] if len(sys.argv) > 1 else "mxt"
+    fnames = find(conf_dir)
+    t0 = time.time()
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w") as outfile:
+            for conf in iter_mxt(fnames):
+                write_xyz(outfile, conf, os.path.basename(conf.fname))
+    else:
+        r, v = stack(fnames)
+        print("positions {}, velocities {}".format(r.shape, v.shape))
+    dt = time.time() - t0
+    print("Read {} files in {:.2f} s".format(len(fnames), dt))
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+# intention: fast reader for the traj/mxt_fin%08d.dat files written by output_scatter (src/output_mod.f90)
+#
+# Every file is read exactly once and parsed by line position, since output_scatter always
+# writes the same 23 lines. Files that do not follow this layout are parsed with the
+# keyword search of the original read_in_mxt_fins(). Many files can be read in parallel
+# with a pool of worker processes; the rows are returned in traj_id order.
+#
+# A manifest (file name, size, mtime, finished flag) of all harvested files allows
+# incremental summary builds that only read new or changed files.
+
+import os, time, multiprocessing
+
+FINISHED_LINES = 23 # number of lines of a finished trajectory file
+
+# summary row layout: (line index, number of values) for every field, see write_summary()
+ROW_LAYOUT = [
+    (0, 1),  # ekin_p_i
+    (1, 1),  # ekin_l_i
+    (2, 1),  # epot_i
+    (3, 1),  # etotal_i
+    (4, 3),  # r_i
+    (5, 3),  # v_i
+    (6, 1),  # polar_i
+    (7, 1),  # azi_i
+    (9, 1),  # ekin_p_f
+    (10, 1), # ekin_l_f
+    (11, 1), # epot_f
+    (12, 1), # etotal_f
+    (13, 3), # r_f
+    (14, 3), # v_f
+    (15, 1), # polar_f
+    (16, 1), # azi_f
+    (21, 1), # time, the keyword search always picked the last line containing "time", i.e. cl_appr_time
+    (19, 1), # turn_pnts
+    (20, 1), # cl_appr
+    (21, 1), # cl_appr_time
+    (22, 3), # r_min_p
+]
+
+# first word of the lines used for the layout check
+LAYOUT_KEYS = {0: "ekin_p_i", 4: "r_i", 9: "ekin_p_f", 13: "r_f", 18: "time", 21: "cl_appr_time", 22: "r_min_p"}
+
+
+def traj_id_from_name(fname):
+    # mxt_fin00000001.dat -> 00000001
+    return os.path.basename(fname)[7:15]
+
+
+def has_fixed_layout(lines):
+    for i, key in LAYOUT_KEYS.items():
+        if not lines[i].startswith(key):
+            return False
+    return True
+
+
+def parse_by_position(lines):
+    fields = []
+    for i, n in ROW_LAYOUT:
+        fields.append(lines[i].split()[-n:] if n > 1 else lines[i].split()[-1])
+    return fields
+
+
+def parse_by_keyword(lines):
+    # same substring tests as the original read_in_mxt_fins()
+    values = {}
+    for line in lines:
+        sline = line.split()
+        if "ekin_p_i" in sline:    values["ekin_p_i"]  = sline[-1]
+        if "ekin_l_i" in sline:    values["ekin_l_i"]  = sline[-1]
+        if "epot_i" in line:       values["epot_i"]    = sline[-1]
+        if "etotal_i" in line:     values["etotal_i"]  = sline[-1]
+        if line.startswith("r_i"): values["r_p_i"]     = sline[-3:]
+        if "v_i" in line:          values["v_p_i"]     = sline[-3:]
+        if "polar_i" in line:      values["polar_i"]   = sline[-1]
+        if "azi_i" in line:        values["azi_i"]     = sline[-1]
+        if "ekin_p_f" in line:     values["ekin_p_f"]  = sline[-1]
+        if "ekin_l_f" in line:     values["ekin_l_f"]  = sline[-1]
+        if "epot_f" in line:       values["epot_f"]    = sline[-1]
+        if "etotal_f" in line:     values["etotal_f"]  = sline[-1]
+        if line.startswith("r_f"): values["r_p_f"]     = sline[-3:]
+        if "v_f" in line:          values["v_p_f"]     = sline[-3:]
+        if "polar_f" in line:      values["polar_f"]   = sline[-1]
+        if "azi_f" in line:        values["azi_f"]     = sline[-1]
+        if "time" in line:         values["time"]      = sline[-1]
+        if "turn_pnts" in line:    values["turn_pnts"] = sline[-1]
+        if "cl_appr " in line:     values["cl_appr"]   = sline[-1]
+        if "cl_appr_time" in line: values["cl_appr_t"] = sline[-1]
+        if "r_min_p" in line:      values["r_p_min"]   = sline[-3:]
+    keys = ["ekin_p_i", "ekin_l_i", "epot_i", "etotal_i", "r_p_i", "v_p_i", "polar_i", "azi_i",
+            "ekin_p_f", "ekin_l_f", "epot_f", "etotal_f", "r_p_f", "v_p_f", "polar_f", "azi_f",
+            "time", "turn_pnts", "cl_appr", "cl_appr_t", "r_p_min"]
+    return [values[key] for key in keys]
+
+
+def read_mxt_fin(fname):
+    # returns (traj_id, fields) or (traj_id, None) for unfinished trajectories
+    with open(fname, "r") as infile:
+        lines = infile.read().split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    if len(lines) != FINISHED_LINES:
+        return traj_id_from_name(fname), None
+    if has_fixed_layout(lines):
+        return traj_id_from_name(fname), parse_by_position(lines)
+    return traj_id_from_name(fname), parse_by_keyword(lines)
+
+
+def read_chunk(fnames):
+    return [read_mxt_fin(fname) for fname in fnames]
+
+
+def harvest(fnames, nprocs=0, chunksize=1000, progress=None):
+    # read all files in fnames (already sorted), returns list of (traj_id, fields or None)
+    # nprocs = 0 uses all available cores, progress(ndone, ntotal) is called after every chunk
+    if nprocs <= 0:
+        nprocs = os.cpu_count() or 1
+    chunks = [fnames[i:i+chunksize] for i in range(0, len(fnames), chunksize)]
+
+    results = []
+    if nprocs == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            results.extend(read_chunk(chunk))
+            if progress is not None:
+                progress(len(results), len(fnames))
+        return results
+
+    # fork avoids re-executing the calling script in the workers
+    if "fork" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("fork")
+    else:
+        ctx = multiprocessing.get_context()
+    with ctx.Pool(nprocs) as pool:
+        for chunk_result in pool.imap(read_chunk, chunks): # imap keeps the chunk order
+            results.extend(chunk_result)
+            if progress is not None:
+                progress(len(results), len(fnames))
+    return results
+
+
+def scan(traj_dir):
+    # sorted list of (name, size, mtime_ns) of all mxt_* files in traj_dir
+    entries = []
+    with os.scandir(traj_dir) as it:
+        for entry in it:
+            if entry.name.startswith("mxt_"):
+                st = entry.stat()
+                entries.append((entry.name, st.st_size, st.st_mtime_ns))
+    entries.sort()
+    return entries
+
+
+def read_manifest(fname):
+    # returns dict name -> (size, mtime_ns, finished)
+    manifest = {}
+    with open(fname, "r") as infile:
+        for line in infile:
+            if line.startswith("#"):
+                continue
+            name, size, mtime, finished = line.split()
+            manifest[name] = (int(size), int(mtime), finished == "1")
+    return manifest
+
+
+def write_manifest(fname, manifest):
+    tmpname = fname + ".tmp"
+    with open(tmpname, "w") as outfile:
+        outfile.write("# file size/B mtime/ns finished\n")
+        for name in sorted(manifest):
+            size, mtime, finished = manifest[name]
+            outfile.write("%s %d %d %d\n" % (name, size, mtime, finished))
+    os.replace(tmpname, fname)
+
+
+def throughput(nfiles, seconds):
+    return nfiles / seconds if seconds > 0 else float("inf")
+
+
+if __name__ == "__main__":
+    # benchmark: python3 mxt_fin.py [traj_dir] [nprocs]
+    import sys, glob
+    traj_dir = sys.argv[1] if len(sys.argv) > 1 else "traj"
+    nprocs   = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    fnames = sorted(glob.glob(os.path.join(traj_dir, "mxt_fin*.dat")))
+    t0 = time.time()
+    rows = harvest(fnames, nprocs)
+    dt = time.time() - t0
+    print("Read {} files ({} finished) in {:.2f} s: {:.0f} files/s".format(
+        len(rows), sum(1 for _, fields in rows if fields is not None), dt, throughput(len(rows), dt)))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# intention: binary columnar cache of the MXT2Summary file written by 1_CreateMXTSummary
+#
+# The text summary is parsed once and every column is stored as a separate .npy file in
+# <summary>.cache/ next to it. Later runs memory-map the columns instead of re-parsing
+# the text. The cache is rebuilt automatically whenever size or modification time of
+# the text summary changes.
+
+# use like:
+#   import mxt_summary
+#   cols = mxt_summary.load_summary("MXT2Summary.txt")
+#   cols["ekin_p_f"], cols["r_p_f"][:,2], ...
+
+import os, sys, shutil, itertools
+import numpy
+
+CACHE_VERSION = 1
+CHUNK_LINES   = 500000 # lines parsed at once when building the cache
+
+# column layout of MXT2Summary.txt, see write_summary() in 1_CreateMXTSummary
+# (name, first column, number of columns, dtype)
+COLUMNS = [
+    ("traj_id",   0,  1, numpy.int64),
+    ("ekin_p_i",  1,  1, numpy.float64),
+    ("ekin_l_i",  2,  1, numpy.float64),
+    ("epot_i",    3,  1, numpy.float64),
+    ("etotal_i",  4,  1, numpy.float64),
+    ("r_p_i",     5,  3, numpy.float64),
+    ("v_p_i",     8,  3, numpy.float64),
+    ("polar_i",  11,  1, numpy.float64),
+    ("azi_i",    12,  1, numpy.float64),
+    ("ekin_p_f", 13,  1, numpy.float64),
+    ("ekin_l_f", 14,  1, numpy.float64),
+    ("epot_f",   15,  1, numpy.float64),
+    ("etotal_f", 16,  1, numpy.float64),
+    ("r_p_f",    17,  3, numpy.float64),
+    ("v_p_f",    20,  3, numpy.float64),
+    ("polar_f",  23,  1, numpy.float64),
+    ("azi_f",    24,  1, numpy.float64),
+    ("time",     25,  1, numpy.float64),
+    ("turn_pnts",26,  1, numpy.int64),
+    ("cl_appr",  27,  1, numpy.float64),
+    ("cl_appr_t",28,  1, numpy.float64),
+    ("r_p_min",  29,  3, numpy.float64),
+]
+NCOLS = 32
+
+
+def cache_dir(inpname):
+    return inpname + ".cache"
+
+
+def source_stamp(inpname):
+    st = os.stat(inpname)
+    return "%d %d %d %d" % (CACHE_VERSION, NCOLS, st.st_size, st.st_mtime_ns)
+
+
+def cache_is_valid(inpname):
+    stampname = os.path.join(cache_dir(inpname), "stamp.txt")
+    if not os.path.exists(stampname):
+        return False
+    with open(stampname, "r") as stampfile:
+        stamp = stampfile.read().strip()
+    if stamp != source_stamp(inpname):
+        return False
+    return all(os.path.exists(os.path.join(cache_dir(inpname), name + ".npy")) for name, _, _, _ in COLUMNS)
+
+
+def parse_summary(inpname):
+    # parse the text summary in chunks, returns a (ntrajs, NCOLS) float64 array
+    chunks = []
+    with open(inpname, "r") as inp_file:
+        lines = (line for line in inp_file if not line.startswith("#") and line.strip())
+        while True:
+            block = list(itertools.islice(lines, CHUNK_LINES))
+            if not block:
+                break
+            chunks.append(numpy.loadtxt(block, dtype=numpy.float64, ndmin=2))
+    if not chunks:
+        return numpy.empty((0, NCOLS))
+    data = numpy.concatenate(chunks)
+    if data.shape[1] != NCOLS:
+        sys.exit("Error in {}: expected {} columns, found {}".format(inpname, NCOLS, data.shape[1]))
+    return data
+
+
+def write_cache(inpname, logfile=None):
+    stamp = source_stamp(inpname)
+    data = parse_summary(inpname)
+
+    # write into a temporary folder first, so that an interrupted run never leaves a broken cache
+    target = cache_dir(inpname)
+    tmpdir = target + ".tmp%d" % os.getpid()
+    if os.path.exists(tmpdir):
+        shutil.rmtree(tmpdir)
+    os.makedirs(tmpdir)
+    for name, first, ncol, dtype in COLUMNS:
+        col = data[:, first:first+ncol].astype(dtype)
+        if ncol == 1:
+            col = col[:, 0]
+        numpy.save(os.path.join(tmpdir, name + ".npy"), numpy.ascontiguousarray(col))
+    with open(os.path.join(tmpdir, "stamp.txt"), "w") as stampfile:
+        stampfile.write(stamp + "\n")
+
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.rename(tmpdir, target)
+
+    if logfile is not None:
+        logfile.write("Wrote binary cache {} for {} trajectories\n".format(target, len(data)))
+
+
+def load_summary(inpname, logfile=None, mmap_mode="r"):
+    # returns a dict of column name -> numpy array (memory-mapped by default)
+    if not cache_is_valid(inpname):
+        print("Building binary cache of {}".format(inpname))
+        if logfile is not None:
+            logfile.write("Building binary cache of {}\n".format(inpname))
+        write_cache(inpname, logfile)
+
+    cols = {}
+    for name, _, _, _ in COLUMNS:
+        cols[name] = numpy.load(os.path.join(cache_dir(inpname), name + ".npy"), mmap_mode=mmap_mode)
+    return cols
+
+
+def traj_id_str(traj_id):
+    # traj ids are stored as integers, the text summary uses the %08d file name id
+    return "%08d" % traj_id
+
+
+if __name__ == "__main__":
+    # build or refresh the cache without running an analysis
+    for name in (sys.argv[1:] or ["MXT2Summary.txt"]):
+        write_cache(name)
+        print("Wrote {}".format(cache_dir(name)))
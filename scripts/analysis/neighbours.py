@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+# intention: periodic neighbour analysis of whole data sets (runner_data.Structures): nearest
+# neighbour distances, radial distribution functions and coordination numbers
+#
+# Distances are minimum-image distances in general (triclinic) cells. Fractional differences are
+# folded into [-0.5, 0.5], then every lattice translation that can bring an image within the
+# cutoff is added: n_i up to floor(rc*|b_i| + 0.5) along cell vector i, b_i the rows of the
+# inverse cell (1/b_i is the width of the cell along i). So images of the atom itself and atoms
+# closer than the cutoff across several cells are found, which the orthorhombic
+# d - rint(d/latt)*latt of the old scripts misses. Structures with a zero cell (no lattice lines)
+# are clusters and only use the direct distances.
+# Structures with the same number of atoms and the same translations are stacked and processed
+# together as one array, in batches of at most MAX_ELEMENTS distances (larger structures are split
+# over their atoms). Units are those of the structures (bohr for input.data).
+
+# use like:
+#   import runner_data, neighbours
+#   data = runner_data.RunnerData("input.data").load()
+#   d = neighbours.min_distances(data)                 # per atom, or same_element=True
+#   d[data.elements == "C"], neighbours.per_structure(data, d, numpy.minimum)
+#   r, g = neighbours.rdf(data, rmax=12.0, nbins=200, pair=("C", "C"))
+#   cn = neighbours.coordination(data, rc=3.2, neighbour="H")
+# or from the shell (distances in A):
+#   ./neighbours.py input.data [rdf_rmax nbins]
+
+import sys
+import numpy
+
+MAX_ELEMENTS = 1 << 22 # distances held at once
+
+
+def is_periodic(cells):
+    return numpy.abs(numpy.linalg.det(cells)) > 1e-10
+
+
+def translations(cell, rc):
+    # multiples of the cell vectors (n, 3) that can hold an image within rc of a folded distance
+    width = 1.0/numpy.linalg.norm(numpy.linalg.inv(cell).T, axis=1)
+    k = numpy.floor(rc/width + 0.5).astype(int)
+    grid = numpy.mgrid[-k[0]:k[0]+1, -k[1]:k[1]+1, -k[2]:k[2]+1].reshape(3, -1).T
+    # zero translation first, the self pair of every atom is (i, i, 0)
+    return grid[numpy.argsort(numpy.abs(grid).sum(axis=1), kind="stable")]
+
+
+def groups(data, rc):
+    # (structures, translations) with the same number of atoms and translations
+    # rc is a scalar or one cutoff per structure
+    rc = numpy.broadcast_to(rc, (len(data),))
+    periodic = is_periodic(data.cells)
+    keys = {}
+    for s in range(len(data)):
+        shifts = translations(data.cells[s], rc[s]) if periodic[s] else numpy.zeros((1, 3), dtype=int)
+        key = (int(data.natoms[s]), shifts.tobytes())
+        if key not in keys:
+            keys[key] = (shifts, [])
+        keys[key][1].append(s)
+    for shifts, members in keys.values():
+        yield numpy.array(members), shifts
+
+
+def batches(data, rc):
+    # squared distances of stacked structures in chunks: (structures, atoms i, d2)
+    # with d2 of shape (structures, atoms i, atoms j, translations), self pairs are inf
+    for members, shifts in groups(data, rc):
+        natoms = int(data.natoms[members[0]])
+        if natoms == 0:
+            continue
+        per_row = natoms*len(shifts)
+        nrows = max(1, min(natoms, MAX_ELEMENTS//per_row))
+        nstruct = max(1, MAX_ELEMENTS//(per_row*natoms)) if nrows == natoms else 1
+        for m in range(0, len(members), nstruct):
+            s = members[m:m+nstruct]
+            atoms = data.first[s][:, None] + numpy.arange(natoms)
+            pos = data.positions[atoms]
+            cells = data.cells[s]
+            periodic = is_periodic(cells)[:, None, None]
+            basis = numpy.where(periodic, cells, numpy.eye(3))
+            frac = numpy.einsum("sax,sxy->say", pos, numpy.linalg.inv(basis))
+            shift = numpy.einsum("tk,skx->stx", shifts, cells)
+            shift2 = numpy.einsum("stx,stx->st", shift, shift)
+            for i0 in range(0, natoms, nrows):
+                i = numpy.arange(i0, min(i0 + nrows, natoms))
+                dfrac = frac[:, None, :, :] - frac[:, i, None, :]
+                dfrac = numpy.where(periodic[..., None], dfrac - numpy.rint(dfrac), dfrac)
+                d = numpy.einsum("sijk,skx->sijx", dfrac, basis)
+                d2 = numpy.einsum("sijx,sijx->sij", d, d)[..., None] + 2.0*numpy.einsum("sijx,stx->sijt", d, shift) + shift2[:, None, None, :]
+                d2[:, numpy.arange(len(i)), i, 0] = numpy.inf
+                yield s, atoms[:, i], numpy.maximum(d2, 0.0)
+
+
+def element_mask(data, atoms_i, elements_j, same_element, neighbour):
+    # (structures, atoms i, atoms j, 1) mask of the neighbours that count, or None for all
+    mask = None
+    if same_element:
+        mask = data.elements[atoms_i][..., None] == elements_j[:, None, :]
+    if neighbour is not None:
+        sel = numpy.broadcast_to((elements_j == neighbour)[:, None, :], atoms_i.shape + elements_j.shape[1:])
+        mask = sel if mask is None else mask & sel
+    return None if mask is None else mask[..., None]
+
+
+def min_distances(data, same_element=False, neighbour=None):
+    # nearest neighbour distance of every atom (inf without neighbours), to any atom, to atoms of
+    # the same element, or to atoms of element neighbour; self images count as neighbours
+    # the cutoff is a distance within which a candidate is sure to have an image: the shortest cell
+    # vector for the atom itself, half the sum of the cell vectors for atoms of another element
+    lengths = numpy.linalg.norm(data.cells, axis=2)
+    rc = lengths.min(axis=1) if neighbour is None else 0.5*lengths.sum(axis=1)
+    out = numpy.full(len(data.positions), numpy.inf)
+    for s, atoms_i, d2 in batches(data, rc):
+        atoms_j = data.first[s][:, None] + numpy.arange(d2.shape[2])
+        mask = element_mask(data, atoms_i, data.elements[atoms_j], same_element, neighbour)
+        if mask is not None:
+            d2 = numpy.where(mask, d2, numpy.inf)
+        out[atoms_i] = numpy.sqrt(d2.min(axis=(2, 3)))
+    return out
+
+
+def coordination(data, rc, same_element=False, neighbour=None):
+    # number of neighbours within rc of every atom
+    out = numpy.zeros(len(data.positions), dtype=int)
+    for s, atoms_i, d2 in batches(data, rc):
+        atoms_j = data.first[s][:, None] + numpy.arange(d2.shape[2])
+        within = d2 < rc*rc
+        mask = element_mask(data, atoms_i, data.elements[atoms_j], same_element, neighbour)
+        if mask is not None:
+            within &= mask
+        out[atoms_i] = within.sum(axis=(2, 3))
+    return out
+
+
+def rdf(data, rmax, nbins=100, pair=None):
+    # radial distribution function averaged over the periodic structures, g(r) -> 1 at large r;
+    # pair=(A, B) counts B around A, default all atoms around all atoms
+    data = data.subset(numpy.flatnonzero(is_periodic(data.cells)))
+    if len(data) == 0:
+        raise ValueError("rdf() needs structures with a cell")
+    centre = numpy.ones(len(data.positions), dtype=bool) if pair is None else data.elements == pair[0]
+    around = numpy.ones(len(data.positions), dtype=bool) if pair is None else data.elements == pair[1]
+    n_centre = numpy.bincount(data.structure_of_atom(), weights=centre, minlength=len(data))
+    n_around = numpy.bincount(data.structure_of_atom(), weights=around, minlength=len(data))
+    norm = (n_centre*n_around/numpy.abs(numpy.linalg.det(data.cells))).sum()
+    if norm == 0.0:
+        raise ValueError("rdf(): no atoms of the pair {} in the periodic structures".format(pair))
+
+    edges = numpy.linspace(0.0, rmax, nbins + 1)
+    hist = numpy.zeros(nbins)
+    for s, atoms_i, d2 in batches(data, rmax):
+        atoms_j = data.first[s][:, None] + numpy.arange(d2.shape[2])
+        sel = (d2 < rmax*rmax) & centre[atoms_i][..., None, None] & around[atoms_j][:, None, :, None]
+        hist += numpy.histogram(numpy.sqrt(d2[sel]), bins=edges)[0]
+    shell = 4.0/3.0*numpy.pi*(edges[1:]**3 - edges[:-1]**3)
+    return 0.5*(edges[1:] + edges[:-1]), hist/(norm*shell)
+
+
+def per_structure(data, values, ufunc=numpy.minimum, empty=numpy.inf):
+    # reduce per-atom values per structure (numpy.minimum, numpy.add, ...), empty for structures without atoms
+    out = numpy.full(len(data), empty, dtype=numpy.result_type(values, empty))
+    full = data.natoms > 0
+    if full.any():
+        out[full] = ufunc.reduceat(values, data.first[:-1][full])
+    return out
+
+
+if __name__ == "__main__":
+    import time, runner_data
+    if len(sys.argv) < 2:
+        sys.exit("use like: {} <input.data> [rdf_rmax nbins]".format(sys.argv[0]))
+    data = runner_data.RunnerData(sys.argv[1]).load()
+    t0 = time.time()
+    d = min_distances(data)*runner_data.BOHR2ANG
+    t1 = time.time()
+    print("{}: {} structures, {} atoms, nearest neighbour distances in {:.3f} s".format(sys.argv[1], len(data), len(d), t1 - t0))
+    for elem in numpy.unique(data.elements):
+        de = d[data.elements == elem]
+        print("{:>3s}: nearest neighbour / A: min {:.4f} mean {:.4f} max {:.4f}".format(elem, de.min(), de.mean(), de.max()))
+    if len(sys.argv) > 2:
+        rmax = float(sys.argv[2])/runner_data.BOHR2ANG
+        r, g = rdf(data, rmax, int(sys.argv[3]) if len(sys.argv) > 3 else 100)
+        for ri, gi in zip(r*runner_data.BOHR2ANG, g):
+            print("{:10.4f} {:12.6f}".format(ri, gi))
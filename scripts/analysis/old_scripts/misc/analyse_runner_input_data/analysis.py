@@ -2,139 +2,37 @@ import numpy as np
 import matplotlib.pyplot as plt
 import statistics as stats
 from math import sqrt
+import os
 import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+import runner_data #scripts/analysis/runner_data.py, indexed reader for input.data
+import neighbours
 
-def readcolumn(filename, column, mode='float'):
-    data=np.loadtxt(filename, usecols=(column-1,), dtype=mode)
-    #data=data[:,column-1]
-    return data
+def get_forces(data, element):
+    #data: all structures, from runner_data.RunnerData(filename).load()
+    force_array=data.forces[data.elements == element].T*ha2ev/b2a
 
-def get_forces(filename, element):
-    #format: atom x y z element ?? ?? fx fy fz
-    element_array=readcolumn(filename, 5, mode='S2')
-    #print(element_array)
-
-    force_array=np.array([readcolumn(filename, 8), readcolumn(filename, 9), readcolumn(filename, 10)])
-    force_array=force_array*ha2ev/b2a
-    #print(force_array)
-
-    #probably a way to do this with array masking, more efficiently
-    del_indx=[]
-    i=0
-    for elm in element_array:
-        if (elm.astype(str) != element):
-            del_indx.append(i)
-        i=i+1
-    #print(del_indx)
-    force_array=np.array([np.delete(force_array[0], del_indx), np.delete(force_array[1], del_indx), np.delete(force_array[2], del_indx)])
-
-    force_tot=np.array([force_array[0]**2 + force_array[1]**2 + force_array[2]**2])
-    force_tot=np.sqrt(force_tot)
-    force_tot=np.concatenate(force_tot)
-
-    #print("COMPONENTS")
-    #print(force_array)
-    #print("FORCE")
-    #print(force_tot)
+    force_tot=np.sqrt(force_array[0]**2 + force_array[1]**2 + force_array[2]**2)
 
     return force_array[0], force_array[1], force_array[2], force_tot
 
-def get_energy(filename, elem_array, atomic_energy_array):
-    infile=open(filename, mode='r')
-    natoms=0
-    energy=0.0
-    e_array=[]
-    n=0
-    dE=0.0
-    for line in infile:
-        spline=line.split()
-        if "begin" in spline[0]:
-            natoms=0
-            energy=0.0
-            dE=0.0
-            #n+=1
-            #print(n)
-        if "atom" in spline[0]:
-            natoms+=1
-            dE+=-1.0*atomic_energy_array[elem_array.index(spline[4])]
-        if "energy" in spline[0]:
-            energy=float(spline[1])
-        if "end" in spline[0]:
-            energy=((energy*ha2ev)+dE)/natoms
-            e_array.append(energy)
-    infile.close()
-    return e_array
+def get_energy(data, elem_array, atomic_energy_array):
+    #energy per atom, minus the isolated atom energies
+    atomic_energy=np.array([atomic_energy_array[elem_array.index(elm)] for elm in data.elements])
+    dE=-np.bincount(data.structure_of_atom(), weights=atomic_energy, minlength=len(data))
+    e_array=((data.energies*ha2ev)+dE)/data.natoms
+    return e_array.tolist()
 
-def get_distances(filename, chosen_elem, same_element=True):
+def get_distances(data, chosen_elem, same_element=True):
     #returns first neighbor distances, ie, minimum distances
     #can be with any atom, or only those of the same element
+    #minimum image in any (also triclinic) cell, see scripts/analysis/neighbours.py
+    dist=neighbours.min_distances(data, same_element=same_element)*b2a
+    chosen=data.elements == chosen_elem
+    for n in np.unique(data.structure_of_atom()[chosen & (dist>100.0)]):
+        print(n+1)
 
-    infile=open(filename, mode="r")
-    dist_array=[]
-    n=0
-    natoms=0
-
-    for line in infile:
-        spline=line.split()
-        if "begin" in spline[0]: #reset stuff
-            pos_array=[]
-            elem_array=[]
-            latt_counter=0
-            latt=np.array([0.0, 0.0, 0.0])
-            n+=1
-            natoms=0
-
-        if "lattice" in spline[0]:
-            #spline=line.split()
-            l=b2a*float(spline[latt_counter+2-1])
-            latt[latt_counter]=l
-            latt_counter += 1
-
-        if "atom" in spline[0]:
-            #spline=line.split()
-            #print(spline)
-            elm=spline[5-1]
-            x=b2a*float(spline[2-1])
-            y=b2a*float(spline[3-1])
-            z=b2a*float(spline[4-1])
-            pos_array.append(np.array([x, y, z]))
-            elem_array.append(elm)
-            natoms+=1
-            
-        if "end" in spline[0]: #process
-            if natoms>1:
-                for (a1, e1) in zip(pos_array, elem_array):
-                    min_dist=10000.0
-                    if e1==chosen_elem:
-                        for (a2, e2) in zip(pos_array, elem_array):
-                            #dist=np.linalg.norm(a2-a1)
-                            #mic
-                            d=(a2-a1)
-                            d=d-np.rint(d/latt)*latt
-                            dist=np.linalg.norm(d)
-                            #print("A1: "+str(a1)+" "+e1+" A2: "+str(a2)+" "+e2+" Dist: "+ \
-                            #str(dist)+" "+str(min_dist)+" Elem Lock "+str(elem_lock(e1, e2, same_element)))
-                            if (dist<min_dist) and (dist>0.0001) and (elem_lock(e1, e2, same_element)) and (e1 == chosen_elem): 
-                            #prevents comparing distance with oneself
-                                min_dist=dist
-                        dist_array.append(min_dist)
-                        if min_dist>100.0:
-                            print(n)
-
-    infile.close()
-    #print(len(dist_array))
-    #print(dist_array)
-
-    return dist_array
-
-def elem_lock(e1, e2, same_element):
-    res=True
-    if same_element:
-        if (e1 == e2):
-            res=True
-        else:
-            res=False
-    return res
+    return dist[chosen].tolist()
 
 def do_stats(data, count, mean_color='black', median_color='blue', stdev_color='red', plot=True):
     mean  =stats.mean(data)
@@ -151,7 +49,6 @@ def do_stats(data, count, mean_color='black', median_color='blue', stdev_color='
 
 
 #files
-atom_file_dir="atom_info.out"
 infile_dir=sys.argv[1]
 
 #unit conversion
@@ -166,55 +63,35 @@ elem_array=["C", "H"]
 atomic_energy_array=[0.0, 0.0] #isolated atom energy for each, in eV       				## VanSibner: Change atomic energy here (if you had them just put them in outherwise fill in zeros; energy convert is crucial to get rid of extremely large numbers and spare 
 ha_energy=[0.0, 0.0]											## 	      caused float errors)
 
+#read input.data once (the index is kept in input.data.idx.npz for the next run)
+data=runner_data.RunnerData(infile_dir).load()
+
 #export to xyz
 if do_xyz:
     print("EXPORTING TO XYZ")
     outfile_dir="structure.lammpstrj"
-    #infile_dir="ruNNer.input.small"
     outfile=open(outfile_dir, mode="w")
-    infile=open(infile_dir, mode="r")
 
-    nsteps=0
-    natoms=0
-    for line in infile:
-        spline=line.split()
-        if "begin" in spline[0]:
-            nsteps+=1
-            natoms=0
-            atom_array=[]
-            latt_counter=0
-            latt_array=[]
-            outfile.write("ITEM: TIMESTEP\n")
-            outfile.write("{}\n".format(nsteps))
-        if "lattice" in spline[0]:
-            latt_array.append(spline[latt_counter+1])
-            latt_counter+=1
-        if "atom" in spline[0]:
-            elm=spline[5-1]
-            x=str(float(spline[2-1])*b2a)
-            y=str(float(spline[3-1])*b2a)
-            z=str(float(spline[4-1])*b2a)
-            atom_array.append([elm, x, y, z])
-            natoms+=1
-        if "end" in spline[0]:
-            outfile.write("ITEM: NUMBER OF ATOMS\n")
-            outfile.write("{}\n".format(natoms))
-            outfile.write("ITEM: BOX BOUNDS pp pp pp\n")
-            outfile.write("0.0 {}\n".format(latt_array[0]))
-            outfile.write("0.0 {}\n".format(latt_array[1]))
-            outfile.write("0.0 {}\n".format(latt_array[2]))
-            outfile.write("ITEM: ATOMS id element x y z\n")
-            for i,a in enumerate(atom_array):
-                outfile.write("{} {} {} {} {}\n".format(i, a[0], a[1], a[2], a[3]))
+    for n in range(0, len(data)):
+        pos, elem, frc=data.atoms(n)
+        outfile.write("ITEM: TIMESTEP\n")
+        outfile.write("{}\n".format(n+1))
+        outfile.write("ITEM: NUMBER OF ATOMS\n")
+        outfile.write("{}\n".format(len(pos)))
+        outfile.write("ITEM: BOX BOUNDS pp pp pp\n")
+        for i in range(0, 3):
+            outfile.write("0.0 {}\n".format(data.cells[n][i][i]))
+        outfile.write("ITEM: ATOMS id element x y z\n")
+        for i,(elm, a) in enumerate(zip(elem, pos*b2a)):
+            outfile.write("{} {} {} {} {}\n".format(i, elm, a[0], a[1], a[2]))
 
-    infile.close()
     outfile.close()
             
 if do_energy:
     #get data
     #energy=readcolumn(energy_file_dir, 2)
     #energy=energy*ha2ev
-    energy=get_energy(infile_dir, elem_array, atomic_energy_array)
+    energy=get_energy(data, elem_array, atomic_energy_array)
 
     #plot data
     ##ENERGY
@@ -233,7 +110,7 @@ if do_force:
     ##FORCES
     print("FORCES")
     for elem in elem_array:
-        f_x, f_y, f_z, f_tot=get_forces(atom_file_dir, element=elem)
+        f_x, f_y, f_z, f_tot=get_forces(data, element=elem)
         if len(f_x)>0:
             plt.figure()
             n, bins, patches = plt.hist([f_x, f_y, f_z], bins=31, normed=False, stacked=False, label=["fx", "fy", "fz"])#,facecolor='blue', alpha=0.75)
@@ -265,7 +142,7 @@ if do_distance:
     ##DISTANCES
     print("DISTANCES")
     for elem in elem_array:
-        dist=get_distances(infile_dir, chosen_elem=elem, same_element=False)
+        dist=get_distances(data, chosen_elem=elem, same_element=False)
         if len(dist)>0:
             plt.figure()
             n, bins, patches = plt.hist(dist, bins=500, normed=False, stacked=False,facecolor='blue', alpha=0.75)
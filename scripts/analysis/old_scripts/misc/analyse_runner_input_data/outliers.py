@@ -1,57 +1,15 @@
-import math, sys
+import math, os, sys
 import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+import runner_data #scripts/analysis/runner_data.py, indexed reader for input.data
+import neighbours
 def get_distances(filename):
-    #returns first neighbor distances, ie, minimum distances
-    #can be with any atom, or only those of the same element
-
-    infile=open(filename, mode="r")
-    dist_array=[]
-    natoms=0
-
-    for line in infile:
-        spline=line.split()
-        if "begin" in spline[0]: #reset stuff
-            pos_array=[]
-            elem_array=[]
-            latt_counter=0
-            latt=np.array([0.0, 0.0, 0.0])
-            natoms=0
-
-        if "lattice" in spline[0]:
-            #spline=line.split()
-            l=b2a*float(spline[latt_counter+2-1])
-            latt[latt_counter]=l
-            latt_counter += 1
-
-        if "atom" in spline[0]:
-            #spline=line.split()
-            #print(spline)
-            elm=spline[5-1]
-            x=b2a*float(spline[2-1])
-            y=b2a*float(spline[3-1])
-            z=b2a*float(spline[4-1])
-            pos_array.append(np.array([x, y, z]))
-            elem_array.append(elm)
-            natoms+=1
-
-        if "end" in spline[0]: #process
-            min_dist=10000.0
-            if natoms>1:
-                for (a1, e1) in zip(pos_array, elem_array):
-                    for (a2, e2) in zip(pos_array, elem_array):
-                        #mic
-                        d=(a2-a1)
-                        d=d-np.rint(d/latt)*latt
-                        dist=np.linalg.norm(d)
-                        if (dist<min_dist) and (dist>0.0001):
-                        #prevents comparing distance with oneself
-                            min_dist=dist
-            dist_array.append(min_dist)
-
-    infile.close()
-    #print(len(dist_array))
-    #print(dist_array)
-    return dist_array
+    #returns first neighbor distances, ie, minimum distances, one per structure
+    #minimum image in any (also triclinic) cell, see scripts/analysis/neighbours.py
+    data=runner_data.RunnerData(filename).load()
+    dist=neighbours.min_distances(data)*b2a
+    dist_array=np.minimum(neighbours.per_structure(data, dist, np.minimum, 10000.0), 10000.0)
+    return dist_array.tolist()
 
 #format: atom x y z element ?? ?? fx fy fz
 #unit conversion
@@ -1,5 +1,8 @@
+import os
 import sys
 import triclinic_functions as trif
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+import runner_data #scripts/analysis/runner_data.py, indexed reader for input.data
 #Unit Conversion
 bohr2angst=0.529177
 angst2bohr=1.0/bohr2angst
@@ -7,33 +10,25 @@ thr=0.000000000001 #threshold for detecting values close to zero for non diagona
 
 infile_name=sys.argv[1]
 outfile_name=infile_name.split(".")[0]+".lammpstrj"
-infile=open(infile_name, mode="r")
 outfile=open(outfile_name, mode="w")
 
-#process file
+#read all structures at once, in chunks to bound the memory for large files
+data=runner_data.RunnerData(infile_name)
 nstruct=0
-for line in infile:
-    spline=line.lstrip().split()
-    if spline[0]=="begin":
-        atom_array=[]
-        bbox=[[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
-        latt_count=0
-        natoms=0
+for chunk in data.iter_chunks():
+    cells=(chunk.cells*bohr2angst).tolist()
+    for k in range(0, len(chunk)):
         nstruct+=1
-    elif spline[0]=="lattice":
-        for i in range(0, 3):
-            bbox[latt_count][i]=float(spline[i+1])*bohr2angst
-        latt_count+=1
+        pos, elem, frc=chunk.atoms(k)
+        pos=(pos*bohr2angst).tolist()
+        natoms=len(pos)
+        bbox=cells[k]
 
-    elif spline[0]=="atom":
-        natoms+=1
-        atom_array.append([bohr2angst*float(spline[1]), bohr2angst*float(spline[2]), bohr2angst*float(spline[3]), spline[4]])
-    elif spline[0]=="end":
         outfile.write("ITEM: TIMESTEP\n")
         outfile.write("{}\n".format(nstruct))
         outfile.write("ITEM: NUMBER OF ATOMS\n")
         outfile.write("{}\n".format(natoms))
-        
+
         #Check for non orthogonal box:
         if trif.check_triclinic(bbox):
             outfile.write("ITEM: BOX BOUNDS xy xz yz pp pp pp\n")
@@ -48,6 +43,5 @@ for line in infile:
 
         outfile.write("ITEM: ATOMS id element x y z\n")
         for i in range(0, natoms):
-            outfile.write("{0} {1[3]} {1[0]} {1[1]} {1[2]}\n".format(i+1, atom_array[i]))
-infile.close()
+            outfile.write("{0} {1} {2[0]} {2[1]} {2[2]}\n".format(i+1, elem[i], pos[i]))
 outfile.close()
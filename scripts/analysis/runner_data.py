@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+# intention: indexed reader for RuNNer input.data files (training sets, md_tian2 runner output)
+#
+# The file is scanned once for the begin ... end blocks; their byte offsets and atom counts are
+# kept next to it in <file>.idx.npz and reused as long as size and modification time of the file
+# match. Any subset of structures is then read by seeking to its blocks and parsed in bulk into
+# NumPy arrays. Values are in the units of the file (bohr, Ha, Ha/bohr), see BOHR2ANG and HA2EV.
+# Atoms of all selected structures are stored one after the other, the atoms of structure i are
+# first[i]:first[i+1] (see Structures.atoms()). Structures without lattice lines get a zero cell.
+
+# use like:
+#   import runner_data
+#   data = runner_data.RunnerData("input.data")
+#   len(data), data.natoms
+#   s = data.load()                      # all structures, or data.load([0, 5, 10]), data.load(range(100, 200))
+#   s.energies, s.cells, s.positions, s.elements, s.forces
+#   pos, elem, frc = s.atoms(3)
+# or from the shell, to build the index and print a summary:
+#   ./runner_data.py input.data
+
+import os, re, sys, mmap
+import numpy
+
+BOHR2ANG = 0.529177211  # as in src/constants.f90
+HA2EV    = 27.21138602
+
+BEGIN   = re.compile(rb"^[ \t]*begin\b", re.M)
+END     = re.compile(rb"^[ \t]*end\b[^\n]*\n?", re.M)
+ATOM    = re.compile(rb"^[ \t]*atom\b", re.M)
+
+ATOM_LINE    = re.compile(rb"^[ \t]*atom[ \t]+([^\n]*)", re.M)
+LATTICE_LINE = re.compile(rb"^[ \t]*lattice[ \t]+([^\n]*)", re.M)
+ENERGY_LINE  = re.compile(rb"^[ \t]*energy[ \t]+(\S+)", re.M)
+CHARGE_LINE  = re.compile(rb"^[ \t]*charge[ \t]+(\S+)", re.M)
+
+
+def build_index(buf):
+    # (start, stop, natoms) of every begin ... end block
+    start, stop, natoms = [], [], []
+    for m in BEGIN.finditer(buf):
+        e = END.search(buf, m.end())
+        if e is None:
+            break # structure still being written
+        if start and m.start() < stop[-1]:
+            raise ValueError("begin at byte {} inside the block starting at byte {}".format(m.start(), start[-1]))
+        start.append(m.start())
+        stop.append(e.end())
+        natoms.append(len(ATOM.findall(buf, m.start(), e.end())))
+    return numpy.array(start, dtype=numpy.int64), numpy.array(stop, dtype=numpy.int64), numpy.array(natoms, dtype=numpy.int64)
+
+
+class Structures:
+    def __init__(self, indices, natoms, cells, energies, charges, elements, positions, atom_charges, atom_energies, forces):
+        self.indices       = indices   # positions of the structures in the file
+        self.natoms        = natoms
+        self.first         = numpy.concatenate(([0], numpy.cumsum(natoms)))
+        self.cells         = cells     # (n, 3, 3), rows are the lattice vectors
+        self.energies      = energies
+        self.charges       = charges
+        self.elements      = elements  # (natoms_total,) str
+        self.positions     = positions # (natoms_total, 3)
+        self.atom_charges  = atom_charges
+        self.atom_energies = atom_energies
+        self.forces        = forces    # (natoms_total, 3)
+
+    def __len__(self):
+        return len(self.natoms)
+
+    def atoms(self, i):
+        # positions, elements and forces of the i-th loaded structure
+        sl = slice(self.first[i], self.first[i+1])
+        return self.positions[sl], self.elements[sl], self.forces[sl]
+
+    def subset(self, structures):
+        # the given loaded structures (indices into this set) as a new Structures
+        structures = numpy.arange(len(self))[structures]
+        atoms = numpy.concatenate([numpy.arange(self.first[i], self.first[i+1]) for i in structures] + [numpy.zeros(0, dtype=int)])
+        return Structures(self.indices[structures], self.natoms[structures], self.cells[structures], self.energies[structures],
+                          self.charges[structures], self.elements[atoms], self.positions[atoms], self.atom_charges[atoms],
+                          self.atom_energies[atoms], self.forces[atoms])
+
+    def structure_of_atom(self):
+        # index of the loaded structure of every atom
+        return numpy.repeat(numpy.arange(len(self.natoms)), self.natoms)
+
+
+class RunnerData:
+    def __init__(self, fname, index_file=None, rebuild=False):
+        self.fname      = fname
+        self.index_file = index_file or fname + ".idx.npz"
+        stat = os.stat(fname)
+        self.key = numpy.array([stat.st_size, stat.st_mtime_ns], dtype=numpy.int64)
+
+        if not rebuild and os.path.exists(self.index_file):
+            idx = numpy.load(self.index_file)
+            if numpy.array_equal(idx["key"], self.key):
+                self.start, self.stop, self.natoms = idx["start"], idx["stop"], idx["natoms"]
+                return
+
+        with open(fname, "rb") as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            self.start, self.stop, self.natoms = build_index(buf)
+        try:
+            numpy.savez(self.index_file, key=self.key, start=self.start, stop=self.stop, natoms=self.natoms)
+        except OSError:
+            pass # read-only location, the index is kept in memory only
+
+    def __len__(self):
+        return len(self.start)
+
+    def read_blocks(self, indices):
+        # raw text of the selected blocks, in the given order
+        out = []
+        with open(self.fname, "rb") as infile:
+            for i in indices:
+                infile.seek(self.start[i])
+                out.append(infile.read(self.stop[i] - self.start[i]))
+        return out
+
+    def load(self, indices=None):
+        # the selected structures (all by default) as NumPy arrays, one bulk parse
+        indices = numpy.arange(len(self)) if indices is None else numpy.arange(len(self))[indices]
+        indices = numpy.atleast_1d(indices)
+        blocks  = self.read_blocks(indices)
+        text    = b"".join(blocks)
+
+        natoms = self.natoms[indices]
+        cols   = numpy.array(b" ".join(ATOM_LINE.findall(text)).split()).reshape(-1, 9)
+        if len(cols) != natoms.sum():
+            raise ValueError("{}: atom lines with other than 9 entries".format(self.fname))
+
+        cells = numpy.zeros((len(indices), 3, 3))
+        for k, block in enumerate(blocks):
+            lattice = LATTICE_LINE.findall(block)
+            if lattice:
+                cells[k] = numpy.array(b" ".join(lattice).split(), dtype=float).reshape(3, 3)
+
+        energies = numpy.array([float(ENERGY_LINE.search(block).group(1)) if ENERGY_LINE.search(block) else numpy.nan for block in blocks])
+        charges  = numpy.array([float(CHARGE_LINE.search(block).group(1)) if CHARGE_LINE.search(block) else numpy.nan for block in blocks])
+
+        return Structures(indices, natoms, cells, energies, charges,
+                          numpy.char.decode(cols[:, 3]), cols[:, 0:3].astype(float),
+                          cols[:, 4].astype(float), cols[:, 5].astype(float), cols[:, 6:9].astype(float))
+
+    def iter_chunks(self, size=1000):
+        # load() in chunks of structures, for files that do not fit into memory at once
+        for i in range(0, len(self), size):
+            yield self.load(slice(i, i + size))
+
+
+if __name__ == "__main__":
+    import time
+    fname = sys.argv[1] if len(sys.argv) > 1 else "input.data"
+    t0 = time.time()
+    data = RunnerData(fname)
+    t1 = time.time()
+    s = data.load()
+    t2 = time.time()
+    print("{}: {} structures, {} atoms (index {:.3f} s, parse {:.3f} s)".format(fname, len(data), data.natoms.sum(), t1 - t0, t2 - t1))
+    if len(s) > 0:
+        epa = s.energies * HA2EV / s.natoms
+        print("energy per atom / eV: min {:.6f} max {:.6f}".format(epa.min(), epa.max()))
+        for elem in numpy.unique(s.elements):
+            f = numpy.linalg.norm(s.forces[s.elements == elem], axis=1) * HA2EV / BOHR2ANG
+            print("{:>3s}: {} atoms, |F| / eV/A: mean {:.4f} max {:.4f}".format(elem, len(f), f.mean(), f.max()))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# intention: reader for the traj/scatter%08d.bin files written by output_scatter_bin (src/output_mod.f90)
+#
+# md_tian2 with "output scatter_bin 1" appends one fixed-size record per finished trajectory
+# to one file per run (named after the first traj_id of the run). A file starts with a 16 byte
+# header (magic, version, record size) and is memory-mapped as a structured array, so
+# harvesting a campaign is the concatenation of a few files. A record that is still being
+# written (partial record at the end of the file) is ignored. Native byte order, as written.
+
+# use like:
+#   import scatter_bin
+#   recs = scatter_bin.load(scatter_bin.find("traj"))
+#   recs["traj_id"], recs["ekin_p_f"], recs["r_p_f"][:,2], ...
+
+import os, glob
+import numpy
+
+MAGIC   = b"MDTSCAT "
+VERSION = 1
+
+HEADER = numpy.dtype([("magic", "S8"), ("version", numpy.int32), ("record_bytes", numpy.int32)])
+
+# record layout, see output_scatter_bin(); names follow mxt_summary.COLUMNS
+RECORD = numpy.dtype([
+    ("traj_id",   numpy.int32),
+    ("steps",     numpy.int32),
+    ("turn_pnts", numpy.int32),
+    ("bounces",   numpy.int32),
+    ("ekin_p_i",  numpy.float64),
+    ("ekin_l_i",  numpy.float64),
+    ("epot_i",    numpy.float64),
+    ("etotal_i",  numpy.float64),
+    ("r_p_i",     numpy.float64, (3,)),
+    ("v_p_i",     numpy.float64, (3,)),
+    ("polar_i",   numpy.float64),
+    ("azi_i",     numpy.float64),
+    ("ekin_p_f",  numpy.float64),
+    ("ekin_l_f",  numpy.float64),
+    ("epot_f",    numpy.float64),
+    ("etotal_f",  numpy.float64),
+    ("r_p_f",     numpy.float64, (3,)),
+    ("v_p_f",     numpy.float64, (3,)),
+    ("polar_f",   numpy.float64),
+    ("azi_f",     numpy.float64),
+    ("time",      numpy.float64),
+    ("cl_appr",   numpy.float64),
+    ("cl_appr_t", numpy.float64),
+    ("r_p_min",   numpy.float64, (3,)),
+    ("time_int",  numpy.float64),
+])
+
+
+def find(traj_dir):
+    return sorted(glob.glob(os.path.join(traj_dir, "scatter*.bin")))
+
+
+def read_records(fname):
+    # memory-mapped records of one file (empty array for files without a complete record)
+    size = os.path.getsize(fname)
+    if size < HEADER.itemsize:
+        return numpy.empty(0, dtype=RECORD)
+    header = numpy.fromfile(fname, dtype=HEADER, count=1)[0]
+    if header["magic"] != MAGIC:
+        raise ValueError("{} is not a scatter_bin file".format(fname))
+    if header["version"] != VERSION or header["record_bytes"] != RECORD.itemsize:
+        raise ValueError("{}: unsupported version {} with {} byte records".format(fname, header["version"], header["record_bytes"]))
+    nrecs = (size - HEADER.itemsize) // RECORD.itemsize
+    if nrecs == 0:
+        return numpy.empty(0, dtype=RECORD)
+    return numpy.memmap(fname, dtype=RECORD, mode="r", offset=HEADER.itemsize, shape=(nrecs,))
+
+
+def load(fnames):
+    # records of all files ordered by traj_id; a trajectory written more than once (restarted
+    # run) is taken from the last record written
+    parts = [read_records(fname) for fname in fnames]
+    if not parts:
+        return numpy.empty(0, dtype=RECORD)
+    recs = numpy.concatenate(parts)
+    _, last = numpy.unique(recs["traj_id"][::-1], return_index=True)
+    return recs[len(recs) - 1 - last]
+
+
+def fortran_e(x, digits=10):
+    # Fortran e21.10 style mantissa 0.d...dE+xx, as written by output_scatter
+    if x == 0:
+        return "0." + "0"*digits + "E+00"
+    s = "%.*E" % (digits-1, abs(x))
+    mantissa, exponent = s.split("E")
+    return "%s0.%sE%+03d" % ("-" if x < 0 else "", mantissa.replace(".", ""), int(exponent)+1)
+
+
+def summary_fields(rec):
+    # text fields of one record in the order of mxt_fin.ROW_LAYOUT, formatted like traj/mxt_fin
+    # the time field is cl_appr_time, as in summaries harvested from traj/mxt_fin files
+    f = lambda x: "%.7f" % x
+    v = lambda a: [f(x) for x in a]
+    return [f(rec["ekin_p_i"]), f(rec["ekin_l_i"]), fortran_e(rec["epot_i"]), fortran_e(rec["etotal_i"]),
+            v(rec["r_p_i"]), v(rec["v_p_i"]), f(rec["polar_i"]), f(rec["azi_i"]),
+            f(rec["ekin_p_f"]), f(rec["ekin_l_f"]), fortran_e(rec["epot_f"]), fortran_e(rec["etotal_f"]),
+            v(rec["r_p_f"]), v(rec["v_p_f"]), f(rec["polar_f"]), f(rec["azi_f"]),
+            f(rec["cl_appr_t"]), "%d" % rec["turn_pnts"], f(rec["cl_appr"]), f(rec["cl_appr_t"]), v(rec["r_p_min"])]
+
+
+if __name__ == "__main__":
+    # benchmark: python3 scatter_bin.py [traj_dir]
+    import sys, time
+    traj_dir = sys.argv[1] if len(sys.argv) > 1 else "traj"
+    fnames = find(traj_dir)
+    t0 = time.time()
+    recs = load(fnames)
+    dt = time.time() - t0
+    print("Read {} trajectories from {} files in {:.3f} s".format(len(recs), len(fnames), dt))
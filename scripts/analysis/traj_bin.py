@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+# intention: random access to the traj_bin/traj_%08d.bin frames written by output_traj_bin (src/output_mod.f90)
+#
+# md_tian2 with "output traj_bin <n>" writes one file per trajectory: a header with the system
+# (natoms, nbeads, ntypes, cell, names, type index and fixed flags of the atoms) and a frame every
+# n steps. Frames have a fixed size, frame k starts at header_bytes + k*frame_bytes, so it is
+# read without touching the others. A frame holds time (fs), step and the cartesian positions (A)
+# and velocities (A/fs) of all beads (with the beads keyword) or of the centroids, in single
+# precision (double with the traj_bin_double key). Native byte order, as written.
+# The frames are memory-mapped, a frame that is still being written is ignored. The initial
+# structure of a trajectory (written with interval 1) has step -1.
+# Fortran arrays are column-major, the views have the reversed shape:
+#   r(3,nbeads,natoms) -> r[atom, bead, xyz], simbox(3,3) -> simbox[i, xyz] (rows are the cell vectors)
+
+# use like:
+#   import traj_bin
+#   traj = traj_bin.TrajBin(traj_bin.path("traj_bin", 1234))
+#   traj.nframes, traj.steps, traj.r(10)[:,0,:], traj.frame_of_step(500)
+#   traj.write_xyz(open("movie.xyz", "w"), range(0, traj.nframes, 10))
+#   traj.write_poscar(open("POSCAR", "w"), -1)
+# or from the shell:
+#   ./traj_bin.py traj_bin/traj_00001234.bin movie.xyz [first last every]
+#   ./traj_bin.py traj_bin/traj_00001234.bin POSCAR_final -1
+
+import os, sys, glob
+import numpy
+
+MAGIC   = b"MDTTRAJ "
+VERSION = 1
+
+HEAD = numpy.dtype([("magic", "S8"), ("version", numpy.int32), ("header_bytes", numpy.int32), ("frame_bytes", numpy.int32),
+                    ("natoms", numpy.int32), ("nbeads", numpy.int32), ("ntypes", numpy.int32), ("real_bytes", numpy.int32),
+                    ("simbox", numpy.float64, (3, 3))])
+
+
+def path(traj_dir, traj_id):
+    return os.path.join(traj_dir, "traj_%08d.bin" % traj_id)
+
+
+def find(traj_dir):
+    return sorted(glob.glob(os.path.join(traj_dir, "traj_*.bin")))
+
+
+def frame_dtype(natoms, nbeads, real_bytes):
+    real = numpy.float32 if real_bytes == 4 else numpy.float64
+    return numpy.dtype([("time", numpy.float64), ("step", numpy.int64),
+                        ("r", real, (natoms, nbeads, 3)), ("v", real, (natoms, nbeads, 3))])
+
+
+class TrajBin:
+    def __init__(self, fname):
+        self.fname = fname
+        head = numpy.fromfile(fname, dtype=HEAD, count=1)
+        if len(head) != 1 or head["magic"][0] != MAGIC:
+            raise ValueError("{} is not a traj_bin file".format(fname))
+        head = head[0]
+        if head["version"] != VERSION:
+            raise ValueError("{}: unsupported version {}".format(fname, head["version"]))
+        self.natoms, self.nbeads, self.ntypes = int(head["natoms"]), int(head["nbeads"]), int(head["ntypes"])
+        self.simbox = head["simbox"]
+
+        rest = numpy.dtype([("name", "S3", (self.ntypes,)), ("idx", numpy.int32, (self.natoms,)),
+                            ("fixed", numpy.int32, (self.natoms, 3))])
+        if HEAD.itemsize + rest.itemsize != head["header_bytes"]:
+            raise ValueError("{}: header of {} bytes, expected {}".format(fname, head["header_bytes"], HEAD.itemsize + rest.itemsize))
+        rest = numpy.fromfile(fname, dtype=rest, count=1, offset=HEAD.itemsize)[0]
+        self.types = numpy.char.strip(numpy.char.decode(rest["name"]))
+        self.idx   = rest["idx"].copy()  # atom type index (1-based, as in Fortran)
+        self.fixed = rest["fixed"] != 0  # (natoms, 3), True for fixed coordinates
+
+        dtype = frame_dtype(self.natoms, self.nbeads, int(head["real_bytes"]))
+        if dtype.itemsize != head["frame_bytes"]:
+            raise ValueError("{}: frames of {} bytes, expected {}".format(fname, head["frame_bytes"], dtype.itemsize))
+        self.nframes = (os.path.getsize(fname) - int(head["header_bytes"])) // dtype.itemsize
+        self.frames  = numpy.memmap(fname, dtype=dtype, mode="r", offset=int(head["header_bytes"]), shape=(self.nframes,)) \
+                       if self.nframes > 0 else numpy.empty(0, dtype=dtype)
+
+    @property
+    def steps(self):
+        return self.frames["step"]
+
+    @property
+    def times(self):
+        return self.frames["time"]
+
+    def names(self):
+        # element name per atom
+        return self.types[self.idx - 1]
+
+    def r(self, k):
+        # positions of frame k, (natoms, nbeads, 3)
+        return self.frames["r"][k]
+
+    def v(self, k):
+        return self.frames["v"][k]
+
+    def frame_of_step(self, step):
+        # index of the frame written at this step (steps are ascending)
+        k = int(numpy.searchsorted(self.steps, step))
+        if k == self.nframes or self.steps[k] != step:
+            raise KeyError("{}: no frame at step {}".format(self.fname, step))
+        return k
+
+    def folded(self, k):
+        # positions of frame k folded into the cell as in output_xyz (z centred around 0); in single
+        # precision, atoms on a face of the cell can end up on the opposite face
+        direct = self.r(k).astype(numpy.float64) @ numpy.linalg.inv(self.simbox)
+        shift = direct - 0.5
+        direct -= numpy.sign(shift)*numpy.floor(numpy.abs(shift) + 0.5) # Fortran anint, halves away from zero
+        cart = direct @ self.simbox
+        cart[..., 2] = numpy.where(cart[..., 2] > 0.5*self.simbox[2, 2], cart[..., 2] - self.simbox[2, 2], cart[..., 2])
+        return cart
+
+    def write_xyz(self, outfile, frames, fold=True):
+        # selected frames as xyz, all beads of an atom after each other
+        names = numpy.repeat(self.names(), self.nbeads)
+        for k in frames:
+            pos = (self.folded(k) if fold else self.r(k)).reshape(-1, 3)
+            outfile.write("%d\ntime = %.4f fs, step %d\n" % (len(pos), self.times[k], self.steps[k]))
+            outfile.write("".join("%-3s %18.8e %18.8e %18.8e\n" % (name, x, y, z) for name, (x, y, z) in zip(names, pos)))
+
+    def write_poscar(self, outfile, k, bead=None):
+        # frame k in the layout of output_vasp: the centroid (or one bead), cartesian, with velocities
+        r, v = self.r(k).astype(numpy.float64), self.v(k).astype(numpy.float64)
+        if bead is None:
+            r, v = r.mean(axis=1), v.mean(axis=1)
+        else:
+            r, v = r[:, bead], v[:, bead]
+        order = numpy.argsort(self.idx, kind="stable")
+        counts = numpy.bincount(self.idx - 1, minlength=self.ntypes)
+        flag = lambda fixed: " ".join("F" if f else "T" for f in fixed)
+        outfile.write("time = %.4f fs, step %d\n1.0\n" % (self.times[k], self.steps[k]))
+        outfile.write("".join("%23.15f%23.15f%23.15f\n" % tuple(vec) for vec in self.simbox))
+        outfile.write(" ".join(self.types) + "\n" + "".join("%6d" % n for n in counts) + "\n")
+        outfile.write("Selective dynamics\nCartesian\n")
+        outfile.write("".join("%23.15f%23.15f%23.15f %s\n" % (*r[i], flag(self.fixed[i])) for i in order))
+        outfile.write("\n" + "".join("%23.15f%23.15f%23.15f\n" % tuple(v[i]) for i in order))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("use like: {} <traj_bin file> <out.xyz> [first last every] | <POSCAR> <frame>".format(sys.argv[0]))
+    traj = TrajBin(sys.argv[1])
+    outname = sys.argv[2]
+    if outname.endswith(".xyz"):
+        first, last, every = (list(map(int, sys.argv[3:6])) + [0, traj.nframes, 1][len(sys.argv[3:6]):])
+        with open(outname, "w") as outfile:
+            traj.write_xyz(outfile, range(first, min(last, traj.nframes), every))
+    else:
+        k = int(sys.argv[3]) if len(sys.argv) > 3 else -1
+        with open(outname, "w") as outfile:
+            traj.write_poscar(outfile, k)
+    print("{}: {} frames of {} atoms with {} beads".format(sys.argv[1], traj.nframes, traj.natoms, traj.nbeads))
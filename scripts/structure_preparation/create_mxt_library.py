@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# intention: pack a folder of mxt configuration files (e.g. conf/latt_300K/) into one library file for conf merge
+#
+# md_tian2 reads a *.mxtlib library once and draws the configurations from memory instead of opening
+# mxt_%08d.dat for every trajectory. Configuration i of the library is mxt_%08d.dat with number i,
+# so a run with the library draws the same configurations as a run with the folder.
+#
+# library layout (native byte order, no record markers):
+#   header: magic "MDTMXTLB", version, nconfs, natoms, nbeads, ntypes (int32)
+#   nconfs records: content of the second record of the mxt file (r, v, is_cart, is_fixed, idx, name, is_proj, simbox, isimbox)
+
+# use like: ./create_mxt_library.py <mxt folder> [<library file>]
+# example:  ./create_mxt_library.py conf/latt_300K conf/latt_300K.mxtlib
+#           md_tian.inp: conf merge 'conf/proj/' 1 'conf/latt_300K.mxtlib' 1000
+
+import os, sys, glob, struct
+
+MAGIC   = b"MDTMXTLB"
+VERSION = 1
+
+
+def read_record(infile, fname):
+    # one Fortran sequential record (4 byte markers)
+    head = infile.read(4)
+    if len(head) != 4:
+        sys.exit("{}: unexpected end of file".format(fname))
+    nbytes = struct.unpack("=i", head)[0]
+    data = infile.read(nbytes)
+    if len(data) != nbytes or infile.read(4) != head:
+        sys.exit("{}: broken record".format(fname))
+    return data
+
+
+def read_mxt(fname):
+    # returns ((natoms, nbeads, ntypes), content of the second record)
+    with open(fname, "rb") as infile:
+        sizes = read_record(infile, fname)
+        if len(sizes) != 12:
+            sys.exit("{} is not an mxt file".format(fname))
+        return struct.unpack("=3i", sizes), read_record(infile, fname)
+
+
+def create_library(fnames, outname):
+    sizes, first = read_mxt(fnames[0])
+    with open(outname + ".tmp", "wb") as outfile:
+        outfile.write(MAGIC + struct.pack("=5i", VERSION, len(fnames), *sizes))
+        outfile.write(first)
+        for fname in fnames[1:]:
+            this_sizes, data = read_mxt(fname)
+            if this_sizes != sizes or len(data) != len(first):
+                sys.exit("{}: natoms, nbeads, ntypes {} differ from {} of {}".format(fname, this_sizes, sizes, fnames[0]))
+            outfile.write(data)
+    os.replace(outname + ".tmp", outname)
+    return sizes
+
+
+if len(sys.argv) < 2:
+    sys.exit("use like: {} <mxt folder> [<library file>]".format(sys.argv[0]))
+
+folder  = sys.argv[1].rstrip("/")
+outname = sys.argv[2] if len(sys.argv) > 2 else folder + ".mxtlib"
+if not outname.endswith(".mxtlib"):
+    sys.exit("the library file name has to end on .mxtlib")
+
+# mxt_00000001.dat ... mxt_<n>.dat without gaps, conf merge draws the numbers 1 to n
+fnames = sorted(glob.glob(os.path.join(folder, "mxt_*.dat")))
+if not fnames:
+    sys.exit("no mxt_*.dat files in {}".format(folder))
+for i, fname in enumerate(fnames):
+    if os.path.basename(fname) != "mxt_%08d.dat" % (i+1):
+        sys.exit("expected {} instead of {}".format("mxt_%08d.dat" % (i+1), os.path.basename(fname)))
+
+natoms, nbeads, ntypes = create_library(fnames, outname)
+print("Packed {} configurations ({} atoms, {} beads, {} types) into {}".format(len(fnames), natoms, nbeads, ntypes, outname))
@@ -131,6 +131,9 @@ module constants
     character(len=*), parameter :: output_key_runner      = "runner"
     character(len=*), parameter :: output_key_is_adsorbed = "adsorption_status"
     character(len=*), parameter :: output_key_beads       = "beads"
+    character(len=*), parameter :: output_key_scatter_bin = "scatter_bin"
+    character(len=*), parameter :: output_key_energy_bin  = "energy_bin"
+    character(len=*), parameter :: output_key_traj_bin    = "traj_bin"
 
     integer, parameter :: output_id_xyz         = 1
     integer, parameter :: output_id_energy      = 2
@@ -143,6 +146,9 @@ module constants
     integer, parameter :: output_id_runner      = 9
     integer, parameter :: output_id_is_adsorbed = 10
     integer, parameter :: output_id_beads       = 11
+    integer, parameter :: output_id_scatter_bin = 12
+    integer, parameter :: output_id_energy_bin  = 13
+    integer, parameter :: output_id_traj_bin    = 14
 
     ! Conversion constants to program units
     !
@@ -25,11 +25,12 @@ module force
 
     use constants
     use universe_mod, only : universe, minimg_beads
+    use run_config,   only : simparams
 
-    use pes_lj_mod,   only : compute_lj, compute_simple_lj
-    use pes_emt_mod,  only : compute_emt
+    use pes_lj_mod,   only : compute_lj, compute_simple_lj, lj_cutoff
+    use pes_emt_mod,  only : compute_emt, emt_cutoff
     use pes_ho_mod,   only : compute_ho
-    use pes_rebo_mod, only : compute_rebo
+    use pes_rebo_mod, only : compute_rebo, rebo_cutoff
     use rpmd,         only : do_ring_polymer_step
     use pes_nene_mod, only : compute_nene
 
@@ -44,7 +45,8 @@ contains
         character(len=*), parameter   :: err = "Error in calc_force(): "
 
         real(dp) :: temp_distance(atoms%nbeads), temp_vector(3, atoms%nbeads)
-        integer :: i, j
+        integer :: i, j, jj, nentries
+        logical :: lfrozen
 
         atoms%f    = 0.0_dp
         atoms%a    = 0.0_dp
@@ -53,23 +55,39 @@ contains
         ! XXX remove for production
         if (atoms%nbeads > 1) call do_ring_polymer_step(atoms)
 
-        ! gather distance and vector information before calling energy subroutines
-        ! calculate only one half and then add to other half (with changed sign)
-        if (.not. allocated(atoms%distances)) then
-            allocate(atoms%distances(atoms%nbeads, atoms%natoms, atoms%natoms))
-            allocate(atoms%vectors(3, atoms%nbeads, atoms%natoms, atoms%natoms))
+        call update_neighbour_list(atoms)
+
+        ! with frozen_pairs, the entries of two frozen atoms are only filled after the neighbour
+        ! list changed, fz_atom is unset then (and the cached PES terms are dropped with it)
+        lfrozen = .false.
+        if (simparams%frozen_pairs) then
+            lfrozen = allocated(atoms%fz_atom)
+            if (.not. lfrozen) call reset_frozen_pairs(atoms)
         end if
 
-        atoms%distances = 0.0_dp
-        atoms%vectors   = 0.0_dp
+        ! gather distance and vector information of the neighbour list entries before calling energy subroutines
+        ! calculate only one half and then add to other half (with changed sign)
+        nentries = atoms%nl_first(atoms%natoms+1) - 1
+        if (allocated(atoms%nl_dist)) then
+            if (any(shape(atoms%nl_dist) /= [atoms%nbeads, nentries])) deallocate(atoms%nl_dist, atoms%nl_vec)
+        end if
+        if (.not. allocated(atoms%nl_dist)) then
+            allocate(atoms%nl_dist(atoms%nbeads, nentries))
+            allocate(atoms%nl_vec(3, atoms%nbeads, nentries))
+        end if
 
-        do j = 1, atoms%natoms-1
-            do i = j+1, atoms%natoms
+        do j = 1, atoms%natoms
+            do jj = atoms%nl_first(j), atoms%nl_first(j+1)-1
+                i = atoms%nl_list(jj)
+                if (i < j) cycle
+                if (lfrozen) then
+                    if (atoms%fz_atom(i) .and. atoms%fz_atom(j)) cycle
+                end if
                 call minimg_beads(atoms, i, j, temp_distance, temp_vector)
-                atoms%distances(:,i,j) = temp_distance
-                atoms%distances(:,j,i) = temp_distance
-                atoms%vectors(:,:,i,j) = -temp_vector
-                atoms%vectors(:,:,j,i) = +temp_vector
+                atoms%nl_dist(:,jj)                = temp_distance
+                atoms%nl_dist(:,atoms%nl_rev(jj))  = temp_distance
+                atoms%nl_vec(:,:,jj)               = +temp_vector
+                atoms%nl_vec(:,:,atoms%nl_rev(jj)) = -temp_vector
             end do
         end do
 
@@ -81,11 +99,231 @@ contains
         if (any(atoms%pes == pes_id_rebo))      call compute_rebo     (atoms, flag)
         if (any(atoms%pes == pes_id_nene))      call compute_nene     (atoms, flag)
 
+        ! forces on frozen atoms are not evaluated with frozen_pairs, the PES routines skip only parts of them
+        if (simparams%frozen_pairs) then
+            do i = 1, atoms%natoms
+                if (atoms%fz_atom(i)) atoms%f(:,:,i) = 0.0_dp
+            end do
+        end if
+
         if (flag == energy_and_force) call set_acceleration(atoms)
 
     end subroutine calc_force
 
 
+
+    subroutine reset_frozen_pairs(atoms)
+
+        ! Frozen atoms have all coordinates of all beads fixed. Their mutual distances stay
+        ! the same as long as the neighbour list does, so the energy terms that depend on
+        ! these distances only are computed once (fz_sigma, fz_pair, fz_lj) and kept.
+
+        type(universe), intent(inout) :: atoms
+
+        integer :: i
+
+        if (allocated(atoms%fz_atom))  deallocate(atoms%fz_atom)
+        if (allocated(atoms%fz_sigma)) deallocate(atoms%fz_sigma, atoms%fz_pair)
+        if (allocated(atoms%fz_lj))    deallocate(atoms%fz_lj)
+
+        allocate(atoms%fz_atom(atoms%natoms))
+        do i = 1, atoms%natoms
+            atoms%fz_atom(i) = all(atoms%is_fixed(:,:,i))
+        end do
+
+    end subroutine reset_frozen_pairs
+
+
+
+    subroutine update_neighbour_list(atoms)
+
+        ! Without the neighbour_list key every other atom is a neighbour. With it, an atom is a
+        ! neighbour if one of its beads is closer than the PES range plus skin to the same bead
+        ! of the other atom. The list stays valid until a bead has moved by more than half the skin.
+
+        type(universe), intent(inout) :: atoms
+
+        real(dp) :: rlist
+        integer  :: i, j, n
+
+        if (simparams%nl_skin == default_real) then
+
+            if (allocated(atoms%nl_first)) then
+                if (size(atoms%nl_first) == atoms%natoms+1) return
+                deallocate(atoms%nl_first, atoms%nl_list, atoms%nl_rev)
+            end if
+
+            allocate(atoms%nl_first(atoms%natoms+1), atoms%nl_list(atoms%natoms*(atoms%natoms-1)))
+            n = 0
+            do i = 1, atoms%natoms
+                atoms%nl_first(i) = n+1
+                do j = 1, atoms%natoms
+                    if (j == i) cycle
+                    n = n+1
+                    atoms%nl_list(n) = j
+                end do
+            end do
+            atoms%nl_first(atoms%natoms+1) = n+1
+            call set_reverse_entries(atoms)
+            if (allocated(atoms%fz_atom)) deallocate(atoms%fz_atom)
+            return
+
+        end if
+
+        if (allocated(atoms%nl_r)) then
+            if (all(shape(atoms%nl_r) == shape(atoms%r)) .and. all(atoms%nl_simbox == atoms%simbox)) then
+                if (maxval(sum((atoms%r - atoms%nl_r)**2, dim=1)) < (0.5_dp*simparams%nl_skin)**2) return
+            end if
+        end if
+
+        rlist = 0.0_dp
+        if (any(atoms%pes == pes_id_lj))   rlist = max(rlist, lj_cutoff())
+        if (any(atoms%pes == pes_id_emt))  rlist = max(rlist, emt_cutoff(atoms))
+        if (any(atoms%pes == pes_id_rebo)) rlist = max(rlist, rebo_cutoff(atoms))
+
+        call build_neighbour_list(atoms, rlist + simparams%nl_skin)
+
+    end subroutine update_neighbour_list
+
+
+
+    subroutine build_neighbour_list(atoms, rlist)
+
+        ! Linked cells on the bead centroids. The cells are at least rlist plus twice the
+        ! largest bead distance from a centroid wide, so the neighbours of an atom are found
+        ! in its own and the 26 surrounding cells. Directions with less than 3 cells are not split.
+
+        type(universe), intent(inout) :: atoms
+        real(dp), intent(in)          :: rlist
+
+        real(dp) :: centroid(3, atoms%natoms), frac(3), rcell, rbead
+        real(dp) :: temp_distance(atoms%nbeads), temp_vector(3, atoms%nbeads)
+        integer  :: ncell(3), cell(3, atoms%natoms), c(3), next(atoms%natoms), found(atoms%natoms)
+        integer  :: i, j, k, b, d, n, o1, o2, o3, nmax, nfound
+        integer, allocatable :: head(:,:,:), temp_list(:)
+
+        centroid = sum(atoms%r, dim=2) / atoms%nbeads
+
+        rbead = 0.0_dp
+        do i = 1, atoms%natoms
+            do b = 1, atoms%nbeads
+                rbead = max(rbead, norm2(atoms%r(:,b,i) - centroid(:,i)))
+            end do
+        end do
+        rcell = max(rlist + 2*rbead, tolerance)
+
+        ! distance of the lattice planes along cell vector d is 1/|isimbox(d,:)|,
+        ! larger cells than needed are fine, so their number is limited for sparse systems
+        nmax = max(3, 2*ceiling(atoms%natoms**(1.0_dp/3)))
+        do d = 1, 3
+            ncell(d) = int(min(1.0_dp / (norm2(atoms%isimbox(d,:)) * rcell), real(nmax, dp)))
+            if (ncell(d) < 3) ncell(d) = 1
+        end do
+
+        allocate(head(0:ncell(1)-1, 0:ncell(2)-1, 0:ncell(3)-1))
+        head = 0
+        do i = 1, atoms%natoms
+            frac = matmul(atoms%isimbox, centroid(:,i))
+            frac = frac - floor(frac)
+            cell(:,i) = min(int(frac*ncell), ncell-1)
+            next(i) = head(cell(1,i), cell(2,i), cell(3,i))
+            head(cell(1,i), cell(2,i), cell(3,i)) = i
+        end do
+
+        if (allocated(atoms%nl_first)) deallocate(atoms%nl_first, atoms%nl_list, atoms%nl_rev)
+        allocate(atoms%nl_first(atoms%natoms+1), atoms%nl_list(16*atoms%natoms))
+
+        n = 0
+        do i = 1, atoms%natoms
+
+            nfound = 0
+            do o3 = -min(1, ncell(3)-1), min(1, ncell(3)-1)
+                do o2 = -min(1, ncell(2)-1), min(1, ncell(2)-1)
+                    do o1 = -min(1, ncell(1)-1), min(1, ncell(1)-1)
+
+                        c = modulo(cell(:,i) + [o1, o2, o3], ncell)
+                        j = head(c(1), c(2), c(3))
+                        do while (j > 0)
+                            if (j /= i) then
+                                call minimg_beads(atoms, i, j, temp_distance, temp_vector)
+                                if (minval(temp_distance) < rlist) then
+                                    nfound = nfound + 1
+                                    found(nfound) = j
+                                end if
+                            end if
+                            j = next(j)
+                        end do
+
+                    end do
+                end do
+            end do
+
+            ! ascending order, as in the all-pairs loops
+            do k = 2, nfound
+                j = found(k)
+                d = k-1
+                do while (d > 0)
+                    if (found(d) < j) exit
+                    found(d+1) = found(d)
+                    d = d-1
+                end do
+                found(d+1) = j
+            end do
+
+            if (n + nfound > size(atoms%nl_list)) then
+                allocate(temp_list(max(2*size(atoms%nl_list), n + nfound)))
+                temp_list(1:n) = atoms%nl_list(1:n)
+                call move_alloc(temp_list, atoms%nl_list)
+            end if
+
+            atoms%nl_first(i) = n+1
+            atoms%nl_list(n+1:n+nfound) = found(1:nfound)
+            n = n + nfound
+
+        end do
+        atoms%nl_first(atoms%natoms+1) = n+1
+        call set_reverse_entries(atoms)
+        if (allocated(atoms%fz_atom)) deallocate(atoms%fz_atom)
+
+        if (allocated(atoms%nl_r)) deallocate(atoms%nl_r)
+        allocate(atoms%nl_r, source=atoms%r)
+        atoms%nl_simbox = atoms%simbox
+
+    end subroutine build_neighbour_list
+
+
+
+    subroutine set_reverse_entries(atoms)
+
+        ! nl_rev(ij) is the entry of atom i in the (ascending) list of its neighbour j
+
+        type(universe), intent(inout) :: atoms
+
+        integer :: i, j, ij, lo, hi, mid
+
+        allocate(atoms%nl_rev(atoms%nl_first(atoms%natoms+1)-1))
+
+        do i = 1, atoms%natoms
+            do ij = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                j  = atoms%nl_list(ij)
+                lo = atoms%nl_first(j)
+                hi = atoms%nl_first(j+1)-1
+                do while (lo < hi)
+                    mid = (lo+hi)/2
+                    if (atoms%nl_list(mid) < i) then
+                        lo = mid+1
+                    else
+                        hi = mid
+                    end if
+                end do
+                if (atoms%nl_list(lo) /= i) stop "Error in set_reverse_entries(): neighbour list not symmetric"
+                atoms%nl_rev(ij) = lo
+            end do
+        end do
+
+    end subroutine set_reverse_entries
+
+
     pure subroutine set_acceleration(atoms)
 
         type(universe), intent(inout) :: atoms
@@ -303,7 +303,7 @@ contains
 
     subroutine langevin_rpmd(atoms, i)
 
-        use rpmd,        only : cjk, build_cjk
+        use rpmd,        only : to_normal_modes, from_normal_modes
         use pes_emt_mod, only : dens
 
         type(universe), intent(inout) :: atoms
@@ -314,8 +314,6 @@ contains
         real(dp), dimension(atoms%nbeads)    :: c1, c2, gammak
         real(dp), dimension(3, atoms%nbeads) :: zeta, newP, atomP
 
-        if (.not. allocated(cjk)) call build_cjk(atoms%nbeads)
-
         if (atoms%is_proj(atoms%idx(i))) then
             betaN = 1.0_dp / (kB * simparams%Tproj * atoms%nbeads)
         else
@@ -323,14 +321,8 @@ contains
         end if
 
         ! Transform to normal mode space
-        newP = 0.0_dp
         atomP = calc_momentum_one(atoms, i)
-
-        do b = 1, atoms%nbeads
-            do k = 1, atoms%nBeads
-                newP(:,b) = newP(:,b) + atomP(:,k)*cjk(k,b)
-            end do
-        end do
+        call to_normal_modes(atomP, newP, atoms%nbeads, 1)
 
         ! other ideas
         !   apply gamma coeff to all but the centroid mode
@@ -383,14 +375,8 @@ contains
         end do
 
         ! Transform back to Cartesian space
-        atomP = 0.0_dp
-        do b = 1, atoms%nbeads
-            do k = 1, atoms%nbeads
-                where (.not. atoms%is_fixed(:,b,i))
-                    atomP(:,b) = atomP(:,b) + newP(:,k)*cjk(b,k)
-                end where
-            end do
-        end do
+        call from_normal_modes(newP, atomP, atoms%nbeads, 1)
+        where (atoms%is_fixed(:,:,i)) atomP = 0.0_dp
         atoms%v(:,:,i) = atomP/atoms%m(i)
 
     end subroutine langevin_rpmd
@@ -439,7 +425,7 @@ contains
     ! This subroutine implements Eqns. 27-29
     subroutine pile_thermostat(atoms, i)
 
-        use rpmd, only : cjk, build_cjk
+        use rpmd, only : to_normal_modes, from_normal_modes
 
         type(universe), intent(inout) :: atoms
         integer       , intent(in)    :: i
@@ -449,8 +435,6 @@ contains
         real(dp), dimension(atoms%nbeads)    :: c1, c2, gammak
         real(dp), dimension(3, atoms%nbeads) :: zeta, newP, atomP
 
-        if (.not. allocated(cjk)) call build_cjk(atoms%nbeads)
-
         if (atoms%is_proj(atoms%idx(i))) then
             betaN = 1.0_dp / (kB * simparams%Tproj * atoms%nbeads)
         else
@@ -458,14 +442,8 @@ contains
         end if
 
         ! Transform to normal mode space
-        newP = 0.0_dp
         atomP = calc_momentum_one(atoms, i)
-
-        do b = 1, atoms%nbeads
-            do k = 1, atoms%nBeads
-                newP(:,b) = newP(:,b) + atomP(:,k)*cjk(k,b)
-            end do
-        end do
+        call to_normal_modes(atomP, newP, atoms%nbeads, 1)
 
         ! generate gamma coefficients for all beads
         do k = 0, atoms%nbeads-1
@@ -489,14 +467,8 @@ contains
         end do
 
         ! Transform back to Cartesian space
-        atomP = 0.0_dp
-        do b = 1, atoms%nbeads
-            do k = 1, atoms%nbeads
-                where (.not. atoms%is_fixed(:,b,i))
-                    atomP(:,b) = atomP(:,b) + newP(:,k)*cjk(b,k)
-                end where
-            end do
-        end do
+        call from_normal_modes(newP, atomP, atoms%nbeads, 1)
+        where (atoms%is_fixed(:,:,i)) atomP = 0.0_dp
         atoms%v(:,:,i) = atomP/atoms%m(i)
 
     end subroutine pile_thermostat
@@ -1,7 +1,7 @@
 !############################################################################
 ! This routine is part of
 ! md_tian2 (Molecular Dynamics Tian Xia 2)
-! (c) 2014-2021 Daniel J. Auerbach, Svenja M. Janke, Marvin Kammler,
+! (c) 2014-2021 Daniel J. Auerbach, Svenja M. Janke, Marvin Kammler,
 !               Sascha Kandratsenka, Sebastian Wille
 ! Dynamics at Surfaces Department
 ! MPI for Biophysical Chemistry Goettingen, Germany
@@ -42,6 +42,19 @@ module md_init
     integer, parameter :: pes_unit = 38
     integer, parameter :: geo_unit = 55
 
+    ! packed configuration libraries (conf merge with *.mxtlib files), read once and kept in memory
+    ! header: magic, version, nconfs, natoms, nbeads, ntypes (int32), then nconfs records with the
+    ! content of the second mxt record (see read_mxt), written by scripts/structure_preparation/create_mxt_library.py
+    character(len=8), parameter :: mxt_library_magic   = "MDTMXTLB"
+    integer,          parameter :: mxt_library_version = 1
+
+    type mxt_library
+        character(len=max_string_length) :: fname = ""
+        type(universe), allocatable :: confs(:)
+    end type mxt_library
+
+    type(mxt_library) :: proj_library, slab_library
+
 contains
 
     subroutine simbox_init(atoms)
@@ -49,12 +62,13 @@ contains
         type(universe), intent(out) :: atoms
 
         character(len=:), allocatable :: input_file
+        character(len=max_string_length) :: buffer
         integer :: input_file_length, input_file_status
-        integer :: i
+        integer :: i, ios, worker_start, worker_ntrajs
 
         ! Read in name of input file
         if (command_argument_count() == 0) stop " I need an input file"
-        if (command_argument_count() .gt. 1) stop "Only one input file is allowed"
+        if (command_argument_count() /= 1 .and. command_argument_count() /= 3) stop "Only one input file is allowed"
 
         call get_command(length=input_file_length)
         allocate(character(input_file_length) :: input_file)
@@ -63,7 +77,18 @@ contains
 
 
         ! build the simparams object
-        call read_input_file(input_file)
+        if (command_argument_count() == 3) then
+            ! worker process started by run_workers(): md_tian2 <input file> <start> <ntrajs>
+            call get_command_argument(2, buffer)
+            read(buffer, *, iostat=ios) worker_start
+            if (ios /= 0) stop " Error by reading the first trajectory of the worker"
+            call get_command_argument(3, buffer)
+            read(buffer, *, iostat=ios) worker_ntrajs
+            if (ios /= 0) stop " Error by reading the number of trajectories of the worker"
+            call read_input_file(input_file, worker_start, worker_ntrajs)
+        else
+            call read_input_file(input_file)
+        end if
         call ensure_input_sanity()
 
         call read_geometry(atoms, simparams%confname_file)
@@ -79,6 +104,62 @@ contains
 
 
 
+    subroutine run_workers()
+
+        ! Runs the trajectories start ... start+ntrajs-1 in nworkers processes of this program,
+        ! each with its own universe and a contiguous part of the trajectories. The workers seed
+        ! the RNG per trajectory like a serial run, so every trajectory gives the same output.
+
+        character(len=*), parameter :: err = "Error in run_workers(): "
+
+        character(len=:), allocatable :: exe, input_file, cmd, pids
+        integer :: length, iworker, nworkers, start, ntrajs, stat
+
+        call get_command_argument(0, length=length)
+        allocate(character(length) :: exe)
+        call get_command_argument(0, exe)
+
+        call get_command_argument(1, length=length)
+        allocate(character(length) :: input_file)
+        call get_command_argument(1, input_file)
+
+        nworkers = min(simparams%nworkers, simparams%ntrajs)
+
+        ! sh: start all workers in the background and fail if one of them fails
+        cmd   = ""
+        pids  = ""
+        start = simparams%start
+        do iworker = 1, nworkers
+            ntrajs = simparams%ntrajs / nworkers
+            if (iworker <= mod(simparams%ntrajs, nworkers)) ntrajs = ntrajs + 1
+
+            cmd  = cmd // "'" // exe // "' '" // input_file // "' " // str(start) // " " // str(ntrajs) &
+                // " & p" // str(iworker) // "=$!; "
+            pids = pids // " $p" // str(iworker)
+
+            start = start + ntrajs
+        end do
+        cmd = cmd // "s=0; for p in" // pids // "; do wait $p || s=1; done; exit $s"
+
+        print *, "Running", simparams%ntrajs, "trajectories in", nworkers, "worker processes"
+
+        call execute_command_line(cmd, exitstat=stat)
+        if (stat /= 0) stop err // "a worker process failed"
+
+    contains
+
+        function str(i)
+            integer, intent(in) :: i
+            character(len=:), allocatable :: str
+            character(len=12) :: buffer
+            write(buffer, '(i0)') i
+            str = trim(buffer)
+        end function str
+
+    end subroutine run_workers
+
+
+
 
     subroutine read_pes(atoms)
 
@@ -173,9 +254,12 @@ contains
             case ("poscar")
                 call read_poscar(atoms, infile)
 
-            case ("mxt", "merge")
+            case ("mxt")
                 call read_mxt(atoms, infile)
 
+            case ("merge")
+                call read_merge_conf(atoms, infile, slab_library, simparams%iconf)
+
             case default
                 stop "Error: conf keyword unknown"
 
@@ -183,7 +267,7 @@ contains
 
         ! merge projectile file if present
         if (simparams%confname == "merge") then
-            call read_mxt(proj, simparams%merge_proj_file)
+            call read_merge_conf(proj, simparams%merge_proj_file, proj_library, simparams%merge_proj_iconf)
             call merge_universes(atoms, proj)
         end if
 
@@ -347,8 +431,7 @@ contains
         character(len=*), intent(in) :: infile
 
         character(len=*), parameter  :: err = "Error in read_mxt(): "
-        integer :: natoms, nbeads, ntypes, ios, i
-        integer, allocatable :: atom_list(:)
+        integer :: natoms, nbeads, ntypes, ios
 
         if (.not. file_exists(infile)) then
             print *, err, "file ", infile, " does not exist"
@@ -367,6 +450,21 @@ contains
 
         close(geo_unit)
 
+        call set_mxt_properties(atoms)
+
+    end subroutine read_mxt
+
+
+
+    subroutine set_mxt_properties(atoms)
+
+        ! degrees of freedom, masses and propagation algorithms of a configuration read from mxt
+
+        type(universe), intent(inout) :: atoms
+
+        integer :: i
+        integer, allocatable :: atom_list(:)
+
         allocate(atom_list(atoms%ntypes))
         atom_list = 0
         !print *, atoms%ntypes
@@ -378,7 +476,78 @@ contains
         call set_atomic_masses(atoms, atom_list)
         call set_prop_algos(atoms)
 
-    end subroutine read_mxt
+    end subroutine set_mxt_properties
+
+
+
+    subroutine read_mxt_library(lib, infile)
+
+        ! reads all configurations of a packed library, unless lib already holds infile
+
+        type(mxt_library), intent(inout) :: lib
+        character(len=*), intent(in)     :: infile
+
+        character(len=*), parameter  :: err = "Error in read_mxt_library(): "
+        character(len=8) :: magic
+        integer(int32)   :: version, nconfs, natoms, nbeads, ntypes
+        integer :: ios, i
+
+        if (lib%fname == infile) return
+
+        if (.not. file_exists(infile)) then
+            print *, err, "file ", trim(infile), " does not exist"
+            stop
+        end if
+
+        open(geo_unit, file=infile, access="stream", form="unformatted", status="old", action="read", iostat=ios)
+        if (ios /= 0) stop err // "cannot open file"
+
+        read(geo_unit, iostat=ios) magic, version, nconfs, natoms, nbeads, ntypes
+        if (ios /= 0 .or. magic /= mxt_library_magic) stop err // "not a configuration library"
+        if (version /= mxt_library_version) stop err // "unsupported library version"
+
+        if (allocated(lib%confs)) deallocate(lib%confs)
+        allocate(lib%confs(nconfs))
+
+        do i = 1, nconfs
+            lib%confs(i) = new_atoms(nbeads, natoms, ntypes)
+            read(geo_unit, iostat=ios) lib%confs(i)%r, lib%confs(i)%v, lib%confs(i)%is_cart, lib%confs(i)%is_fixed, &
+                lib%confs(i)%idx, lib%confs(i)%name, lib%confs(i)%is_proj, lib%confs(i)%simbox, lib%confs(i)%isimbox
+            if (ios /= 0) stop err // "cannot read configuration"
+            call set_mxt_properties(lib%confs(i))
+        end do
+
+        close(geo_unit)
+
+        lib%fname = infile
+
+    end subroutine read_mxt_library
+
+
+
+    subroutine read_merge_conf(atoms, infile, lib, iconf)
+
+        ! conf merge geometry: mxt file or configuration iconf of a packed library
+
+        type(universe), intent(out)      :: atoms
+        character(len=*), intent(in)     :: infile
+        type(mxt_library), intent(inout) :: lib
+        integer, intent(in)              :: iconf
+
+        character(len=*), parameter  :: err = "Error in read_merge_conf(): "
+
+        if (is_mxt_library(infile)) then
+            call read_mxt_library(lib, infile)
+            if (iconf > size(lib%confs)) then
+                print *, err, "configuration", iconf, "requested, but ", trim(infile), " holds", size(lib%confs)
+                stop
+            end if
+            atoms = lib%confs(iconf)
+        else
+            call read_mxt(atoms, infile)
+        end if
+
+    end subroutine read_merge_conf
 
 
 
@@ -429,7 +598,16 @@ contains
 
             if (simparams%confname == "merge" .and. .not. (allocated(simparams%mass_l) .and. allocated(simparams%mass_p))) &
                 stop err // "both projectile and slab have to be present in the input file to use <conf merge>"
-            if (simparams%nthreads /= 1) print *, warn, "only one thread supported for md"
+            if (simparams%nthreads /= 1) print *, warn, "only EMT and REBO use threads in md, use nworkers to run trajectories in parallel"
+
+            ! worker processes share the output folders, formats numbered per run would collide
+            if (simparams%nworkers > 1 .and. (any(simparams%output_type == output_id_poscar) .or. &
+                any(simparams%output_type == output_id_mxt) .or. any(simparams%output_type == output_id_runner))) &
+                stop err // "poscar, mxt and runner output are not available with nworkers"
+
+            if (simparams%rpmd_fft .and. simparams%force_beads /= default_int .and. &
+                iand(simparams%force_beads, simparams%force_beads-1) /= 0) &
+                stop err // "rpmd_fft needs a power of two number of beads"
 
             if (simparams%force_beads /= default_int .and. &
                 simparams%Tsurf == default_real .and. simparams%Tproj == default_real) &
@@ -467,6 +645,7 @@ contains
             if (simparams%evasp == default_real) stop err // "reference energy evasp missing"
             if (simparams%start == default_int) stop err // "fit number not set"
             if (simparams%fit_training_folder == simparams%fit_validation_folder) stop err // "cannot use the same folder for training and validation"
+            if (simparams%frozen_pairs) stop err // "frozen_pairs cannot be used for fits, the parameters change"
 
         else
             print *, err // "unknown run command", simparams%run
@@ -489,6 +668,7 @@ contains
         if (simparams%force_beads /= default_int .and. atoms%nbeads /= 1) stop err // "Cannot force any beads when system already contains multiple beads."
         if (atoms%nbeads > 1 .and. any(atoms%is_proj) .and. simparams%Tproj == default_real) stop err // "RPMD requires projectile temperature"
         if (atoms%nbeads > 1 .and. any(.not. atoms%is_proj) .and. simparams%Tsurf == default_real) stop err // "RPMD requires surface temperature"
+        if (simparams%rpmd_fft .and. iand(atoms%nbeads, atoms%nbeads-1) /= 0) stop err // "rpmd_fft needs a power of two number of beads"
 
     end subroutine ensure_geometry_sanity
 
@@ -906,7 +1086,10 @@ contains
             ! renew simparams projectile geometry file
             mxt_idx = index(simparams%merge_proj_file, "mxt_")
             dat_idx = index(simparams%merge_proj_file, ".dat")
-            if (mxt_idx /= 0 .and. dat_idx /= 0 .and. dat_idx == mxt_idx+12) then
+            if (is_mxt_library(simparams%merge_proj_file)) then
+                call random_number(rnd)
+                simparams%merge_proj_iconf = int(rnd*simparams%merge_proj_nconfs)+1
+            else if (mxt_idx /= 0 .and. dat_idx /= 0 .and. dat_idx == mxt_idx+12) then
                 call random_number(rnd)
                 new_conf = int(rnd*simparams%merge_proj_nconfs)+1
                 write(dummy_merge_proj_file, '(a, i8.8, a)') simparams%merge_proj_file(:mxt_idx+3), new_conf, ".dat"
@@ -918,7 +1101,10 @@ contains
             ! renew simparams slab geometry file
             mxt_idx = index(simparams%confname_file, "mxt_")
             dat_idx = index(simparams%confname_file, ".dat")
-            if (mxt_idx /= 0 .and. dat_idx /= 0 .and. dat_idx == mxt_idx+12) then
+            if (is_mxt_library(simparams%confname_file)) then
+                call random_number(rnd)
+                simparams%iconf = int(rnd*simparams%nconfs)+1
+            else if (mxt_idx /= 0 .and. dat_idx /= 0 .and. dat_idx == mxt_idx+12) then
                 call random_number(rnd)
                 new_conf = int(rnd*simparams%nconfs)+1
                 write(dummy_confname_file, '(a, i8.8, a)') simparams%confname_file(:mxt_idx+3), new_conf, ".dat"
@@ -927,9 +1113,9 @@ contains
                 print *, err, "lattice confname_file has wrong format. It needs to end on /mxt_%08d.dat"; stop
             end if
 
-            ! read the geometry files and combine
-            call read_mxt(proj, simparams%merge_proj_file)
-            call read_mxt(slab, simparams%confname_file)
+            ! read the geometry files (or take them from the libraries) and combine
+            call read_merge_conf(proj, simparams%merge_proj_file, proj_library, simparams%merge_proj_iconf)
+            call read_merge_conf(slab, simparams%confname_file, slab_library, simparams%iconf)
 
             call merge_universes(slab, proj)
             slab%pes = atoms%pes
@@ -1,7 +1,7 @@
 !############################################################################
 ! This routine is part of
 ! md_tian2 (Molecular Dynamics Tian Xia 2)
-! (c) 2014-2021 Daniel J. Auerbach, Svenja M. Janke, Marvin Kammler,
+! (c) 2014-2021 Daniel J. Auerbach, Svenja M. Janke, Marvin Kammler,
 !               Sascha Kandratsenka, Sebastian Wille
 ! Dynamics at Surfaces Department
 ! MPI for Biophysical Chemistry Goettingen, Germany
@@ -31,14 +31,16 @@ program md_tian2
     use rpmd
     use universe_mod
     use fit
-    use output_mod, only : output, write_header
+    use output_mod, only : output, write_header, close_runner_output
     use trajectory_info
     use geometry_opt
     use useful_things, only : rnd_seed
+    use pes_rebo_mod,  only : print_rebo_timing
 
     implicit none
 
     integer :: itraj, istep, i, seed
+    logical :: lscatter
     real(dp) :: tmp
     type(universe) :: atoms
 
@@ -46,7 +48,7 @@ program md_tian2
     real(dp) :: vec(3)
 
 
-    call write_header() ! write program header at the beginning
+    if (command_argument_count() /= 3) call write_header() ! write program header at the beginning, once for worker processes
 
     call simbox_init(atoms) ! set up the simulation box
 
@@ -63,61 +65,77 @@ program md_tian2
 
         case ('md')
 
-            do itraj = simparams%start, simparams%start+simparams%ntrajs-1
+            ! text (mxt_fin) or binary scatter output, both need the initial state and the exit conditions
+            lscatter = any(simparams%output_type == output_id_scatter) .or. any(simparams%output_type == output_id_scatter_bin)
 
+            ! independent trajectories in several processes of md_tian2, see run_workers()
+            if (simparams%nworkers > 1) then
+                call run_workers()
+            else
 
-                call calc_force(atoms, energy_and_force)
-                if (.not. allocated(cents)) allocate(cents(3, atoms%natoms))
+                do itraj = simparams%start, simparams%start+simparams%ntrajs-1
 
-                if (any(simparams%output_type == output_id_scatter)) then
-                    call output(atoms, itraj, -1, "scatter_initial")
-                end if
 
-                print *, "Traj ", itraj, " with Eref:", atoms%epot
+                    call calc_force(atoms, energy_and_force)
+                    if (.not. allocated(cents)) allocate(cents(3, atoms%natoms))
 
-                do istep = 1, simparams%nsteps
+                    if (lscatter) then
+                        call output(atoms, itraj, -1, "scatter_initial")
+                    end if
 
-                    ! core propagation
-                    call propagate_1(atoms)
-                    call calc_force(atoms, energy_and_force)
-                    call propagate_2(atoms)
+                    print *, "Traj ", itraj, " with Eref:", atoms%epot
 
-                    ! output and exit conditionns
-                    if (any(mod(istep, simparams%output_interval) == 0)) call output(atoms, itraj, istep)
+                    do istep = 1, simparams%nsteps
 
-                    if ( all(atoms%r(3,:,1) > simparams%proj_ul) .and. atoms%is_proj(atoms%idx(1)) & ! check for projectile upper limit
-                        .and. any(simparams%output_type == output_id_scatter)) exit
+                        ! core propagation
+                        call propagate_1(atoms)
+                        call calc_force(atoms, energy_and_force)
+                        call propagate_2(atoms)
 
-                    if ( all(atoms%r(3,:,1) < simparams%proj_ll) .and. atoms%is_proj(atoms%idx(1)) & ! check for projectile lower limit
-                        .and. any(simparams%output_type == output_id_scatter)) exit
+                        ! output and exit conditionns
+                        if (any(mod(istep, simparams%output_interval) == 0)) call output(atoms, itraj, istep)
 
-                    ! record bounces, lowest position, etc.
-                    call collect_trajectory_characteristics(atoms, itraj, istep)
+                        if ( all(atoms%r(3,:,1) > simparams%proj_ul) .and. atoms%is_proj(atoms%idx(1)) & ! check for projectile upper limit
+                            .and. lscatter) exit
 
+                        if ( all(atoms%r(3,:,1) < simparams%proj_ll) .and. atoms%is_proj(atoms%idx(1)) & ! check for projectile lower limit
+                            .and. lscatter) exit
+
+                        ! record bounces, lowest position, etc.
+                        call collect_trajectory_characteristics(atoms, itraj, istep)
 
-                end do
 
-                call collect_trajectory_characteristics(atoms, itraj, istep)
+                    end do
 
-                close(78)
+                    call collect_trajectory_characteristics(atoms, itraj, istep)
 
-                if (any(simparams%output_type == output_id_scatter)) call output(atoms, itraj, istep, "scatter_final")
+                    close(78)
 
-                if (itraj < simparams%start+simparams%ntrajs-1) then
+                    if (lscatter) call output(atoms, itraj, istep, "scatter_final")
 
-                    seed = itraj + 1
-                    call rnd_seed(simparams%nran,seed)
+                    if (itraj < simparams%start+simparams%ntrajs-1) then
 
-                    call prepare_next_traj(atoms)
+                        seed = itraj + 1
+                        call rnd_seed(simparams%nran,seed)
 
-                end if
+                        call prepare_next_traj(atoms)
 
-            end do
+                    end if
+
+                end do
+
+            end if
 
         case default
             call abort
 
     end select
 
+    ! structures left in the block of the runner_buffer output
+    call close_runner_output()
+
+    ! time per REBO bond of the run ("debug rebo")
+    call print_rebo_timing()
+
 
 end program md_tian2
@@ -41,6 +41,47 @@ module output_mod
     integer :: out_id_poscar       = 0
     integer :: out_id_mxt          = 0
 
+    ! binary scatter records (output scatter_bin): one append-only file traj/scatter%08d.bin per run,
+    ! a header (magic, version, record size in bytes) followed by one fixed-size record per trajectory,
+    ! see scripts/analysis/scatter_bin.py
+    character(len=8), parameter :: scatter_bin_magic   = "MDTSCAT "
+    integer(int32),   parameter :: scatter_bin_version = 1
+    integer(int32),   parameter :: scatter_bin_bytes   = 4*4 + 31*8
+
+    ! binary energy records (output energy_bin): one file energy/traj_%08d.bin per trajectory,
+    ! the same header followed by the 21 columns of output_nrg (real64) per written step,
+    ! see scripts/analysis/energy_bin.py
+    character(len=8), parameter :: energy_bin_magic    = "MDTENRG "
+    integer(int32),   parameter :: energy_bin_version  = 1
+    integer(int32),   parameter :: energy_bin_bytes    = 21*8
+    integer :: energy_bin_traj = -1 ! trajectory of the last energy_bin record, a new trajectory replaces its file
+
+    ! binary trajectory frames (output traj_bin): one file traj_bin/traj_%08d.bin per trajectory,
+    ! a header (magic, version, header and frame size in bytes, natoms, nbeads, ntypes, bytes
+    ! per real, simbox, names, idx, fixed flags) followed by fixed-size frames (time, step,
+    ! cartesian r and v), so frame k starts at header + k*frame bytes, see scripts/analysis/traj_bin.py
+    character(len=8), parameter :: traj_bin_magic      = "MDTTRAJ "
+    integer(int32),   parameter :: traj_bin_version    = 1
+    integer :: traj_bin_traj = -1
+
+    ! runner output: with runner_buffer, runner/input.data stays open (runner_unit) and the
+    ! structures are collected here and written runner_block at a time, see close_runner_output;
+    ! with runner_novelty, structures close to the last written one (runner_last_e, _f) are skipped
+    integer, parameter :: runner_unit = 88
+    logical :: runner_open = .false.
+    integer :: runner_nbuf = 0
+    real(dp),         allocatable :: runner_box(:,:,:), runner_r(:,:,:), runner_f(:,:,:), runner_e(:)
+    character(len=3), allocatable :: runner_name(:,:)
+    real(dp),         allocatable :: runner_last_f(:,:)
+    real(dp) :: runner_last_e
+
+    ! projectile state written by output_scatter
+    type scatter_state
+        real(dp) :: ekin_p, ekin_l, epot, etotal, r(3), v(3), polar, azi
+    end type scatter_state
+
+    type(scatter_state) :: scatter_i ! kept until the trajectory has finished
+
     ! nene pes
     integer :: total_count_extrapolation_warnings = 0
 
@@ -58,7 +99,8 @@ contains
 
         ! use only for start of md trajectory
         if (present(flag)) then
-            call output_scatter(atoms, itraj, istep, flag)
+            call output_scatter(atoms, itraj, istep, flag, &
+                any(simparams%output_type == output_id_scatter), any(simparams%output_type == output_id_scatter_bin))
         end if
 
         if (simparams%loutput) then ! this should help to reduce if conditions per step
@@ -74,6 +116,12 @@ contains
                         case (output_id_energy)
                             call output_nrg(atoms, itraj, istep)
 
+                        case (output_id_energy_bin)
+                            call output_nrg_bin(atoms, itraj, istep)
+
+                        case (output_id_traj_bin)
+                            call output_traj_bin(atoms, itraj, istep)
+
                         case (output_id_poscar)
                             call output_poscar(atoms)
                             out_id_poscar = out_id_poscar + 1
@@ -85,7 +133,7 @@ contains
                             call output_mxt(atoms)
                             out_id_mxt = out_id_mxt + 1
 
-                        case (output_id_scatter)
+                        case (output_id_scatter, output_id_scatter_bin)
                             ! pass
 
                         case (output_id_is_adsorbed)
@@ -169,16 +217,12 @@ contains
 
     subroutine output_nrg(atoms, itraj, istep)
 
-        use rpmd
-
         type(universe), intent(in) :: atoms
         integer, intent(in)        :: itraj, istep
 
         character(len=8)                 :: traj_id
         character(len=max_string_length) :: fname
         integer  :: i
-        real(dp) :: atom_temp, bead_temp, rgyr_p, rgyr_l , a_ekin_p, a_ekin_l, &
-            q_ekin_l, q_ekin_p, b_ekin_p, b_ekin_l, atom_epot, bead_epot, etotal
 
 
         if (.not. dir_exists('energy')) call execute_command_line('mkdir energy')
@@ -199,6 +243,120 @@ contains
             call open_for_append(out_unit,fname)
         end if
 
+        write(out_unit, '(21e17.8e2)') nrg_columns(atoms, istep)
+
+        close(out_unit)
+
+    end subroutine output_nrg
+
+
+
+    subroutine output_nrg_bin(atoms, itraj, istep)
+
+        ! appends the columns of output_nrg to energy/traj_%08d.bin
+
+        type(universe), intent(in) :: atoms
+        integer, intent(in)        :: itraj, istep
+
+        character(len=max_string_length) :: fname
+
+        if (.not. dir_exists('energy')) call execute_command_line('mkdir energy')
+
+        write(fname, '(a12, i8.8, a4)') 'energy/traj_', itraj, '.bin'
+
+        if (itraj /= energy_bin_traj) then
+            open(out_unit, file=fname, access="stream", form="unformatted", status="replace", action="write")
+            write(out_unit) energy_bin_magic, energy_bin_version, energy_bin_bytes
+            energy_bin_traj = itraj
+        else
+            open(out_unit, file=fname, access="stream", form="unformatted", status="old", position="append", action="write")
+        end if
+
+        write(out_unit) nrg_columns(atoms, istep)
+
+        close(out_unit)
+
+    end subroutine output_nrg_bin
+
+
+
+    subroutine output_traj_bin(atoms, itraj, istep)
+
+        ! appends a frame to traj_bin/traj_%08d.bin, all beads with the beads keyword, otherwise
+        ! the centroids; single precision unless traj_bin_double is set
+
+        use rpmd, only : calc_centroid_velocities, calc_centroid_is_fixed
+
+        type(universe), intent(in) :: atoms
+        integer, intent(in)        :: itraj, istep
+
+        character(len=max_string_length) :: fname
+        real(dp), allocatable :: r(:,:,:), v(:,:,:)
+        integer  :: i, b, nbeads, nreal, header_bytes, frame_bytes
+
+        if (.not. dir_exists('traj_bin')) call execute_command_line('mkdir traj_bin')
+
+        write(fname, '(a14, i8.8, a4)') 'traj_bin/traj_', itraj, '.bin'
+
+        nbeads = 1
+        if (simparams%lbead_output_format) nbeads = atoms%nbeads
+        nreal = 4
+        if (simparams%traj_bin_double) nreal = 8
+
+        allocate(r(3, nbeads, atoms%natoms), v(3, nbeads, atoms%natoms))
+        if (nbeads == atoms%nbeads) then
+            r = atoms%r
+            v = atoms%v
+        else
+            r(:,1,:) = sum(atoms%r, dim=2)/atoms%nbeads
+            v(:,1,:) = calc_centroid_velocities(atoms)
+        end if
+        if (.not. atoms%is_cart) then
+            do i = 1, atoms%natoms
+                do b = 1, nbeads
+                    r(:,b,i) = matmul(atoms%simbox, r(:,b,i))
+                end do
+            end do
+        end if
+
+        if (itraj /= traj_bin_traj) then
+            header_bytes = 8 + 7*4 + 9*8 + 3*atoms%ntypes + 4*atoms%natoms + 3*4*atoms%natoms
+            frame_bytes  = 2*8 + 2*3*nbeads*atoms%natoms*nreal
+            open(out_unit, file=fname, access="stream", form="unformatted", status="replace", action="write")
+            write(out_unit) traj_bin_magic, traj_bin_version, int(header_bytes, int32), int(frame_bytes, int32), &
+                int([atoms%natoms, nbeads, atoms%ntypes, nreal], int32), atoms%simbox, atoms%name, &
+                int(atoms%idx, int32), int(merge(1, 0, calc_centroid_is_fixed(atoms)), int32)
+            traj_bin_traj = itraj
+        else
+            open(out_unit, file=fname, access="stream", form="unformatted", status="old", position="append", action="write")
+        end if
+
+        if (nreal == 4) then
+            write(out_unit) istep*simparams%step, int(istep, int64), real(r, real32), real(v, real32)
+        else
+            write(out_unit) istep*simparams%step, int(istep, int64), r, v
+        end if
+
+        close(out_unit)
+
+    end subroutine output_traj_bin
+
+
+
+    function nrg_columns(atoms, istep) result(cols)
+
+        ! time, temperatures, radii of gyration, kinetic and potential energies, force sum and
+        ! centroid position and velocity of the first atom, see the header in output_nrg
+
+        use rpmd
+
+        type(universe), intent(in) :: atoms
+        integer, intent(in)        :: istep
+        real(dp)                   :: cols(21)
+
+        real(dp) :: atom_temp, bead_temp, rgyr_p, rgyr_l , a_ekin_p, a_ekin_l, &
+            q_ekin_l, q_ekin_p, b_ekin_p, b_ekin_l, atom_epot, bead_epot, etotal
+
         atom_temp = calc_atom_temperature(atoms)
         bead_temp = calc_bead_temperature(atoms)
 
@@ -219,14 +377,12 @@ contains
 
 
 
-        write(out_unit, '(21e17.8e2)') istep*simparams%step, atom_temp, bead_temp, &
+        cols = [istep*simparams%step, atom_temp, bead_temp, &
             rgyr_p, rgyr_l, a_ekin_p, a_ekin_l, b_ekin_p, b_ekin_l, q_ekin_p, q_ekin_l, &
             atom_epot, bead_epot, etotal, sum(atoms%f), sum(atoms%r(:,:,1), dim=2)/atoms%nbeads, &
-            sum(atoms%v(:,:,1), dim=2)/atoms%nbeads
+            sum(atoms%v(:,:,1), dim=2)/atoms%nbeads]
 
-        close(out_unit)
-
-    end subroutine output_nrg
+    end function nrg_columns
 
 
     subroutine output_poscar(atoms)
@@ -549,64 +705,153 @@ contains
 
     subroutine output_runner(atoms, itraj, istep)
 
+        ! centroid structure with energy and forces in the RuNNer input.data format (runner/input.data),
+        ! written at once or, with runner_buffer, collected and written in blocks
+
         type(universe), intent(in)          :: atoms
         integer, intent(in)                 :: itraj, istep
 
-        integer :: zero_step
-
-        character(len=max_string_length)    :: fname
-
-        integer                             :: time_vals(8), noccurrences(atoms%ntypes)
-        integer                             :: j, k
         real(dp)                            :: cents_r(3, atoms%natoms) ! for the beads to get center of mass for positions
         real(dp)                            :: cents_f(3, atoms%natoms) ! for the beads to get center of mass for forces
+        real(dp)                            :: epot
+        integer                             :: j, nblock
 
-        real(dp)                            :: dummy_ce, epot
+        epot = sum(atoms%epot)/atoms%nbeads
+        cents_f = calc_centroid_forces(atoms)
+
+        ! subsampling: skip structures whose energy per atom and forces barely changed
+        if (simparams%runner_novelty_e /= default_real) then
+            if (allocated(runner_last_f)) then
+                if (all(shape(runner_last_f) == shape(cents_f))) then
+                    if (abs(epot - runner_last_e)/atoms%natoms <= simparams%runner_novelty_e .and. &
+                        maxval(abs(cents_f - runner_last_f)) <= simparams%runner_novelty_f) return
+                end if
+                deallocate(runner_last_f)
+            end if
+            runner_last_e = epot
+            allocate(runner_last_f, source=cents_f)
+        end if
 
-        character(len=36)   :: lattice_format = '(A7, X, F11.8, X, F11.8, X, F11.8)'
-        character(len=93)   :: atom_format = '(A4, X, F16.9, X, F16.9, X, F16.9, X, A3, X, F11.8, X, F11.8, X, F11.8, X, F11.8, X, F11.8)'
-        character(len=20)   :: ce_format = '(A6 ,X , F11.8)'
+        cents_r = calc_centroid_positions(atoms)
 
+        if (simparams%runner_block == default_int) then
+            call open_runner_output()
+            call write_runner_structure(runner_unit, atoms%simbox, cents_r, &
+                [(atoms%name(atoms%idx(j)), j = 1, atoms%natoms)], cents_f, epot)
+            close(runner_unit)
+            runner_open = .false.
+            return
+        end if
 
-        zero_step = 0 ! write the initial structure to step 0 file
-        dummy_ce = 0.0_dp
+        ! a new system size starts a new block
+        if (allocated(runner_r)) then
+            if (size(runner_r, dim=2) /= atoms%natoms) call flush_runner_output()
+            if (size(runner_r, dim=2) /= atoms%natoms) deallocate(runner_box, runner_r, runner_f, runner_e, runner_name)
+        end if
+        if (.not. allocated(runner_r)) then
+            nblock = simparams%runner_block
+            allocate(runner_box(3, 3, nblock), runner_r(3, atoms%natoms, nblock), runner_f(3, atoms%natoms, nblock), &
+                     runner_e(nblock), runner_name(atoms%natoms, nblock))
+        end if
+
+        runner_nbuf = runner_nbuf + 1
+        runner_box(:,:,runner_nbuf) = atoms%simbox
+        runner_r(:,:,runner_nbuf)   = cents_r
+        runner_f(:,:,runner_nbuf)   = cents_f
+        runner_e(runner_nbuf)       = epot
+        runner_name(:,runner_nbuf)  = [(atoms%name(atoms%idx(j)), j = 1, atoms%natoms)]
+
+        if (runner_nbuf == size(runner_e)) call flush_runner_output()
+
+    end subroutine output_runner
+
+
+
+    subroutine open_runner_output()
+
+        ! opens runner/input.data, a new file with the comment lines at the first call of a run
+
+        integer :: time_vals(8)
+        character(len=max_string_length) :: fname
+
+        if (runner_open) return
 
         if (.not. dir_exists('runner')) call execute_command_line('mkdir runner')
 
         fname = 'runner/input.data'
 
         if (overwrite_runner) then
-            call open_for_write(out_unit, fname)
+            call open_for_write(runner_unit, fname)
             ! first comment line with program name
-            write(out_unit, '(a)') '# This file was generated by MDT2.'
+            write(runner_unit, '(a)') '# This file was generated by MDT2.'
             ! second comment line with date and time
             call date_and_time(values=time_vals)
-            write(out_unit, '(a,i4, a, i2.2, a, i2.2, a, i2.2, a, i2.2)') &
+            write(runner_unit, '(a,i4, a, i2.2, a, i2.2, a, i2.2, a, i2.2)') &
             "# ", time_vals(1), "-", time_vals(2), "-",time_vals(3), " - ",time_vals(5), ".",time_vals(6)
             overwrite_runner = .false.
         else
-            call open_for_append(out_unit,fname)
+            call open_for_append(runner_unit, fname)
         end if
+        runner_open = .true.
 
-        epot = sum(atoms%epot)/atoms%nbeads
-        cents_r = calc_centroid_positions(atoms)
-        cents_f = calc_centroid_forces(atoms)
+    end subroutine open_runner_output
 
-        write (out_unit,'(A5)') 'begin'
-        do k = 1,3
-            write(out_unit,lattice_format) 'lattice', atoms%simbox(:,k) * ang2bohr
-        end do
-        do j = 1,atoms%natoms
-            write (out_unit,atom_format) 'atom', cents_r(:,j) * ang2bohr, atoms%name(atoms%idx(j)), dummy_ce, dummy_ce, &
-            cents_f(:,j) * evang2habohr
+
+
+    subroutine write_runner_structure(unit, simbox, r, names, f, epot)
+
+        ! one begin ... end block; positions and the cell in bohr, forces in Ha/bohr, energy in Ha
+
+        integer, intent(in)          :: unit
+        real(dp), intent(in)         :: simbox(3,3), r(:,:), f(:,:), epot
+        character(len=3), intent(in) :: names(:)
+
+        character(len=*), parameter :: lattice_format = '(A7, X, F11.8, X, F11.8, X, F11.8)'
+        character(len=*), parameter :: atom_format = '(A4, X, F16.9, X, F16.9, X, F16.9, X, A3, X, F11.8, X, F11.8, X, F11.8, X, F11.8, X, F11.8)'
+        character(len=*), parameter :: ce_format = '(A6 ,X , F11.8)'
+
+        real(dp), parameter :: dummy_ce = 0.0_dp
+        integer :: j, k
+
+        write (unit,'(A5)') 'begin'
+        write (unit,lattice_format) ('lattice', simbox(:,k) * ang2bohr, k = 1, 3)
+        write (unit,atom_format) ('atom', r(:,j) * ang2bohr, names(j), dummy_ce, dummy_ce, &
+            f(:,j) * evang2habohr, j = 1, size(names))
+        write (unit,ce_format) 'charge', dummy_ce
+        write (unit,ce_format) 'energy', epot * ev2ha
+        write (unit,'(A3)') 'end'
+
+    end subroutine write_runner_structure
+
+
+
+    subroutine flush_runner_output()
+
+        integer :: i
+
+        if (runner_nbuf == 0) return
+
+        call open_runner_output()
+        do i = 1, runner_nbuf
+            call write_runner_structure(runner_unit, runner_box(:,:,i), runner_r(:,:,i), runner_name(:,i), &
+                runner_f(:,:,i), runner_e(i))
         end do
-        write (out_unit,ce_format) 'charge', dummy_ce
-        write (out_unit,ce_format) 'energy', epot * ev2ha
-        write (out_unit,'(A3)') 'end'
+        flush(runner_unit)
+        runner_nbuf = 0
+
+    end subroutine flush_runner_output
 
-        close(out_unit)
 
-    end subroutine output_runner
+
+    subroutine close_runner_output()
+
+        ! writes the structures left in the runner_buffer block, call at the end of the run
+
+        call flush_runner_output()
+        if (runner_open) close(runner_unit)
+        runner_open = .false.
+
+    end subroutine close_runner_output
 
 
     subroutine output_mxt(atoms)
@@ -632,7 +877,7 @@ contains
     end subroutine output_mxt
 
 
-    subroutine output_scatter(atoms, itraj, istep, flag)
+    subroutine output_scatter(atoms, itraj, istep, flag, ltext, lbin)
 
         use rpmd
         use pes_nene_mod,  only : max_count_extrapolation_warnings, count_extrapolation_warnings_traj_energy, count_extrapolation_warnings_traj_symfunc
@@ -640,8 +885,10 @@ contains
         type(universe), intent(in) :: atoms
         integer, intent(in) :: itraj, istep
         character(len=*), intent(in) :: flag
+        logical, intent(in) :: ltext, lbin     ! traj/mxt_fin%08d.dat text file, traj/scatter%08d.bin record
 
         real(dp) :: ekin_p, ekin_l, b_ekin_p, b_ekin_l, proj_v(3), bead_epot
+        type(scatter_state) :: this
         integer  :: turning_points
         character(len=max_string_length) :: fname, fin_name
         character(len=8)                 :: fin_id
@@ -659,19 +906,34 @@ contains
         call bead_ekin(atoms, b_ekin_p, b_ekin_l)
         call finalize_bounces()
 
+        this%ekin_p = ekin_p
+        this%ekin_l = ekin_l
+        this%epot   = sum(atoms%epot)/atoms%nbeads
+        this%etotal = b_ekin_p + b_ekin_l + sum(atoms%epot)/atoms%nbeads + bead_epot
+        this%r      = sum(atoms%r(:,:,1), dim=2)/atoms%nbeads
+        this%v      = sum(atoms%v(:,:,1), dim=2)/atoms%nbeads
+        this%azi    = atan2(proj_v(2), proj_v(1))*rad2deg
+
         if (flag == "scatter_initial") then
 
-            call open_for_write(out_unit, fname)
+            this%polar = 180-acos(proj_v(3)/sqrt(sum(proj_v*proj_v)))*rad2deg
+            scatter_i  = this
 
-            write(out_unit, '(a11, f14.7)') "ekin_p_i = ", ekin_p
-            write(out_unit, '(a11, f14.7)') "ekin_l_i = ", ekin_l
-            write(out_unit, '(a11, e21.10)') "epot_i   = ", sum(atoms%epot)/atoms%nbeads
-            write(out_unit, '(a11, e21.10)') "etotal_i = ", b_ekin_p + b_ekin_l + sum(atoms%epot)/atoms%nbeads + bead_epot
-            write(out_unit, '(a11, 3f14.7)')"r_i      = ", sum(atoms%r(:,:,1), dim=2)/atoms%nbeads
-            write(out_unit, '(a11, 3f14.7)')"v_i      = ", sum(atoms%v(:,:,1), dim=2)/atoms%nbeads
-            write(out_unit, '(a11, f14.7)') "polar_i  = ", 180-acos(proj_v(3)/sqrt(sum(proj_v*proj_v)))*rad2deg
-            write(out_unit, '(a11, f14.7)') "azi_i    = ", atan2(proj_v(2), proj_v(1))*rad2deg
-            write(out_unit, '(a)') ""
+            if (ltext) then
+                call open_for_write(out_unit, fname)
+
+                write(out_unit, '(a11, f14.7)') "ekin_p_i = ", this%ekin_p
+                write(out_unit, '(a11, f14.7)') "ekin_l_i = ", this%ekin_l
+                write(out_unit, '(a11, e21.10)') "epot_i   = ", this%epot
+                write(out_unit, '(a11, e21.10)') "etotal_i = ", this%etotal
+                write(out_unit, '(a11, 3f14.7)')"r_i      = ", this%r
+                write(out_unit, '(a11, 3f14.7)')"v_i      = ", this%v
+                write(out_unit, '(a11, f14.7)') "polar_i  = ", this%polar
+                write(out_unit, '(a11, f14.7)') "azi_i    = ", this%azi
+                write(out_unit, '(a)') ""
+
+                close (out_unit)
+            end if
 
             if (any(atoms%pes == pes_id_nene)) then
                 count_extrapolation_warnings_traj_energy  = 0 ! re-initialize for each trajectory
@@ -680,24 +942,32 @@ contains
 
         else if (flag == "scatter_final") then
 
-            call open_for_append(out_unit, fname)
+            this%polar = acos(proj_v(3)/sqrt(sum(proj_v*proj_v)))*rad2deg
+
+            if (ltext) then
+                call open_for_append(out_unit, fname)
+
+                write(out_unit, '(a15, f14.7)')  "ekin_p_f     = ", this%ekin_p
+                write(out_unit, '(a15, f14.7)')  "ekin_l_f     = ", this%ekin_l
+                write(out_unit, '(a15, e21.10)') "epot_f       = ", this%epot
+                write(out_unit, '(a15, e21.10)') "etotal_f     = ", this%etotal
+                write(out_unit, '(a15, 3f14.7)') "r_f          = ", this%r
+                write(out_unit, '(a15, 3f14.7)') "v_f          = ", this%v
+                write(out_unit, '(a15, f14.7)')  "polar_f      = ", this%polar
+                write(out_unit, '(a15, f14.7)')  "azi_f        = ", this%azi
+                write(out_unit, '(a)')           ""
+                write(out_unit, '(a15, f14.7)')  "time         = ", (istep-1) * simparams%step ! time in fs
+                write(out_unit, '(a15, i)')      "turn_pnts    = ", nturning_points
+                write(out_unit, '(a15, f14.7)')  "cl_appr      = ", closest_approach
+                write(out_unit, '(a15, f14.7)')  "cl_appr_time = ", closest_approach_time ! time at closest approach in fs
+                write(out_unit, '(a15, 3f14.7)') "r_min_p      = ", lowest_z
+                !write(out_unit, '(a11, i)')     "bounces  = ", bounces
+                !write(out_unit, '(a11, f14.7)') "time_int = ", interaction_time
+
+                close (out_unit)
+            end if
 
-            write(out_unit, '(a15, f14.7)')  "ekin_p_f     = ", ekin_p
-            write(out_unit, '(a15, f14.7)')  "ekin_l_f     = ", ekin_l
-            write(out_unit, '(a15, e21.10)') "epot_f       = ", sum(atoms%epot)/atoms%nbeads
-            write(out_unit, '(a15, e21.10)') "etotal_f     = ", b_ekin_p + b_ekin_l + sum(atoms%epot)/atoms%nbeads + bead_epot
-            write(out_unit, '(a15, 3f14.7)') "r_f          = ", sum(atoms%r(:,:,1), dim=2)/atoms%nbeads
-            write(out_unit, '(a15, 3f14.7)') "v_f          = ", sum(atoms%v(:,:,1), dim=2)/atoms%nbeads
-            write(out_unit, '(a15, f14.7)')  "polar_f      = ", acos(proj_v(3)/sqrt(sum(proj_v*proj_v)))*rad2deg
-            write(out_unit, '(a15, f14.7)')  "azi_f        = ", atan2(proj_v(2), proj_v(1))*rad2deg
-            write(out_unit, '(a)')           ""
-            write(out_unit, '(a15, f14.7)')  "time         = ", (istep-1) * simparams%step ! time in fs
-            write(out_unit, '(a15, i)')      "turn_pnts    = ", nturning_points
-            write(out_unit, '(a15, f14.7)')  "cl_appr      = ", closest_approach
-            write(out_unit, '(a15, f14.7)')  "cl_appr_time = ", closest_approach_time ! time at closest approach in fs
-            write(out_unit, '(a15, 3f14.7)') "r_min_p      = ", lowest_z
-            !write(out_unit, '(a11, i)')     "bounces  = ", bounces
-            !write(out_unit, '(a11, f14.7)') "time_int = ", interaction_time
+            if (lbin) call output_scatter_bin(itraj, istep, scatter_i, this)
 
             ! to make sure that a configuration file is written even if no format keyword is given:
 !            if (.not. dir_exists('mxt')) call execute_command_line('mkdir mxt')
@@ -725,11 +995,39 @@ contains
             stop
         end if
 
-        close (out_unit)
-
     end subroutine output_scatter
 
 
+
+    subroutine output_scatter_bin(itraj, istep, ini, fin)
+
+        ! appends the record of a finished trajectory to traj/scatter%08d.bin (simparams%start)
+        ! record: traj_id, steps, turn_pnts, bounces (int32), initial and final ekin_p, ekin_l, epot,
+        !         etotal, r(3), v(3), polar, azi, time, cl_appr, cl_appr_time, r_min_p(3),
+        !         interaction_time (real64)
+
+        integer, intent(in) :: itraj, istep
+        type(scatter_state), intent(in) :: ini, fin
+
+        logical :: exists
+        character(len=max_string_length) :: fname
+
+        write(fname, '(a12, i8.8, a4)') 'traj/scatter', simparams%start, '.bin'
+        inquire(file=fname, exist=exists)
+        open(fin_unit, file=fname, access="stream", form="unformatted", status="unknown", position="append", action="write")
+
+        if (.not. exists) write(fin_unit) scatter_bin_magic, scatter_bin_version, scatter_bin_bytes
+
+        write(fin_unit) int(itraj, int32), int(istep, int32), int(nturning_points, int32), int(bounces, int32), &
+            ini%ekin_p, ini%ekin_l, ini%epot, ini%etotal, ini%r, ini%v, ini%polar, ini%azi, &
+            fin%ekin_p, fin%ekin_l, fin%epot, fin%etotal, fin%r, fin%v, fin%polar, fin%azi, &
+            (istep-1) * simparams%step, closest_approach, closest_approach_time, lowest_z, interaction_time
+
+        close(fin_unit)
+
+    end subroutine output_scatter_bin
+
+
     subroutine output_pes(atoms)
 
         use pes_rebo_mod, only : to_string_rebo
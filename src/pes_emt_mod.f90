@@ -193,6 +193,8 @@ module pes_emt_mod
 
     subroutine compute_emt(atoms, flag)
 
+        use run_config, only : simparams
+
         type(universe), intent(inout) :: atoms
         integer, intent(in)           :: flag
 
@@ -204,6 +206,14 @@ module pes_emt_mod
             if (atoms%pes(i,i) == pes_id_emt) nEMT = nEMT + 1
         end do
 
+        ! threaded neighbour-list path, emt_dense keeps the N x N routines below for comparison
+        if (nEMT > 0 .and. nEMT <= 2 .and. .not. simparams%emt_dense) then
+            if (emt_nl_applicable(atoms)) then
+                call compute_emt_nl(atoms, flag)
+                return
+            end if
+        end if
+
         select case (nEMT)
 
             case (1)
@@ -226,6 +236,282 @@ module pes_emt_mod
 
 
 
+    real(dp) function emt_cutoff(atoms)
+
+        ! Largest pair distance with an EMT contribution (cutoff*rcut of the compute subroutines)
+
+        type(universe), intent(in) :: atoms
+
+        real(dp), parameter :: cutoff = 1.5_dp
+
+        integer  :: i, nEMT
+        real(dp) :: s0max
+
+        nEMT  = 0
+        s0max = 0.0_dp
+        do i = 1, atoms%ntypes
+            if (atoms%pes(i,i) == pes_id_emt) then
+                nEMT  = nEMT + 1
+                s0max = max(s0max, pes_emt%s0(i))
+            end if
+        end do
+
+        ! compute_emt_nspecies takes the cut-off from all species
+        if (nEMT > 2) s0max = maxval(pes_emt%s0)
+
+        emt_cutoff = cutoff * select_beta('fcc') * s0max * sqrt3
+
+    end function emt_cutoff
+
+
+
+
+    subroutine compute_emt_nl(atoms, flag)
+
+        ! EMT for one or two species (same expressions as compute_emt_1species and
+        ! compute_emt_2species) on the neighbour list with per-atom storage only.
+        ! Every pair is visited from both atoms. Both passes write to atom i only, so they
+        ! run in parallel without reductions and the result does not depend on the number
+        ! of threads (nthreads). With frozen_pairs, the density and pair energy sums over
+        ! pairs of frozen atoms are kept in atoms%fz_sigma and atoms%fz_pair, and the
+        ! forces on frozen atoms are skipped.
+
+        use run_config, only : simparams
+
+        type(universe), intent(inout) :: atoms
+        integer, intent(in)           :: flag
+
+        real(dp), parameter :: cutoff = 1.5_dp
+
+        integer  :: i, j, jj, b, t, u, idx_i, idx_j
+        real(dp) :: beta, rcut, rr, acut, r, theta, rtemp, rtemp1, g_ij, g_ji, h_ij, h_ji, dEdr
+        logical  :: lfrozen
+
+        real(dp), dimension(3) :: rnn, x, nneighs, r3temp
+
+        logical,  dimension(atoms%ntypes) :: is_emt
+        real(dp), dimension(atoms%ntypes) :: betas0, betaeta2, kappadbeta, igamma1, igamma2
+
+        ! chi(t,u) scales the density and the pair potential of a type u atom at a type t atom
+        real(dp), dimension(atoms%ntypes,atoms%ntypes) :: chi
+
+        real(dp), dimension(atoms%nbeads) :: exp_lambda_s, exp_kappa_s
+        real(dp), dimension(atoms%nbeads,atoms%natoms) :: sigma, s, dEdsigma, nrg
+
+        !----------------------VALUES OF FREQUENT USE ---------------------------------
+
+        is_emt  = [(atoms%pes(t,t) == pes_id_emt, t = 1, atoms%ntypes)]
+        beta    = select_beta('fcc')
+        nneighs = select_nneighs('fcc')
+
+        betas0     = 0.0_dp
+        betaeta2   = 0.0_dp
+        kappadbeta = 0.0_dp
+        do t = 1, atoms%ntypes
+            if (.not. is_emt(t)) cycle
+            betas0(t)     = beta * pes_emt%s0(t)
+            betaeta2(t)   = beta * pes_emt%eta2(t)
+            kappadbeta(t) = pes_emt%kappa(t) / beta
+        end do
+
+        ! cut-off of the lattice species (largest s0), see compute_emt_2species
+        rcut = maxval(betas0) * sqrt3
+        rr   = 4.0 * rcut / (sqrt3 + 2)
+        acut = 9.21034037197618_dp/(rr -rcut) ! ln(10000)
+
+        igamma1 = 0.0_dp
+        igamma2 = 0.0_dp
+        chi     = 0.0_dp
+        do t = 1, atoms%ntypes
+            if (.not. is_emt(t)) cycle
+
+            rnn = betas0(t) * [1.0_dp, sqrt2, sqrt3]
+            x   = nneighs * twelfth / (1 + exp(acut*(rnn-rcut)))
+
+            r3temp     = rnn - betas0(t)
+            igamma1(t) = 1.0 / sum(x*exp(-pes_emt%eta2(t) * r3temp))
+            igamma2(t) = 1.0 / sum(x*exp(-kappadbeta(t) * r3temp))
+
+            do u = 1, atoms%ntypes
+                if (is_emt(u)) chi(t,u) = pes_emt%n0(u) / pes_emt%n0(t) &
+                                          * exp(0.5/bohr2ang * (pes_emt%s0(t) - pes_emt%s0(u)))
+            end do
+        end do
+
+        !------------------------------------------------------------------------------
+        !                     Sums over Pairs of Frozen Atoms (frozen_pairs)
+        !                     ==============================================
+        !------------------------------------------------------------------------------
+
+        lfrozen = simparams%frozen_pairs
+        if (lfrozen .and. .not. allocated(atoms%fz_sigma)) then
+
+            allocate(atoms%fz_sigma(atoms%nbeads, atoms%natoms), atoms%fz_pair(atoms%nbeads, atoms%natoms))
+            atoms%fz_sigma = 0.0_dp
+            atoms%fz_pair  = 0.0_dp
+
+            do i = 1, atoms%natoms
+                idx_i = atoms%idx(i)
+                if (.not. (is_emt(idx_i) .and. atoms%fz_atom(i))) cycle
+
+                do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                    j = atoms%nl_list(jj)
+                    idx_j = atoms%idx(j)
+
+                    if (atoms%pes(idx_i,idx_j) /= pes_id_emt .or. .not. atoms%fz_atom(j)) cycle
+
+                    do b = 1, atoms%nbeads
+
+                        r = atoms%nl_dist(b,jj)
+                        if (r > cutoff*rcut) cycle
+
+                        theta = 1.0 / (1 + exp(acut*(r - rcut)))
+
+                        atoms%fz_sigma(b,i) = atoms%fz_sigma(b,i) &
+                                              + chi(idx_i,idx_j)*theta*exp(-pes_emt%eta2(idx_j)*(r - betas0(idx_j)))
+                        atoms%fz_pair(b,i)  = atoms%fz_pair(b,i) - 0.5*igamma2(idx_i)*pes_emt%v0(idx_i)*chi(idx_i,idx_j) &
+                                                                   *theta*exp(-kappadbeta(idx_j)*(r - betas0(idx_j)))
+                    end do
+                end do
+            end do
+
+        end if
+
+        !------------------------------------------------------------------------------
+        !          Sigma, Neutral Sphere Radius, Cohesive and Pair Energy per Atom
+        !          ===============================================================
+        !------------------------------------------------------------------------------
+
+        !$omp parallel do num_threads(simparams%nthreads) default(shared) &
+        !$omp private(i, j, jj, b, idx_i, idx_j, r, theta, exp_lambda_s, exp_kappa_s)
+        do i = 1, atoms%natoms
+            idx_i = atoms%idx(i)
+
+            sigma(:,i)    = 0.0_dp
+            nrg(:,i)      = 0.0_dp
+            dEdsigma(:,i) = 0.0_dp
+            if (.not. is_emt(idx_i)) cycle
+
+            if (lfrozen) then
+                sigma(:,i) = atoms%fz_sigma(:,i)
+                nrg(:,i)   = atoms%fz_pair(:,i)
+            end if
+
+            do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                j = atoms%nl_list(jj)
+                idx_j = atoms%idx(j)
+
+                if (atoms%pes(idx_i,idx_j) /= pes_id_emt) cycle
+                if (lfrozen) then
+                    if (atoms%fz_atom(i) .and. atoms%fz_atom(j)) cycle
+                end if
+
+                do b = 1, atoms%nbeads
+
+                    r = atoms%nl_dist(b,jj)
+                    if (r > cutoff*rcut) cycle
+
+                    theta = 1.0 / (1 + exp(acut*(r - rcut)))
+
+                    ! density at i due to j and half of the pair potential between i and j
+                    sigma(b,i) = sigma(b,i) + chi(idx_i,idx_j)*theta*exp(-pes_emt%eta2(idx_j)*(r - betas0(idx_j)))
+                    nrg(b,i)   = nrg(b,i)   - 0.5*igamma2(idx_i)*pes_emt%v0(idx_i)*chi(idx_i,idx_j) &
+                                              *theta*exp(-kappadbeta(idx_j)*(r - betas0(idx_j)))
+                end do
+            end do
+
+            sigma(:,i) = max(1e-30, sigma(:,i) * igamma1(idx_i))
+            s(:,i)     = -log(max(tolerance,sigma(:,i))*twelfth)/betaeta2(idx_i)
+
+            dens(:,i)    = pes_emt%n0(idx_i)*exp((0.5/bohr2ang - betaeta2(idx_i))*s(:,i))
+            exp_lambda_s = exp(-pes_emt%lambda(idx_i)*s(:,i))
+            exp_kappa_s  = exp(-pes_emt%kappa(idx_i)*s(:,i))
+
+            ! cohesive function and reference pair potential (12 neighbours, half of it)
+            nrg(:,i) = nrg(:,i) + pes_emt%e0(idx_i)*((1 + pes_emt%lambda(idx_i)*s(:,i)) * exp_lambda_s - 1) &
+                                + 6 * pes_emt%v0(idx_i)*exp_kappa_s
+
+            ! dE/dsigma_i = dE/ds_i * ds_i/dsigma_i
+            dEdsigma(:,i) = (pes_emt%e0(idx_i)*pes_emt%lambda(idx_i)*pes_emt%lambda(idx_i)*s(:,i)*exp_lambda_s &
+                            + 6 * pes_emt%v0(idx_i)*pes_emt%kappa(idx_i)*exp_kappa_s) / (betaeta2(idx_i)*sigma(:,i))
+        end do
+        !$omp end parallel do
+
+        ! summed in atom order, independent of the thread schedule
+        atoms%epot = atoms%epot + sum(nrg, dim=2)
+
+        if (flag /= energy_and_force) return
+
+        !------------------------------------------------------------------------------
+        !                                   FORCES
+        !                                   ======
+        !------------------------------------------------------------------------------
+
+        !$omp parallel do num_threads(simparams%nthreads) default(shared) &
+        !$omp private(i, j, jj, b, idx_i, idx_j, r, rtemp, theta, rtemp1, g_ij, g_ji, h_ij, h_ji, dEdr)
+        do i = 1, atoms%natoms
+            idx_i = atoms%idx(i)
+            if (.not. is_emt(idx_i)) cycle
+            if (lfrozen) then
+                if (atoms%fz_atom(i)) cycle
+            end if
+
+            do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                j = atoms%nl_list(jj)
+                idx_j = atoms%idx(j)
+
+                if (atoms%pes(idx_i,idx_j) /= pes_id_emt) cycle
+
+                do b = 1, atoms%nbeads
+
+                    r = atoms%nl_dist(b,jj)
+                    if (r > cutoff*rcut) cycle
+
+                    ! cut-off function and -dtheta/dr / theta
+                    rtemp  = exp(acut*(r - rcut))
+                    theta  = 1.0 / (1 + rtemp)
+                    rtemp1 = acut*rtemp*theta
+
+                    ! sigma and pair potential terms of i due to j and of j due to i
+                    g_ij = igamma1(idx_i)*chi(idx_i,idx_j)*theta*exp(-pes_emt%eta2(idx_j)*(r - betas0(idx_j)))
+                    g_ji = igamma1(idx_j)*chi(idx_j,idx_i)*theta*exp(-pes_emt%eta2(idx_i)*(r - betas0(idx_i)))
+                    h_ij = igamma2(idx_i)*pes_emt%v0(idx_i)*chi(idx_i,idx_j)*theta*exp(-kappadbeta(idx_j)*(r - betas0(idx_j)))
+                    h_ji = igamma2(idx_j)*pes_emt%v0(idx_j)*chi(idx_j,idx_i)*theta*exp(-kappadbeta(idx_i)*(r - betas0(idx_i)))
+
+                    dEdr = - dEdsigma(b,i)*(pes_emt%eta2(idx_j) + rtemp1)*g_ij  &
+                           - dEdsigma(b,j)*(pes_emt%eta2(idx_i) + rtemp1)*g_ji  &
+                           + 0.5*((kappadbeta(idx_j) + rtemp1)*h_ij + (kappadbeta(idx_i) + rtemp1)*h_ji)
+
+                    atoms%f(:,b,i) = atoms%f(:,b,i) - dEdr*atoms%nl_vec(:,b,jj)/r
+                end do
+            end do
+        end do
+        !$omp end parallel do
+
+    end subroutine compute_emt_nl
+
+
+
+    logical function emt_nl_applicable(atoms)
+
+        ! compute_emt_nl needs EMT parameters of both atom types of every EMT pair
+
+        type(universe), intent(in) :: atoms
+
+        integer :: t, u
+
+        emt_nl_applicable = .true.
+        do t = 1, atoms%ntypes
+            do u = 1, atoms%ntypes
+                if (atoms%pes(t,u) == pes_id_emt .and. &
+                    (atoms%pes(t,t) /= pes_id_emt .or. atoms%pes(u,u) /= pes_id_emt)) emt_nl_applicable = .false.
+            end do
+        end do
+
+    end function emt_nl_applicable
+
+
+
 
     subroutine compute_emt_1species(atoms, flag)
 
@@ -234,7 +520,7 @@ module pes_emt_mod
 
         real(dp), parameter :: cutoff = 1.5_dp
 
-        integer :: i, j, b, emt_idx, idx_i, idx_j
+        integer :: i, j, jj, b, emt_idx, idx_i, idx_j
 
         real(dp) :: betas0, betaeta2, kappadbeta
 
@@ -326,16 +612,18 @@ module pes_emt_mod
         vref   = 0.0
         dvref  = 0.0
 
-        do i = 1, atoms%natoms-1
+        do i = 1, atoms%natoms
             idx_i = atoms%idx(i)
 
-            do j = i+1, atoms%natoms
+            do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                j = atoms%nl_list(jj)
+                if (j < i) cycle
                 idx_j = atoms%idx(j)
 
                 if (atoms%pes(idx_i,idx_j) /= pes_id_emt) cycle
 
-                rijmag = atoms%distances(:,i,j)
-                rij    = atoms%vectors(:,:,i,j)
+                rijmag = atoms%nl_dist(:,jj)
+                rij    = atoms%nl_vec(:,:,jj)
 
                 do b = 1, atoms%nbeads
 
@@ -487,7 +775,7 @@ module pes_emt_mod
 
         real(dp), parameter :: cutoff = 1.5_dp
 
-        integer :: i, j, b, type1, type2, idx_i, idx_j
+        integer :: i, j, jj, b, type1, type2, idx_i, idx_j
 
         real(dp) :: betas0_1, betaeta2_1, kappadbeta_1, chi_21
         real(dp) :: betas0_2, betaeta2_2, kappadbeta_2, chi_12
@@ -643,16 +931,18 @@ module pes_emt_mod
         dvref_1_2   = 0.0
         dvref_1_1   = 0.0
 
-        do i = 1, atoms%natoms-1
+        do i = 1, atoms%natoms
             idx_i = atoms%idx(i)
 
-            do j = i+1, atoms%natoms
+            do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                j = atoms%nl_list(jj)
+                if (j < i) cycle
                 idx_j = atoms%idx(j)
 
                 if (atoms%pes(idx_i,idx_j) /= pes_id_emt) cycle
 
-                rijmag = atoms%distances(:,i,j)
-                rij    = atoms%vectors(:,:,i,j)
+                rijmag = atoms%nl_dist(:,jj)
+                rij    = atoms%nl_vec(:,:,jj)
 
                 if (idx_i == type2 .and. idx_j == type2) then
 
@@ -1035,7 +1325,7 @@ module pes_emt_mod
             type(universe), intent(inout) :: atoms
             integer, intent(in)           :: flag
 
-            integer :: i, j, k, b, n, idx_i, idx_j
+            integer :: i, j, jj, k, b, n, idx_i, idx_j
 
             real(dp), parameter :: cutoff = 1.5_dp
 
@@ -1182,13 +1472,15 @@ module pes_emt_mod
             dEcoh   = 0.0_dp
             dVref   = 0.0_dp
 
-            do i = 1, atoms%natoms-1
+            do i = 1, atoms%natoms
                 idx_i = atoms%idx(i)
 
-                do j = i+1, atoms%natoms
+                do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                    j = atoms%nl_list(jj)
+                    if (j < i) cycle
                     idx_j = atoms%idx(j)
 
-                    if (i == j .or. atoms%pes(idx_i,idx_j) /= pes_id_emt) cycle
+                    if (atoms%pes(idx_i,idx_j) /= pes_id_emt) cycle
 
                     do b = 1, atoms%nbeads
 
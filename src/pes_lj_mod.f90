@@ -230,25 +230,50 @@ contains
 
     subroutine compute_lj(atoms, flag)
 
+        ! With frozen_pairs, the energy of the pairs of frozen atoms is summed into
+        ! atoms%fz_lj at the first call and these pairs are skipped afterwards.
+
+        use run_config, only : simparams
+
         type(universe), intent(inout) :: atoms
         integer, intent(in)           :: flag
 
-        integer ::  idx_i, idx_j, i, j, b
+        integer ::  idx_i, idx_j, i, j, jj, b
         real(dp) :: sig_rc, sig_rc_2, sig_rc_6, sig_rc_12
         real(dp), dimension(atoms%nbeads) :: sig_r, sig_r_2, sig_r_6, sig_r_12, r
         real(dp), dimension(atoms%nbeads) :: nrg, vdr
         real(dp), dimension(3, atoms%nbeads) :: f, vec
+        logical :: lfrozen, lfill, frozen_pair
 
         nrg = 0.0_dp
 
-        do i = 1, atoms%natoms-1
-            do j = i+1, atoms%natoms
+        lfrozen = simparams%frozen_pairs
+        lfill   = .false.
+        if (lfrozen) then
+            lfill = .not. allocated(atoms%fz_lj)
+            if (lfill) then
+                allocate(atoms%fz_lj(atoms%nbeads))
+                atoms%fz_lj = 0.0_dp
+            else
+                atoms%epot = atoms%epot + atoms%fz_lj
+            end if
+        end if
+
+        do i = 1, atoms%natoms
+            do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+
+                j = atoms%nl_list(jj)
+                if (j < i) cycle
 
                 idx_i = atoms%idx(i)
                 idx_j = atoms%idx(j)
 
                 if (atoms%pes(idx_i,idx_j) /= pes_id_lj) cycle
 
+                frozen_pair = .false.
+                if (lfrozen) frozen_pair = atoms%fz_atom(i) .and. atoms%fz_atom(j)
+                if (frozen_pair .and. .not. lfill) cycle
+
                 call minimg_beads(atoms, i, j, r, vec)
 
                 if (any(r < tolerance)) then
@@ -271,13 +296,18 @@ contains
                     + (6*sig_rc_12-3*sig_rc_6)*(r/pes_lj%cutoff)**2 &
                     - 7*sig_rc_12 + 4*sig_rc_6 )
 
+                ! the shifted potential ends at the cutoff
+                where (r > pes_lj%cutoff) nrg = 0.0_dp
+
                 atoms%epot = atoms%epot + nrg
+                if (frozen_pair) atoms%fz_lj = atoms%fz_lj + nrg
 
 
                 if (flag == energy_and_force) then
 
                     vdr = (24/pes_lj%cutoff**2)*r*pes_lj%eps(idx_i,idx_j)*sig_rc_6*(2*sig_rc_6-1) &
                         - (24/r)*pes_lj%eps(idx_i,idx_j)*sig_r_6*(2*sig_r_6-1)
+                    where (r > pes_lj%cutoff) vdr = 0.0_dp
 
                     do b = 1, atoms%nbeads
                         f(:,b) = vdr(b) * vec(:,b)/r(b)
@@ -296,6 +326,14 @@ contains
 
 
 
+    real(dp) function lj_cutoff()
+
+        lj_cutoff = pes_lj%cutoff
+
+    end function lj_cutoff
+
+
+
     subroutine compute_simple_lj(atoms, flag)
 
         type(universe), intent(inout) :: atoms
@@ -58,6 +58,9 @@ module pes_rebo_mod
     ! Initialization flag
     logical, public :: REBO_INIT_SUCCESS = .false.
 
+    ! timing of compute_rebo with "debug rebo", summed over the run, see print_rebo_timing
+    integer(8), private :: rebo_calls = 0, rebo_bonds = 0, rebo_ticks = 0, rebo_rate = 1
+
     integer, private :: i, j, k
 
 
@@ -1670,22 +1673,28 @@ contains
 
 
 
-    subroutine rebo_bondorder(atoms, i, j, nC, nH, VA, bij, flag)
+    subroutine rebo_bondorder(atoms, i, j, ij, nC, nH, w_nl, dw_nl, spn_nl, dspn_nl, VA, bij, f, flag)
+
+        ! ij is the neighbour list entry of j in the list of i,
+        ! w_nl, dw_nl, spn_nl and dspn_nl belong to the neighbour list entries (see compute_rebo),
+        ! forces are added to f instead of atoms%f, so that threads can use their own copy
 
         ! arguments
-        type(universe), intent(inout) :: atoms
-        integer, intent(in) :: i, j
+        type(universe), intent(in) :: atoms
+        integer, intent(in) :: i, j, ij
         integer, intent(in) :: flag
         real(dp), dimension(atoms%nbeads, atoms%natoms), intent(in) :: nH, nC
+        real(dp), dimension(:,:), intent(in) :: w_nl, dw_nl, spn_nl, dspn_nl
         real(dp), dimension(atoms%nbeads), intent(in) :: VA
         real(dp), dimension(atoms%nbeads), intent(out) :: bij
+        real(dp), dimension(3, atoms%nbeads, atoms%natoms), intent(inout) :: f
 
         ! local variables
         integer :: k, l, n, b
-        integer :: itype, jtype, ktype, ltype, ntype
+        integer :: itype, jtype, ktype, ltype, ntype, kk, ll, nn
         character(len=*), parameter :: err = "Error in rebo_bondorder(): "
 
-        real(dp), dimension(atoms%nbeads) :: NijC, NijH, NjiC, NjiH, Nki, Nlj
+        real(dp), dimension(atoms%nbeads) :: NijC, NijH, NjiC, NjiH
         real(dp), dimension(atoms%nbeads) :: rikmag, rjlmag, rijmag, rjimag, rknmag, rlnmag
         real(dp), dimension(atoms%nbeads) :: r23mag, r21mag, r32mag, r34mag
         real(dp), dimension(atoms%nbeads) :: wij, wik, wjl, w21, w34
@@ -1694,7 +1703,7 @@ contains
         real(dp), dimension(3, atoms%nbeads) :: r32, r23, r34, r21
         real(dp), dimension(3, atoms%nbeads) :: cross321, cross234
 
-        real(dp), dimension(atoms%nbeads) :: g, Tij, piRC, dummy, prefactor
+        real(dp), dimension(atoms%nbeads) :: g, Tij, piRC, prefactor
         real(dp), dimension(atoms%nbeads) :: PijS, PjiS, pji, pij
         real(dp), dimension(atoms%nbeads) :: Nijconj, NconjtmpI, NconjtmpJ
         real(dp), dimension(atoms%nbeads) :: lamdajik, lamdaijl
@@ -1763,12 +1772,12 @@ contains
         jtype = atoms%idx(j)
 
         ! find the distance between them
-        rijmag = atoms%distances(:,i,j)
-        rjimag = atoms%distances(:,j,i)
+        rijmag = atoms%nl_dist(:,ij)
+        rjimag = atoms%nl_dist(:,ij)
 
         ! determine vector between them
-        rij = atoms%vectors(:,:,i,j)
-        rji = atoms%vectors(:,:,j,i)
+        rij = atoms%nl_vec(:,:,ij)
+        rji = -atoms%nl_vec(:,:,ij)
 
         ! evaluate interaction
         call cufu(rijmag, pes_rebo%Dmin(itype,jtype), pes_rebo%Dmax(itype,jtype), wij, dwij)
@@ -1791,20 +1800,21 @@ contains
         NconjtmpJ = 0.0_dp
         Etmp = 0.0_dp
 
-        do k = 1, atoms%natoms
+        do kk = atoms%nl_first(i), atoms%nl_first(i+1)-1
+            k = atoms%nl_list(kk)
             ktype = atoms%idx(k)
             if (k /= i .and. k /= j .and. atoms%pes(ktype, itype) == pes_id_rebo) then
 
-                rikmag = atoms%distances(:,i,k)
-                call cufu(rikmag, pes_rebo%Dmin(itype,ktype), pes_rebo%Dmax(itype,ktype), wik, dwik)
+                rikmag = atoms%nl_dist(:,kk)
+                wik  = w_nl(:,kk)
+                dwik = dw_nl(:,kk)
                 if (all(wik < TOLERANCE)) cycle
 
-                rik = atoms%vectors(:,:,i,k)
+                rik = atoms%nl_vec(:,:,kk)
 
                 lamdajik = 4.0_dp*is_hydrogen(atoms,itype) * &
                     ((pes_rebo%rho(itype,ktype)-rikmag) - (pes_rebo%rho(itype,jtype)-rijmag))
 
-                Nki = nC(:,k) + nH(:,k) - wik
 
                 cosjik = sum(rij*rik, dim=1) / (rijmag*rikmag)
                 cosjik = min(cosjik, 1.0_dp)
@@ -1817,7 +1827,7 @@ contains
 
                 Etmp = Etmp + (wik*g*exp(lamdajik))
                 tmp3 = tmp3 + (wik*dgdN*exp(lamdajik))
-                call cufu(Nki, CSF_LOW, CSF_HIGH, SpN, dummy)
+                SpN = spn_nl(:,kk)
                 NconjtmpI = NconjtmpI + is_carbon(atoms, ktype) * wik * SpN
 
             end if
@@ -1843,15 +1853,17 @@ contains
 
         ! pij forces
         if (flag == ENERGY_AND_FORCE) then
-            do k = 1, atoms%natoms
+            do kk = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                k = atoms%nl_list(kk)
                 ktype = atoms%idx(k)
                 if (k /= i .and. k /= j .and. atoms%pes(ktype, itype) == pes_id_rebo) then
 
-                    rikmag = atoms%distances(:,i,k)
-                    call cufu(rikmag, pes_rebo%Dmin(itype,ktype), pes_rebo%Dmax(itype,ktype), wik, dwik)
+                    rikmag = atoms%nl_dist(:,kk)
+                    wik  = w_nl(:,kk)
+                    dwik = dw_nl(:,kk)
                     if (all(wik < TOLERANCE)) cycle
 
-                    rik = atoms%vectors(:,:,i,k)
+                    rik = atoms%nl_vec(:,:,kk)
 
                     lamdajik = 4.0_dp*is_hydrogen(atoms,itype) * &
                         ((pes_rebo%rho(itype,ktype)-rikmag) - (pes_rebo%rho(itype,jtype)-rijmag))
@@ -1920,9 +1932,9 @@ contains
                     end do
 
                     ! add to accumulator
-                    atoms%f(:,:,i) = atoms%f(:,:,i) + fi
-                    atoms%f(:,:,j) = atoms%f(:,:,j) + fj
-                    atoms%f(:,:,k) = atoms%f(:,:,k) + fk
+                    f(:,:,i) = f(:,:,i) + fi
+                    f(:,:,j) = f(:,:,j) + fj
+                    f(:,:,k) = f(:,:,k) + fk
                 end if
             end do
         end if
@@ -1933,21 +1945,22 @@ contains
         Etmp = 0.0_dp
 
 
-        do l = 1, atoms%natoms
+        do ll = atoms%nl_first(j), atoms%nl_first(j+1)-1
+            l = atoms%nl_list(ll)
             ltype = atoms%idx(l)
             if (l /= j .and. l /= i .and. atoms%pes(ltype, jtype) == pes_id_rebo) then
 
-                rjlmag = atoms%distances(:,j,l)
+                rjlmag = atoms%nl_dist(:,ll)
 
-                call cufu(rjlmag, pes_rebo%Dmin(jtype,ltype), pes_rebo%Dmax(jtype,ltype), wjl, dwjl)
+                wjl  = w_nl(:,ll)
+                dwjl = dw_nl(:,ll)
                 if (all(wjl < TOLERANCE)) cycle
 
-                rjl = atoms%vectors(:,:,j,l)
+                rjl = atoms%nl_vec(:,:,ll)
 
                 lamdaijl = 4.0_dp*is_hydrogen(atoms,jtype) * &
                     ((pes_rebo%rho(jtype,ltype)-rjlmag) - (pes_rebo%rho(jtype,itype)-rjimag))
 
-                Nlj = nC(:,l) + nH(:,l) - wjl
 
                 cosijl = sum(rji*rjl, dim=1) / (rjimag*rjlmag)
                 cosijl = min(cosijl, 1.0_dp)
@@ -1960,7 +1973,7 @@ contains
 
                 Etmp = Etmp + (wjl*g*exp(lamdaijl))
                 tmp3 = tmp3 + (wjl*dgdN*exp(lamdaijl))
-                call cufu(Nlj, CSF_LOW, CSF_HIGH, SpN, dummy)
+                SpN = spn_nl(:,ll)
                 NconjtmpJ = NconjtmpJ + is_carbon(atoms, ltype) * wjl * SpN
 
             end if
@@ -1986,15 +1999,17 @@ contains
 
         ! pji forces
         if (flag == ENERGY_AND_FORCE) then
-            do l = 1, atoms%natoms
+            do ll = atoms%nl_first(j), atoms%nl_first(j+1)-1
+                l = atoms%nl_list(ll)
                 ltype = atoms%idx(l)
                 if (l /= j .and. l /= i .and. atoms%pes(ltype, jtype) == pes_id_rebo) then
 
-                    rjlmag = atoms%distances(:,j,l)
-                    call cufu(rjlmag, pes_rebo%Dmin(jtype,ltype), pes_rebo%Dmax(jtype,ltype), wjl, dwjl)
+                    rjlmag = atoms%nl_dist(:,ll)
+                    wjl  = w_nl(:,ll)
+                    dwjl = dw_nl(:,ll)
                     if (all(wjl < TOLERANCE)) cycle
 
-                    rjl = atoms%vectors(:,:,j,l)
+                    rjl = atoms%nl_vec(:,:,ll)
 
                     lamdaijl = 4.0_dp*is_hydrogen(atoms,jtype) * &
                         ((pes_rebo%rho(jtype,ltype)-rjlmag) - (pes_rebo%rho(jtype,itype)-rjimag))
@@ -2063,9 +2078,9 @@ contains
                     end do
 
                     ! add to accumulator
-                    atoms%f(:,:,i) = atoms%f(:,:,i) + fi
-                    atoms%f(:,:,j) = atoms%f(:,:,j) + fj
-                    atoms%f(:,:,l) = atoms%f(:,:,l) + fl
+                    f(:,:,i) = f(:,:,i) + fi
+                    f(:,:,j) = f(:,:,j) + fj
+                    f(:,:,l) = f(:,:,l) + fl
                 end if
             end do
         end if
@@ -2112,43 +2127,45 @@ contains
         !        print '(2i, 7f23.15)', i, j, NijC+NijH, NjiC+NjiH, Nijconj, piRC, dN3
         ! piRC forces
         if (flag == ENERGY_AND_FORCE) then
-            do k = 1, atoms%natoms
+            do kk = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                k = atoms%nl_list(kk)
                 ktype = atoms%idx(k)
                 if (k /= i .and. k /= j .and. atoms%pes(ktype, itype) == pes_id_rebo ) then
-                    rikmag = atoms%distances(:,i,k)
-                    call cufu(rikmag, pes_rebo%Dmin(itype,ktype), pes_rebo%Dmax(itype,ktype), wik, dwik)
-                    rik = atoms%vectors(:,:,i,k)
-                    Nki = nC(:,k) + nH(:,k) - wik
-                    call cufu(Nki, CSF_LOW, CSF_HIGH, SpN, dNki)
+                    rikmag = atoms%nl_dist(:,kk)
+                    wik  = w_nl(:,kk)
+                    dwik = dw_nl(:,kk)
+                    rik = atoms%nl_vec(:,:,kk)
+                    SpN  = spn_nl(:,kk)
+                    dNki = dspn_nl(:,kk)
 
                     tmp2 = VA * dN3(1,:) * dwik/rikmag
                     do b = 1, atoms%nbeads
-                        atoms%f(:,b,i) = atoms%f(:,b,i) - tmp2(b)*rik(:,b)
-                        atoms%f(:,b,k) = atoms%f(:,b,k) + tmp2(b)*rik(:,b)
+                        f(:,b,i) = f(:,b,i) - tmp2(b)*rik(:,b)
+                        f(:,b,k) = f(:,b,k) + tmp2(b)*rik(:,b)
                     end do
 
                     if (.not. is_carbon(atoms, ktype)) cycle
 
                     tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpI * dwik * SpN/rikmag
                     do b = 1, atoms%nbeads
-                        atoms%f(:,b,i) = atoms%f(:,b,i) - tmp2(b)*rik(:,b)
-                        atoms%f(:,b,k) = atoms%f(:,b,k) + tmp2(b)*rik(:,b)
+                        f(:,b,i) = f(:,b,i) - tmp2(b)*rik(:,b)
+                        f(:,b,k) = f(:,b,k) + tmp2(b)*rik(:,b)
                     end do
 
                     if (any(abs(dNki) > TOLERANCE)) then
-                        do n = 1, atoms%natoms
+                        do nn = atoms%nl_first(k), atoms%nl_first(k+1)-1
+                            n = atoms%nl_list(nn)
                             ntype = atoms%idx(n)
                             if (n /= i .and. n /= k .and. atoms%pes(ktype, ntype) == pes_id_rebo) then
 
-                                rkn = atoms%vectors(:,:,k,n)
-                                rknmag = atoms%distances(:,k,n)
-                                call cufu(rknmag, pes_rebo%Dmin(ktype,ntype), &
-                                    pes_rebo%Dmax(ktype,ntype), dummy, dwkn)
+                                rkn = atoms%nl_vec(:,:,nn)
+                                rknmag = atoms%nl_dist(:,nn)
+                                dwkn = dw_nl(:,nn)
 
                                 tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpI * wik * dNki * dwkn/rknmag
                                 do b = 1, atoms%nbeads
-                                    atoms%f(:,b,k) = atoms%f(:,b,k) - tmp2(b)*rkn(:,b)
-                                    atoms%f(:,b,n) = atoms%f(:,b,n) + tmp2(b)*rkn(:,b)
+                                    f(:,b,k) = f(:,b,k) - tmp2(b)*rkn(:,b)
+                                    f(:,b,n) = f(:,b,n) + tmp2(b)*rkn(:,b)
                                 end do
                             end if
                         end do
@@ -2157,43 +2174,45 @@ contains
             end do
 
             ! piRC forces
-            do l = 1, atoms%natoms
+            do ll = atoms%nl_first(j), atoms%nl_first(j+1)-1
+                l = atoms%nl_list(ll)
                 ltype = atoms%idx(l)
                 if (l /= i .and. l /= j .and. atoms%pes(ltype, jtype) == pes_id_rebo) then
-                    rjlmag = atoms%distances(:,j,l)
-                    call cufu(rjlmag, pes_rebo%Dmin(jtype,ltype), pes_rebo%Dmax(jtype,ltype), wjl, dwjl)
+                    rjlmag = atoms%nl_dist(:,ll)
+                    wjl  = w_nl(:,ll)
+                    dwjl = dw_nl(:,ll)
 
-                    rjl = atoms%vectors(:,:,j,l)
-                    Nlj = nC(:,l) + nH(:,l) - wjl
-                    call cufu(Nlj, CSF_LOW, CSF_HIGH, SpN, dNlj)
+                    rjl = atoms%nl_vec(:,:,ll)
+                    SpN  = spn_nl(:,ll)
+                    dNlj = dspn_nl(:,ll)
 
                     tmp2 = VA * dN3(2,:) * dwjl/rjlmag
                     do b = 1, atoms%nbeads
-                        atoms%f(:,b,j) = atoms%f(:,b,j) - tmp2(b)*rjl(:,b)
-                        atoms%f(:,b,l) = atoms%f(:,b,l) + tmp2(b)*rjl(:,b)
+                        f(:,b,j) = f(:,b,j) - tmp2(b)*rjl(:,b)
+                        f(:,b,l) = f(:,b,l) + tmp2(b)*rjl(:,b)
                     end do
 
                     if (.not. is_carbon(atoms, ltype)) cycle
 
                     tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpJ * dwjl * SpN/rjlmag
                     do b = 1, atoms%nbeads
-                        atoms%f(:,b,j) = atoms%f(:,b,j) - tmp2(b)*rjl(:,b)
-                        atoms%f(:,b,l) = atoms%f(:,b,l) + tmp2(b)*rjl(:,b)
+                        f(:,b,j) = f(:,b,j) - tmp2(b)*rjl(:,b)
+                        f(:,b,l) = f(:,b,l) + tmp2(b)*rjl(:,b)
                     end do
 
                     if (any(abs(dNlj) > TOLERANCE)) then
-                        do n = 1, atoms%natoms
+                        do nn = atoms%nl_first(l), atoms%nl_first(l+1)-1
+                            n = atoms%nl_list(nn)
                             ntype = atoms%idx(n)
                             if (n /= j .and. n /= l .and. atoms%pes(ltype, ntype) == pes_id_rebo) then
-                                rln = atoms%vectors(:,:,l,n)
-                                rlnmag = atoms%distances(:,l,n)
-                                call cufu(rlnmag, pes_rebo%Dmin(ltype,ntype), &
-                                    pes_rebo%Dmax(ltype,ntype), dummy, dwln)
+                                rln = atoms%nl_vec(:,:,nn)
+                                rlnmag = atoms%nl_dist(:,nn)
+                                dwln = dw_nl(:,nn)
 
                                 tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpJ * wjl * dNlj * dwln/rlnmag
                                 do b = 1, atoms%nbeads
-                                    atoms%f(:,b,l) = atoms%f(:,b,l) - tmp2(b)*rln(:,b)
-                                    atoms%f(:,b,n) = atoms%f(:,b,n) + tmp2(b)*rln(:,b)
+                                    f(:,b,l) = f(:,b,l) - tmp2(b)*rln(:,b)
+                                    f(:,b,n) = f(:,b,n) + tmp2(b)*rln(:,b)
                                 end do
                             end if
                         end do
@@ -2224,19 +2243,20 @@ contains
         if (any(abs(Tij) > TOLERANCE)) then
             ! atom2 = i
             ! atom3 = j
-            r32 = atoms%vectors(:,:,j,i)
-            r32mag = atoms%distances(:,j,i)
+            r32 = -atoms%nl_vec(:,:,ij)
+            r32mag = atoms%nl_dist(:,ij)
             r23 = -r32
             r23mag = r32mag
 
-            do k = 1, atoms%natoms    ! atom1 = k
+            do kk = atoms%nl_first(i), atoms%nl_first(i+1)-1    ! atom1 = k
+                k = atoms%nl_list(kk)
+                ktype = atoms%idx(k)
                 if (k /= i .and. k /= j .and. atoms%pes(ktype, itype) == pes_id_rebo) then
 
-                    ktype = atoms%idx(k)
-                    r21mag = atoms%distances(:,i,k)
+                    r21mag = atoms%nl_dist(:,kk)
                     call cufu(r21mag, pes_rebo%Dmin(itype,ktype), pes_rebo%Dmaxp(itype,ktype), w21, dw21)
 
-                    r21 = atoms%vectors(:,:,i,k)
+                    r21 = atoms%nl_vec(:,:,kk)
                     cos321 = -1.0_dp * sum(r21*r32, dim=1) / (r21mag*r32mag)
                     cos321 = min(cos321,  1.0_dp)
                     cos321 = max(cos321, -1.0_dp)
@@ -2246,8 +2266,8 @@ contains
                         sink2i = 1.0_dp / (sin321*sin321)
                         rik2i  = 1.0_dp / (r21mag*r21mag)
                         rr = r23mag*r23mag - r21mag*r21mag
-                        !                    rjk = r21 - r23
-                        rjk = atoms%vectors(:,:,j,k)
+                        ! k is a neighbour of i, not necessarily of j
+                        rjk = r21 - r23
                         rjk2 = sum(rjk*rjk, dim=1)
                         rijrik = 2.0_dp * r23mag*r21mag
                         rik2 = r21mag*r21mag
@@ -2263,16 +2283,17 @@ contains
                         !            tspjik = 0.0_dp
                         !            dtsjik = 0.0_dp
 
-                        do l = 1, atoms%natoms    ! atom4 = l
+                        do ll = atoms%nl_first(j), atoms%nl_first(j+1)-1    ! atom4 = l
+                            l = atoms%nl_list(ll)
+                            ltype = atoms%idx(l)
                             if (l /= i .and. l /= j .and. l /= k &
                                 .and. atoms%pes(ltype, jtype) == pes_id_rebo) then
 
-                                ltype = atoms%idx(l)
-                                r34mag = atoms%distances(:,j,l)
+                                r34mag = atoms%nl_dist(:,ll)
                                 call cufu(r34mag, pes_rebo%Dmin(jtype,ltype), &
                                     pes_rebo%Dmaxp(jtype,ltype), w34, dw34)
 
-                                r34 = atoms%vectors(:,:,j,l)
+                                r34 = atoms%nl_vec(:,:,ll)
                                 cos234 = sum(r32*r34, dim=1) / (r32mag*r34mag)
                                 cos234 = min(cos234,  1.0_dp)
                                 cos234 = max(cos234, -1.0_dp)
@@ -2282,8 +2303,8 @@ contains
                                     sinl2i = 1.0_dp / (sin234*sin234)
                                     rjl2i  = 1.0_dp / (r34mag*r34mag)
                                     rr = r23mag*r23mag - r34mag*r34mag
-                                    !                            ril = r23 + r34
-                                    ril = atoms%vectors(:,:,i,l)
+                                    ! l is a neighbour of j, not necessarily of i
+                                    ril = r23 + r34
                                     ril2 = sum(ril*ril, dim=1)
                                     rijrjl = 2.0_dp * r23mag * r34mag
                                     rjl2 = r34mag * r34mag
@@ -2369,23 +2390,23 @@ contains
                                         f4(:,b) = f4(:,b) + tmp2(b)*r34(:,b)
                                     end do
 
-                                    atoms%f(:,:,k) = atoms%f(:,:,k) + f1
-                                    atoms%f(:,:,i) = atoms%f(:,:,i) + f2
-                                    atoms%f(:,:,j) = atoms%f(:,:,j) + f3
-                                    atoms%f(:,:,l) = atoms%f(:,:,l) + f4
+                                    f(:,:,k) = f(:,:,k) + f1
+                                    f(:,:,i) = f(:,:,i) + f2
+                                    f(:,:,j) = f(:,:,j) + f3
+                                    f(:,:,l) = f(:,:,l) + f4
 
 
 
 !                                    ! alternative forces (TODO when time available)
-!                                    rij = atoms%vectors(:,:,i,j)
-!                                    rji = atoms%vectors(:,:,j,i)
-!                                    rik = atoms%vectors(:,:,i,k)
-!                                    rjl = atoms%vectors(:,:,j,l)
+!                                    rij = atoms%nl_vec(:,:,ij)
+!                                    rji = -atoms%nl_vec(:,:,ij)
+!                                    rik = atoms%nl_vec(:,:,kk)
+!                                    rjl = atoms%nl_vec(:,:,ll)
 !
-!                                    rijmag = atoms%distances(:,i,j)
-!                                    rjimag = atoms%distances(:,j,i)
-!                                    rikmag = atoms%distances(:,i,k)
-!                                    rjlmag = atoms%distances(:,j,l)
+!                                    rijmag = atoms%nl_dist(:,ij)
+!                                    rjimag = atoms%nl_dist(:,ij)
+!                                    rikmag = atoms%nl_dist(:,kk)
+!                                    rjlmag = atoms%nl_dist(:,ll)
 !
 !                                    do b = 1, atoms%nbeads
 !                                        eij(:,b) = rij(:,b)/rijmag(b)
@@ -2421,47 +2442,48 @@ contains
 
             ! Tij forces now that we have Etmp
             if (flag == ENERGY_AND_FORCE) then
-                do k = 1, atoms%natoms
+                do kk = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                    k = atoms%nl_list(kk)
+                    ktype = atoms%idx(k)
                     if (k /= i .and. k /= j .and. atoms%pes(ktype, itype) == pes_id_rebo) then
 
-                        ktype = atoms%idx(k)
-                        rikmag = atoms%distances(:,i,k)
-                        call cufu(rikmag, pes_rebo%Dmin(itype,ktype), &
-                            pes_rebo%Dmax(itype,ktype), wik, dwik)
+                        rikmag = atoms%nl_dist(:,kk)
+                        wik  = w_nl(:,kk)
+                        dwik = dw_nl(:,kk)
 
-                        rik = atoms%vectors(:,:,i,k)
-                        Nki = nC(:,k)  + nH(:,k) - wik
-                        call cufu(Nki, CSF_LOW, CSF_HIGH, SpN, dNki)
+                        rik = atoms%nl_vec(:,:,kk)
+                        SpN  = spn_nl(:,kk)
+                        dNki = dspn_nl(:,kk)
 
                         tmp2 = VA * dN3(1,:) * dwik * Etmp / rikmag
                         do b = 1, atoms%nbeads
-                            atoms%f(:,b,i) = atoms%f(:,b,i) - tmp2(b)*rik(:,b)
-                            atoms%f(:,b,k) = atoms%f(:,b,k) + tmp2(b)*rik(:,b)
+                            f(:,b,i) = f(:,b,i) - tmp2(b)*rik(:,b)
+                            f(:,b,k) = f(:,b,k) + tmp2(b)*rik(:,b)
                         end do
-                        !                   if ( (i==19 .or. k==19) .and. abs(sum(tmp2*rik))>0) print '(a, 6f23.15, 3i)', "2 1", atoms%f(:,19), tmp2*rik, i, j, k
+                        !                   if ( (i==19 .or. k==19) .and. abs(sum(tmp2*rik))>0) print '(a, 6f23.15, 3i)', "2 1", f(:,19), tmp2*rik, i, j, k
 
                         if (.not. is_carbon(atoms, ktype)) cycle
 
                         tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpI * dwik * SpN * Etmp / rikmag
                         do b = 1, atoms%nbeads
-                            atoms%f(:,b,i) = atoms%f(:,b,i) - tmp2(b)*rik(:,b)
-                            atoms%f(:,b,k) = atoms%f(:,b,k) + tmp2(b)*rik(:,b)
+                            f(:,b,i) = f(:,b,i) - tmp2(b)*rik(:,b)
+                            f(:,b,k) = f(:,b,k) + tmp2(b)*rik(:,b)
                         end do
-                        !                    if ( (i==19 .or. k==19) .and. abs(sum(tmp2*rik))>0) print '(a, 6f23.15)', "2 2", atoms%f(:,19), tmp2*rik
+                        !                    if ( (i==19 .or. k==19) .and. abs(sum(tmp2*rik))>0) print '(a, 6f23.15)', "2 2", f(:,19), tmp2*rik
 
                         if (any(abs(dNki) > TOLERANCE)) then
-                            do n = 1, atoms%natoms
+                            do nn = atoms%nl_first(k), atoms%nl_first(k+1)-1
+                                n = atoms%nl_list(nn)
+                                ntype = atoms%idx(n)
                                 if (n /= i .and. n /= k .and. atoms%pes(ktype, ntype) == pes_id_rebo) then
-                                    ntype = atoms%idx(n)
-                                    rkn = atoms%vectors(:,:,k,n)
-                                    rknmag = atoms%distances(:,k,n)
-                                    call cufu(rknmag, pes_rebo%Dmin(ktype,ntype), &
-                                        pes_rebo%Dmax(ktype,ntype), dummy, dwkn)
+                                    rkn = atoms%nl_vec(:,:,nn)
+                                    rknmag = atoms%nl_dist(:,nn)
+                                    dwkn = dw_nl(:,nn)
 
                                     tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpI * wik * dNki * dwkn * Etmp / rknmag
                                     do b = 1, atoms%nbeads
-                                        atoms%f(:,b,k) = atoms%f(:,b,k) - tmp2(b)*rkn(:,b)
-                                        atoms%f(:,b,n) = atoms%f(:,b,n) + tmp2(b)*rkn(:,b)
+                                        f(:,b,k) = f(:,b,k) - tmp2(b)*rkn(:,b)
+                                        f(:,b,n) = f(:,b,n) + tmp2(b)*rkn(:,b)
                                     end do
                                 !                            if ( (n==19 .or. k==19) .and. abs(sum(tmp2*rkn))>0) print '(a, 6f23.15)', "2 3", force(:,19), tmp2*rkn
                                 end if
@@ -2472,48 +2494,49 @@ contains
 
 
                 ! Tij forces
-                do l = 1, atoms%natoms
+                do ll = atoms%nl_first(j), atoms%nl_first(j+1)-1
+                    l = atoms%nl_list(ll)
+                    ltype = atoms%idx(l)
                     if (l /= i .and. l /= j .and. atoms%pes(ltype, jtype) == pes_id_rebo) then
 
-                        ltype = atoms%idx(l)
-                        rjlmag = atoms%distances(:,j,l)
-                        call cufu(rjlmag, pes_rebo%Dmin(jtype,ltype), &
-                            pes_rebo%Dmax(jtype,ltype), wjl, dwjl)
+                        rjlmag = atoms%nl_dist(:,ll)
+                        wjl  = w_nl(:,ll)
+                        dwjl = dw_nl(:,ll)
 
-                        rjl = atoms%vectors(:,:,j,l)
-                        Nlj = nC(:,l) + nH(:,l) - wjl
-                        call cufu(Nlj, CSF_LOW, CSF_HIGH, SpN, dNlj)
+                        rjl = atoms%nl_vec(:,:,ll)
+                        SpN  = spn_nl(:,ll)
+                        dNlj = dspn_nl(:,ll)
 
                         tmp2 = VA * dN3(2,:) * dwjl * Etmp / rjlmag
                         do b = 1, atoms%nbeads
-                            atoms%f(:,b,j) = atoms%f(:,b,j) - tmp2(b)*rjl(:,b)
-                            atoms%f(:,b,l) = atoms%f(:,b,l) + tmp2(b)*rjl(:,b)
+                            f(:,b,j) = f(:,b,j) - tmp2(b)*rjl(:,b)
+                            f(:,b,l) = f(:,b,l) + tmp2(b)*rjl(:,b)
                         end do
-                        !                    if ( (j==19 .or. l==19) .and. abs(sum(tmp2*rjl)>0) ) print '(a, 6f23.15)', "3 1", atoms%f(:,19) , tmp2*rjl
+                        !                    if ( (j==19 .or. l==19) .and. abs(sum(tmp2*rjl)>0) ) print '(a, 6f23.15)', "3 1", f(:,19) , tmp2*rjl
 
                         if (.not. is_carbon(atoms, ltype)) cycle
 
                         tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpJ * dwjl * SpN * Etmp / rjlmag
                         do b = 1, atoms%nbeads
-                            atoms%f(:,b,j) = atoms%f(:,b,j) - tmp2(b)*rjl(:,b)
-                            atoms%f(:,b,l) = atoms%f(:,b,l) + tmp2(b)*rjl(:,b)
+                            f(:,b,j) = f(:,b,j) - tmp2(b)*rjl(:,b)
+                            f(:,b,l) = f(:,b,l) + tmp2(b)*rjl(:,b)
                         end do
-                        !                    if ( (j==19 .or. l==19) .and. abs(sum(tmp2*rjl))>0) print '(a, 6f23.15)', "3 2", atoms%f(:,19), tmp2*rjl
+                        !                    if ( (j==19 .or. l==19) .and. abs(sum(tmp2*rjl))>0) print '(a, 6f23.15)', "3 2", f(:,19), tmp2*rjl
 
                         if (any(abs(dNlj) > TOLERANCE)) then
-                            do n = 1, atoms%natoms
+                            do nn = atoms%nl_first(l), atoms%nl_first(l+1)-1
+                                n = atoms%nl_list(nn)
+                                ntype = atoms%idx(n)
                                 if (n /= l .and. n /= j .and. atoms%pes(ltype, ntype) == pes_id_rebo) then
 
-                                    ntype = atoms%idx(n)
-                                    rln = atoms%vectors(:,:,l,n)
-                                    rlnmag = atoms%distances(:,l,n)
-                                    call cufu(rlnmag, pes_rebo%Dmin(ltype,ntype), &
-                                        pes_rebo%Dmax(ltype,ntype), dummy, dwln)
+                                    rln = atoms%nl_vec(:,:,nn)
+                                    rlnmag = atoms%nl_dist(:,nn)
+                                    dwln = dw_nl(:,nn)
 
                                     tmp2 = VA * dN3(3,:) * 2.0_dp * NconjtmpJ * wjl * dNlj * dwln * Etmp / rlnmag
                                     do b = 1, atoms%nbeads
-                                        atoms%f(:,b,l) = atoms%f(:,b,l) - tmp2(b)*rln(:,b)
-                                        atoms%f(:,b,n) = atoms%f(:,b,n) + tmp2(b)*rln(:,b)
+                                        f(:,b,l) = f(:,b,l) - tmp2(b)*rln(:,b)
+                                        f(:,b,n) = f(:,b,n) + tmp2(b)*rln(:,b)
                                     end do
                                 !                            if ( (j==19 .or. l==19) .and. abs(sum(tmp2*rln))>0) print '(a, 6f23.15)', "3 3", force(:,19), tmp2*rln
                                 end if
@@ -2541,7 +2564,7 @@ contains
             print *, "atom i has", NijH, "hydrogen neighbors"
             print *, "atom j has", NjiC, "carbon neighbors"
             print *, "atom j has", NjiH, "hydrogen neighbors"
-            print *, "dist_ij", atoms%distances(:,i,j)
+            print *, "dist_ij", atoms%nl_dist(:,ij)
             print *, "num_conj", Nijconj
             print *, "first_bracket", NconjtmpI
             print *, "second_bracket", NconjtmpJ
@@ -2566,54 +2589,97 @@ contains
     subroutine compute_rebo(atoms, flag)
 
         !   Calculates energy and forces with REBO potential
+        !   The bonds are distributed over nthreads threads. The pair cut-offs w_nl and the
+        !   conjugation cut-offs spn_nl (of the neighbour count of l without k) are evaluated
+        !   once per neighbour list entry (k,l) and shared by all bond orders of this step.
+        !   Every thread adds its forces to its own slice of the heap array f, the slices are
+        !   summed after the bond loop.
+
+        use run_config, only : simparams
+        !$ use omp_lib, only : omp_get_thread_num
 
         type(universe), intent(inout) :: atoms
         integer, intent(in) :: flag
 
-        integer ::  i, j, k, l, b, itype, jtype, ktype, ltype
-        real(dp), dimension(atoms%nbeads) :: rsq, rij, wij, fpair, wkl, dummy, dwij
-        real(dp), dimension(atoms%nbeads) :: VR, pre, dVRdi, VA, term, bij, dVAdi, dVA, temp_distance
+        integer ::  i, j, k, l, jj, ll, b, itype, jtype, ktype, ltype, nbonds, ithread
+        integer(8) :: count0, count1
+        real(dp), dimension(atoms%nbeads) :: rsq, rij, wij, fpair, dwij
+        real(dp), dimension(atoms%nbeads) :: VR, pre, dVRdi, VA, term, bij, dVAdi, dVA, epot
 
-        real(dp), dimension(3, atoms%nbeads) :: temp_vector
-        real(dp), dimension(atoms%nbeads, atoms%natoms) :: nH, nC
+        real(dp), allocatable :: nH(:,:), nC(:,:)
+        real(dp), allocatable :: f(:,:,:,:) ! forces of every thread
+        real(dp), allocatable :: w_nl(:,:), dw_nl(:,:), spn_nl(:,:), dspn_nl(:,:)
 
-        ! determine neighbors
-        nC = 0.0_dp
-        nH = 0.0_dp
+        if (simparams%debug(debug_id_rebo)) call system_clock(count0, rebo_rate)
 
-        do k = 1, atoms%natoms - 1
+        allocate(nH(atoms%nbeads, atoms%natoms), nC(atoms%nbeads, atoms%natoms), &
+            f(3, atoms%nbeads, atoms%natoms, 0:simparams%nthreads-1))
+        allocate(w_nl(atoms%nbeads, size(atoms%nl_list)), dw_nl(atoms%nbeads, size(atoms%nl_list)), &
+            spn_nl(atoms%nbeads, size(atoms%nl_list)), dspn_nl(atoms%nbeads, size(atoms%nl_list)))
+
+        ! pair cut-offs and neighbors
+        !$omp parallel do num_threads(simparams%nthreads) default(shared) private(l, ll, ktype, ltype)
+        do k = 1, atoms%natoms
             ktype = atoms%idx(k)
+            nC(:,k) = 0.0_dp
+            nH(:,k) = 0.0_dp
 
-            do l = k+1, atoms%natoms
+            do ll = atoms%nl_first(k), atoms%nl_first(k+1)-1
+                l = atoms%nl_list(ll)
                 ltype = atoms%idx(l)
 
                 if (atoms%pes(ktype, ltype) == pes_id_rebo) then
 
-                    call cufu(atoms%distances(:,k,l), pes_rebo%Dmin(ktype,ltype), &
-                        pes_rebo%Dmax(ktype,ltype), wkl, dummy)
+                    call cufu(atoms%nl_dist(:,ll), pes_rebo%Dmin(ktype,ltype), &
+                        pes_rebo%Dmax(ktype,ltype), w_nl(:,ll), dw_nl(:,ll))
 
-                    if (is_carbon(  atoms, ktype)) nC(:,l) = nC(:,l) + wkl
-                    if (is_hydrogen(atoms, ktype)) nH(:,l) = nH(:,l) + wkl
-                    if (is_carbon(  atoms, ltype)) nC(:,k) = nC(:,k) + wkl
-                    if (is_hydrogen(atoms, ltype)) nH(:,k) = nH(:,k) + wkl
+                    if (is_carbon(  atoms, ltype)) nC(:,k) = nC(:,k) + w_nl(:,ll)
+                    if (is_hydrogen(atoms, ltype)) nH(:,k) = nH(:,k) + w_nl(:,ll)
+                else
+                    w_nl(:,ll)  = 0.0_dp
+                    dw_nl(:,ll) = 0.0_dp
                 end if
             end do
         end do
+        !$omp end parallel do
+
+        ! conjugation cut-offs of the neighbors of k without k
+        !$omp parallel do num_threads(simparams%nthreads) default(shared) private(l, ll)
+        do k = 1, atoms%natoms
+            do ll = atoms%nl_first(k), atoms%nl_first(k+1)-1
+                l = atoms%nl_list(ll)
+                call cufu(nC(:,l) + nH(:,l) - w_nl(:,ll), CSF_LOW, CSF_HIGH, spn_nl(:,ll), dspn_nl(:,ll))
+            end do
+        end do
+        !$omp end parallel do
 
         ! two-body interactions
-        do i = 1, atoms%natoms-1
+        f      = 0.0_dp
+        epot   = 0.0_dp
+        nbonds = 0
+
+        !$omp parallel do num_threads(simparams%nthreads) default(shared) schedule(dynamic) &
+        !$omp private(j, jj, b, itype, jtype, rsq, rij, wij, fpair, dwij, VR, pre, dVRdi, VA, term, bij, dVAdi, dVA, ithread) &
+        !$omp reduction(+:epot, nbonds)
+        do i = 1, atoms%natoms
             itype = atoms%idx(i)
+            ithread = 0
+            !$ ithread = omp_get_thread_num()
 
-            do j = i+1, atoms%natoms
+            do jj = atoms%nl_first(i), atoms%nl_first(i+1)-1
+                j = atoms%nl_list(jj)
+                if (j < i) cycle
                 jtype = atoms%idx(j)
 
                 if (atoms%pes(itype, jtype) /= pes_id_rebo) cycle
 
-                rij = atoms%distances(:,i,j)
-                call cufu(rij, pes_rebo%Dmin(itype,jtype), pes_rebo%Dmax(itype,jtype), wij, dwij)
+                rij  = atoms%nl_dist(:,jj)
+                wij  = w_nl(:,jj)
+                dwij = dw_nl(:,jj)
 
                 if (all(wij < tolerance)) cycle
 
+                nbonds = nbonds + 1
                 rsq = rij*rij
 
                 VR = wij * (1.0_dp + (pes_rebo%Q(itype,jtype)/rij)) * &
@@ -2627,7 +2693,6 @@ contains
                 VA = 0.0_dp
                 dVA = 0.0_dp
                 do k = 1, 3
-                    !print *, wij, pes_rebo%B(k,itype,jtype), pes_rebo%beta(k,itype,jtype), rij
                     term = -wij * pes_rebo%B(k,itype,jtype) * exp(-pes_rebo%beta(k,itype,jtype)*rij)
                     VA   = VA + term
                     dVA  = dVA - pes_rebo%beta(k,itype,jtype) * term
@@ -2635,23 +2700,67 @@ contains
 
                 where (wij > tolerance) dVA = dVA + VA/wij * dwij
 
-                call rebo_bondorder(atoms, i, j, nC, nH, VA, bij, flag)
+                call rebo_bondorder(atoms, i, j, jj, nC, nH, w_nl, dw_nl, spn_nl, dspn_nl, VA, bij, f(:,:,:,ithread), flag)
                 dVAdi = bij*dVA
 
                 fpair = -(dVRdi+dVAdi) / rij
 
                 do b = 1, atoms%nbeads
-                    atoms%f(:,b,i) = atoms%f(:,b,i) + atoms%vectors(:,b,i,j)*fpair(b)
-                    atoms%f(:,b,j) = atoms%f(:,b,j) + atoms%vectors(:,b,j,i)*fpair(b)
+                    f(:,b,i,ithread) = f(:,b,i,ithread) + atoms%nl_vec(:,b,jj)*fpair(b)
+                    f(:,b,j,ithread) = f(:,b,j,ithread) - atoms%nl_vec(:,b,jj)*fpair(b)
                 end do
 
-                !            if (i==19) print '(a, 6f23.15)', "mother", all_force(:,19), del*fpair
-                !            if (j==19) print '(a, 6f23.15)', "mother", all_force(:,19), del*fpair
-
-                atoms%epot = atoms%epot + (VR + bij*VA)
+                epot = epot + (VR + bij*VA)
             end do
         end do
+        !$omp end parallel do
+
+        atoms%f    = atoms%f + sum(f, dim=4)
+        atoms%epot = atoms%epot + epot
+
+        ! timing with "debug rebo", printed once by print_rebo_timing
+        if (simparams%debug(debug_id_rebo)) then
+            call system_clock(count1)
+            rebo_calls = rebo_calls + 1
+            rebo_bonds = rebo_bonds + int(nbonds, 8)*atoms%nbeads
+            rebo_ticks = rebo_ticks + (count1-count0)
+        end if
 
     end subroutine compute_rebo
 
+
+
+    subroutine print_rebo_timing()
+
+        ! average time per bond and bead of all compute_rebo calls of the run, with "debug rebo"
+
+        use run_config, only : simparams
+
+        if (.not. simparams%debug(debug_id_rebo) .or. rebo_calls == 0) return
+
+        print '(a, i10, a, i14, a, i4, a, f12.1, a)', " REBO:", rebo_calls, " evaluations,", rebo_bonds, " bonds x beads,", &
+            simparams%nthreads, " threads,", 1.0e9_dp*real(rebo_ticks, dp)/real(rebo_rate, dp)/real(max(rebo_bonds, 1_8), dp), " ns/bond"
+
+    end subroutine print_rebo_timing
+
+
+
+    real(dp) function rebo_cutoff(atoms)
+
+        ! Largest pair distance with a REBO contribution, Dmaxp applies to the torsion
+
+        type(universe), intent(in) :: atoms
+
+        integer :: i, j
+
+        rebo_cutoff = 0.0_dp
+        do i = 1, atoms%ntypes
+            do j = 1, atoms%ntypes
+                if (atoms%pes(i,j) == pes_id_rebo) &
+                    rebo_cutoff = max(rebo_cutoff, pes_rebo%Dmax(i,j), pes_rebo%Dmaxp(i,j))
+            end do
+        end do
+
+    end function rebo_cutoff
+
 end module pes_rebo_mod
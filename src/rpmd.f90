@@ -31,6 +31,10 @@ module rpmd !ring polymer MD
 
     real(dp), allocatable :: cjk(:,:)
 
+    ! FFT normal mode transform (rpmd_fft), see build_fft
+    integer,     allocatable :: fft_rev(:)
+    complex(dp), allocatable :: fft_w(:)
+
     contains
 
     subroutine build_cjk(nbeads)
@@ -60,6 +64,158 @@ module rpmd !ring polymer MD
 
 
 
+    subroutine build_fft(nbeads)
+
+        ! bit-reversed bead order and twiddle factors exp(-2 pi i k/nbeads) of the radix-2 FFT
+        ! nbeads is a power of two, see ensure_input_sanity() and ensure_geometry_sanity()
+
+        integer, intent(in) :: nbeads
+
+        integer :: t, k, nbits, i_bit
+
+        allocate(fft_rev(nbeads), fft_w(nbeads/2))
+
+        nbits = nint(log(real(nbeads, dp))/log(2.0_dp))
+        do t = 0, nbeads-1
+            k = 0
+            do i_bit = 0, nbits-1
+                if (btest(t, i_bit)) k = ibset(k, nbits-1-i_bit)
+            end do
+            fft_rev(t+1) = k+1
+        end do
+
+        do k = 0, nbeads/2-1
+            fft_w(k+1) = exp(cmplx(0.0_dp, -2.0_dp*pi*k/nbeads, kind=dp))
+        end do
+
+    end subroutine build_fft
+
+
+
+    subroutine fft_beads(z, nbeads, n, isign)
+
+        ! in-place complex FFT along the bead index of z, sum_t z_t exp(isign 2 pi i t m/nbeads)
+
+        integer, intent(in)        :: nbeads, n, isign
+        complex(dp), intent(inout) :: z(3, nbeads, n)
+
+        integer     :: t, k, s, half, len
+        complex(dp) :: w, tmp(3, n)
+
+        do t = 1, nbeads
+            if (t < fft_rev(t)) then
+                tmp = z(:,t,:)
+                z(:,t,:) = z(:,fft_rev(t),:)
+                z(:,fft_rev(t),:) = tmp
+            end if
+        end do
+
+        len = 2
+        do while (len <= nbeads)
+            half = len/2
+            do s = 1, nbeads, len
+                do k = 0, half-1
+                    w = fft_w(k*(nbeads/len)+1)
+                    if (isign > 0) w = conjg(w)
+                    tmp = z(:,s+k+half,:) * w
+                    z(:,s+k+half,:) = z(:,s+k,:) - tmp
+                    z(:,s+k,:)      = z(:,s+k,:) + tmp
+                end do
+            end do
+            len = 2*len
+        end do
+
+    end subroutine fft_beads
+
+
+
+    subroutine to_normal_modes(x, y, nbeads, n)
+
+        ! y(:,m,:) = sum_j x(:,j,:)*cjk(j,m) for n atoms, by FFT (rpmd_fft) or with the cjk matrix
+
+        integer, intent(in)   :: nbeads, n
+        real(dp), intent(in)  :: x(3, nbeads, n)
+        real(dp), intent(out) :: y(3, nbeads, n)
+
+        complex(dp) :: z(3, nbeads, n)
+        integer     :: j, m
+
+        if (.not. simparams%rpmd_fft) then
+            if (.not. allocated(cjk)) call build_cjk(nbeads)
+            y = 0.0_dp
+            do m = 1, nbeads
+                do j = 1, nbeads
+                    y(:,m,:) = y(:,m,:) + x(:,j,:)*cjk(j,m)
+                end do
+            end do
+            return
+        end if
+
+        if (.not. allocated(fft_w)) call build_fft(nbeads)
+
+        ! bead j has the phase exp(2 pi i j m/nbeads), so bead nbeads goes first
+        z(:,1,:) = x(:,nbeads,:)
+        z(:,2:nbeads,:) = x(:,1:nbeads-1,:)
+
+        call fft_beads(z, nbeads, n, -1)
+
+        ! cosine modes up to nbeads/2 (real part), sine modes above (-imaginary part)
+        y(:,1,:) = sqrt(1.0_dp/nbeads) * real(z(:,1,:))
+        do m = 1, nbeads/2-1
+            y(:,m+1,:) = sqrt(2.0_dp/nbeads) * real(z(:,m+1,:))
+        end do
+        y(:,nbeads/2+1,:) = sqrt(1.0_dp/nbeads) * real(z(:,nbeads/2+1,:))
+        do m = nbeads/2+1, nbeads-1
+            y(:,m+1,:) = -sqrt(2.0_dp/nbeads) * aimag(z(:,m+1,:))
+        end do
+
+    end subroutine to_normal_modes
+
+
+
+    subroutine from_normal_modes(y, x, nbeads, n)
+
+        ! x(:,j,:) = sum_m y(:,m,:)*cjk(j,m), inverse of to_normal_modes
+
+        integer, intent(in)   :: nbeads, n
+        real(dp), intent(in)  :: y(3, nbeads, n)
+        real(dp), intent(out) :: x(3, nbeads, n)
+
+        complex(dp) :: z(3, nbeads, n)
+        integer     :: j, m
+
+        if (.not. simparams%rpmd_fft) then
+            if (.not. allocated(cjk)) call build_cjk(nbeads)
+            x = 0.0_dp
+            do j = 1, nbeads
+                do m = 1, nbeads
+                    x(:,j,:) = x(:,j,:) + y(:,m,:)*cjk(j,m)
+                end do
+            end do
+            return
+        end if
+
+        if (.not. allocated(fft_w)) call build_fft(nbeads)
+
+        ! sin(phi) = Re(-i exp(i phi))
+        z(:,1,:) = sqrt(1.0_dp/nbeads) * y(:,1,:)
+        do m = 1, nbeads/2-1
+            z(:,m+1,:) = sqrt(2.0_dp/nbeads) * y(:,m+1,:)
+        end do
+        z(:,nbeads/2+1,:) = sqrt(1.0_dp/nbeads) * y(:,nbeads/2+1,:)
+        do m = nbeads/2+1, nbeads-1
+            z(:,m+1,:) = cmplx(0.0_dp, -sqrt(2.0_dp/nbeads), kind=dp) * y(:,m+1,:)
+        end do
+
+        call fft_beads(z, nbeads, n, 1)
+
+        x(:,nbeads,:) = real(z(:,1,:))
+        x(:,1:nbeads-1,:) = real(z(:,2:nbeads,:))
+
+    end subroutine from_normal_modes
+
+
+
     real(dp) function calc_bead_temperature(atoms) result(temperature)
 
         type(universe), intent(in) :: atoms
@@ -316,9 +472,7 @@ module rpmd !ring polymer MD
         real(dp) :: twown, wk, wt, wm, cos_wt, sin_wt
         real(dp) :: betaN, piN, mass, prefactor
 
-        integer :: i, b, k, prev_idx, next_idx
-
-        if (.not. allocated(cjk)) call build_cjk(atoms%nbeads)
+        integer :: i, b, prev_idx, next_idx
 
         ! save positions and velocities
         saveR     = atoms%r
@@ -326,29 +480,9 @@ module rpmd !ring polymer MD
         prefactor = -1 * atoms%m(1) * (kB*simparams%Tproj*atoms%nbeads/hbar)**2
 
         ! Transform to normal mode space
-        call calc_momentum_all(atoms, p)
-        q = atoms%r
-
-        !        do k = 1, 3
-        !            do i = 1, atoms%natoms
-        !                call rfft(p(k,:,i), atoms%nbeads)
-        !                call rfft(q(k,:,i), atoms%nbeads)
-        !            end do
-        !        end do
-
-        ! TODO: Intel MKL 3D-FFT should be faster
-
-        newP = 0.0_dp
-        newQ = 0.0_dp
-        do b = 1, atoms%nbeads
-            do k = 1, atoms%nbeads
-                newP(:,b,:) = newP(:,b,:) + p(:,k,:)*cjk(k,b)
-                newQ(:,b,:) = newQ(:,b,:) + q(:,k,:)*cjk(k,b)
-            end do
-        end do
-        !        print *, "firstp", newP(:,1,1)
-        p = newP
-        q = newQ
+        call calc_momentum_all(atoms, newP)
+        call to_normal_modes(newP, p, atoms%nbeads, atoms%natoms)
+        call to_normal_modes(atoms%r, q, atoms%nbeads, atoms%natoms)
 
         piN = pi / atoms%nbeads
         do i = 1, atoms%natoms
@@ -393,20 +527,14 @@ module rpmd !ring polymer MD
         end do
 
         ! Transform back to Cartesian space
-        where(.not. atoms%is_fixed)
-            atoms%r = 0.0_dp
-            atoms%v = 0.0_dp
-        end where
+        call from_normal_modes(q, newQ, atoms%nbeads, atoms%natoms)
+        call from_normal_modes(p, newP, atoms%nbeads, atoms%natoms)
 
         do i = 1, atoms%natoms
-            do b = 1, atoms%nbeads
-                do k = 1, atoms%nbeads
-                    where (.not. atoms%is_fixed(:,b,i))
-                        atoms%r(:,b,i) = atoms%r(:,b,i) + q(:,k,i)*cjk(b,k)
-                        atoms%v(:,b,i) = atoms%v(:,b,i) + p(:,k,i)*cjk(b,k)/atoms%m(i)
-                    end where
-                end do
-            end do
+            where (.not. atoms%is_fixed(:,:,i))
+                atoms%r(:,:,i) = newQ(:,:,i)
+                atoms%v(:,:,i) = newP(:,:,i)/atoms%m(i)
+            end where
         end do
 
 
@@ -434,20 +562,6 @@ module rpmd !ring polymer MD
             end do
         end if
 
-        !        do k = 1, 3
-        !            do i = 1, atoms%natoms
-        !                call irfft(p(k,:,i), atoms%nbeads)
-        !                call irfft(q(k,:,i), atoms%nbeads)
-        !            end do
-        !        end do
-        !
-        !        do i = 1, atoms%natoms
-        !            where(.not. atoms%is_fixed(:,:,i))
-        !                atoms%r(:,:,i) = q(:,:,i)
-        !                atoms%v(:,:,i) = p(:,:,i)/atoms%m(i)
-        !            end where
-        !        end do
-
 
     end subroutine do_ring_polymer_step
 
@@ -573,74 +687,4 @@ module rpmd !ring polymer MD
 
 
 
-    ! Compute the real fast Fourier transform of the given array of data.
-    ! Parameters:
-    !   x - The array of data to transform
-    !   N - The length of the array of data
-    ! Returns:
-    !   x - The transformed array of data, in half-complex form
-!    subroutine rfft(x,N)
-!        implicit none
-!
-!        integer, intent(in) :: N
-!        double precision, intent(inout) :: x(N)
-!
-!        integer, parameter :: Nmax = 1024
-!        integer :: Np
-!        double precision :: copy(Nmax), factor
-!        integer(8) :: plan
-!
-!
-!        data Np /0/
-!        save copy, factor, plan, Np
-!
-!        if (N .ne. Np) then
-!            if (Np .ne. 0) call dfftw_destroy_plan(plan)
-!            call dfftw_plan_r2r_1d(plan,N,copy,copy,0,64)
-!            factor = sqrt(1.0d0/N)
-!            Np = N
-!        end if
-!
-!        copy(1:N) = x
-!        call dfftw_execute(plan)
-!        x = factor * copy(1:N)
-!
-!    end subroutine rfft
-
-    ! Compute the inverse real fast Fourier transform of the given array of data.
-    ! Parameters:
-    !   x - The array of data to transform, in half-complex form
-    !   N - The length of the array of data
-    ! Returns:
-    !   x - The transformed array of data
-!    subroutine irfft(x,N)
-!
-!        implicit none
-!        integer, intent(in) :: N
-!        double precision, intent(inout) :: x(N)
-!
-!        integer, parameter :: Nmax = 1024
-!        integer :: Np
-!        double precision :: copy(Nmax), factor
-!        integer(8) :: plan
-!
-!        data Np /0/
-!        save copy, factor, plan, Np
-!
-!        if (N .ne. Np) then
-!            ! The input array is a different length than the last array, so we
-!            ! must generate a new FFTW plan for the transform
-!            ! First delete the previous plan
-!            if (Np .ne. 0) call dfftw_destroy_plan(plan)
-!            call dfftw_plan_r2r_1d(plan,N,copy,copy,1,64)
-!            factor = sqrt(1.0d0/N)
-!            Np = N
-!        end if
-!
-!        copy(1:N) = x
-!        call dfftw_execute(plan)
-!        x = factor * copy(1:N)
-!
-!    end subroutine irfft
-
 end module rpmd
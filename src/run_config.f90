@@ -56,6 +56,7 @@ module run_config
         integer :: nconfs                                           ! number of configurations to read in
         character(len=max_string_length) :: merge_proj_file         ! name of folder containing projecile configuration
         integer :: merge_proj_nconfs                                ! number of projectile configurations
+        integer :: iconf, merge_proj_iconf                          ! drawn slab and projectile configuration in packed libraries
         integer :: rep(2)                                           ! defines in-plane repetitions
         character(len=max_string_length) :: pes_file                ! name of the file that stores the potential parameters
         character(len=3)  :: run                                    ! what to do
@@ -74,11 +75,20 @@ module run_config
         real(dp) :: evasp                                           ! reference energy for fit
         integer  :: maxit                                           ! maximum number of iteration during fit
         integer  :: nthreads                                        ! number of threads used for fitting
+        integer  :: nworkers                                        ! number of processes running trajectories in md
         real(dp) :: adsorption_start, adsorption_end                ! define adsorption start and end. it starts when below 'start' and ends when above 'end'
         integer  :: nran                                            ! type of the random number generator
         logical  :: debug(number_of_pess)                           ! for the chosen pes this variable turn on more information for debugging purposes
         logical  :: loutput                                         ! if any output format is set, this variable is true; should reduce the if condition per step when no output is chosen
         logical  :: lbead_output_format                             ! defines if centroid positions or each bead is written out in a separate data file
+        real(dp) :: nl_skin                                         ! skin of the Verlet neighbour list in A; all pairs are evaluated if not set
+        logical  :: emt_dense                                       ! use the serial EMT routines with N x N derivative arrays (regression checks)
+        logical  :: rpmd_fft                                        ! ring polymer normal mode transform by FFT instead of the cjk matrix
+        logical  :: frozen_pairs                                    ! keep the constant terms of pairs of frozen atoms, no forces on frozen atoms
+        logical  :: traj_bin_double                                 ! traj_bin frames in double instead of single precision
+        integer  :: runner_block                                    ! runner output: structures buffered per write, the file stays open
+        real(dp) :: runner_novelty_e                                ! runner output: minimum change of the energy per atom (eV) to the last written structure
+        real(dp) :: runner_novelty_f                                ! runner output: minimum change of a centroid force component (eV/A) to the last written structure
 
     end type
 
@@ -111,6 +121,8 @@ contains
         new_simulation_parameters%confname_file         = default_string
         new_simulation_parameters%merge_proj_file       = default_string
         new_simulation_parameters%merge_proj_nconfs     = default_int
+        new_simulation_parameters%iconf                 = default_int
+        new_simulation_parameters%merge_proj_iconf      = default_int
         new_simulation_parameters%rep                   = [0,0]
         new_simulation_parameters%nconfs                = default_int
         new_simulation_parameters%pes_file              = default_string
@@ -128,18 +140,28 @@ contains
         new_simulation_parameters%evasp                 = default_real
         new_simulation_parameters%maxit                 = 30
         new_simulation_parameters%nthreads              = 1
+        new_simulation_parameters%nworkers              = 1
         new_simulation_parameters%adsorption_start      = default_real
         new_simulation_parameters%adsorption_end        = default_real
         new_simulation_parameters%nran                  = default_int
         new_simulation_parameters%debug                 = default_bool
         new_simulation_parameters%loutput               = default_bool
         new_simulation_parameters%lbead_output_format   = default_bool
+        new_simulation_parameters%nl_skin               = default_real
+        new_simulation_parameters%emt_dense             = default_bool
+        new_simulation_parameters%rpmd_fft              = default_bool
+        new_simulation_parameters%frozen_pairs          = default_bool
+        new_simulation_parameters%traj_bin_double       = default_bool
+        new_simulation_parameters%runner_block          = default_int
+        new_simulation_parameters%runner_novelty_e      = default_real
+        new_simulation_parameters%runner_novelty_f      = default_real
 
     end function
 
-    subroutine read_input_file(input_file)
+    subroutine read_input_file(input_file, worker_start, worker_ntrajs)
 
-        character(len=*), intent(in) :: input_file
+        character(len=*), intent(in)  :: input_file
+        integer, intent(in), optional :: worker_start, worker_ntrajs  ! trajectories of a worker process, see run_workers()
 
         integer :: i, ios = 0, line = 0, nwords, randk, word
         real(dp) :: rnd
@@ -208,6 +230,8 @@ contains
             simparams%nran = 2
         end if
 
+        if (present(worker_start)) simparams%start = worker_start
+
         call rnd_seed(simparams%nran,simparams%start) ! seed the RNG
 
         ! read rest of the input file
@@ -476,6 +500,7 @@ contains
 
                                 case ('merge')
                                     ! conf mergewith <mxt_folder> <n>: randomly select mxt files 1<=x<=n from folder
+                                    ! instead of a folder, a packed library <file.mxtlib> can be given (see is_mxt_library)
                                     if (nwords /= 6) stop err // "conf merge needs projectile mxt folder, # of projectile configurations therein &
                                         lattice mxt folder and # of lattice configurations therein"
 
@@ -484,16 +509,24 @@ contains
                                     read(words(4),'(i1000)',iostat=ios) simparams%merge_proj_nconfs
                                     if (ios /= 0) stop err // "conf key - number of configurations must be integer"
                                     call random_number(rnd)
-                                    write(simparams%merge_proj_file, '(2a, i8.8, a)') &
-                                        trim(simparams%merge_proj_file), "/mxt_", int(rnd*simparams%merge_proj_nconfs)+1, ".dat"
+                                    if (is_mxt_library(simparams%merge_proj_file)) then
+                                        simparams%merge_proj_iconf = int(rnd*simparams%merge_proj_nconfs)+1
+                                    else
+                                        write(simparams%merge_proj_file, '(2a, i8.8, a)') &
+                                            trim(simparams%merge_proj_file), "/mxt_", int(rnd*simparams%merge_proj_nconfs)+1, ".dat"
+                                    end if
 
                                     ! slab
                                     read(words(5),'(A)') simparams%confname_file
                                     read(words(6),'(i1000)',iostat=ios) simparams%nconfs
                                     if (ios /= 0) stop err // "conf key - number of configurations must be integer"
                                     call random_number(rnd)
-                                    write(simparams%confname_file, '(2a, i8.8, a)') &
-                                        trim(simparams%confname_file), "/mxt_", int(rnd*simparams%nconfs)+1, ".dat"
+                                    if (is_mxt_library(simparams%confname_file)) then
+                                        simparams%iconf = int(rnd*simparams%nconfs)+1
+                                    else
+                                        write(simparams%confname_file, '(2a, i8.8, a)') &
+                                            trim(simparams%confname_file), "/mxt_", int(rnd*simparams%nconfs)+1, ".dat"
+                                    end if
 
 
                                 case default
@@ -519,6 +552,12 @@ contains
                                 case (output_key_energy)
                                     simparams%output_type(i) = output_id_energy
                                     simparams%loutput = .true.
+                                case (output_key_energy_bin)
+                                    simparams%output_type(i) = output_id_energy_bin
+                                    simparams%loutput = .true.
+                                case (output_key_traj_bin)
+                                    simparams%output_type(i) = output_id_traj_bin
+                                    simparams%loutput = .true.
                                 case (output_key_poscar)
                                     simparams%output_type(i) = output_id_poscar
                                     simparams%loutput = .true.
@@ -530,6 +569,8 @@ contains
                                     simparams%loutput = .true.
                                 case (output_key_scatter)
                                     simparams%output_type(i) = output_id_scatter
+                                case (output_key_scatter_bin)
+                                    simparams%output_type(i) = output_id_scatter_bin
                                 case (output_key_is_adsorbed)
                                     simparams%output_type(i) = output_id_is_adsorbed
                                     simparams%loutput = .true.
@@ -642,6 +683,62 @@ contains
                         read(words(2), *, iostat=ios) simparams%nthreads
                         if (ios /= 0) stop err // "Error reading number of threads"
 
+                    case ('nworkers')
+
+                        read(words(2), *, iostat=ios) simparams%nworkers
+                        if (ios /= 0) stop err // "Error reading number of workers"
+                        if (simparams%nworkers < 1) stop err // "nworkers must be larger than zero"
+
+                    case ('neighbour_list')
+
+                        if (simparams%nl_skin /= default_real) stop err // "neighbour_list key set multiple times"
+                        if (nwords /= 2) stop err // "neighbour_list key needs a single argument (skin in A)"
+                        read(words(2), *, iostat=ios) simparams%nl_skin
+                        if (ios /= 0) stop err // "Error reading the neighbour list skin"
+                        if (simparams%nl_skin < 0.0_dp) stop err // "neighbour list skin must not be negative"
+
+                    case ('emt_dense')
+
+                        if (simparams%emt_dense) stop err // "emt_dense key set multiple times"
+                        if (nwords /= 1) stop err // "emt_dense key needs no argument"
+                        simparams%emt_dense = .true.
+
+                    case ('rpmd_fft')
+
+                        if (simparams%rpmd_fft) stop err // "rpmd_fft key set multiple times"
+                        if (nwords /= 1) stop err // "rpmd_fft key needs no argument"
+                        simparams%rpmd_fft = .true.
+
+                    case ('frozen_pairs')
+
+                        if (simparams%frozen_pairs) stop err // "frozen_pairs key set multiple times"
+                        if (nwords /= 1) stop err // "frozen_pairs key needs no argument"
+                        simparams%frozen_pairs = .true.
+
+                    case ('traj_bin_double')
+
+                        if (simparams%traj_bin_double) stop err // "traj_bin_double key set multiple times"
+                        if (nwords /= 1) stop err // "traj_bin_double key needs no argument"
+                        simparams%traj_bin_double = .true.
+
+                    case ('runner_buffer')
+
+                        if (simparams%runner_block /= default_int) stop err // "runner_buffer key set multiple times"
+                        if (nwords /= 2) stop err // "runner_buffer key needs a single argument (structures per block)"
+                        read(words(2), *, iostat=ios) simparams%runner_block
+                        if (ios /= 0) stop err // "Error reading the runner_buffer block size"
+                        if (simparams%runner_block < 1) stop err // "runner_buffer block size must be positive"
+
+                    case ('runner_novelty')
+
+                        if (simparams%runner_novelty_e /= default_real) stop err // "runner_novelty key set multiple times"
+                        if (nwords /= 3) stop err // "runner_novelty key needs 2 arguments (energy per atom in eV, force in eV/A)"
+                        read(words(2), *, iostat=ios) simparams%runner_novelty_e
+                        if (ios == 0) read(words(3), *, iostat=ios) simparams%runner_novelty_f
+                        if (ios /= 0) stop err // "Error reading the runner_novelty thresholds"
+                        if (simparams%runner_novelty_e < 0.0_dp .or. simparams%runner_novelty_f < 0.0_dp) &
+                            stop err // "runner_novelty thresholds must not be negative"
+
                     case ('adsorption_distance')
 
                         if (nwords /= 3) stop err // "adsorption_distance key needs 2 arguments"
@@ -655,6 +752,8 @@ contains
                                 select case(trim(words(word+1)))
                                     case (pes_name_nene)
                                         simparams%debug(debug_id_nene) = .true.
+                                    case (pes_name_rebo)
+                                        simparams%debug(debug_id_rebo) = .true.
                                     case default
                                         print *, warn, "no debug information available for ", trim(words(word+1))
                                 end select
@@ -674,6 +773,27 @@ contains
 
         close(inp_unit)
 
+        if (present(worker_ntrajs)) then
+            simparams%ntrajs   = worker_ntrajs
+            simparams%nworkers = 1
+        end if
+
     end subroutine read_input_file
 
+
+
+    logical function is_mxt_library(fname)
+
+        ! packed configuration library written by scripts/structure_preparation/create_mxt_library.py
+
+        character(len=*), intent(in) :: fname
+
+        integer :: n
+
+        n = len_trim(fname)
+        is_mxt_library = n > 7
+        if (is_mxt_library) is_mxt_library = fname(n-6:n) == ".mxtlib"
+
+    end function is_mxt_library
+
 end module run_config
@@ -61,8 +61,18 @@ module universe_mod
         real(dp)                      :: isimbox(3,3)    ! inverse simulation cell
         logical                       :: is_cart         ! if geometry is cartesian or direct
 
-        real(dp), allocatable         :: distances(:,:,:)
-        real(dp), allocatable         :: vectors(:,:,:,:)
+        integer,  allocatable         :: nl_first(:)     ! neighbours of atom i are nl_list(nl_first(i):nl_first(i+1)-1)
+        integer,  allocatable         :: nl_list(:)      ! neighbour atoms, ascending per atom
+        integer,  allocatable         :: nl_rev(:)       ! entry of atom i in the list of j for the entry ij of j in the list of i
+        real(dp), allocatable         :: nl_dist(:,:)    ! (nbeads, entry) minimum image bead distances of the list entries
+        real(dp), allocatable         :: nl_vec(:,:,:)   ! (3, nbeads, entry) r_i - r_j for the entry ij of j in the list of i
+        real(dp), allocatable         :: nl_r(:,:,:)     ! positions at the last neighbour list build
+        real(dp)                      :: nl_simbox(3,3)  ! simulation cell at the last neighbour list build
+
+        logical,  allocatable         :: fz_atom(:)      ! frozen_pairs: atoms with all beads fixed, unset when the neighbour list changes
+        real(dp), allocatable         :: fz_sigma(:,:)   ! frozen_pairs: (nbeads, natoms) EMT density sums over the frozen neighbours of frozen atoms
+        real(dp), allocatable         :: fz_pair(:,:)    ! frozen_pairs: (nbeads, natoms) EMT pair energy sums over the same pairs
+        real(dp), allocatable         :: fz_lj(:)        ! frozen_pairs: (nbeads) LJ energy of the pairs of frozen atoms
 
     end type universe
 